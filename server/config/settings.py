@@ -30,6 +30,11 @@ if SLAVE_DIR.exists():
 else:
     print(f"✗ Warning: Slave directory not found at {SLAVE_DIR}")
 
+# tools/file_sender.py：視窗化檔案上傳 (core.bus_hub 與主機工具共用)
+TOOLS_DIR = PROJECT_ROOT / 'tools'
+if str(TOOLS_DIR) not in sys.path:
+    sys.path.insert(0, str(TOOLS_DIR))
+
 PROTOCOL_CONFIG = {
     'schema_dir': str(SLAVE_DIR / 'schema'),
     'version': 3,
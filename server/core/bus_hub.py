@@ -1,7 +1,9 @@
 # server/core/bus_hub.py
-import hashlib
+import threading
 import time
 from .protocol import proto_mgr
+from lib.proto import StreamParser
+from file_sender import WindowedSender
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,7 +11,32 @@ logger = logging.getLogger(__name__)
 class MCUCommandHub:
     def __init__(self, bus):
         self.bus = bus  # 持有 NetBus 實例
-        self.ack_event = None # 用於同步文件上傳的事件 (如果你在 Django 使用多執行緒)
+        self.parser = StreamParser()
+        self.sender = None   # 上傳中的 WindowedSender：收到 FILE_ACK (0x2004) 轉給它
+
+    # --- 0. 收包 ---
+    def feed(self, data):
+        """餵入 slave 上行的 NL3 字節流 (Consumer 收到的 bytes_data 或 NetBus 手動模式讀出的數據)"""
+        self.parser.feed(data)
+        for ver, addr, cmd, payload in self.parser.pop():
+            name, args = proto_mgr.unpack(cmd, payload)
+            if name:
+                self.on_packet(cmd, args)
+
+    def on_packet(self, cmd, args):
+        if cmd == 0x2004 and self.sender:
+            self.sender.on_ack(args)
+
+    def _rx_loop(self, stop):
+        """上傳期間輪詢 NetBus (手動模式，無 app)：ACK 不經 Consumer 時由此收進來"""
+        buf = bytearray(4096)
+        while not stop.is_set():
+            self.bus.poll()
+            n = self.bus.readinto(buf) if self.bus.any() else 0
+            if n:
+                self.feed(buf[:n])
+            else:
+                time.sleep(0.001)
 
     # --- 1. 發現與連接測試 ---
     def test_handshake(self):
@@ -28,36 +55,27 @@ class MCUCommandHub:
     # --- 3. 檔案上傳 (從 PCTestTool 遷移) ---
     def upload_file(self, local_data, remote_path, chunk_size=1024):
         """
-        將 PCTestTool 的上傳邏輯遷移至此
+        視窗化管線上傳 (tools/file_sender.WindowedSender，與 NetBusMaster / pc_test_tool 共用)
+        FILE_ACK 來源：Consumer 把上行包交給 feed()；bus 為 NetBus 時另起執行緒輪詢
         注意：Django 環境建議異步或使用線程處理大文件，避免阻塞主循環
         """
-        sha_bytes = hashlib.sha256(local_data).digest()
         f_id = int(time.time()) & 0xFFFF # 隨機 file_id
-        
-        # 1. FILE_BEGIN (0x2001)
-        begin_pkt = proto_mgr.pack(0x2001, {
-            "file_id": f_id,
-            "total_size": len(local_data),
-            "chunk_size": chunk_size,
-            "sha256": sha_bytes,
-            "path": remote_path
-        })
-        self.bus.write(begin_pkt)
-        time.sleep(0.1) # 給 MCU 準備時間
-        
-        # 2. FILE_CHUNK (0x2002)
-        for offset in range(0, len(local_data), chunk_size):
-            chunk = local_data[offset : offset + chunk_size]
-            chunk_pkt = proto_mgr.pack(0x2002, {
-                "file_id": f_id,
-                "offset": offset,
-                "data": chunk
-            })
-            self.bus.write(chunk_pkt)
-            # 這裡暫時使用簡易延時，未來可對接更複雜的 ACK 停等機制
-            time.sleep(0.02) 
-        
-        # 3. FILE_END (0x2003)
-        end_pkt = proto_mgr.pack(0x2003, {"file_id": f_id})
-        self.bus.write(end_pkt)
-        logger.info(f"[{self.bus.label}] Uploaded {remote_path} ({len(local_data)} bytes)")
\ No newline at end of file
+        sender = WindowedSender(lambda cmd, args: self.bus.write(proto_mgr.pack(cmd, args)),
+                                chunk_size=chunk_size)
+        self.sender = sender
+        stop = threading.Event()
+        if hasattr(self.bus, "readinto"):
+            threading.Thread(target=self._rx_loop, args=(stop,), daemon=True).start()
+        try:
+            st = sender.send_file(local_data, remote_path, file_id=f_id)
+        finally:
+            stop.set()
+            self.sender = None
+        logger.info(f"[{self.bus.label}] Uploaded {remote_path} ({len(local_data)} bytes, "
+                    f"{st['kbps']} KB/s, retx {st['retransmits']})")
+        return st
+
+    # --- 4. 像素重映射表 ---
+    def upload_remap(self, table_bytes):
+        """上傳 remap.bin (由 light_control.config_store.build_remap_table 產生)，slave 收到 FILE_END 即套用"""
+        self.upload_file(table_bytes, "/remap.bin")
@@ -2,13 +2,13 @@
 from __future__ import annotations
 from pathlib import Path
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 import os, json
 
 from .pxld_v3_decoder_api import PXLDv3DecoderAPI
 from .pxld_v3_decoder import PXLDv3
-from .config_store import load_json, save_json, load_mapping, save_mapping
+from .config_store import load_json, save_json, load_mapping, save_mapping, build_remap_table
 
 def _pxld_path(name: str) -> Path:
     # 只允許讀 media/netlight/pxld/
@@ -219,6 +219,28 @@ def mapping_set(request):
         save_mapping(slave_id, body)
         return JsonResponse({"ok": True})
 
+@require_http_methods(["GET"])
+def mapping_remap_bin(request):
+    """
+    GET:
+      /light/api/mapping/remap_bin/?slave_id=1&pixel_count=300
+
+    Return: remap.bin (application/octet-stream)，上傳至 slave 的 /remap.bin 即熱生效
+    """
+    slave_id = int(request.GET.get("slave_id", "-1"))
+    if slave_id < 0:
+        return JsonResponse({"ok": False, "err": "missing slave_id"}, status=400)
+
+    data = load_mapping(slave_id)
+    if data is None:
+        return JsonResponse({"ok": False, "err": f"mapping not found: {slave_id}"}, status=404)
+
+    pixel_count = request.GET.get("pixel_count")
+    blob = build_remap_table(data, int(pixel_count) if pixel_count else None)
+    resp = HttpResponse(blob, content_type="application/octet-stream")
+    resp["Content-Disposition"] = f'attachment; filename="remap_slave_{slave_id}.bin"'
+    return resp
+
 @require_http_methods(["GET"])
 def pxld_slave_frame_rgbw(request):
     """
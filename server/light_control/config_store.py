@@ -1,6 +1,7 @@
 # light_control/config_store.py
 from __future__ import annotations
 import json
+import struct
 from pathlib import Path
 from django.conf import settings
 
@@ -78,4 +79,23 @@ def save_mapping(slave_id: int, data: dict):
 
 def get_mapping_path(slave_id: int) -> Path:
     """獲取 mapping 文件路徑"""
-    return Path(settings.MEDIA_ROOT) / "netlight" / "mappings" / f"mapping_slave_{slave_id}.json"
\ No newline at end of file
+    return Path(settings.MEDIA_ROOT) / "netlight" / "mappings" / f"mapping_slave_{slave_id}.json"
+
+def build_remap_table(data: dict, pixel_count: int | None = None) -> bytes:
+    """
+    由 mapping (pxld_id -> mcu_id) 編譯 slave 端的 remap.bin
+    格式: uint16 小端序陣列，索引 = mcu_id (實體接線順序)，值 = pxld_id (show 中的邏輯順序)
+    未對應的 mcu_id 保持直通
+    """
+    entries = data.get("map", []) if data else []
+    if pixel_count is None:
+        pixel_count = max((int(e["mcu_id"]) for e in entries), default=-1) + 1
+
+    table = list(range(pixel_count))
+    for e in entries:
+        mcu_id = int(e["mcu_id"])
+        pxld_id = int(e["pxld_id"])
+        if 0 <= mcu_id < pixel_count and 0 <= pxld_id < pixel_count:
+            table[mcu_id] = pxld_id
+
+    return struct.pack(f"<{pixel_count}H", *table)
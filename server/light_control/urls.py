@@ -30,5 +30,6 @@ urlpatterns = [
 
     path("api/mapping/get/", api_views.mapping_get, name="mapping_get"),
     path("api/mapping/set/", api_views.mapping_set, name="mapping_set"),
+    path("api/mapping/remap_bin/", api_views.mapping_remap_bin, name="mapping_remap_bin"),
     path("api/mapping/auto_arrange/", api_views.auto_arrange, name="mapping_auto_arrange"),
 ]
\ No newline at end of file
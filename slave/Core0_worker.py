@@ -2,6 +2,7 @@
 import time, gc
 from lib.sys_bus import bus
 from lib.net_bus import NetBus
+from lib.file_rx import MCAST_CHUNK
 
 def check_network(lan, state):
     """
@@ -40,9 +41,12 @@ def task_loop(app):
     net_state = {"was_connected": False, "last_retry": 0, "retry_count": 0}
     
     lan = bus.get_service("lan")
+    hub = bus.get_service("pixel_stream")
     
-    ctrl_bus = NetBus(NetBus.TYPE_WS, app=app, label="CTRL-WS")
-    discovery_bus = NetBus(NetBus.TYPE_UDP, app=app, label="UDP-DISCV")
+    # UDP 數據報需整包收下：直推一包 = 整塊 Hub + NL3 包頭/CRC；廣播檔案分片 (F_MCAST) 至多 MCAST_CHUNK
+    ctrl_bus = NetBus(NetBus.TYPE_WS, app=app, label="CTRL-WS", rx_size=4096)
+    discovery_bus = NetBus(NetBus.TYPE_UDP, app=app, label="UDP-DISCV",
+                           rx_size=min(max(hub.size, MCAST_CHUNK) + 32, 65507))
     discovery_bus.connect(None, bus_sys["discovery_port"])
 
 
@@ -54,11 +58,15 @@ def task_loop(app):
     
     # --- 供應鏈狀態 ---
     last_report = time.ticks_ms()
-    s = {"f_local": None, "last_hb": time.ticks_ms()}
-    hub = bus.get_service("pixel_stream")
+    s = {"reader": None, "last_hb": time.ticks_ms()}
+
+    # 🚀 Core 0 負載：累計工作時間 (不含 sleep)，供 status 換算佔用率
+    load = {"busy_us": 0, "loops": 0}
+    bus.register_provider("core0_load", lambda: load)
 
     print("🚀 [Core 0] Data Router Active")
     while bus.shared.get("engine_run", True):
+        t0 = time.ticks_us()
         # 1. 網路守護：確保底層網路可用
         network_ok = check_network(lan, net_state)
         if network_ok:
@@ -72,12 +80,23 @@ def task_loop(app):
         
 
         # 2. 🚀 生產者供應鏈邏輯 (由 Core 0 定時處理補貨)
-        from action.stream_actions    import handle_supply_chain
-        from action.heartbeat_actions import send_heartbeat
+        from action.stream_actions    import handle_supply_chain, drift_report
+        from action.heartbeat_actions import send_heartbeat, clock_tick
         from action.status_actions    import on_status_get
+        from action.effect_actions    import handle_effect
+        from action.file_actions      import file_tick
         # 傳入當前 ctrl_bus 供 Action 回報 Ready 信號
         worker_ctx = {"app": app, "send": ctrl_bus.write}
-        handle_supply_chain(hub, s, worker_ctx)
+        # 本地效果啟用時由效果引擎供貨，檔案供應鏈本輪不動
+        if not handle_effect(hub, s):
+            handle_supply_chain(hub, s, worker_ctx)
+        # 背景 FILE_HASH：每輪只推進一小段
+        file_tick(app)
+
+        # 2.5 show clock 校時 (心跳四時戳) 與播放漂移回報
+        if ctrl_bus.connected:
+            clock_tick(worker_ctx, s)
+            drift_report(worker_ctx, s)
 
         # 3. 系統維護
         now = time.ticks_ms()
@@ -90,6 +109,8 @@ def task_loop(app):
             gc.collect()
             s["last_hb"] = now
             last_report = now
+        load["busy_us"] += time.ticks_diff(time.ticks_us(), t0)
+        load["loops"] += 1
         time.sleep_ms(bus_sys.get("refresh_rate_ms", 1))
     
     ctrl_bus.disconnect()
\ No newline at end of file
@@ -1,6 +1,38 @@
 # Core1_engine.py
 import time
 from lib.sys_bus import bus
+from lib.interp import Interpolator
+
+MASK32 = 0xFFFFFFFF
+RESYNC_US = 100000   # 與 show 時間軸相差超過此值 (校時重新定相)：直接跳到時間軸上，不逐 tick 限幅追趕
+LEAD_PAD_US = 500    # 出幀提前量中轉換以外的餘量 (選幀 / 拷貝 / 喚醒誤差)
+
+def _next_tick(t, tl, clock, fps, slew_us):
+    """
+    t: 剛出完的 tick 的本地排程時刻；tl: 時間軸 [anchor, plan, acc, n] (原地更新)
+    名義間隔 1e6 // fps 的餘數按 fps 累進，長秀不因整數截斷漂移；
+    show clock 已錨定時再把排程朝 show 時間軸拉近，每 tick 至多 slew_us (肉眼不可見)；
+    相差超過 RESYNC_US 時直接換到時間軸對應的本地時刻 (錨點與 tick 序號不變，多台仍落在同一 tick)
+    """
+    d = 1000000 // fps
+    tl[2] += 1000000 % fps
+    if tl[2] >= fps:
+        tl[2] -= fps
+        d += 1
+    tl[3] += 1
+    nxt = time.ticks_add(t, d)
+    if tl[0] is None:
+        return nxt
+    tl[1] = (tl[1] + d) & MASK32
+    local = clock.to_local(tl[1], nxt)
+    err = time.ticks_diff(local, nxt)
+    if err > RESYNC_US or err < -RESYNC_US:
+        return local
+    if err > slew_us:
+        err = slew_us
+    elif err < -slew_us:
+        err = -slew_us
+    return time.ticks_add(nxt, err)
 
 def task_loop(st_LED, fps=40):
     hub = None
@@ -12,17 +44,115 @@ def task_loop(st_LED, fps=40):
     _state = {"render_count": 0}
     # 將計數器註冊到總線，命名為 render_fps
     bus.register_provider("render_fps", lambda: _state["render_count"])
+
+    # 負載統計 (累計值，不隨停止清零)：工作時間 / 斷供 tick / 落後超過一個間隔的 tick / 靜止保持 tick / 追幀跳過的幀
+    load = {"busy_us": 0, "frames": 0, "underruns": 0, "late": 0, "holds": 0, "skipped": 0}
+    bus.register_provider("core1_load", lambda: load)
+
+    # 可選的出幀探針 (主機基準測試注入)，板上為 None
+    probe = bus.get_service("frame_probe")
+
+    # Seek：從 0x3004 收到到目標幀寫出總線的耗時 (us)，-1 = 尚未發生
+    _state["seek_us"] = -1
+    bus.register_provider("seek_us", lambda: _state["seek_us"])
+    seeking = False
     
-    interval_us = (1000 // fps) * 1000
+    interval_us = 1000000 // fps
     next_tick_us = time.ticks_us()
 
+    # ⏱️ 節拍紀律化：第 n 個 tick 的理想時刻 = anchor + n / fps (show clock)，
+    # 晶振漂移由 _next_tick 每 tick 限幅修正；anchor 為 None 時於下一個 tick 重新錨定
+    # 排定起播 (play_at = show clock 起播時刻) 時 anchor 即 start_us，各台時間軸相同
+    clock = bus.get_service("show_clock")
+    tl = [None, 0, 0, 0]             # [anchor show us, 下一 tick 的 show us, 餘數累進, tick 序號]
+    start_show = None                # 排定起播的 show 時刻 (下一次錨定用)
+    # 秀檔進度：[本紀元首幀的幀號 (Core 0 定位時寫入 play_base), 本紀元先前各段時間軸已出的 tick 數]
+    # 暫停 / 重新排定起播只換時間軸不換紀元，進度照常累計
+    prog = [0, 0]
+    # 秀檔播放中斷供的 tick 照樣佔用時間軸：到貨後跳過同數量的幀補回，第 n 個 tick 始終出第 n 幀
+    behind = 0
+
     # --- 💎 性能優化：預先緩存常量與局部變量 💎 ---
     frame_size = len(st_LED.big_buffer) # 單幀所需的字節數
     current_big_buffer = None        # 當前從 Hub 拿到的超大原始 Buff
     buff_offset = 0                  # 當前讀取偏移量
+    epoch = hub.epoch                # Hub 紀元 (flush 後變化)
+    hold_left = 0                    # 當前塊播完後，末幀還要保持的 tick 數
 
+    # 靜止段刷新：燈條 / PCA 皆會鎖存，預設不重送；>0 時每隔此毫秒重送一次驅動緩衝
+    sys_cfg = bus.shared.get("System", {})
+    refresh_us = sys_cfg.get("hold_refresh_ms", 0) * 1000
+    slew_us = sys_cfg.get("drift_slew_us", 250)
+    last_show_us = time.ticks_us()
+
+
+    def wait_block():
+        """
+        秀檔播放缺貨時等 Core 0 補下一塊 (補貨只需一兩個主迴圈)，至多等到本 tick 落後一個間隔；
+        等到則本 tick 照出 (或續追幀)，不必記為斷供再靠跳幀補回
+        """
+        while (not hub.dirty and not bus.shared.get("play_eof")
+               and time.ticks_diff(time.ticks_us(), next_tick_us) < interval_us):
+            time.sleep_us(500)
+        return hub.dirty
 
     raw_view = st_LED.big_buffer
+
+    # 🎞️ 插值：來源幀率 != 本地幀率時 (bus.shared["src_rate"] = (src_fps, blend))，
+    # 由 Interpolator 換算來源幀並在相鄰兩幀間混合；None 時維持逐 tick 一幀
+    interp = Interpolator(frame_size, fps)
+    interp_rate = None
+    bus.register_provider("interp", lambda: interp.stats() if interp_rate else None)
+
+    # 🪟 即時覆蓋層 (0x3015)：於 LED 轉換中同趟合成；覆蓋層更新時即使畫面靜止也重新出幀
+    ovl = bus.get_service("overlay")
+
+    # ⏱️ 出幀提前量：tick 前 lead 醒來先選幀與轉換，等到 tick 才寫出總線，
+    # 寫出時刻即時間軸 (不再晚一個轉換耗時，且各台燈數 / 格式 / 覆蓋層不同也不影響對齊)
+    # lead = 轉換耗時的衰減峰值 + LEAD_PAD_US，至多半個間隔；pace[1] 為本 tick 等待寫出的時間 (不計入 busy)
+    pace = [0, 0]
+
+    def lead_us():
+        d = pace[0] + LEAD_PAD_US
+        return d if d < interval_us // 2 else interval_us // 2
+
+    def show(at=None):
+        """轉換後寫出；at (本地 ticks) 不為 None 時等到 at 才寫出 (已過即寫)，並更新轉換耗時峰值"""
+        t = time.ticks_us()
+        if ovl is None:
+            st_LED.load_all()
+        else:
+            st_LED.load_all(ovl.begin())
+            ovl.end()
+        if at is not None:
+            t1 = time.ticks_us()
+            c = time.ticks_diff(t1, t)
+            pk = pace[0]
+            pace[0] = c if c > pk else pk - ((pk - c) >> 5)
+            w = time.ticks_diff(at, t1)
+            if w > 0:
+                time.sleep_us(w)
+                pace[1] += w
+        st_LED.refresh()
+
+    def drop_anchor():
+        """放棄當前時間軸 (停止 / 暫停 / 排定起播)：已出的 tick 計入本紀元進度，下一 tick 重新錨定"""
+        if tl[0] is not None:
+            prog[1] += tl[3]
+            tl[0] = None
+
+    def ov_changed():
+        return ovl is not None and ovl.seq != ovl.shown
+
+    # 🎚️ 調光 / 調色盤 (0x3006 / 0x3007)：Core 0 只重建 LUT 並遞增 levels_seq，重繪一律在本核 (不與出幀搶驅動緩衝 / 總線)
+    lv = [bus.shared.get("levels_seq", 0)]
+
+    def dirty():
+        """覆蓋層或 LUT 有更新：畫面靜止 (停止 / 暫停 / 保持) 時也要重新出幀"""
+        seq = bus.shared.get("levels_seq", 0)
+        changed = seq != lv[0]
+        lv[0] = seq
+        return ov_changed() or changed
     
     print(f"🔥 [Core 1] Render Engine Online | {fps} FPS")
 
@@ -32,33 +162,229 @@ def task_loop(st_LED, fps=40):
             if bus.shared.get("is_ready") == False:
                 st_LED.big_buffer[:] = bytearray(frame_size) # 清空
                 st_LED.show_all()
+            elif dirty():
+                # 停止中調光：以新 LUT 重繪當前畫面
+                show()
             time.sleep_ms(100)
             next_tick_us = time.ticks_us() # 重置防止緩衝區爆發
+            drop_anchor()
+            behind = 0
             _state["render_count"] = 0 # 停止時清零
             continue
 
-        # 🚀 暫停模式：定格
+        rate = bus.shared.get("src_rate")
+        if rate is not interp_rate:
+            interp_rate = rate
+            if rate:
+                interp.reset(rate[0], rate[1])
+
+        # 🚀 暫停模式：定格 (暫停中 Seek 則立即換上目標幀再定格)
         if bus.shared.get("is_paused"):
-            time.sleep_ms(50)
+            if hub.epoch != epoch and hub.dirty:
+                epoch = hub.epoch
+                prog[0] = bus.shared.get("play_base", 0)
+                prog[1] = 0
+                if interp_rate:
+                    # 插值模式：由插值器接手新紀元的第一幀 (不前進相位)
+                    interp.reset()
+                    current_big_buffer = None
+                    shown = interp.tick(hub, raw_view, False) == interp.RENDERED
+                else:
+                    current_big_buffer = hub.get_read_view()
+                    hold_left = hub.hold if current_big_buffer else 0
+                    shown = bool(current_big_buffer)
+                    if shown:
+                        raw_view[:] = current_big_buffer[0 : frame_size]
+                if shown:
+                    show()
+                    if probe: probe(raw_view)
+                    buff_offset = frame_size
+                    if not interp_rate:
+                        prog[1] = 1   # 恢復播放時從下一幀接續 (插值器則重出本相位)
+                    t0 = bus.shared.pop("seek_t0", None)
+                    if t0 is not None:
+                        _state["seek_us"] = time.ticks_diff(time.ticks_us(), t0)
+            elif dirty():
+                # 定格中覆蓋層更新：底圖不變，只重新合成
+                show()
+            time.sleep_ms(10) # 短輪詢：暫停中 Seek 的換幀延遲上限
             next_tick_us = time.ticks_us()
+            drop_anchor()
+            behind = 0
             _state["render_count"] = 0
             continue
 
         # 🚀 播放模式：死守時鐘
+        if hub.epoch != epoch:
+            # Hub 被 flush (Seek / 換檔)：丟棄殘留舊幀，時鐘歸零立即出新幀
+            # 須先於排定起播處理：停止中載入的檔案 (0x3009) 也會換紀元，若到起播後才看到，
+            # 會把 start_us 錨點換成各台實際醒來的時刻，整場秀帶著台間偏移
+            epoch = hub.epoch
+            current_big_buffer = None
+            hold_left = 0
+            interp.reset()
+            next_tick_us = time.ticks_us()
+            tl[0] = None
+            prog[0] = bus.shared.get("play_base", 0)
+            prog[1] = 0
+            start_show = None
+            behind = 0
+            seeking = True
+        start = bus.shared.get("play_at")
+        if start is not None:
+            # ⏱️ 排定起播：每輪以最新校時換算本地時刻，等到 show clock 的起播時刻，第一幀即在該 tick 出
+            at = clock.to_local(start)
+            wait = time.ticks_diff(at, time.ticks_us()) - lead_us()
+            if wait > 0:
+                time.sleep_us(wait if wait < 2000 else 1000)
+                continue
+            bus.shared.pop("play_at", None)
+            next_tick_us = at
+            drop_anchor()
+            start_show = start
+            behind = 0
         now = time.ticks_us()
-        if time.ticks_diff(now, next_tick_us) >= 0:
+        lag = time.ticks_diff(now, next_tick_us)
+        if lag >= -lead_us():
+            pace[1] = 0
+            if lag > interval_us:
+                load["late"] += 1
+            if tl[0] is None and clock and clock.synced:
+                # 錨定時間軸：排定起播時即 start_us (不經本地時刻換算來回)
+                tl[0] = tl[1] = clock.show_at(next_tick_us) if start_show is None else start_show
+                tl[2] = tl[3] = 0
+                start_show = None
+            # 斷供補幀只用於有時間軸的秀檔播放 (直推 / 效果的幀不按 tick 編號)
+            catch_up = tl[0] is not None and bus.shared.get("active_file") and not bus.shared.get("effect")
+            if tl[0] is not None:
+                # 供 Core 0 回報漂移與進度：(anchor, tick 序號, 本地排程時刻, 紀元首幀, 先前 tick 數)，整體替換
+                # 取排程而非實際醒來時刻：單一 tick 遲到是排程抖動 (計入 core1_load.late)，不是時間軸漂移
+                bus.shared["play_pos"] = (tl[0], tl[3], next_tick_us, prog[0], prog[1])
+            if interp_rate:
+                if behind:
+                    interp.skip(behind)
+                    behind = 0
+                r = interp.tick(hub, raw_view)
+                while r == interp.STALLED and catch_up and wait_block():
+                    # 該換幀 (或追幀) 而缺貨：Core 0 補上即在本 tick 續換
+                    r = interp.tick(hub, raw_view)
+                if r == interp.RENDERED:
+                    show(next_tick_us)
+                    last_show_us = now
+                    if probe: probe(raw_view)
+                    if seeking:
+                        seeking = False
+                        t0 = bus.shared.pop("seek_t0", None)
+                        if t0 is not None:
+                            _state["seek_us"] = time.ticks_diff(time.ticks_us(), t0)
+                    load["frames"] += 1
+                elif r == interp.UNCHANGED:
+                    # 靜止 / 硬切前的保持：輸出未變，不轉換 (覆蓋層更新時才重新合成)
+                    if dirty():
+                        show(next_tick_us)
+                        last_show_us = now
+                    elif refresh_us and time.ticks_diff(now, last_show_us) >= refresh_us:
+                        st_LED.refresh()
+                        last_show_us = now
+                    load["holds"] += 1
+                elif bus.shared.pop("play_eof", None):
+                    bus.shared["is_streaming"] = False
+                    continue
+                else:
+                    load["underruns"] += 1
+                    if catch_up and r == interp.STALLED:
+                        behind += 1
+                    if dirty():
+                        show(next_tick_us)
+                if r != interp.NONE:
+                    _state["render_count"] += 1
+                load["busy_us"] += time.ticks_diff(time.ticks_us(), now) - pace[1]
+                next_tick_us = _next_tick(next_tick_us, tl, clock, fps, slew_us)
+                continue
             # 🚀 流式讀取邏輯：如果當前大 Buffer 用完了或還沒有，去 Hub 拿新的
-            if current_big_buffer is None or buff_offset + frame_size > len(current_big_buffer):
+            exhausted = current_big_buffer is None or buff_offset + frame_size > len(current_big_buffer)
+            if exhausted and hold_left > 0 and behind:
+                # 追幀：欠下的 tick 先從靜止段扣
+                d = behind if behind < hold_left else hold_left
+                hold_left -= d
+                behind -= d
+                load["skipped"] += d
+            if exhausted and hold_left > 0:
+                # 🧊 靜止段：燈上已是末幀，不拷貝、不轉換；必要時只重送驅動緩衝 (覆蓋層更新時重新合成)
+                hold_left -= 1
+                if dirty():
+                    show(next_tick_us)
+                    last_show_us = now
+                elif refresh_us and time.ticks_diff(now, last_show_us) >= refresh_us:
+                    st_LED.refresh()
+                    last_show_us = now
+                _state["render_count"] += 1
+                load["holds"] += 1
+                load["busy_us"] += time.ticks_diff(time.ticks_us(), now) - pace[1]
+                next_tick_us = _next_tick(next_tick_us, tl, clock, fps, slew_us)
+                continue
+            if exhausted:
+                if catch_up:
+                    wait_block()
                 current_big_buffer = hub.get_read_view() # 這是核心同步點
+                hold_left = hub.hold if current_big_buffer else 0
                 buff_offset = 0 # 重置偏移量
                 
+            while behind and current_big_buffer:
+                # 追幀：跳過欠下的幀，本塊至少留末幀在本 tick 出
+                left = (len(current_big_buffer) - buff_offset) // frame_size - 1
+                d = behind if behind < left else left
+                buff_offset += d * frame_size
+                behind -= d
+                load["skipped"] += d
+                if behind <= hold_left:
+                    # 欠數落在末幀的靜止段內：照出末幀，靜止段扣掉欠數
+                    hold_left -= behind
+                    load["skipped"] += behind
+                    behind = 0
+                    break
+                # 末幀連同靜止段也已過時：一併跳過，等 Core 0 補上下一塊再換塊續跳
+                behind -= 1 + hold_left
+                load["skipped"] += 1 + hold_left
+                hold_left = 0
+                buff_offset = len(current_big_buffer)
+                if not wait_block():
+                    break
+                current_big_buffer = hub.get_read_view()
+                hold_left = hub.hold if current_big_buffer else 0
+                buff_offset = 0
+            if current_big_buffer and buff_offset >= len(current_big_buffer):
+                # 手上的幀都已過時而下一塊逾時未到：本 tick 無幀可出，按斷供記欠
+                current_big_buffer = None
             if current_big_buffer:
                 # 🐍 Pythonic 高速切片拷貝 (內核級別 memmove)
                 # 從大緩存中提取一幀到 apa 的顯存中
                 raw_view[:] = current_big_buffer[buff_offset : buff_offset + frame_size]
-                st_LED.show_all()
+                show(next_tick_us)
+                last_show_us = now
+                if probe: probe(raw_view)
+                if seeking:
+                    seeking = False
+                    t0 = bus.shared.pop("seek_t0", None)
+                    if t0 is not None:
+                        _state["seek_us"] = time.ticks_diff(time.ticks_us(), t0)
                 _state["render_count"] += 1
+                load["frames"] += 1
                 buff_offset += frame_size
-            next_tick_us += interval_us
+            elif bus.shared.pop("play_eof", None):
+                # 供應鏈已到檔尾且 Hub 已播空：此時才停止
+                bus.shared["is_streaming"] = False
+                continue
+            else:
+                load["underruns"] += 1
+                if catch_up:
+                    behind += 1
+                if dirty():
+                    # 斷供 (直推間隙) 中覆蓋層更新：在末幀上重新合成
+                    show(next_tick_us)
+            load["busy_us"] += time.ticks_diff(time.ticks_us(), now) - pace[1]
+            next_tick_us = _next_tick(next_tick_us, tl, clock, fps, slew_us)
         else:
-            time.sleep_us(500) 
\ No newline at end of file
+            # 睡到本 tick 的轉換時刻 (不以固定 500 us 輪詢)；遠時每 1 ms 回來看停止 / Seek
+            w = -lag - lead_us()
+            time.sleep_us(w if w < 2000 else 1000)
\ No newline at end of file
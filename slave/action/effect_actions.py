@@ -0,0 +1,97 @@
+# action/effect_actions.py
+from lib.sys_bus import bus
+from lib.effects import EffectEngine, EFFECTS, EFFECT_IDS, PRESETS
+
+def _spec(args):
+    """0x4001 參數 -> 效果規格 (缺省欄位取該效果預設)"""
+    eid = args.get("effect_id", 0)
+    base = PRESETS.get(EFFECTS.get(eid, ""), {})
+    get = lambda k, d=0: args[k] if k in args else base.get(k, d)
+    return {"effect_id": eid, "fps": args.get("fps", 0), "speed": get("speed"), "scale": get("scale"),
+            "param": get("param"), "c1": (get("r", 255), get("g", 255), get("b", 255)),
+            "c2": (get("r2"), get("g2"), get("b2"))}
+
+def on_effect_set(ctx, args):
+    """0x4001: 切換到本地程序化效果 (中止檔案播放 / 直推)，立即開始出幀"""
+    if args.get("effect_id") not in EFFECTS:
+        print(f"⚠️ [Effect] Unknown effect {args.get('effect_id')}")
+        return
+    bus.shared.pop("play_at", None)
+    bus.shared.pop("seek_frame", None)
+    bus.shared.update({
+        "effect": _spec(args),
+        "is_seeking": False,
+        "is_paused": False,
+        "is_ready": True,
+        "is_streaming": True
+    })
+    print(f"✨ [Effect] Set: {EFFECTS[args['effect_id']]}")
+
+def on_effect_stop(ctx, args):
+    """0x4002: 停止效果並關燈 (有設定 idle_effect 時會回到待機效果)"""
+    bus.shared.update({"effect": None, "is_streaming": False, "is_ready": False})
+
+def _idle_spec():
+    """System.idle_effect：名稱 (用預設參數) 或完整參數 dict；空則不啟用"""
+    idle = bus.shared["System"].get("idle_effect")
+    if not idle:
+        return None
+    args = idle if isinstance(idle, dict) else {"effect_id": EFFECT_IDS.get(idle, 0)}
+    if isinstance(args.get("effect_id"), str):
+        args = dict(args, effect_id=EFFECT_IDS.get(args["effect_id"], 0))
+    return _spec(args) if args.get("effect_id") in EFFECTS else None
+
+def handle_effect(hub, s):
+    """
+    由 Core 0 在供應鏈之前調用：效果啟用時每次 Hub 空出即算一幀提交，返回 True (供應鏈本輪不動)
+    效果幀率低於本地幀率時，以 Hub 的 HOLD 保持末幀 (Core 1 不重複拷貝與轉換)
+    """
+    spec = bus.shared.get("effect")
+    if spec is None and not (bus.shared.get("is_streaming") or bus.shared.get("is_ready")
+                             or bus.shared.get("is_seeking")):
+        # 待機：沒有任何播放時自動接上 idle_effect
+        spec = _idle_spec()
+        if spec is not None:
+            bus.shared.update({"effect": spec, "is_ready": True, "is_streaming": True})
+    eng = s.get("effect_engine")
+    st = bus.get_service("st_LED")
+    if eng is not None and (s.get("effect_seq") != st.layout_seq or eng.frame_size != st.total_bytes):
+        # 佈局換過 (remap.bin 熱更新) 或單幀大小與 Hub 的幀 (total_bytes) 不符：丟棄引擎，按當前佈局重建並重設規格
+        eng.stop()
+        eng = s["effect_engine"] = None
+        s["effect_spec"] = None
+    if spec is None:
+        if eng is not None and eng.effect:
+            eng.stop()
+            s["effect_spec"] = None
+        return False
+
+    if eng is None:
+        eng = EffectEngine(st.layout())
+        s["effect_engine"] = eng
+        s["effect_seq"] = st.layout_seq
+        bus.register_provider("effect", lambda: s["effect_engine"].stats() if s.get("effect_engine") else None)
+    local = bus.shared["System"].get("local_fps", 40)
+    if s.get("effect_spec") is not spec:
+        # 新規格：從相位 0 重來，作廢 Hub 內舊內容
+        s["effect_spec"] = spec
+        fps = min(spec["fps"] or local, local)
+        eng.set(spec["effect_id"], spec["speed"], spec["scale"], spec["param"], spec["c1"], spec["c2"], fps)
+        s["effect_tick"] = 0
+        bus.shared.pop("play_eof", None)
+        bus.shared["src_rate"] = None      # 效果按本地幀率出幀，不插值
+        hub.flush()
+
+    if bus.shared.get("is_paused") or hub.dirty:
+        return True
+    n = eng.render(hub.get_write_view())
+    # 本幀佔用的本地 tick 數：local / fps 的餘數累進，平均幀率精確
+    acc = s["effect_tick"] + local
+    ticks = acc // eng.fps
+    s["effect_tick"] = acc % eng.fps
+    hub.commit(n, ticks - 1)
+    return True
+
+def register(app):
+    app.disp.on(0x4001, on_effect_set)
+    app.disp.on(0x4002, on_effect_stop)
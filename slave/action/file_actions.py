@@ -1,33 +1,48 @@
 from lib.proto import Proto
 from lib.schema_codec import SchemaCodec
 import ubinascii
+import time
 from lib.sys_bus import bus
+from lib.file_rx import HASH_STEP
+
+def _data_path(path):
+    """主機路徑 -> 數據卷上的路徑；已帶數據卷根 (如 /sd/data.bin) 者不再重複加前綴"""
+    root = bus.get_service("data_Phat")
+    if not path or not root or path == root or path.startswith(root + '/'):
+        return path
+    return root + path
 
 def on_file_begin(ctx, args):
     app = ctx["app"]
     if args.get("path",False):
-        args['path'] = bus.get_service("data_Phat") + args['path']
+        args['path'] = _data_path(args['path'])
 
     ok = app.file_rx.begin(args)
-    if ok: print(f"📂 [File] Start -> {app.file_rx.path}")
+    if ok: print(f"📂 [File] {'Patch' if app.file_rx.patch else 'Mcast' if app.file_rx.mcast else 'Start'} -> {app.file_rx.path}")
 
 def on_file_chunk(ctx, args):
     app = ctx["app"]
-    if app.file_rx.chunk(args):
+    rx = app.file_rx
+    # 廣播分片不逐包回 ACK (N 台同時回會淹沒主機)，缺片由 FILE_NAK_REQ 輪詢
+    if rx.chunk(args) and not rx.mcast:
         # 🚀 關鍵：每收到一包就回傳 ACK
-        # 讓 PC 知道可以發下一包了
+        # offset = 本包 (舊版停等發送端只看它)；cum = 已連續收齊的字節數；sack = 缺口之後已到的分片
         if "send" in ctx:
             ack_def = app.store.get(0x2004)
             ack_data = SchemaCodec.encode(ack_def, {
                 "file_id": args["file_id"],
-                "offset": args["offset"]
+                "offset": args["offset"],
+                "cum": rx.next,
+                "sack": rx.sack()
             })
             ctx["send"](Proto.pack(0x2004, ack_data))
 
 def on_file_end(ctx, args):
     app = ctx["app"]
-    # 執行校驗
+    # 執行校驗 (流式摘要已在收包時算好，通常不必重讀整檔)
+    t0 = time.ticks_ms()
     ok = app.file_rx.end(args)
+    ms = time.ticks_diff(time.ticks_ms(), t0)
     
     path = app.file_rx.path
     sha = app.file_rx.last_sha_hex # 拿到剛才計算的 hex
@@ -36,8 +51,13 @@ def on_file_end(ctx, args):
         # 🚀 現代化、正式的結尾打印
         print("-" * 40)
         print(f"🏁 [File] End Success: {path}")
-        print(f"🔒 [SHA256] {sha}")
+        if app.file_rx.patch:
+            print(f"🧩 [Patch] {app.file_rx.skipped} bytes kept in place")
+        print(f"🔒 [SHA256] {sha} ({ms} ms{', rehash' if app.file_rx.rehashed else ''})")
         print("-" * 40)
+        # 重映射表上傳完成即熱更新，不需重啟或重新串流
+        if path.endswith("/remap.bin") and bus.get_service("st_LED"):
+            bus.get_service("st_LED").load_remap(path)
     else:
         err = app.file_rx.last_error
         print(f"❌ [File] End Failed: {err}")
@@ -45,6 +65,9 @@ def on_file_end(ctx, args):
 def on_file_query(ctx, args):
     app = ctx["app"]
     path = args.get("path")
+    # 與 FILE_BEGIN 同一套路徑 (數據卷前綴)，摘要快取的鍵才對得上
+    full = _data_path(path)
+    force = int(args.get("flags", 0)) & 1
     
     exists = 0
     sha = b'\x00' * 32
@@ -53,11 +76,13 @@ def on_file_query(ctx, args):
     try:
         import os
         # 使用 os.stat 檢查文件
-        os.stat(path)
+        os.stat(full)
         exists = 1
-        # 調用你現有的高性能流式校驗函數
-        sha = app.file_rx.sha256_digest_stream_from_file(path)
-        print(f"🔍 [Query] {path} exists, SHA: {ubinascii.hexlify(sha).decode()[:8]}...")
+        # 快取命中即答；未命中 / 稽核 (flags bit0) 才串流重算
+        t0 = time.ticks_us()
+        sha, hit = app.file_rx.file_digest(full, force)
+        src = "cache" if hit else "rehash"
+        print(f"🔍 [Query] {path} exists, SHA: {ubinascii.hexlify(sha).decode()[:8]}... ({src} {time.ticks_diff(time.ticks_us(), t0)} us)")
     except:
         print(f"🔍 [Query] {path} not found.")
 
@@ -71,8 +96,82 @@ def on_file_query(ctx, args):
         })
         ctx["send"](Proto.pack(0x2006, rsp_data))
 
+def on_file_skip(ctx, args):
+    # 修補模式：不變區段只記帳不寫盤，下一個 ACK 的 cum 即越過它
+    ctx["app"].file_rx.skip(args)
+
+def on_file_nak_req(ctx, args):
+    """FILE_NAK_REQ (0x200A)：回報廣播傳輸的缺片位圖 (round 原樣帶回，主機據此丟棄過期回覆)"""
+    app = ctx["app"]
+    if "send" not in ctx:
+        return
+    missing, first, bitmap = app.file_rx.missing(int(args.get("file_id", 0)))
+    ctx["send"](Proto.pack(0x200B, SchemaCodec.encode(app.store.get(0x200B), {
+        "file_id": args.get("file_id", 0),
+        "round": args.get("round", 0),
+        "missing": missing,
+        "first_chunk": first,
+        "bitmap": bitmap
+    })))
+
+def on_file_hash(ctx, args):
+    """
+    FILE_HASH (0x2007)：回傳檔案逐區塊摘要，發送端據此只送變動區塊
+    先回一包不含摘要的表頭 (讓主機立即確認韌體支援)；摘要由 Core 0 每輪推進一小段 (file_tick)，
+    湊滿一批即回傳，大檔不會在單次處理裡卡住網路與供應鏈
+    """
+    app = ctx["app"]
+    path = args.get("path")
+    bs = int(args.get("block_size", 0)) or 65536
+    if "send" not in ctx:
+        return
+    rsp_def = app.store.get(0x2008)
+    send = ctx["send"]
+
+    def reply(exists, size, first=0, hashes=b""):
+        send(Proto.pack(0x2008, SchemaCodec.encode(rsp_def, {
+            "exists": exists, "total_size": size, "block_size": bs,
+            "first_block": first, "path": path, "hashes": hashes
+        })))
+
+    app.file_rx.cancel_hash()
+    full = _data_path(path)
+    try:
+        import os
+        size = os.stat(full)[6]
+    except:
+        print(f"🔍 [Hash] {path} not found.")
+        reply(0, 0)
+        return
+
+    reply(1, size)
+    app.file_rx.hash_job = {
+        "gen": app.file_rx.iter_block_hashes(full, bs, step=HASH_STEP),
+        "reply": reply, "path": path, "size": size, "bs": bs, "t0": time.ticks_ms()
+    }
+
+def file_tick(app):
+    """Core 0 每輪調用：背景 FILE_HASH 推進至多 HASH_STEP 字節，湊滿一批即回傳"""
+    rx = app.file_rx
+    job = rx.hash_job
+    if not job:
+        return
+    try:
+        out = next(job["gen"])
+        if out:
+            job["reply"](1, job["size"], out[0], out[1])
+    except StopIteration:
+        rx.hash_job = None
+        print(f"🔍 [Hash] {job['path']}: {job['size']} bytes / {job['bs']} B blocks in {time.ticks_diff(time.ticks_ms(), job['t0'])} ms")
+    except Exception as e:
+        rx.hash_job = None
+        print(f"⚠️ [Hash] {job['path']}: {e}")
+
 def register(app):
     app.disp.on(0x2001, on_file_begin)
     app.disp.on(0x2002, on_file_chunk)
     app.disp.on(0x2003, on_file_end)
-    app.disp.on(0x2005, on_file_query)
\ No newline at end of file
+    app.disp.on(0x2005, on_file_query)
+    app.disp.on(0x2007, on_file_hash)
+    app.disp.on(0x2009, on_file_skip)
+    app.disp.on(0x200A, on_file_nak_req)
\ No newline at end of file
@@ -14,8 +14,8 @@ _LAST_HB_TICK = 0
 def get_uid():
     return ubinascii.hexlify(machine.unique_id()).decode().upper()
 
-def send_heartbeat(ctx):
-    """手動發送心跳包"""
+def send_heartbeat(ctx, quiet=False):
+    """手動發送心跳包 (附本地送出時刻 t1，主機回 ACK 時回顯供校時)"""
     app = ctx.get("app")
     if not app: return
 
@@ -28,11 +28,13 @@ def send_heartbeat(ctx):
         "slave_id": bus.slave_id,
         "uptime_ms": time.ticks_ms(),
         "mem_free": gc.mem_free(),
-        "ws_connected": 1 if ctx.get("is_ws", False) else 0
+        "ws_connected": 1 if ctx.get("is_ws", False) else 0,
+        "t1_us": 0
     }
 
     try:
         # 使用類方法 SchemaCodec.encode 代替 encode_payload
+        payload_data["t1_us"] = time.ticks_us() # 盡量貼近實際送出
         payload = SchemaCodec.encode(cmd_def, payload_data)
         # 使用類方法 Proto.pack 代替 pack_packet
         packet = Proto.pack(cmd_id, payload)
@@ -41,17 +43,35 @@ def send_heartbeat(ctx):
         if send_func:
             send_func(packet)
             
-        print(f"[HB] Sent to PC as {payload_data['slave_id']}") # 加這行調試
+        if not quiet:
+            print(f"[HB] Sent to PC as {payload_data['slave_id']}") # 加這行調試
     except Exception as e:
         print("[HB] Send Error: {}".format(e))
 
 def on_heartbeat_ack(ctx, args):
-    """處理來自 PC 的心跳確認 (0x1202)"""
+    """處理來自 PC 的心跳確認 (0x1202)：帶 t1/t2/t3 時即為一次校時樣本"""
+    t4 = time.ticks_us()
     # args 已經由 dispatcher 解析完畢
-    success = args.get("success", 0)
-    if success:
-        # 這裡可以更新本地的校時標誌
-        pass
+    if not args.get("success", 0) or "t3_us" not in args:
+        return
+    clock = bus.get_service("show_clock")
+    if clock:
+        clock.sample(args["t1_us"], args["t2_us"], args["t3_us"], t4)
+
+def clock_tick(ctx, s):
+    """
+    Core 0 每輪調用：擬合窗口填滿前以 burst 間隔密集校時，之後按 System.clock_sync_ms 維持
+    s: Core 0 狀態字典 (記錄上次校時時刻)
+    """
+    clock = bus.get_service("show_clock")
+    if clock is None:
+        return
+    sys_cfg = bus.shared["System"]
+    gap = sys_cfg.get("clock_sync_ms", 1000) if clock.settled else sys_cfg.get("clock_burst_ms", 100)
+    now = time.ticks_ms()
+    if time.ticks_diff(now, s.get("last_sync", 0)) >= gap:
+        s["last_sync"] = now
+        send_heartbeat(ctx, quiet=True)
 
 def register(app):
     """註冊心跳指令"""
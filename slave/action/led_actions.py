@@ -0,0 +1,41 @@
+# action/led_actions.py
+from lib.sys_bus import bus
+
+def on_led_level_set(ctx, args):
+    """0x3006: 即時更新亮度 / gamma / 白平衡 (只重建 LUT，不需重新串流)"""
+    st = bus.get_service("st_LED")
+    if st is None:
+        print("⚠️ [LED] st_LED 未初始化")
+        return
+
+    bri = args.get("brightness", 255) / 255
+    gamma = args.get("gamma_x100", 100) / 100 or 1.0
+    wb = (args.get("wb_r", 255) / 255, args.get("wb_g", 255) / 255,
+          args.get("wb_b", 255) / 255, args.get("wb_w", 255) / 255)
+
+    st.set_levels(brightness=bri, gamma=gamma, wb=wb)
+    bus.shared.update({"brightness": bri, "gamma": gamma, "white_balance": wb})
+
+    # 畫面靜止時的重繪交給 Core 1 (見 Core1_engine dirty())，本核不碰驅動緩衝
+    bus.shared["levels_seq"] = bus.shared.get("levels_seq", 0) + 1
+    print(f"💡 [LED] Level: bri={bri:.2f} gamma={gamma:.2f}")
+
+def on_led_palette_set(ctx, args):
+    """0x3007: 更新 P8 調色盤 (ctrl=0xFF 代表所有 P8 控制器)"""
+    st = bus.get_service("st_LED")
+    if st is None:
+        return
+    st.set_palette(args["rgbw"], start=args["start"], index=args["ctrl"])
+    bus.shared["levels_seq"] = bus.shared.get("levels_seq", 0) + 1
+    print(f"🎨 [LED] Palette: ctrl={args['ctrl']} start={args['start']} n={len(args['rgbw']) // 4}")
+
+def register(app):
+    app.disp.on(0x3006, on_led_level_set)
+    app.disp.on(0x3007, on_led_palette_set)
+    bus.register_provider("brightness", lambda: bus.shared.get("brightness", 1.0))
+    bus.register_provider("gamma", lambda: bus.shared.get("gamma", 1.0))
+    # 來源幀佈局：Server 依此只打包硬體需要的字節 (RGB888 / W8 / P8 ...)
+    bus.register_provider("led_layout", lambda: bus.get_service("st_LED").layout() if bus.get_service("st_LED") else [])
+    bus.register_provider("remap", lambda: bus.get_service("st_LED").remap_active() if bus.get_service("st_LED") else False)
+    # PCA9685 每板寫入 / 略過字節與批次預算狀態
+    bus.register_provider("pca9685_io", lambda: [b.stats() for b in (bus.get_service("pca9685_batches") or [])])
@@ -7,6 +7,8 @@ from action import status_actions
 from action import stream_actions
 from action import sys_actions 
 from action import heartbeat_actions
+from action import led_actions
+from action import effect_actions
 
 def register_all(app):
     file_actions.register(app)
@@ -14,4 +16,6 @@ def register_all(app):
     status_actions.register(app)
     stream_actions.register(app)
     sys_actions.register(app)
-    heartbeat_actions.register(app)
\ No newline at end of file
+    heartbeat_actions.register(app)
+    led_actions.register(app)
+    effect_actions.register(app)
\ No newline at end of file
@@ -1,11 +1,20 @@
 # action/stream_actions.py
+import time
+import json
 from lib.sys_bus import bus
 from lib.proto import Proto
 from lib.schema_codec import SchemaCodec
 from lib.sys_bus import bus
+from lib.show_reader import RawShowReader, PackedShowReader, is_packed
+from lib.playlist import Playlist
+
 def on_stream_state_set(ctx, args):
     """0x3009: 準備分塊與文件模式"""
+    bus.shared.pop("seek_frame", None)
     bus.shared.update({
+        "playlist_spec": None, # 單檔模式：結束播放清單
+        "effect": None,        # 結束本地效果
+        "interp_spec": (args.get("src_fps", 0), args.get("interp", 0)),
         "active_file": bus.get_service("data_Phat")+ '/' + args["file_name"],
         "cur_block": args["block_id"],
         "play_mode": args["play_mode"],
@@ -15,17 +24,177 @@ def on_stream_state_set(ctx, args):
     })
     print(f"📡 [Stream] Set: {args['file_name']}")
 
+def on_playlist_set(ctx, args):
+    """
+    0x3014: 設定播放清單並預備首項 (回 0x3008 READY 後再 0x300A 開播)
+    playlist_json: [{"file": "a.bin", "loops": 2}, {"file": "b.bin", "fade": 20}, ...]
+    """
+    try:
+        items = json.loads(args["playlist_json"])
+        root = bus.get_service("data_Phat")
+        items = [{"file": root + '/' + it["file"], "loops": int(it.get("loops", 1)),
+                  "fade": int(it.get("fade", 0))} for it in items]
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"❌ [Playlist] Bad list: {e}")
+        return
+    if not items:
+        print("⚠️ [Playlist] Empty list")
+        return
+    bus.shared.pop("seek_frame", None)
+    bus.shared.update({
+        "playlist_spec": (items, args.get("repeat", 0)),
+        "effect": None,
+        "interp_spec": (args.get("src_fps", 0), args.get("interp", 0)),
+        "active_file": items[0]["file"],
+        "cur_block": 0,
+        "play_mode": 0,
+        "is_seeking": True,
+        "is_ready": False,
+        "is_streaming": False
+    })
+    print(f"📡 [Playlist] Set: {len(items)} items")
+
+def on_stream_play(ctx, args):
+    """
+    0x300A: 帶 start_us 時在 show clock 的該時刻出第一幀；0 / 未同步則立即播放
+    play_at 存 show 時刻本身：Core 1 等待時以最新校時換算，並以它作時間軸錨點
+    """
+    start = args.get("start_us", 0)
+    clock = bus.get_service("show_clock")
+    if start and clock and clock.synced:
+        bus.shared["play_at"] = start
+    else:
+        if start:
+            print("⚠️ [Play] Clock not synced, starting now")
+        bus.shared.pop("play_at", None)
+    bus.shared.update({"effect": None, "is_streaming": True})   # 秀檔開播即結束本地效果
+
+def on_stream_seek(ctx, args):
+    """0x3004: 跳轉到指定幀 (播放 / 暫停中皆可)，保留播放狀態，由供應鏈重新預填"""
+    path = bus.shared.get("active_file")
+    if not path:
+        print("⚠️ [Seek] No active file, send 0x3009 first")
+        return
+    bid = args.get("target_block", 0)
+    cur = bus.shared.get("cur_block", 0)
+    if bid != cur:
+        # 分塊模式 (data_{bid}.bin)：換塊即換檔
+        old = f"/data_{cur}.bin"
+        if path.endswith(old):
+            path = path[:-len(old)] + f"/data_{bid}.bin"
+    bus.shared.update({
+        "active_file": path,
+        "cur_block": bid,
+        "seek_frame": args.get("target_frame", 0),
+        "seek_t0": time.ticks_us(),
+        "is_seeking": True
+    })
+
+def _reader(s, path=None):
+    """
+    Core 0 專用的預讀器 (首次使用時按 config 建立並註冊統計)
+    給定 path 時按檔頭選擇原始 / NLPK 壓縮讀取器，類型不符則替換
+    """
+    r = s.get("reader")
+    cls = RawShowReader
+    if path is not None and is_packed(path):
+        cls = PackedShowReader
+    elif r is not None and path is None:
+        cls = type(r)
+    if type(r) is not cls:
+        if r is not None:
+            r.close()
+        r = _new_reader(cls)
+        s["reader"] = r
+        # 統計經 s 間接取用：換讀取器後 provider 仍指向當前實例
+        bus.register_provider("show_reader", lambda: s["reader"].stats())
+    return r
+
+def _new_reader(cls):
+    sys_cfg = bus.shared["System"]
+    return cls(bus.get_service("st_LED").total_bytes,
+               chunk=sys_cfg.get("prefetch_kb", 32) * 1024,
+               align=sys_cfg.get("prefetch_align", 512))
+
+def _open_reader(path, spare=None):
+    """播放清單用：開啟 path 並定位在第 0 幀 (spare 類型相同則沿用其緩衝)"""
+    cls = PackedShowReader if is_packed(path) else RawShowReader
+    r = spare
+    if type(r) is not cls:
+        if r is not None:
+            r.close()
+        r = _new_reader(cls)
+    r.open(path)
+    return r
+
+def _set_playlist(s, spec):
+    """切換播放清單 (spec 為 None 即回到單檔模式)；返回當前讀取器"""
+    old = s.get("playlist")
+    if old is not None and old.nxt is not None and old.nxt is not s.get("reader"):
+        old.nxt.close()
+    s["playlist"] = None
+    if not spec:
+        return _reader(s)
+    _reader(s)  # 確保 show_reader provider 已註冊
+    pl = Playlist(spec[0], spec[1], _open_reader, bus.get_service("st_LED").total_bytes)
+    s["reader"] = pl.start(s.get("reader"))
+    s["playlist"] = pl
+    bus.register_provider("playlist", lambda: s["playlist"].stats() if s.get("playlist") else None)
+    return s["reader"]
+
+def _src_rate(r):
+    """
+    本秀的來源幀率設定 -> Core 1 的 (src_fps, blend)；與本地幀率相同且不插值時為 None (逐 tick 一幀)
+    src_fps 0 = NLPK 檔頭 fps (原始檔則同本地幀率)；interp 1 = 線性插值，0 = 換幀保持
+    """
+    src_fps, interp = bus.shared.get("interp_spec") or (0, 0)
+    local = bus.shared["System"].get("local_fps", 40)
+    if not src_fps and interp:
+        src_fps = getattr(r, "fps", 0)
+    src_fps = src_fps or local
+    if src_fps == local:
+        return None
+    return (src_fps, bool(interp))
+
 def handle_supply_chain(hub, s, ctx):
     """由 Core 0 定時調用，負責加載與 READY 回報"""
+    r = _reader(s)
+    loop = bus.shared.get("play_mode") == 1
     if bus.shared.get("is_seeking"):
         try:
-            if s.get("f_local"): s["f_local"].close()
-            s["f_local"] = open(bus.shared["active_file"], "rb")
-            
-            # 預填第一幀
-            view = hub.get_write_view()
-            if s["f_local"].readinto(view) > 0:
-                hub.commit()
+            path = bus.shared["active_file"]
+            frame = bus.shared.pop("seek_frame", None)
+            spec = bus.shared.pop("playlist_spec", False)
+            if spec is not False:
+                # SET (None) / PLAYLIST_SET：換播放模式
+                r = _set_playlist(s, spec)
+            pl = s.get("playlist")
+            if pl is not None:
+                # 播放清單：首項已由 start() 開好；Seek 只在當前項內跳轉
+                frame = frame or 0
+                pl.seek(frame)
+                path = r.path
+            else:
+                # SET 總是重開 (檔案可能剛被覆寫)；同檔 Seek 沿用已讀入的塊
+                if frame is None or r.path != path:
+                    r = _reader(s, path)
+                    r.open(path)
+
+                # 🚀 O(1) 定址：第 n 幀的字節偏移 = n * frame_size
+                frame = frame or 0
+                if r.total and frame >= r.total:
+                    frame = frame % r.total if loop else r.total - 1
+                r.seek_frame(frame)
+
+            # 作廢 Hub 內尚未播出的舊幀，再預填新位置 (插值設定與新紀元首幀號先於新紀元生效)
+            bus.shared.pop("play_eof", None)
+            bus.shared["src_rate"] = _src_rate(r)
+            bus.shared["play_base"] = frame
+            hub.flush()
+            src = pl or r
+            n = src.fill(hub.get_write_view(), loop)
+            if n > 0:
+                hub.commit(n, src.hold, src.cuts)
             
             bus.shared["is_seeking"] = False
             bus.shared["is_ready"] = True
@@ -34,27 +203,111 @@ def handle_supply_chain(hub, s, ctx):
             cmd_def = ctx["app"].store.get(0x3008)
             payload = SchemaCodec.encode(cmd_def, {"block_id": bus.shared["cur_block"]})
             ctx["send"](Proto.pack(0x3008, payload))
-            print(f"✅ READY: {bus.shared['active_file']}")
+            print(f"✅ READY: {path} @ frame {frame}")
         except Exception as e:
             print(f"❌ Load Error: {e}")
             bus.shared["is_seeking"] = False
+        return
 
-    # 播放規律預讀
+    # 播放規律補貨：只做內存拷貝 (整幀切入 Hub)
     if bus.shared.get("is_streaming") and not bus.shared.get("is_paused"):
         # 利用 Hub 自帶 dirty 位檢查供給
-        if not hub.dirty and s.get("f_local"):
-            view = hub.get_write_view()
-            if s["f_local"].readinto(view) == 0:
-                if bus.shared.get("play_mode") == 1: s["f_local"].seek(0)
-                else: bus.shared["is_streaming"] = False
+        if not hub.dirty and r.path:
+            pl = s.get("playlist")
+            src = pl or r
+            n = src.fill(hub.get_write_view(), loop)
+            if n == 0:
+                # 播完：由 Core 1 播完手上的塊 (含末尾靜止段) 後再停
+                bus.shared["play_eof"] = True
             else:
-                hub.commit()
+                hub.commit(n, src.hold, src.cuts)
+            if pl is not None:
+                s["reader"] = pl.cur  # 可能已換檔
+
+    # 空檔預讀下一整塊 (loop 時檔尾預讀第 0 塊；播放清單則先預載下一項)
+    pl = s.get("playlist")
+    if pl is not None:
+        pl.preload()
+    elif r.path:
+        r.prefetch(loop)
+
+def drift_report(ctx, s):
+    """
+    播放中每 System.drift_report_ms 回報 0x3012：秀檔幀號 end_frame (Seek 目標 + 已出的幀，暫停 / Seek 不歸零)，
+    以及 Core 1 最近一個 tick 的序號 tick_n 與其排程時刻 (換成 show clock)
+    Server 以 anchor_us + tick_n / tick_fps 為理想時刻，差值即該 slave 時間軸的殘餘漂移 (限幅收斂中 / 重新定相)
+    """
+    gap = bus.shared["System"].get("drift_report_ms", 1000)
+    if (not gap or not bus.shared.get("is_streaming") or bus.shared.get("is_paused")
+            or bus.shared.get("effect")):
+        s.pop("drift_last", None)
+        return
+    pos = bus.shared.get("play_pos")
+    clock = bus.get_service("show_clock")
+    now = time.ticks_ms()
+    if pos is None or clock is None or time.ticks_diff(now, s.get("last_drift", 0)) < gap:
+        return
+    s["last_drift"] = now
+    anchor, n, local, base, done = pos
+    # 實際幀率：與上次回報之間的 tick 數 / 本地時間 (同一時間軸內才計)
+    fps = 0
+    last = s.get("drift_last")
+    if last and last[0] == anchor and n > last[1]:
+        dt = time.ticks_diff(local, last[2])
+        if dt > 0:
+            fps = (n - last[1]) * 100000000 // dt
+    s["drift_last"] = pos
+    rate = bus.shared.get("src_rate")
+    tick_fps = bus.shared["System"].get("local_fps", 40)
+    # 本紀元已出的 tick 換成來源幀 (插值時兩者幀率不同)；單檔循環播放按檔長取餘
+    frame = done + n
+    if rate:
+        frame = frame * rate[0] // tick_fps
+    frame += base
+    r = s.get("reader")
+    if bus.shared.get("play_mode") == 1 and not s.get("playlist") and r is not None and r.total:
+        frame %= r.total
+    cmd_def = ctx["app"].store.get(0x3012)
+    payload = SchemaCodec.encode(cmd_def, {
+        "block_id": bus.shared.get("cur_block", 0), "end_frame": frame, "actual_fps": min(fps, 0xFFFF),
+        "anchor_us": anchor, "show_us": clock.show_at(local), "tick_fps": tick_fps,
+        "src_fps": rate[0] if rate else 0,   # 0 = 未插值 (一 tick 一來源幀)
+        "tick_n": n})
+    ctx["send"](Proto.pack(0x3012, payload))
+
+def on_stream_frame(ctx, args):
+    """0x3003: 直推模式，整塊 Hub 寫入區 (buffer_frames 幀) 一次提交"""
+    hub = bus.get_service("pixel_stream")
+    data = args.get("pixel_data", b"")
+    view = hub.get_write_view()
+    if len(data) != len(view):
+        print(f"⚠️ [Direct] Size mismatch: {len(data)} != {len(view)}")
+        return
+    bus.shared["effect"] = None   # 直推接管：結束本地效果 (含待機效果)
+    bus.shared.pop("active_file", None)   # 秀檔時間軸作廢 (Core 1 不再按 tick 追幀)
+    view[:] = data
+    hub.commit()
+
+def on_overlay_set(ctx, args):
+    """
+    0x3015: 即時覆蓋層 (疊在秀檔 / 效果 / 直推之上)，只傳有變化的像素區間
+    ctrl: bit0 清空 / bit1 發佈 / bit2 只有 alpha / bit3 只有像素；data = alpha[count] + 像素 (來源格式)
+    """
+    ovl = bus.get_service("overlay")
+    if ovl is None:
+        return
+    if not ovl.apply(args["ctrl"], args["mode"], args["start"], args["count"], args.get("data", b"")):
+        print(f"⚠️ [Overlay] Bad span: start={args['start']} count={args['count']} len={len(args.get('data', b''))}")
 
 def register(app):
     # 播放控制
     app.disp.on(0x3009, on_stream_state_set) # SET
-    app.disp.on(0x300A, lambda c,a: bus.shared.update({"is_streaming": True})) # PLAY
+    app.disp.on(0x300A, on_stream_play) # PLAY
     app.disp.on(0x3005, lambda c,a: bus.shared.update({"is_paused": bool(a["pause"])})) # PAUSE
-    app.disp.on(0x3002, lambda c,a: bus.shared.update({"is_streaming": False, "is_ready": False})) # STOP
+    app.disp.on(0x3004, on_stream_seek) # SEEK
+    app.disp.on(0x3014, on_playlist_set) # PLAYLIST
+    app.disp.on(0x3002, lambda c,a: bus.shared.update({"is_streaming": False, "is_ready": False, "effect": None, "src_rate": None})) # STOP
     # 0x3003 Direct Mode
-    app.disp.on(0x3003, lambda c,a: (bus.get_service("pixel_stream").get_write_view().__setitem__(slice(None), a["pixel_data"]), bus.get_service("pixel_stream").commit()))
\ No newline at end of file
+    app.disp.on(0x3003, on_stream_frame)
+    # 0x3015 即時覆蓋層
+    app.disp.on(0x3015, on_overlay_set)
\ No newline at end of file
@@ -1,8 +1,10 @@
 # app.py
 from lib.schema_loader import SchemaStore
 from lib.dispatch import Dispatcher
-from lib.proto import StreamParser
+from lib.proto import StreamParser, MAX_LEN_DEFAULT
+from lib.sys_bus import bus
 from lib.file_rx import FileRx
+from lib.hash_cache import HashCache
 from action.registry import register_all
 
 class App:
@@ -11,13 +13,22 @@ class App:
         self.store = SchemaStore()
         self.store.load_dir("/schema")
         self.disp = Dispatcher(self.store)
-        self.file_rx = FileRx()
+        # 檔案摘要快取與數據同卷 (SD 卡換機時一併帶走)
+        self.hash_cache = HashCache(bus.get_service("data_Phat") + "/.sha.db")
+        bus.register_provider("hash_cache", self.hash_cache.stats)
+        self.file_rx = FileRx(self.hash_cache)
+        bus.register_provider("file_rx", self.file_rx.stats)
    
         # 3. 註冊行為
         register_all(self)
 
     def create_parser(self):
-        return StreamParser()
+        # 直推幀 (0x3003) 一包即整塊 Hub，解析上限需跟隨 Hub 大小
+        hub = bus.get_service("pixel_stream")
+        max_len = MAX_LEN_DEFAULT
+        if hub and hub.size + 16 > max_len:
+            max_len = hub.size + 16
+        return StreamParser(max_len)
 
     def handle_stream(self, parser, data, transport_name="Bus", send_func=None, **kwargs):
         """
@@ -65,29 +65,39 @@ def init_led(sysBus):
     
     PCA9685_config = sysBus.shared['PCA9685']
     pca9685_list = []
+    pca_batches = []
     if PCA9685_config['enable']:
         for i in PCA9685_config['list']:
             if sysBus.shared['I2C']['enable']:
                 try:
                     i2c_list = sysBus.get_service("i2c_list")
-                    for i2c in i2c_list:
+                    for bus_idx, i2c in enumerate(i2c_list):
                         devices = i2c.scan()
                         print(f"I2C Scan found: {[hex(d) for d in devices]}")
+                        boards = []
                         for addr in devices:
                             try:
                                 if addr != 112:
-                                    pca = PCA9685(i2c, address=addr)
+                                    pca = PCA9685(i2c, address=addr,
+                                                  mode=i.get('mode', 1),
+                                                  dither=bool(i.get('dither', 1)),
+                                                  bus_hz=sysBus.shared['I2C']['list'][bus_idx].get('freq') or 400_000)
                                     pca.freq(1000)
+                                    boards.append(pca)
                                     # 建立符合精簡版接口的控制器
-                                    pca9685_list.append(LEDController('i2c_LED', {'led_IO': pca, 'Q': 16, 'order': 'W'}))
+                                    pca9685_list.append(LEDController('i2c_LED', {'led_IO': pca, 'Q': 16, 'order': 'W', 'fmt': i.get('fmt', 'RGBW8888')}))
                             except Exception as e:
                                 print(f"❌ PCA9685 at {hex(addr)} error: {e}")
+                        # 同總線的板子合併為一個批次 (差量寫入 + 每幀 I2C 時間預算)
+                        if boards:
+                            pca_batches.append(PCA9685Batch(boards, budget_us=i.get('i2c_budget_us', 0)))
 #                     pca = PCA9685(i2c_list[i['GPIO']['i2c']], address=i['address'])
 #                     pca.freq(1000)
 #                     pca9685_list.append(LEDController('i2c_LED', {'led_IO': pca, 'Q': 16, 'order': 'W'}))
                 except Exception as e:
                     print(f"❌ PCA9685 at {hex(i['address'])} error: {e}")
         sysBus.register_service("pca9685_list", pca9685_list)
+        sysBus.register_service("pca9685_batches", pca_batches)
     
     
     WS2812_config = sysBus.shared['WS2812']
@@ -96,7 +106,7 @@ def init_led(sysBus):
         import neopixel
         for i in WS2812_config['list']:
             pixel = neopixel.NeoPixel(machine.Pin(i['GPIO'], machine.Pin.OUT),i['Q'])
-            ws2812_list.append(LEDController('WS2812', {'led_IO': pixel, 'Q': i['Q'], 'order': i['order']}))
+            ws2812_list.append(LEDController('WS2812', {'led_IO': pixel, 'Q': i['Q'], 'order': i['order'], 'fmt': i.get('fmt', 'RGBW8888')}))
             
         sysBus.register_service("ws2812_list", ws2812_list)
         
@@ -108,8 +118,8 @@ def init_led(sysBus):
             for i in APA102_config['list']:
                 try:
                     spi_list = sysBus.get_service("spi_list")
-                    apa = APA102(spi_list[i['GPIO']['spi']], num_leds=i['Q'])
-                    apa1022_list.append(LEDController('APA102', {'led_IO': apa, 'Q': i['Q'], 'order': i['order']}))
+                    apa = APA102(spi_list[i['GPIO']['spi']], num_leds=i['Q'], order=i['order'])
+                    apa1022_list.append(LEDController('APA102', {'led_IO': apa, 'Q': i['Q'], 'order': i['order'], 'fmt': i.get('fmt', 'RGBW8888')}))
                 except Exception as e:
                     print(f"❌ APA102 at SPI ID {i['GPIO']['spi']} error: {e}")
                         
@@ -121,6 +131,10 @@ def init_led(sysBus):
 def init_st(sysBus):
     try:
         st_LED = LEDStreamer(sysBus.get_service("led_list"))
+        # 開機套用 config 中的全域亮度 / gamma (LUT 一次建好，之後 0x3006 即時更新)
+        sys_cfg = sysBus.shared['System']
+        st_LED.set_levels(brightness=sys_cfg.get('c_lum', 1.0), gamma=sys_cfg.get('gamma', 1.0))
+        sysBus.shared["brightness"] = sys_cfg.get('c_lum', 1.0)
         st_LED.show_all()
         sysBus.register_service("st_LED", st_LED)
     except Exception as e:
@@ -146,9 +160,17 @@ def init_sd(sysBus):
     sysBus.register_service("data_Phat", _phat)
     return
 
+def init_remap(sysBus):
+    # 像素重映射表 (實體接線 -> 邏輯順序)，存在即載入；之後由 FILE_END 熱更新
+    st_LED = sysBus.get_service("st_LED")
+    if st_LED and exists(sysBus.get_service("data_Phat") + "/remap.bin"):
+        st_LED.load_remap(sysBus.get_service("data_Phat") + "/remap.bin")
+    return
+
 init_lan(bus)
 init_bus(bus)
 init_led(bus)
 init_st(bus)
 init_sd(bus)
+init_remap(bus)
 
@@ -5,6 +5,41 @@ import utime
 import math
 import array
 
+# ==================== 來源格式 ====================
+# 名稱 -> (編號, 每像素字節, R/G/B/W 在來源像素中的偏移)；P8 的偏移指向調色盤條目 (RGBW)
+FMT_RGBW8888 = 0
+FMT_RGB888 = 1
+FMT_W8 = 2
+FMT_P8 = 3
+SOURCE_FORMATS = {
+    'RGBW8888': (FMT_RGBW8888, 4, 0, 1, 2, 3),
+    'RGB888':   (FMT_RGB888,   3, 0, 1, 2, 0),
+    'W8':       (FMT_W8,       1, 0, 0, 0, 0),
+    'P8':       (FMT_P8,       1, 0, 1, 2, 3),
+}
+
+# ==================== 色彩校正平面 ====================
+@micropython.viper
+def _lut_plane_loop(buf, off: int, step: int, n: int, table):
+    """輸出緩衝的一個色彩平面 (off 起每 step 字節、共 n 個) 原地查表"""
+    d = ptr8(buf)
+    t = ptr8(table)
+    i = off
+    end = off + n * step
+    while i < end:
+        d[i] = t[d[i]]
+        i += step
+
+def _lut_plane_translate(buf, off, step, n, table):
+    """同 _lut_plane_loop；CPython (emu / 主機工具) 以 bytes.translate 在 C 層逐字節查表"""
+    end = off + n * step
+    seg = buf[off:end:step]
+    if type(seg) is memoryview:
+        seg = bytes(seg)            # APA102 像素區為 memoryview (無 translate)
+    buf[off:end:step] = seg.translate(table)
+
+_lut_plane = _lut_plane_translate if hasattr(bytes, 'translate') else _lut_plane_loop
+
 # ==================== LEDController ====================
 class LEDController:
     """
@@ -21,66 +56,306 @@ class LEDController:
         type_map = {'WS2812': 1, 'APA102': 2, 'i2c_LED': 3}
         self._tid = type_map.get(led_type, 0)
         
-        # 色序與通道處理
+        # 色序與通道處理 (APA102 以驅動解析後的色序為準，W 位即亮度頭部)
         order = led_io_cfg.get('order', 'GRB').upper()
+        if self._tid == 2 and hasattr(self.led, 'order'):
+            order = self.led.order
         self.bpp = len(order)
         self._r = order.find('R')
         self._g = order.find('G')
         self._b = order.find('B')
         self._w = order.find('W')
         
-        # 單幀大小 (輸入源統一定義為 R,G,B,W 每像素 4 bytes)
-        self.frame_size = self.num_leds * 4 
+        # 來源格式 (預設 RGBW8888)；PCA 只取 W 通道，不接受無 W 的 RGB888
+        fmt = led_io_cfg.get('fmt', 'RGBW8888').upper()
+        if fmt not in SOURCE_FORMATS or (self._tid == 3 and fmt == 'RGB888'):
+            print(f"⚠️ [LED] 不支援的來源格式 {fmt} ({led_type})，改用 RGBW8888")
+            fmt = 'RGBW8888'
+        self.fmt = fmt
+        self._fmt, self._stride, self._sr, self._sg, self._sb, self._sw = SOURCE_FORMATS[fmt]
+
+        # 單幀大小 (依來源格式，只攜帶硬體需要的字節)
+        self.frame_size = self.num_leds * self._stride
+
+        # 色彩校正 LUT: 4 個平面 [R|G|B|W] x 256，合併 gamma / 全域亮度 / 白平衡
+        # _lutp 為同一份表按平面拆開 (WS2812 / APA102 轉換後逐平面原地查表用)
+        self._lut = bytearray(1024)
+        self._lutp = [bytes(256)] * 4
+        self._lut_on = False
+        self._levels = None
+
+        # P8 調色盤：256 條 RGBW (預設灰階)，_pal 為已套用 LUT 的版本，轉換時免查表
+        self._pal_src = bytearray(1024)
+        self._pal = bytearray(1024)
+        for i in range(1024):
+            self._pal_src[i] = i >> 2
+
+        # 像素重映射表 (實體燈序 -> 本控制器內的邏輯像素索引)，未啟用時為佔位
+        self._remap = array.array('H', [0])
+        self._remap_on = False
+
+        # 覆蓋層合成的通道表：每通道 [來源偏移, 輸出偏移, LUT 平面]；PCA 只取 W
+        if self._tid == 3:
+            self._ovch = bytearray([self._sw, 0, 3])
+        else:
+            self._ovch = bytearray([self._sr, max(self._r, 0), 0, self._sg, max(self._g, 0), 1,
+                                    self._sb, max(self._b, 0), 2])
+        self._ovn = len(self._ovch) // 3
+        self.set_levels()
+
+    def set_levels(self, brightness=1.0, gamma=1.0, wb=(1.0, 1.0, 1.0, 1.0)):
+        """
+        更新亮度 / gamma / 白平衡，僅在參數變更時重建 LUT
+        brightness: 0.0 ~ 1.0 ; gamma: 1.0 為線性 ; wb: 每通道 (R,G,B,W) 0.0 ~ 1.0
+        """
+        levels = (float(brightness), float(gamma), tuple(float(x) for x in wb))
+        if levels == self._levels:
+            return False
+        self._levels = levels
+
+        bri, gam, wb = levels
+        # PCA9685 感知曲線模式：亮度直接折算進 12-bit 曲線，避免先在 8-bit 域量化
+        if self._tid == 3 and getattr(self.led, 'mode', 0):
+            self.led.set_curve(self.led.gamma, bri * wb[3])
+            self._lut_on = False
+            self._bake_palette()
+            return True
 
+        # 全部為 1.0 時走原始直拷路徑，零額外成本
+        if bri >= 1.0 and gam == 1.0 and min(wb) >= 1.0:
+            self._lut_on = False
+            self._bake_palette()
+            return True
 
+        lut = bytearray(1024)
+        for c in range(4):
+            k = bri * wb[c]
+            if k > 1.0: k = 1.0
+            if k < 0.0: k = 0.0
+            base = c << 8
+            for v in range(256):
+                lut[base + v] = int(((v / 255) ** gam) * k * 255 + 0.5)
+        self._lut[:] = lut
+        self._lutp = [bytes(lut[c << 8:(c + 1) << 8]) for c in range(4)]
+        self._lut_on = True
+        self._bake_palette()
+        return True
+
+    def set_remap(self, table):
+        """
+        設定重映射表 (array('H')，長度 = 燈數，值 = 本控制器內的邏輯像素索引)
+        table=None 恢復直通；越界條目會被拒絕
+        """
+        if table is None:
+            self._remap_on = False
+            self._remap = array.array('H', [0])
+            return True
+        n = self.num_leds
+        if len(table) != n or (n and max(table) >= n):
+            return False
+        # 先換表再開旗標，Core 1 不會讀到半新半舊的狀態
+        self._remap = table
+        self._remap_on = True
+        return True
+
+    def set_palette(self, rgbw, start=0):
+        """更新 P8 調色盤 (RGBW 每條 4 bytes)，從第 start 條開始覆寫"""
+        base = start << 2
+        end = min(base + len(rgbw), 1024)
+        self._pal_src[base:end] = rgbw[:end - base]
+        self._bake_palette()
+
+    def _bake_palette(self):
+        """把 LUT 預先套進調色盤，P8 轉換時每像素只需一次索引"""
+        if self._fmt != FMT_P8:
+            return
+        if not self._lut_on:
+            self._pal[:] = self._pal_src
+            return
+        pal = self._pal
+        src = self._pal_src
+        lut = self._lut
+        for i in range(1024):
+            pal[i] = lut[((i & 3) << 8) + src[i]]
 
     @micropython.native
-    def st_load_and_convert(self, source_buffer, offset: int):
-        """核心載入函數：調用 Viper 機器碼加速轉換"""
+    def st_load_and_convert(self, source_buffer, offset: int, ov=None, alpha=None, aoff: int = 0, mode: int = 0):
+        """核心載入函數：調用 Viper 機器碼加速轉換；ov 不為 None 時同趟合成覆蓋層 (alpha 自 aoff 起)"""
         if self.led is None:
             return
         # 直接獲取硬體驅動的 Buffer 引用（Neopixel 存放在 .buf，其他自定義驅動通常也是）
         # 如果是 PCA9685/i2c 類型的，我們假設它有自定義 buf
-        self._convert(source_buffer, offset, self.num_leds, self._tid)
+        if ov is None:
+            self._convert(source_buffer, offset, self.num_leds, self._tid)
+            if self._lut_on and self._fmt != FMT_P8 and self._tid != 3:
+                # 色彩校正：直拷後逐平面原地查表 (P8 已預烘焙進調色盤，PCA 在轉換迴圈內查)
+                buf = self.led.buf
+                n = self.num_leds
+                bpp = self.bpp
+                lp = self._lutp
+                _lut_plane(buf, self._r, bpp, n, lp[0])
+                _lut_plane(buf, self._g, bpp, n, lp[1])
+                _lut_plane(buf, self._b, bpp, n, lp[2])
+        else:
+            self._convert_ov(source_buffer, offset, self.num_leds, self._tid, ov, alpha, aoff, mode)
 
     @micropython.viper
     def _convert(self, source, offset: int, n: int, tid: int):
         src = ptr8(source)
-        dst = self.led.buf
+        lut = ptr8(self._lut)
         bpp = int(self.bpp)
+
+        # 來源讀取：p[k + 通道偏移]；P8 時 p 指向調色盤、k 由索引決定 (LUT 已預烘焙)
+        st = int(self._stride)
+        sr = int(self._sr); sg = int(self._sg); sb = int(self._sb); sw = int(self._sw)
+        use_pal = int(self._fmt) == 3
+        use_lut = bool(self._lut_on) and not use_pal
+        p = src
+        if use_pal:
+            p = ptr8(self._pal)
+
+        # 重映射 (gather)：第 i 顆實體燈讀取邏輯像素 m[i]；連續讀取時 k 直接累加
+        use_map = bool(self._remap_on)
+        m = ptr16(self._remap)
+        gather = use_pal or use_map
+        k = offset
+        j = 0
         
         if tid == 1:  # WS2812 (RGB/GRB)
+            d8 = ptr8(self.led.buf)
             ro = int(self._r)
             go = int(self._g)
             bo = int(self._b)
             for i in range(n):
-                s_idx = offset + (i << 2) # i * 4
+                if gather:
+                    j = i
+                    if use_map: j = int(m[i])
+                    if use_pal: k = int(src[offset + j]) << 2
+                    else: k = offset + j * st
                 d_idx = i * bpp
-                dst[d_idx + ro] = src[s_idx]     # R
-                dst[d_idx + go] = src[s_idx + 1] # G
-                dst[d_idx + bo] = src[s_idx + 2] # B
+                d8[d_idx + ro] = p[k + sr] # R
+                d8[d_idx + go] = p[k + sg] # G
+                d8[d_idx + bo] = p[k + sb] # B
+                k += st
                 
-        elif tid == 2: # APA102 (Frame: Header[0xE1] + BGR)
+        elif tid == 2: # APA102 (單趟直寫 SPI 幀的像素區: Header[0xE0|亮度] + 色序)
+            d8 = ptr8(self.led.buf)
+            hdr = int(self.led.header)
             ro = int(self._r); go = int(self._g); bo = int(self._b); wo = int(self._w)
             for i in range(n):
-                s_idx = offset + (i << 2)
+                if gather:
+                    j = i
+                    if use_map: j = int(m[i])
+                    if use_pal: k = int(src[offset + j]) << 2
+                    else: k = offset + j * st
                 d_idx = i << 2
-                dst[d_idx + wo] = 0xEF           # 亮度頭部
-                dst[d_idx + ro] = src[s_idx]     # R
-                dst[d_idx + go] = src[s_idx + 1] # G
-                dst[d_idx + bo] = src[s_idx + 2] # B
+                d8[d_idx + wo] = hdr            # 亮度頭部
+                d8[d_idx + ro] = p[k + sr]      # R
+                d8[d_idx + go] = p[k + sg]      # G
+                d8[d_idx + bo] = p[k + sb]      # B
+                k += st
 
         elif tid == 3: # i2c_LED (PCA9685)
-            # 專門提取 W 通道 (src[+3]) 給 PWM 控制器
-            for i in range(n):
-                s_idx = offset + (i << 2)
-                dst[i] = src[s_idx + 3]          # 直接映射亮度
+            dst = self.led.buf
+            # 專門提取 W 通道給 PWM 控制器；曲線模式下 8→12 bit 擴展與抖動在驅動寄存器填充時完成
+            if use_lut:
+                for i in range(n):
+                    if use_map:
+                        k = offset + int(m[i]) * st
+                    dst[i] = lut[768 + p[k + sw]]
+                    k += st
+            else:
+                for i in range(n):
+                    if gather:
+                        j = i
+                        if use_map: j = int(m[i])
+                        if use_pal: k = int(src[offset + j]) << 2
+                        else: k = offset + j * st
+                    dst[i] = p[k + sw]          # 直接映射亮度
+                    k += st
+
+    @micropython.viper
+    def _convert_ov(self, source, offset: int, n: int, tid: int, ov, alpha, aoff: int, mode: int):
+        """
+        同 _convert，但每個通道先與覆蓋層合成再查 LUT 輸出 (單趟，不另開整幀緩衝)
+        a = alpha + (alpha >> 7)；mode 0 normal / 1 add (飽和) / 2 multiply；
+        P8 兩層索引皆先經調色盤解析再混合
+        """
+        src = ptr8(source)
+        osrc = ptr8(ov)
+        al = ptr8(alpha)
+        lut = ptr8(self._lut)
+        ch = ptr8(self._ovch)
+        nch = int(self._ovn)
+        bpp = int(self.bpp)
+        st = int(self._stride)
+        use_pal = int(self._fmt) == 3
+        use_lut = bool(self._lut_on) and not use_pal
+        pb = src
+        po = osrc
+        if use_pal:
+            pb = ptr8(self._pal)
+            po = pb
+        use_map = bool(self._remap_on)
+        m = ptr16(self._remap)
+
+        # 輸出：WS2812 / APA102 寫 bytes 緩衝 (APA102 另補亮度頭部)，PCA 寫 PWM 值陣列
+        d8 = ch
+        dst = self.led.buf
+        hdr = 0
+        wo = 0
+        if tid != 3:
+            d8 = ptr8(self.led.buf)
+        if tid == 2:
+            hdr = int(self.led.header)
+            wo = int(self._w)
+
+        for i in range(n):
+            j = i
+            if use_map:
+                j = int(m[i])
+            a = int(al[aoff + j])
+            a += a >> 7
+            if use_pal:
+                k = int(src[offset + j]) << 2
+                ko = int(osrc[offset + j]) << 2
+            else:
+                k = offset + j * st
+                ko = k
+            if tid == 2:
+                d = i << 2
+                d8[d + wo] = hdr
+            elif tid == 1:
+                d = i * bpp
+            else:
+                d = i
+            c = 0
+            while c < nch:
+                q = c * 3
+                v = int(pb[k + ch[q]])
+                if a:
+                    o = int(po[ko + ch[q]])
+                    if mode == 1:
+                        v += (o * a) >> 8
+                        if v > 255:
+                            v = 255
+                    else:
+                        if mode == 2:
+                            o = (v * o + 255) >> 8
+                        v = (v * (256 - a) + o * a) >> 8
+                if use_lut:
+                    v = int(lut[(int(ch[q + 2]) << 8) + v])
+                if tid == 3:
+                    dst[d] = v
+                else:
+                    d8[d + int(ch[q + 1])] = v
+                c += 1
 
     def st_show(self):
         """觸發硬體顯示"""
         t = self._tid
         if t == 1: self.led.write()
-        elif t == 2: self.led.show_raw() if hasattr(self.led, 'show_raw') else self.led.show()
+        elif t == 2: self.led.show_raw() # 單次 spi.write 輸出整幀
         elif t == 3: self.led.show() if hasattr(self.led, 'show') else self.led.sync_buffer()
 
     def __len__(self):
@@ -96,12 +371,18 @@ class LEDStreamer:
         self.total_bytes = sum(c.frame_size for c in controllers)
         self.big_buffer = bytearray(self.total_bytes)
         self.offsets = []
+        self.pixel_offsets = []
+        # 佈局序號：重映射表換過即遞增，依佈局建立的快取 (如 Core 0 的效果引擎) 據此作廢
+        self.layout_seq = 0
         
-        # 預計算偏移量，減少循環中的算力支出
+        # 預計算偏移量，減少循環中的算力支出 (覆蓋層 alpha 以像素為單位)
         current_offset = 0
+        current_pixel = 0
         for c in controllers:
             self.offsets.append(current_offset)
+            self.pixel_offsets.append(current_pixel)
             current_offset += c.frame_size
+            current_pixel += c.num_leds
 
     def init(self):
         for c in self.controllers:
@@ -112,17 +393,89 @@ class LEDStreamer:
         """獲取原始緩衝供外部填充數據"""
         return self.big_buffer
 
+    def set_levels(self, **levels):
+        """對所有控制器套用亮度 / gamma / 白平衡 (LUT 只在參數變更時重建)"""
+        for c in self.controllers:
+            c.set_levels(**levels)
+
+    def set_palette(self, rgbw, start=0, index=0xFF):
+        """更新 P8 調色盤；index=0xFF 代表所有 P8 控制器"""
+        for i, c in enumerate(self.controllers):
+            if c.fmt == 'P8' and (index == 0xFF or index == i):
+                c.set_palette(rgbw, start)
+
+    def load_remap(self, path):
+        """
+        載入整機重映射表：uint16 小端序，依實體接線順序涵蓋所有控制器
+        條目為整幀的邏輯像素索引，必須落在所屬控制器的範圍內；文件不存在則恢復直通
+        """
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            for c in self.controllers:
+                c.set_remap(None)
+            self.layout_seq += 1
+            return False
+
+        total = sum(c.num_leds for c in self.controllers)
+        if len(raw) != total * 2:
+            print(f"❌ [Remap] 大小不符: {len(raw)} bytes, 需要 {total * 2}")
+            return False
+        table = array.array('H', raw)
+
+        # 先全部驗證，避免套用一半
+        tables = []
+        base = 0
+        for c in self.controllers:
+            n = c.num_leds
+            local = array.array('H', [0] * n)
+            for i in range(n):
+                v = table[base + i] - base
+                if v < 0 or v >= n:
+                    print(f"❌ [Remap] 條目 {base + i} -> {table[base + i]} 跨越控制器範圍")
+                    return False
+                local[i] = v
+            tables.append(local)
+            base += n
+
+        for c, t in zip(self.controllers, tables):
+            # 恆等表直接關閉，保留連續讀取的快路徑
+            c.set_remap(None if all(t[i] == i for i in range(len(t))) else t)
+        self.layout_seq += 1
+        print(f"🔀 [Remap] Loaded {path} ({total} entries)")
+        return True
+
+    def remap_active(self):
+        return any(c._remap_on for c in self.controllers)
+
+    def layout(self):
+        """來源幀佈局 [[格式, 燈數], ...]，供 Server 按需打包 data.bin / 實時幀"""
+        return [[c.fmt, c.num_leds] for c in self.controllers]
+
     @micropython.native
-    def show_all(self):
-        """執行一幀完整的渲染流程"""
+    def load_all(self, ov=None):
+        """
+        只搬運與轉換到各驅動緩衝，不寫出；ov = (覆蓋像素, alpha, 模式) 時於轉換中同趟合成
+        Core 1 在 tick 前先轉換、到點再 refresh()，總線寫出時刻不受轉換耗時 (燈數 / 格式 / 覆蓋層) 影響
+        """
         buf = self.big_buffer
         offs = self.offsets
         for i in range(len(self.controllers)):
             ctrl = self.controllers[i]
-            # 1. 搬運與轉換
-            ctrl.st_load_and_convert(buf, offs[i])
-            
-            # 2. 硬體輸出
+            if ov is None:
+                ctrl.st_load_and_convert(buf, offs[i])
+            else:
+                ctrl.st_load_and_convert(buf, offs[i], ov[0], ov[1], self.pixel_offsets[i], ov[2])
+
+    def show_all(self, ov=None):
+        """執行一幀完整的渲染流程：1. 搬運與轉換 2. 硬體輸出"""
+        self.load_all(ov)
+        self.refresh()
+
+    def refresh(self):
+        """重送各驅動已轉換好的緩衝 (不重新轉換)；靜止段需要刷新時使用"""
+        for ctrl in self.controllers:
             ctrl.st_show()
             
     def close(self):
@@ -6,83 +6,77 @@ import time
 class APA102:
     """
     APA102 極速驅動 - 專為 LEDcontroller 配套設計
-    特性：雙緩衝、Viper 轉換、對齊 LEDcontroller 的 buf 操作
+    特性：單一連續幀緩衝 [Start | Pixels | End]、單次 spi.write 輸出
+    LEDController 直接把 RGBW 來源轉換進像素區，不再二次轉換
     """
-    def __init__(self, spi, num_leds,  baudrate=8_000_000):
+    def __init__(self, spi, num_leds,  baudrate=8_000_000, order='WBGR', brightness=31):
         self.n = num_leds
         self.buf_length = num_leds * 4
-        
-        # 1. 暴露給 LEDcontroller 的標準緩衝區 [G, R, B, W]
-        # 注意：為了符合你 LEDcontroller 的 set_rgb 邏輯與 f.readinto 的性能
-        self.buf = bytearray(self.buf_length)
-        
-        # 2. SPI 物理傳輸數據區 (原生 APA102 格式)
-        self.spi_buffer = bytearray(self.buf_length)
-        
-        # 3. SPI 硬體初始化
-        self.spi = spi
-        
-        # 協議控制幀
-        self.start_frame = bytearray([0x00, 0x00, 0x00, 0x00])
+
+        # 亮度頭部 (0xE0 | 5-bit) 固定在每顆像素第 0 字節 (協議規定)；order 只決定其後 3 個色字節的順序
+        # 設定檔的 W 不論寫在哪 (例如 "BGRW") 都不移動頭部；self.order 為正規化後的 'W' + 色序
+        colors = ''.join(c for c in order.upper() if c in 'RGB')
+        if len(colors) != 3:
+            colors = 'BGR'
+        self.order = 'W' + colors
+
+        # 1. 協議控制幀長度
         end_len = max(4, (num_leds + 15) // 16)
-        self.end_frame = bytearray([0xFF] * end_len)
-        
-        self._init_spi_buffer()
 
-    @micropython.viper
-    def _init_spi_buffer(self):
-        """初始化物理緩衝區的亮度標頭 0xE0"""
-        p_spi: ptr8 = ptr8(self.spi_buffer)
-        for i in range(0, int(self.buf_length), 4):
-            p_spi[i] = 0xE0
+        # 2. 單一連續物理緩衝區 [0x00 x4 | 像素 n*4 | 0xFF x end_len]
+        self.frame = bytearray(4 + self.buf_length + end_len)
+        for i in range(4 + self.buf_length, len(self.frame)):
+            self.frame[i] = 0xFF
+
+        # 3. 暴露給 LEDcontroller 的像素區 (零拷貝視圖，已是 APA102 硬體字節流)
+        self.buf = memoryview(self.frame)[4 : 4 + self.buf_length]
+
+        # 4. SPI 硬體
+        self.spi = spi
+
+        self.header = 0xE0
+        self.set_brightness(brightness)
+
+    def set_brightness(self, level):
+        """設定 5-bit 全域亮度 (0-31)，於下一次轉換時寫入每顆像素頭部"""
+        level = int(level)
+        if level < 0: level = 0
+        if level > 31: level = 31
+        self.brightness = level
+        self.header = 0xE0 | level
+        self._fill_header()
 
     @micropython.viper
-    def _convert(self):
-        """
-        Viper 內核：將 LEDcontroller 寫入的 [G, R, B, W] 轉換為 [0xE0|W, B, G, R]
-        直接由 show() 調用
-        """
-        p_in: ptr8 = ptr8(self.buf)
-        p_out: ptr8 = ptr8(self.spi_buffer)
-        n: int = int(self.buf_length)
-        
-        for i in range(0, n, 4):
-            # 讀取 LEDcontroller 規範的四字節 (假設最後一字節為亮度)
-            g = p_in[i]
-            r = p_in[i+1]
-            b = p_in[i+2]
-            w = p_in[i+3]
-            
-            # 寫入 APA102 格式 (亮度位 0xE0 + 5-bit)
-            p_out[i]     = 0xE0 | (w >> 3) 
-            p_out[i + 1] = b
-            p_out[i + 2] = g
-            p_out[i + 3] = r
+    def _fill_header(self):
+        """將亮度頭部刷入所有像素 (僅在亮度變更時調用)"""
+        p: ptr8 = ptr8(self.buf)
+        hdr = int(self.header)
+        for i in range(0, int(self.buf_length), 4):
+            p[i] = hdr
 
     def show_raw(self):
         """
-        🚀 快車道：零轉換直接輸出
+        🚀 快車道：整幀一次 SPI 傳輸
         前提：self.buf 中的數據必須已經是 APA102 的硬體字節流
         """
-        # 直接調用底層寫入，避開 Python 緩慢的 slice 操作
-        self.spi.write(self.start_frame)
-        self.spi.write(self.buf)
-        self.spi.write(self.end_frame)
-            
+        self.spi.write(self.frame)
+
     def show(self):
         """物理輸出"""
-        self._convert()
         self.show_raw()
-        
+
     def write(self):
         """相容 LEDcontroller 的調用習慣"""
         self.show_raw()
 
     def fill(self, color):
-        """相容 neopixel 接口"""
-        g, r, b = color # 預設三元組
+        """相容 neopixel 接口 (R, G, B)"""
+        r, g, b = color
+        o = self.order
+        ro = o.find('R'); go = o.find('G'); bo = o.find('B')
+        buf = self.buf
         for i in range(0, self.buf_length, 4):
-            self.buf[i] = g
-            self.buf[i+1] = r
-            self.buf[i+2] = b
-            self.buf[i+3] = 255 # 預設滿亮度
\ No newline at end of file
+            buf[i] = self.header
+            buf[i + ro] = r
+            buf[i + go] = g
+            buf[i + bo] = b
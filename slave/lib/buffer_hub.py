@@ -14,6 +14,14 @@ class AtomicStreamHub:
         self._bufs = [bytearray(size), bytearray(size)]
         # 🚀 視圖緩存：避免運行時重複創建 memoryview 對象
         self._views = [memoryview(b) for b in self._bufs]
+        # 交給消費者的視圖 (整塊或已提交長度的切片)
+        self._out = list(self._views)
+        # 各槽末幀需再重複的 tick 數 (靜止段)；消費者取塊時一併取走到 self.hold
+        self._holds = [0, 0]
+        self.hold = 0
+        # 各槽的 cut 位圖 (bit j = 塊內第 j 幀為硬切，插值時不與前一幀混合)；同樣於取塊時取走到 self.cuts
+        self._cuts = [0, 0]
+        self.cuts = 0
         
         # 指針索引：w_idx(寫入/生產), r_idx(讀取/消費)
         self._w_idx = 0
@@ -23,18 +31,31 @@ class AtomicStreamHub:
         self.dirty = False
         self.size = size
 
+        # 紀元：每次 flush 遞增，消費者發現變化即丟棄手上殘留的舊幀
+        self.epoch = 0
+
     def get_write_view(self):
         """
         生產者 (Core 0) 調用：獲取當前可寫入的後台緩衝區。
         """
         return self._views[self._w_idx]
 
-    def commit(self):
+    def commit(self, length=None, hold=0, cuts=0):
         """
         生產者 (Core 0) 調用：提交數據，瞬間交換讀寫指針。
         執行後，剛才寫入的數據對消費者變為可見。
+        length: 實際寫入字節數 (檔尾不足一整塊時)，消費者只會看到這一段。
+        hold: 播完本塊末幀後，末幀再保持的 tick 數 (靜止段不佔拷貝與轉換)。
+        cuts: 塊內硬切幀位圖 (編碼器標記)，供 Core 1 插值時改為換幀保持。
         """
-        self._w_idx, self._r_idx = self._r_idx, self._w_idx
+        w = self._w_idx
+        if length is None or length >= self.size:
+            self._out[w] = self._views[w]
+        else:
+            self._out[w] = self._views[w][:length]
+        self._holds[w] = hold
+        self._cuts[w] = cuts
+        self._w_idx, self._r_idx = self._r_idx, w
         self.dirty = True
 
     def get_read_view(self):
@@ -43,13 +64,24 @@ class AtomicStreamHub:
         若無新數據 (dirty=False)，返回 None。
         """
         if self.dirty:
+            r = self._r_idx
+            self.hold = self._holds[r] # 先取走保持數，收旗後生產者才可能再提交
+            self.cuts = self._cuts[r]
             self.dirty = False # 🚀 消費者看見紅旗後，立刻收起紅旗
-            return self._views[self._r_idx]
+            return self._out[r]
         return None
 
+    def flush(self):
+        """
+        生產者 (Core 0) 調用：作廢所有未播出的數據 (Seek / 換檔)。
+        收起紅旗並遞增紀元；之後 commit 的數據才屬於新紀元。
+        """
+        self.dirty = False
+        self.epoch += 1
+
     def force_get_view(self):
         """
         強制獲取當前讀取緩衝區 (無視 dirty 位)。
         用於某些需要持續刷燈而不在乎數據是否更新的場景。
         """
-        return self._views[self._r_idx]
\ No newline at end of file
+        return self._out[self._r_idx]
\ No newline at end of file
@@ -0,0 +1,327 @@
+# lib/effects.py
+import time
+import array
+import micropython
+
+# 效果編號 (0x4001 effect_id) -> 名稱
+EFFECTS = {1: "solid", 2: "rainbow", 3: "chase", 4: "breathe", 5: "noise"}
+EFFECT_IDS = {v: k for k, v in EFFECTS.items()}
+
+# 各效果的預設參數 (System.idle_effect 只給名稱時使用)
+PRESETS = {
+    "solid":   {"speed": 0,   "scale": 0,   "param": 0,   "r": 255, "g": 255, "b": 255},
+    "rainbow": {"speed": 64,  "scale": 256, "param": 255},
+    "chase":   {"speed": 128, "scale": 30,  "param": 8,   "r": 255, "g": 120, "b": 0},
+    "breathe": {"speed": 64,  "scale": 0,   "param": 16,  "r": 0,   "g": 80,  "b": 255},
+    "noise":   {"speed": 96,  "scale": 24,  "param": 0,   "r": 255, "g": 60,  "b": 0, "b2": 40},
+}
+
+# 核心參數陣列 (int32) 的欄位
+P_PHASE = 0      # 時間相位 u16 (65536 = 一個週期)
+P_SCALE = 1
+P_PARAM = 2
+P_R = 3
+P_G = 4
+P_B = 5
+P_R2 = 6
+P_G2 = 7
+P_B2 = 8
+P_AUX = 9        # 每效果預先算好的常數 (chase: 65536 // 尾長；noise: 時間 smoothstep)
+P_LEN = 10
+
+# 來源格式 -> pack 模式 (同 LEDController.SOURCE_FORMATS 編號)
+_PACK = {"RGBW8888": 0, "RGB888": 1, "W8": 2, "P8": 3}
+
+def smooth8(x):
+    """整數 smoothstep：x 0..255 -> 0..255 (3t^2 - 2t^3)"""
+    return x * x * (768 - 2 * x) >> 16
+
+class EffectEngine:
+    """
+    Slave 本地程序化效果：沒有串流時直接在 Hub 寫入區算出畫面
+    設計目標：
+    1. 全部緩衝 (RGB 暫存、參數、分段表) 於建構時預分配，每幀零分配。
+    2. 核心全為 viper 整數運算 (無浮點、無除法)，板上與主機 numpy 參考逐字節一致。
+    3. 先算邏輯 RGB888，再按 st_LED.layout() 各段格式打包：RGBW8888 (W=0) / RGB888 /
+       W8 與 P8 取亮度 (r*77 + g*150 + b*29) >> 8 (P8 即調色盤索引)。
+    4. 相位按 speed * 256 / fps 精確累進 (speed 256 = 每秒一週期)，換幀率不改變動畫速度。
+    """
+    def __init__(self, layout):
+        self.n = sum(c for _, c in layout)
+        self.frame_size = 0
+        seg = []
+        soff = 0
+        for fmt, count in layout:
+            mode = _PACK.get(fmt, 0)
+            seg += [mode, count, self.frame_size, soff]
+            self.frame_size += count * (4 if mode == 0 else 3 if mode == 1 else 1)
+            soff += count * 3
+        self._seg = array.array('i', seg)
+        self._nseg = len(layout)
+        self._rgb = bytearray(self.n * 3)
+        self._p = array.array('i', [0] * P_LEN)
+        self.effect = 0
+        self.fps = 0
+        self.speed = 0
+        self._acc = 0
+        self.frames = 0
+        self.render_us = 0
+        self.max_us = 0
+        self._sum_us = 0
+        self._cnt = 0
+        self._win = (time.ticks_ms(), 0)   # (窗口起點 ms, 起點幀數)，實際幀率
+        self.actual_fps = 0
+        self.cost = {}                     # 名稱 -> 平均 us (每個跑過的效果)
+
+    def set(self, effect, speed=0, scale=0, param=0, c1=(255, 255, 255), c2=(0, 0, 0), fps=40):
+        """切換效果並從相位 0 開始；效果編號未知返回 False"""
+        if effect not in EFFECTS:
+            return False
+        self._fold_cost()
+        p = self._p
+        for i in range(P_LEN):
+            p[i] = 0
+        p[P_SCALE] = scale & 0xFFFF
+        p[P_PARAM] = param & 0xFFFF
+        p[P_R], p[P_G], p[P_B] = c1[0] & 255, c1[1] & 255, c1[2] & 255
+        p[P_R2], p[P_G2], p[P_B2] = c2[0] & 255, c2[1] & 255, c2[2] & 255
+        if EFFECTS[effect] == "chase":
+            # 週期 1..32767：phase * 週期 不超出 int32
+            p[P_SCALE] = max(1, min(p[P_SCALE], 32767))
+            p[P_PARAM] = max(1, min(p[P_PARAM], p[P_SCALE]))
+            p[P_AUX] = 65536 // p[P_PARAM]
+        self.effect = effect
+        self.speed = speed & 0xFFFF
+        self.fps = max(1, fps)
+        self._acc = 0
+        self.frames = 0
+        self.max_us = 0
+        self._sum_us = 0
+        self._cnt = 0
+        self._win = (time.ticks_ms(), 0)
+        self.actual_fps = 0
+        return True
+
+    def stop(self):
+        """停止出幀 (保留各效果成本統計)"""
+        self._fold_cost()
+        self._cnt = 0
+        self._sum_us = 0
+        self.effect = 0
+
+    @property
+    def name(self):
+        return EFFECTS.get(self.effect, "")
+
+    def render(self, view):
+        """把當前相位的一幀寫入 view[0:frame_size] 並前進一幀；返回字節數"""
+        t0 = time.ticks_us()
+        p = self._p
+        e = self.effect
+        rgb = self._rgb
+        if e == 1:
+            _fill(rgb, self.n, p[P_R], (p[P_G] << 8) | p[P_B])
+        elif e == 2:
+            _rainbow(rgb, self.n, p)
+        elif e == 3:
+            _chase(rgb, self.n, p)
+        elif e == 4:
+            x = p[P_PHASE] >> 8
+            tri = x * 2 if x < 128 else (255 - x) * 2
+            fl = p[P_PARAM] & 255
+            lv = fl + ((smooth8(tri) * (256 - fl)) >> 8)
+            lv += lv >> 7                  # 0..255 -> 0..256
+            iv = 256 - lv
+            _fill(rgb, self.n, (p[P_R] * lv + p[P_R2] * iv) >> 8,
+                  (((p[P_G] * lv + p[P_G2] * iv) >> 8) << 8) | ((p[P_B] * lv + p[P_B2] * iv) >> 8))
+        elif e == 5:
+            p[P_AUX] = smooth8(p[P_PHASE] & 255)
+            _noise(rgb, self.n, p)
+        _pack(view, rgb, self._nseg, self._seg)
+
+        # 相位：speed * 256 / fps 每幀，餘數累進 (整數、無漂移)
+        self._acc += self.speed * 256
+        p[P_PHASE] = (p[P_PHASE] + self._acc // self.fps) & 0xFFFF
+        self._acc %= self.fps
+        self.frames += 1
+
+        us = time.ticks_diff(time.ticks_us(), t0)
+        self.render_us = us
+        self._sum_us += us
+        self._cnt += 1
+        if us > self.max_us:
+            self.max_us = us
+        now = time.ticks_ms()
+        dt = time.ticks_diff(now, self._win[0])
+        if dt >= 1000:
+            self.actual_fps = (self.frames - self._win[1]) * 100000 // dt
+            self._win = (now, self.frames)
+        return self.frame_size
+
+    def _fold_cost(self):
+        if self._cnt:
+            self.cost[self.name] = self._sum_us // self._cnt
+
+    def stats(self):
+        self._fold_cost()
+        return {"effect": self.name, "fps": self.fps, "actual_fps_x100": self.actual_fps,
+                "frames": self.frames, "render_us": self.render_us, "max_us": self.max_us,
+                "avg_us": self._sum_us // self._cnt if self._cnt else 0, "cost_us": self.cost}
+
+# ==================== viper 核心 (寫入值一律 0..255) ====================
+@micropython.viper
+def _fill(rgb, n: int, r: int, gb: int):
+    d = ptr8(rgb)
+    g = (gb >> 8) & 255
+    b = gb & 255
+    i = 0
+    for _ in range(n):
+        d[i] = r
+        d[i + 1] = g
+        d[i + 2] = b
+        i += 3
+
+@micropython.viper
+def _rainbow(rgb, n: int, params):
+    """色相 = i * scale / 256 + phase / 256；整數 HSV (S 滿)，V = param 低 8 位"""
+    d = ptr8(rgb)
+    p = ptr32(params)
+    ph = p[0] >> 8
+    sc = p[1]
+    v = p[2] & 255
+    i = 0
+    for k in range(n):
+        h = ((k * sc >> 8) + ph) & 255
+        h6 = h * 6
+        reg = h6 >> 8
+        rem = h6 & 255
+        t = (v * rem) >> 8
+        q = (v * (255 - rem)) >> 8
+        if reg == 0:
+            r = v; g = t; b = 0
+        elif reg == 1:
+            r = q; g = v; b = 0
+        elif reg == 2:
+            r = 0; g = v; b = t
+        elif reg == 3:
+            r = 0; g = q; b = v
+        elif reg == 4:
+            r = t; g = 0; b = v
+        else:
+            r = v; g = 0; b = q
+        d[i] = r
+        d[i + 1] = g
+        d[i + 2] = b
+        i += 3
+
+@micropython.viper
+def _chase(rgb, n: int, params):
+    """每 scale 顆一個光點，尾長 param 顆線性淡出到底色；相位一週期光點前進 scale 顆"""
+    d = ptr8(rgb)
+    p = ptr32(params)
+    per = p[1]
+    width = p[2]
+    step = p[9]
+    head = (p[0] * per) >> 16
+    r1 = p[3]; g1 = p[4]; b1 = p[5]
+    r2 = p[6]; g2 = p[7]; b2 = p[8]
+    j = 0
+    i = 0
+    for k in range(n):
+        dist = head - j
+        if dist < 0:
+            dist += per
+        if dist < width:
+            w = 256 - ((dist * step) >> 8)
+            iw = 256 - w
+            d[i] = (r1 * w + r2 * iw) >> 8
+            d[i + 1] = (g1 * w + g2 * iw) >> 8
+            d[i + 2] = (b1 * w + b2 * iw) >> 8
+        else:
+            d[i] = r2
+            d[i + 1] = g2
+            d[i + 2] = b2
+        j += 1
+        if j == per:
+            j = 0
+        i += 3
+
+@micropython.viper
+def _noise(rgb, n: int, params):
+    """
+    時空值雜訊：空間格 = i * scale / 256，時間格 = phase / 256 (256 格一週期，無縫回繞)
+    四角 16 位雜湊雙線性插值 (smoothstep)，結果在底色與主色之間插值
+    """
+    d = ptr8(rgb)
+    p = ptr32(params)
+    sc = p[1]
+    t0 = (p[0] >> 8) & 255
+    t1 = (t0 + 1) & 255
+    st = p[9]
+    ist = 256 - st
+    r1 = p[3]; g1 = p[4]; b1 = p[5]
+    r2 = p[6]; g2 = p[7]; b2 = p[8]
+    i = 0
+    for k in range(n):
+        x = k * sc
+        c0 = (x >> 8) & 0xFFFF
+        c1 = (c0 + 1) & 0xFFFF
+        fx = x & 255
+        sx = (fx * fx * (768 - 2 * fx)) >> 16
+        isx = 256 - sx
+        # 雜湊 h(c, t)：乘法取低 16 位 + xorshift
+        h = (c0 * 0x9E37 + t0 * 0x7F4B + 0x3A5D) & 0xFFFF
+        h ^= h >> 7
+        h = (h * 0x2F9B) & 0xFFFF
+        n00 = (h ^ (h >> 8)) & 255
+        h = (c1 * 0x9E37 + t0 * 0x7F4B + 0x3A5D) & 0xFFFF
+        h ^= h >> 7
+        h = (h * 0x2F9B) & 0xFFFF
+        n10 = (h ^ (h >> 8)) & 255
+        h = (c0 * 0x9E37 + t1 * 0x7F4B + 0x3A5D) & 0xFFFF
+        h ^= h >> 7
+        h = (h * 0x2F9B) & 0xFFFF
+        n01 = (h ^ (h >> 8)) & 255
+        h = (c1 * 0x9E37 + t1 * 0x7F4B + 0x3A5D) & 0xFFFF
+        h ^= h >> 7
+        h = (h * 0x2F9B) & 0xFFFF
+        n11 = (h ^ (h >> 8)) & 255
+        a = (n00 * isx + n10 * sx) >> 8
+        b = (n01 * isx + n11 * sx) >> 8
+        v = (a * ist + b * st) >> 8
+        w = v + (v >> 7)
+        iw = 256 - w
+        d[i] = (r1 * w + r2 * iw) >> 8
+        d[i + 1] = (g1 * w + g2 * iw) >> 8
+        d[i + 2] = (b1 * w + b2 * iw) >> 8
+        i += 3
+
+@micropython.viper
+def _pack(dst, rgb, nseg: int, segs):
+    """邏輯 RGB888 -> 各段來源格式 (segs: [模式, 燈數, 輸出偏移, RGB 偏移] * nseg)"""
+    o = ptr8(dst)
+    s = ptr8(rgb)
+    sg = ptr32(segs)
+    for k in range(nseg):
+        mode = sg[k * 4]
+        cnt = sg[k * 4 + 1]
+        di = sg[k * 4 + 2]
+        si = sg[k * 4 + 3]
+        if mode == 0:
+            for _ in range(cnt):
+                o[di] = s[si]
+                o[di + 1] = s[si + 1]
+                o[di + 2] = s[si + 2]
+                o[di + 3] = 0
+                di += 4
+                si += 3
+        elif mode == 1:
+            for _ in range(cnt * 3):
+                o[di] = s[si]
+                di += 1
+                si += 1
+        else:
+            for _ in range(cnt):
+                o[di] = (s[si] * 77 + s[si + 1] * 150 + s[si + 2] * 29) >> 8
+                di += 1
+                si += 3
@@ -2,13 +2,33 @@ import hashlib
 import ubinascii
 import os
 
+# FILE_BEGIN flags
+F_PATCH = 1        # 就地修補既有檔案 (只收變動區塊，其餘由 FILE_SKIP 宣告不變)
+F_MCAST = 2        # 分片經 UDP 廣播一對多送達：不逐包 ACK，以位圖記帳，主機 FILE_NAK_REQ 輪詢缺片
+
+HASH_LEN = 8       # FILE_HASH_RSP 每區塊摘要長度 (SHA256 前 8 字節；最終整檔 SHA256 再把關)
+HASH_BATCH = 960   # 每包 FILE_HASH_RSP 的區塊數 (960 × 8 = 7680 字節，低於 NL3 預設 8192 上限)
+HASH_STEP = 8192   # FILE_HASH 背景計算：Core 0 每輪主迴圈至多讀這麼多字節 (大檔不阻塞網路 / 供應鏈)
+OOO_HASH_MAX = 65536   # 越過缺口先到的分片暫存上限 (供補洞後接續流式 SHA256)；超出者補洞時自盤讀回
+MCAST_CHUNK = 4096     # 廣播分片上限 (discovery 端口單次 recvfrom 至少要收得下 NL3 包頭 + 此長度)
+NAK_MAX = 4096         # FILE_NAK 位圖上限 (字節)；每輪回報首個缺片起 32768 個分片，其後留待下一輪
+NO_SESSION = 0xFFFFFFFF    # FILE_NAK missing：沒有對應的接收任務 (FILE_BEGIN 失敗 / 已結束)
+WB_SIZE = 16384        # 寫回暫存：分片攢滿對齊塊才寫盤 (FAT 簇 / flash 擦除塊的整數倍)；斷電最多丟這麼多未落盤數據
 
 
 class FileRx:
     """
     高性能文件接收組件 - 支援分片寫入與 SHA256 流式校驗
+    收包時按順序餵入 SHA256，FILE_END 只取摘要，不必整檔重讀
+    分片先進預配置的寫回暫存，按 WB_SIZE 邊界整塊寫盤 (wb_size = 0 則每片直寫)
+    廣播模式 (F_MCAST) 以位圖記錄已收分片，missing() 供 FILE_NAK 回報缺片
     """
-    def __init__(self):
+    def __init__(self, cache=None, wb_size=WB_SIZE):
+        self.cache = cache     # HashCache：校驗成功寫入，FILE_QUERY 命中即答
+        self.hash_job = None   # 進行中的 FILE_HASH (由 Core 0 每輪推進一步，見 file_actions.file_tick)
+        # 寫回暫存長駐 (不隨每次上傳重新配置，避免堆碎片)
+        self._wb = bytearray(wb_size) if wb_size else None
+        self._wbv = memoryview(self._wb) if wb_size else None
         self.reset()
         self.last_sha_hex = "" # 儲存最後一次成功或失敗的哈希計算結果
 
@@ -28,6 +48,73 @@ class FileRx:
                 h.update(memoryview(buf)[:n])
         return h.digest()
 
+    def iter_block_hashes(self, path, block_size, bufsize=2048, step=0):
+        """
+        逐區塊計算 SHA256 前 HASH_LEN 字節，每 HASH_BATCH 個區塊產出一次 (首區塊序號, 摘要串)
+        供 FILE_HASH (0x2007) 邊算邊回，不必整表暫存
+        step > 0 時每讀 step 字節另產出一次 None (讓出控制權：呼叫端每輪主迴圈只 next() 一次)
+        """
+        buf = bytearray(bufsize)
+        mv = memoryview(buf)
+        out = bytearray()
+        first = idx = 0
+        since = 0
+        with open(str(path), "rb") as f:
+            while True:
+                h = hashlib.sha256()
+                left = block_size
+                got = 0
+                while left:
+                    n = f.readinto(mv[:min(bufsize, left)])
+                    if not n:
+                        break
+                    h.update(mv[:n])
+                    got += n
+                    left -= n
+                    since += n
+                    if step and since >= step:
+                        since = 0
+                        yield None
+                if not got:
+                    break
+                out.extend(h.digest()[:HASH_LEN])
+                idx += 1
+                if idx - first >= HASH_BATCH:
+                    yield first, bytes(out)
+                    out = bytearray()
+                    first = idx
+                if left:
+                    break
+        if out:
+            yield first, bytes(out)
+
+    def cancel_hash(self):
+        """放棄進行中的 FILE_HASH (關閉生成器即關閉檔案)"""
+        job = self.hash_job
+        self.hash_job = None
+        if job:
+            job["gen"].close()
+
+    def file_digest(self, path, force=False):
+        """
+        FILE_QUERY 用：返回 (摘要, 是否快取命中)
+        未命中則串流重算並回寫快取；force = 稽核，跳過快取
+        """
+        if self.cache and not force:
+            sha = self.cache.get(path)
+            if sha:
+                return sha, True
+        gen = self.cache.write_gen(path) if self.cache else 0
+        sha = self.sha256_digest_stream_from_file(path)
+        if self.cache:
+            self.cache.put(path, sha, gen)
+        return sha, False
+
+    def stats(self):
+        """最近一次傳輸 (STATUS 用)：修補模式保留的字節、讀回補摘要的字節、結束時是否整檔重算摘要"""
+        return {"path": self.path, "patch": self.patch, "skipped": self.skipped,
+                "readback": self.readback, "rehashed": self.rehashed}
+
     def reset(self):
         """重置接收狀態"""
         self.active = False
@@ -38,11 +125,35 @@ class FileRx:
         self.written = 0
         self.sha_expect = None
         self.last_error = None
+        # 視窗傳輸：next = 已連續收齊的字節數 (累積 ACK)；_ooo = 越過缺口先到的分片 {offset: 長度}
+        self.chunk_size = 0
+        self.next = 0
+        self._ooo = {}
+        self.dups = 0
+        self.patch = False
+        self.wgen = -1         # 本次寫入的世代 (HashCache.bump)
+        self.skipped = 0
+        # 廣播模式：_bits 的 bit i = 第 i 個分片已收到 (取代 _ooo，缺口可能遍佈全檔)
+        self.mcast = False
+        self._bits = None
+        self.got = 0
+        # 流式 SHA256：_hpos = 已餵入摘要的字節數 (追隨 next)；_hbuf = 缺口後暫存的分片 {offset: data}
+        self._h = None
+        self._hpos = 0
+        self._hbuf = {}
+        self._hbuf_bytes = 0
+        self.readback = 0
+        self.rehashed = False
+        # 寫回暫存：_wb 內為檔案 [_wb_off, _wb_off + _wb_len) 的未落盤數據
+        self._wb_off = 0
+        self._wb_len = 0
+        self.writes = 0
 
     def _close(self):
         """安全關閉文件句柄，並強制刷入磁盤"""
         if self.fp:
             try:
+                self._flush_wb()
                 self.fp.flush()
                 # 某些 MicroPython 端口支援 os.sync()
                 if hasattr(os, 'sync'):
@@ -58,20 +169,31 @@ class FileRx:
         """
         self._close()
         self.reset()
+        self.cancel_hash()     # 目標檔即將被改寫，舊摘要作廢
         
         self.file_id = int(args.get("file_id", 0))
         self.total = int(args.get("total_size", 0))
         self.path = args.get("path")
         self.sha_expect = args.get("sha256")
+        self.chunk_size = int(args.get("chunk_size", 0)) or 1024
+        flags = int(args.get("flags", 0))
+        self.patch = bool(flags & F_PATCH)
+        self.mcast = bool(flags & F_MCAST)
+        if self.mcast:
+            self._bits = bytearray((-(-self.total // self.chunk_size) + 7) // 8)
+        self._h = hashlib.sha256()
         
         if not self.path or not self.sha_expect:
             self.last_error = "MISSING_PATH_OR_SHA"
             return False
 
         try:
-            # 以 'wb' 模式開啟會自動清空舊文件
+            # 以 'w+b' 模式開啟會自動清空舊文件 (可讀：補洞 / FILE_SKIP 區段需讀回餵摘要)
             # 對於 ESP32-P4，直接順序寫入比頻繁 seek 預分配更快
-            self.fp = open(self.path, "wb")
+            # 修補模式保留舊內容，只覆寫收到的區塊 (新檔不得短於舊檔，由發送端保證)
+            if self.cache:
+                self.wgen = self.cache.bump(self.path)
+            self.fp = open(self.path, "r+b" if self.patch else "w+b")
             self.active = True
             return True
         except Exception as e:
@@ -82,6 +204,7 @@ class FileRx:
         """
         FILE_CHUNK (0x2002) 處理邏輯
         支持斷點續傳地址定位，但推薦順序發送以獲得最高效能。
+        視窗傳輸下分片可能越過缺口先到 (重傳補洞)：照寫入位置落盤，連續區由 next / sack() 回報。
         """
         if not self.active or not self.fp:
             self.last_error = "NO_ACTIVE_SESSION"
@@ -94,19 +217,176 @@ class FileRx:
         off = int(args.get("offset", 0))
         data = args.get("data", b"")
         
-        try:
-            # 只有當 offset 不在當前磁頭位置時才執行 seek
-            if off != self.written:
-                self.fp.seek(off)
-            
-            self.fp.write(data)
-            self.written = off + len(data)
+        # 重傳的重複分片 (ACK 在路上丟失 / 發送端逾時)：不重寫，照樣回 ACK
+        if off + len(data) <= self.next or off in self._ooo:
+            self.dups += 1
             return True
+        if self.mcast:
+            # 補洞輪次的廣播含其他 slave 的缺片：已有的照樣丟棄；未對齊 / 越界的不收
+            i = off // self.chunk_size
+            if off % self.chunk_size or off + len(data) > self.total or self._bits[i >> 3] & (1 << (i & 7)):
+                self.dups += 1
+                return True
+
+        try:
+            self._stage(off, data)
         except Exception as e:
             self.last_error = f"WRITE_FAIL: {e}"
             self.active = False # 發生物理錯誤時解除激活
             return False
 
+        # 順序到達直接餵摘要；越過缺口的先暫存 (有上限)，補洞後接續
+        if self._h:
+            if off == self._hpos:
+                self._h.update(data)
+                self._hpos += len(data)
+            elif self._hbuf_bytes + len(data) <= OOO_HASH_MAX:
+                self._hbuf[off] = data
+                self._hbuf_bytes += len(data)
+        self._advance(off, len(data))
+        self._catch_up()
+        return True
+
+    def _write_at(self, off, data):
+        # 只有當 offset 不在當前磁頭位置時才執行 seek
+        if off != self.written:
+            self.fp.seek(off)
+        self.fp.write(data)
+        self.written = off + len(data)
+        self.writes += 1
+
+    def _stage(self, off, data):
+        """
+        分片進寫回暫存；暫存尾端對齊 WB_SIZE 邊界，攢滿即整塊寫盤
+        不接續暫存尾的分片 (亂序補洞 / 修補跳區) 先把已暫存部分落盤，再從新位置開始攢
+        """
+        wb = self._wb
+        if wb is None:
+            self._write_at(off, data)
+            return
+        if self._wb_len and off != self._wb_off + self._wb_len:
+            self._flush_wb()
+        if not self._wb_len:
+            self._wb_off = off
+        size = len(wb)
+        mv = memoryview(data)
+        n = len(data)
+        pos = 0
+        while pos < n:
+            cap = size - self._wb_off % size      # 本塊到下一個對齊邊界的容量
+            take = min(n - pos, cap - self._wb_len)
+            self._wbv[self._wb_len:self._wb_len + take] = mv[pos:pos + take]
+            self._wb_len += take
+            pos += take
+            if self._wb_len == cap:
+                self._flush_wb()
+
+    def _flush_wb(self):
+        if self._wb_len:
+            self._write_at(self._wb_off, self._wbv[:self._wb_len])
+            self._wb_off += self._wb_len
+            self._wb_len = 0
+
+    def skip(self, args: dict) -> bool:
+        """
+        FILE_SKIP (0x2009)：修補模式下發送端宣告 [offset, offset + length) 與舊檔相同
+        不寫盤，只計入已收齊區段，讓累積 ACK 越過不變區塊
+        """
+        if not self.active or not self.patch or int(args.get("file_id", 0)) != self.file_id:
+            return False
+        off = int(args.get("offset", 0))
+        ln = int(args.get("length", 0))
+        if off + ln <= self.next or off in self._ooo:
+            return True
+        self.skipped += ln
+        self._advance(off, ln)
+        self._catch_up()
+        return True
+
+    def _advance(self, off, ln):
+        """推進連續區；缺口之後先到的區段記下，補齊時一併併入"""
+        if self.mcast:
+            cs = self.chunk_size
+            bits = self._bits
+            i = off // cs
+            bits[i >> 3] |= 1 << (i & 7)
+            self.got += 1
+            while self.next < self.total:
+                i = self.next // cs
+                if not bits[i >> 3] & (1 << (i & 7)):
+                    break
+                self.next = min(self.total, self.next + cs)
+            return
+        if off <= self.next:
+            self.next = max(self.next, off + ln)
+            ooo = self._ooo
+            while self.next in ooo:
+                self.next += ooo.pop(self.next)
+        else:
+            self._ooo[off] = ln
+
+    def _catch_up(self, bufsize=2048):
+        """
+        讓摘要追上連續區 next：先用暫存分片，沒有暫存的 (FILE_SKIP 不變區段 / 超出暫存上限) 自盤讀回
+        讀回失敗則放棄流式摘要，FILE_END 退回整檔重算
+        """
+        h = self._h
+        if not h or self._hpos >= self.next:
+            return
+        buf = None
+        try:
+            while self._hpos < self.next:
+                d = self._hbuf.pop(self._hpos, None)
+                if d is not None:
+                    self._hbuf_bytes -= len(d)
+                    h.update(d)
+                    self._hpos += len(d)
+                    continue
+                stop = self.next
+                for k in self._hbuf:
+                    if self._hpos < k < stop:
+                        stop = k
+                if buf is None:
+                    buf = bytearray(bufsize)
+                    mv = memoryview(buf)
+                    self._flush_wb()       # 讀回前先把暫存落盤 (讀回的區段可能還在暫存裡)
+                self.fp.seek(self._hpos)
+                n = self.fp.readinto(mv[:min(bufsize, stop - self._hpos)])
+                if not n:
+                    raise OSError("short read")
+                h.update(mv[:n])
+                self._hpos += n
+                self.readback += n
+                self.written = -1          # 磁頭已移動，下一個分片必定 seek
+        except Exception as e:
+            print(f"⚠️ [File] stream hash dropped: {e}")
+            self._h = None
+            self._hbuf = {}
+            self._hbuf_bytes = 0
+
+    def sack(self):
+        """選擇性 ACK 位圖：bit i = 缺口 (next) 之後第 i + 1 個分片已收到"""
+        bits = 0
+        cs = self.chunk_size
+        for off in self._ooo:
+            d = (off - self.next) // cs - 1
+            if 0 <= d < 32:
+                bits |= 1 << d
+        return bits
+
+    def missing(self, file_id, max_bytes=NAK_MAX):
+        """
+        FILE_NAK (0x200B) 內容：(缺片數, 位圖首分片, 位圖)
+        位圖 = 已收位圖自首個缺片所在字節起的切片 (bit = 1 已收)，至多 max_bytes；缺片數 0 = 收齊
+        """
+        if not self.active or not self.mcast or file_id != self.file_id:
+            return NO_SESSION, 0, b""
+        left = -(-self.total // self.chunk_size) - self.got
+        if not left:
+            return 0, 0, b""
+        b0 = self.next // self.chunk_size >> 3
+        return left, b0 * 8, bytes(self._bits[b0:b0 + max_bytes])
+
     def end(self, args: dict) -> bool:
         """
         FILE_END (0x2003) 處理邏輯
@@ -115,17 +395,30 @@ class FileRx:
         if not self.active:
             return False
             
-        # 1. 先關閉文件，確保所有數據已從緩存刷入 Flash
+        # 1. 先寫出暫存並關閉文件，確保所有數據已從緩存刷入 Flash
+        try:
+            self._flush_wb()
+        except Exception as e:
+            self.last_error = f"WRITE_FAIL: {e}"
+            self.active = False
+            self._close()
+            return False
         self._close()
         
         try:
-            # 2. 計算實際寫入文件的哈希值
-            got_digest = self.sha256_digest_stream_from_file(self.path)
+            # 2. 流式摘要已覆蓋整檔且檔長相符時直接取用；否則 (讀回失敗等) 整檔重算
+            if self._h and self._hpos == self.total and os.stat(self.path)[6] == self.total:
+                got_digest = self._h.digest()
+            else:
+                self.rehashed = True
+                got_digest = self.sha256_digest_stream_from_file(self.path)
             self.last_sha_hex = ubinascii.hexlify(got_digest).decode()
             
             # 3. 雙向對應
             if got_digest == self.sha_expect:
                 self.active = False
+                if self.cache:
+                    self.cache.put(self.path, got_digest, self.wgen)
                 return True
             else:
                 exp_hex = ubinascii.hexlify(self.sha_expect).decode()
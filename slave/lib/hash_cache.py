@@ -0,0 +1,101 @@
+import btree
+import os
+import ubinascii
+
+
+class HashCache:
+    """
+    檔案 SHA256 持久快取 (btree 旁路檔，與數據同卷)
+    - FileRx.begin() 調用 bump()：全域世代 +1 記為該路徑的寫入世代，並刪除舊條目 (中斷的上傳不會留下舊摘要)
+    - FileRx.end() 校驗成功以 begin 時的世代寫入；重算 (file_digest) 以開算前快照的世代寫入
+    - 條目 = 大小 + mtime + 世代 + 摘要；查詢時世代須等於該路徑目前的寫入世代 (主判據：
+      算到一半被重寫 / 作廢未落盤的舊條目一律過期)，大小 / mtime 再作附加檢查 (防範 webrepl 等旁路改檔)
+    - FILE_QUERY (0x2005) 命中即答，免整檔重讀；flags bit0 強制重算 (稽核)
+    """
+    _GEN = b"\x00gen"     # 條目值為 "size,mtime,gen,sha256_hex" (文字，與 ConfigManager 的 btree 用法一致)
+    _WGEN = b"\x01"       # 鍵前綴：路徑的寫入世代 (FileRx 每次 begin 遞增)
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._f = None
+        self._db = None
+        self.gen = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _open(self):
+        if self._db is None:
+            try:
+                self._f = open(self.db_path, "r+b")
+            except OSError:
+                self._f = open(self.db_path, "w+b")
+            self._db = btree.open(self._f)
+            self.gen = int(self._db.get(self._GEN, b"0"))
+        return self._db
+
+    @staticmethod
+    def _stat(path):
+        st = os.stat(path)
+        return st[6], int(st[8])
+
+    def write_gen(self, path):
+        """路徑目前的寫入世代 (從未經 FileRx 寫入為 0)"""
+        try:
+            return int(self._open().get(self._WGEN + path.encode(), b"0"))
+        except Exception as e:
+            print(f"⚠️ [HashCache] write_gen {path}: {e}")
+            return -1
+
+    def bump(self, path):
+        """FileRx 即將改寫 path：遞增並記錄寫入世代，作廢舊條目；返回新世代"""
+        try:
+            db = self._open()
+            self.gen += 1
+            db[self._WGEN + path.encode()] = str(self.gen).encode()
+            db[self._GEN] = str(self.gen).encode()
+            if db.get(path.encode()) is not None:
+                del db[path.encode()]
+            db.flush()
+            return self.gen
+        except Exception as e:
+            print(f"⚠️ [HashCache] bump {path}: {e}")
+            return -1
+
+    def get(self, path):
+        """命中返回 32 字節摘要；無條目 / 過期 / 檔案不存在返回 None"""
+        try:
+            db = self._open()
+            raw = db.get(path.encode())
+            if raw:
+                size, mtime, gen, sha = raw.decode().split(",")
+                if int(gen) == self.write_gen(path) and (int(size), int(mtime)) == self._stat(path):
+                    self.hits += 1
+                    return ubinascii.unhexlify(sha)
+                del db[path.encode()]
+                db.flush()
+        except Exception as e:
+            print(f"⚠️ [HashCache] get {path}: {e}")
+        self.misses += 1
+        return None
+
+    def put(self, path, sha, gen):
+        """gen = 摘要所對應內容的寫入世代 (begin 的 bump() 返回值 / 重算前的 write_gen() 快照)"""
+        try:
+            if gen < 0 or gen != self.write_gen(path):
+                return              # 計算期間檔案已被改寫：不寫入過期摘要
+            db = self._open()
+            size, mtime = self._stat(path)
+            db[path.encode()] = f"{size},{mtime},{gen},{ubinascii.hexlify(sha).decode()}".encode()
+            db.flush()
+        except Exception as e:
+            print(f"⚠️ [HashCache] put {path}: {e}")
+
+    def stats(self):
+        return {"gen": self.gen, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        if self._db:
+            self._db.close()
+        if self._f:
+            self._f.close()
+        self._db = self._f = None
@@ -0,0 +1,147 @@
+# lib/interp.py
+import micropython
+
+class Interpolator:
+    """
+    Core 1 幀率轉換：來源幀率 (秀檔 / 串流) 與本地出幀率各自獨立
+    設計目標：
+    1. 常駐兩幀緩衝 a (當前來源幀) / b (下一來源幀)，自 Hub 整幀拷入後 Hub 槽即可交還 Core 0；
+       每個 tick 按時間相位 acc / fps 在 a、b 間以 viper 線性混合 (blend=False 時只換幀不混合)。
+    2. 相位以整數累進 (每 tick += src_fps，滿 fps 換下一來源幀)，長秀無截斷漂移。
+    3. Hub 的 HOLD 以來源幀為單位；b 與 a 相同 (靜止段) 或 b 被編碼器標為 cut 時不混合，
+       直到換幀瞬間才硬切 (與原始 frame-hold 相同)。
+    4. 輸出未變 (靜止 / 硬切區間內) 時回報 UNCHANGED，Core 1 免重新轉換與輸出。
+    """
+    NONE = 0        # 尚無任何來源幀 (斷供)
+    RENDERED = 1    # out 已更新
+    UNCHANGED = 2   # out 與上一 tick 相同
+    STALLED = 3     # 該換下一來源幀但尚未到貨：定格在上一輸出
+
+    def __init__(self, frame_size, fps):
+        self.fs = frame_size
+        self.fps = fps
+        self._a = bytearray(frame_size)
+        self._b = bytearray(frame_size)
+        self.src_fps = fps
+        self.blend = True
+        self.blended = 0           # 混合輸出的 tick 數
+        self.cuts = 0              # 遇到的 cut 幀數
+        self.stalls = 0
+        self.reset()
+
+    def reset(self, src_fps=None, blend=None):
+        """新時間軸 (換檔 / Seek / 重新起播)：丟棄手上的幀，相位歸零"""
+        if src_fps:
+            self.src_fps = src_fps
+        if blend is not None:
+            self.blend = blend
+        self._acc = 0
+        self._have_a = False
+        self._have_b = False
+        self._same = False         # b 與 a 內容相同 (HOLD)
+        self._cut = False          # b 為 cut 幀
+        self._w = -1               # out 目前的混合權重 (-1 = 未知)
+        self._blk = None
+        self._off = 0
+        self._idx = 0
+        self._hold = 0
+        self._blk_cuts = 0
+
+    def skip(self, ticks):
+        """時間軸已走過 ticks 個斷供 (STALLED) 的 tick：相位照補，到貨後由換幀迴圈一次追上"""
+        self._acc += ticks * self.src_fps
+
+    def _pull(self, hub, dst, prev):
+        """
+        下一個來源幀拷入 dst：返回 0 = 無貨，1 = 新幀，2 = 靜止 (與 prev 相同)
+        self._pc 為該幀的 cut 標記
+        """
+        self._pc = False
+        blk = self._blk
+        if blk is None or self._off >= len(blk):
+            if self._hold > 0:
+                self._hold -= 1
+                dst[:] = prev
+                return 2
+            blk = hub.get_read_view()
+            if blk is None:
+                self._blk = None
+                return 0
+            self._blk = blk
+            self._hold = hub.hold
+            self._blk_cuts = hub.cuts
+            self._off = 0
+            self._idx = 0
+        fs = self.fs
+        dst[:] = blk[self._off : self._off + fs]
+        self._pc = (self._blk_cuts >> self._idx) & 1 == 1
+        self._off += fs
+        self._idx += 1
+        return 1
+
+    def _load_b(self, hub):
+        r = self._pull(hub, self._b, self._a)
+        if r:
+            self._have_b = True
+            self._same = r == 2
+            self._cut = self._pc
+            if self._cut:
+                self.cuts += 1
+        return r
+
+    def tick(self, hub, out, advance=True):
+        """出一個 tick：必要時換下一來源幀，再把 a→b 的當前相位寫入 out；返回狀態碼"""
+        if not self._have_a:
+            if not self._pull(hub, self._a, self._a):
+                return self.NONE
+            self._have_a = True
+            self._acc = 0
+            self._w = -1
+        if not self._have_b:
+            self._load_b(hub)
+
+        fps = self.fps
+        stalled = False
+        while self._acc >= fps:
+            if not self._have_b:
+                stalled = True
+                break
+            # 換幀：b 成為當前幀
+            self._a, self._b = self._b, self._a
+            self._acc -= fps
+            self._have_b = False
+            if not self._same:
+                self._w = -1
+            self._load_b(hub)
+        if stalled:
+            self.stalls += 1
+            return self.STALLED
+
+        w = 0
+        if self.blend and self._have_b and not self._same and not self._cut:
+            w = self._acc * 256 // fps
+        if advance:
+            self._acc += self.src_fps
+        if w == self._w:
+            return self.UNCHANGED
+        if w:
+            lerp8(out, self._a, self._b, self.fs, w)
+            self.blended += 1
+        else:
+            out[:] = self._a
+        self._w = w
+        return self.RENDERED
+
+    def stats(self):
+        return {"src_fps": self.src_fps, "fps": self.fps, "blend": 1 if self.blend else 0,
+                "blended": self.blended, "cuts": self.cuts, "stalls": self.stalls}
+
+@micropython.viper
+def lerp8(dst, a, b, n: int, w: int):
+    """dst = a + (b - a) * w / 256 (逐字節，w 0..255)"""
+    d = ptr8(dst)
+    pa = ptr8(a)
+    pb = ptr8(b)
+    iw = 256 - w
+    for i in range(n):
+        d[i] = (pa[i] * iw + pb[i] * w) >> 8
@@ -11,7 +11,7 @@ class NetBus:
     TYPE_WS  = 1
     TYPE_UDP = 2
 
-    def __init__(self, bus_type=TYPE_WS, app=None, label="Bus"):
+    def __init__(self, bus_type=TYPE_WS, app=None, label="Bus", rx_size=2048):
         self.type = bus_type
         self.label = label
         self.app = app
@@ -24,6 +24,10 @@ class NetBus:
         self._ptr = 0
         self.parser = app.create_parser() if app else None
 
+        # 單次接收上限：UDP 必須容納整個數據報 (直推幀)，否則會被截斷
+        self.rx_size = rx_size
+        self._ws = bytearray()  # WS 未完成幀累積區 (跨 recv 拼接)
+
     def connect(self, host, port, path="/ws"):
         """初始化連接 (TCP/WS) 或 綁定 (UDP)"""
         try:
@@ -45,8 +49,11 @@ class NetBus:
                         "Sec-WebSocket-Version: 13\r\n\r\n"
                     )
                     self.sock.send(handshake.encode())
-                    if b"101 Switching Protocols" not in self.sock.recv(1024):
+                    resp = self.sock.recv(1024)
+                    if b"101 Switching Protocols" not in resp:
                         raise Exception("WS Handshake Failed")
+                    # Server 可能緊接著握手回應就發幀，同一次 recv 裡的殘餘字節留給解幀
+                    self._ws = bytearray(resp[resp.find(b"\r\n\r\n") + 4:])
                 
                 self.connected = True
             
@@ -79,6 +86,7 @@ class NetBus:
             self.connected = False
             self.target_addr = None
             self._ptr = 0 # 清空緩衝區指針
+            self._ws = bytearray()
             print(f"🔌 [{self.label}] Connection Closed.")
 
     def poll(self, **extra_ctx):
@@ -92,23 +100,23 @@ class NetBus:
         
         try:
             if self.type == self.TYPE_UDP:
-                raw, addr = self.sock.recvfrom(2048)
+                raw, addr = self.sock.recvfrom(self.rx_size)
                 self.target_addr = addr # 自動鎖定最後一個來源
             else:
-                raw = self.sock.recv(2048)
-                if not raw: 
-                    self.connected = False
-                    return
+                try:
+                    raw = self.sock.recv(self.rx_size)
+                    if not raw: 
+                        self.connected = False
+                        return
+                except OSError:
+                    if not self._ws: raise
+                    raw = b"" # 無新數據，但握手殘餘可能已含完整幀
 
             # --- 解析數據 (WS 剝皮 或 直接取用) ---
             data = raw
             if self.type == self.TYPE_WS:
-                # 簡易 WS 解幀 (忽略 Mask, 只取 Payload)
-                off = 2
-                pl_len = raw[1] & 0x7F
-                if pl_len == 126: off = 4
-                elif pl_len == 127: off = 10
-                data = raw[off:]
+                data = self._ws_unwrap(raw)
+                if not data: return
 
             # --- 智能分發 ---
             if self.app and self.parser:
@@ -128,6 +136,43 @@ class NetBus:
         except OSError:
             pass # 沒有數據
 
+    def _ws_unwrap(self, raw):
+        """
+        WS 解幀：大幀會被拆到多次 recv，一次 recv 也可能含多幀
+        只返回已完整到達的數據幀 Payload，殘餘字節留待下次拼接
+        """
+        b = self._ws
+        b.extend(raw)
+        out = bytearray()
+        while len(b) >= 2:
+            op = b[0] & 0x0F
+            masked = b[1] & 0x80
+            ln = b[1] & 0x7F
+            off = 2
+            if ln == 126:
+                if len(b) < 4: break
+                ln = (b[2] << 8) | b[3]; off = 4
+            elif ln == 127:
+                if len(b) < 10: break
+                ln = struct.unpack_from(">Q", b, 2)[0]; off = 10
+            if masked: off += 4
+            if len(b) < off + ln: break
+
+            pl = b[off : off + ln]
+            if masked:
+                mk = b[off - 4 : off]
+                for i in range(ln): pl[i] ^= mk[i & 3]
+
+            if op == 0x8:   # Close
+                self.connected = False
+            elif op == 0x9: # Ping -> Pong
+                self.sock.send(bytes([0x8A, len(pl)]) + pl)
+            elif op <= 0x2: # 延續 / 文本 / 二進制
+                out.extend(pl)
+            b = b[off + ln:]
+        self._ws = b
+        return out
+
     def write(self, data: bytes):
         """大一統寫入"""
         if not self.connected: return
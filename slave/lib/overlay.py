@@ -0,0 +1,146 @@
+# lib/overlay.py
+import time
+
+# 0x3015 ctrl 位元
+OV_CLEAR = 0x01        # 先把整層 alpha 清零，再套用本包區段
+OV_COMMIT = 0x02       # 套用後發佈 (多包更新以最後一包發佈，Core 1 不會看到半新半舊)
+OV_ALPHA_ONLY = 0x04   # data 只有 alpha (顏色沿用)
+OV_COLOR_ONLY = 0x08   # data 只有像素 (alpha 沿用)
+
+# 混合模式 (a = alpha + (alpha >> 7)，255 即全覆蓋)
+MODE_NORMAL = 0        # out = (base * (256 - a) + ov * a) >> 8
+MODE_ADD = 1           # out = base + (ov * a >> 8)，飽和 255
+MODE_MULTIPLY = 2      # ov 先與 base 相乘 (base * ov / 255)，再按 a 混合
+MODES = {MODE_NORMAL: "normal", MODE_ADD: "add", MODE_MULTIPLY: "multiply"}
+
+# 來源格式 -> 每像素字節 (同 LEDController.SOURCE_FORMATS)
+_STRIDE = {"RGBW8888": 4, "RGB888": 3, "W8": 1, "P8": 1}
+
+class OverlayLayer:
+    """
+    即時覆蓋層：疊在秀檔 / 效果 / 直推畫面之上的第二層 (操作員追光、感測器高亮)
+    設計目標：
+    1. 與來源幀同格式的像素層 + 每像素 alpha (u8)，Core 1 在 LED 轉換的同一趟內合成，不另開整幀拷貝。
+    2. 只在變化時傳送：0x3015 每包只帶一段像素區間，網路用量與即時內容成正比。
+    3. 雙槽：Core 0 寫後台槽，COMMIT 才換槽發佈；發佈後以前台回寫後台 (等 Core 1 讀完舊槽)，
+       稀疏更新永遠疊在最新狀態上。
+    4. 未啟用 (alpha 全 0) 時 Core 1 走原轉換路徑，零額外成本。
+    """
+    def __init__(self, layout):
+        self.n = sum(c for _, c in layout)
+        # 分段表：(起始像素, 起始字節, 每像素字節)
+        self._segs = []
+        fs = 0
+        pix = 0
+        for fmt, count in layout:
+            st = _STRIDE.get(fmt, 4)
+            self._segs.append((pix, fs, st))
+            pix += count
+            fs += count * st
+        self.frame_size = fs
+        self._bufs = [bytearray(fs), bytearray(fs)]
+        self._alphas = [bytearray(self.n), bytearray(self.n)]
+        self._zero = bytes(self.n)
+        self._modes = [MODE_NORMAL, MODE_NORMAL]
+        self._active = [False, False]
+        self.front = 0          # 已發佈 (Core 1 讀取) 的槽
+        self.seq = 0            # 每次發佈 +1
+        self.shown = 0          # Core 1 最近一次合成時看到的 seq
+        self.reading = -1       # Core 1 轉換中正在讀的槽 (-1 = 未在讀)
+        self._stale = False     # 後台槽落後於前台，下次寫入前需回寫
+        self.commits = 0
+        self.spans = 0
+        self.rx_bytes = 0
+        self.wait_us = 0        # Core 0 等 Core 1 讀完舊槽的累計時間
+
+    def byte_at(self, pixel):
+        """邏輯像素索引 -> 來源幀字節偏移"""
+        for pix, base, st in reversed(self._segs):
+            if pixel >= pix:
+                return base + (pixel - pix) * st
+        return 0
+
+    def _sync(self):
+        """後台槽追上前台 (發佈後首次寫入時)；Core 1 若仍在讀該槽則稍候 (至多一次轉換時間)"""
+        if not self._stale:
+            return
+        b = 1 - self.front
+        if self.reading == b:
+            t0 = time.ticks_us()
+            while self.reading == b:
+                time.sleep_us(50)
+            self.wait_us += time.ticks_diff(time.ticks_us(), t0)
+        f = self.front
+        self._bufs[b][:] = self._bufs[f]
+        self._alphas[b][:] = self._alphas[f]
+        self._modes[b] = self._modes[f]
+        self._active[b] = self._active[f]
+        self._stale = False
+
+    def apply(self, ctrl, mode, start, count, data):
+        """
+        Core 0 (0x3015)：把一段區間寫入後台槽，ctrl 帶 OV_COMMIT 時發佈
+        data = alpha[count] + 像素 (來源格式)；OV_ALPHA_ONLY / OV_COLOR_ONLY 時只帶其一
+        區間越界或長度不符返回 False (整包不套用)
+        """
+        if mode not in MODES:
+            return False
+        if count:
+            if start + count > self.n:
+                return False
+            b0 = self.byte_at(start)
+            b1 = self.byte_at(start + count)
+            na = 0 if ctrl & OV_COLOR_ONLY else count
+            nc = 0 if ctrl & OV_ALPHA_ONLY else b1 - b0
+            if len(data) != na + nc:
+                return False
+        self._sync()
+        b = 1 - self.front
+        al = self._alphas[b]
+        if ctrl & OV_CLEAR:
+            al[:] = self._zero
+            self._active[b] = False
+        self._modes[b] = mode
+        if count:
+            mv = memoryview(data)
+            if na:
+                al[start:start + count] = mv[:na]
+                if not self._active[b] and any(mv[:na]):
+                    self._active[b] = True
+            if nc:
+                self._bufs[b][b0:b1] = mv[na:]
+            self.spans += 1
+            self.rx_bytes += len(data)
+        if ctrl & OV_COMMIT:
+            self.front = b
+            self.seq += 1
+            self._stale = True
+            self.commits += 1
+        return True
+
+    def begin(self):
+        """
+        Core 1 轉換前調用：鎖定前台槽並返回 (像素, alpha, 模式)；未啟用返回 None
+        先標記再複查 front，Core 0 回寫時不會動到正在讀的槽
+        """
+        seq = self.seq
+        f = self.front
+        self.reading = f
+        while self.front != f:
+            f = self.front
+            self.reading = f
+        self.shown = seq
+        if not self._active[f]:
+            self.reading = -1
+            return None
+        return (self._bufs[f], self._alphas[f], self._modes[f])
+
+    def end(self):
+        """Core 1 轉換完成：釋放槽"""
+        self.reading = -1
+
+    def stats(self):
+        f = self.front
+        return {"active": 1 if self._active[f] else 0, "mode": MODES.get(self._modes[f], ""),
+                "seq": self.seq, "commits": self.commits, "spans": self.spans,
+                "rx_bytes": self.rx_bytes, "wait_us": self.wait_us}
@@ -3,22 +3,64 @@ import micropython
 import array
 import time
 
+# 輸出模式：_buf 內數值的意義
+MODE_RAW12 = 0    # 直接為 12-bit duty (0-4095)，舊行為
+MODE_CURVE8 = 1   # 8-bit 感知亮度 (0-255)，經曲線擴展為 12-bit
+MODE_CURVE16 = 2  # 16-bit 感知亮度 (0-65535)，曲線線性插值擴展為 12-bit
+
 class PCA9685:
-    def __init__(self, i2c, address=0x40, n=16, invert=False):
+    def __init__(self, i2c, address=0x40, n=16, invert=False, mode=MODE_RAW12, dither=False, gamma=None, bus_hz=400_000):
         self.i2c = i2c
         self.address = address
         self.n = n
+        self.bus_hz = bus_hz  # 僅用於估算 I2C 傳輸時間 (批次預算)
         self.invert = invert  # 支援邏輯反轉 (共陽極)
+        self.mode = mode
+        self.dither = dither  # 時間抖動：把 12-bit 以下的小數誤差累積到下一幀
         
         # 核心數據區 (H: uint16)
         self._buf = array.array('H', [0] * n)
         # I2C 傳輸緩衝區
         self.reg_buf = bytearray(n * 4)
+
+        # 擴展曲線：257 點 12.4 定點 (最後一點為插值哨兵)；抖動誤差累積 (每通道 0-15)
+        self._curve = array.array('H', [0] * 257)
+        self._err = array.array('H', [0] * n)
+        self.set_curve(gamma)
+
+        # 差量寫入：上次實際送出的寄存器鏡像 + 變更區段 [start, end) 對
+        self._sent = bytearray(n * 4)
+        self._mv = memoryview(self.reg_buf)
+        self._runs = array.array('H', [0] * (n * 2))
+        self.batch = None
+        self.reset_stats()
         
         self.setup()
         self.show()
 
+    def set_curve(self, gamma=None, scale=1.0):
+        """
+        建立 8-bit -> 12.4 定點的感知曲線 (僅參數變更時調用)
+        gamma=None 使用 CIE 1931 明度曲線，否則為冪次曲線；scale 為整體亮度 0.0 ~ 1.0
+        """
+        if scale < 0.0: scale = 0.0
+        if scale > 1.0: scale = 1.0
+        top = 4095 * 16 * scale
+        c = self._curve
+        for i in range(256):
+            x = i / 255
+            if gamma is None:
+                L = x * 100
+                y = ((L + 16) / 116) ** 3 if L > 8 else L / 903.3
+            else:
+                y = x ** gamma
+            c[i] = int(y * top + 0.5)
+        c[256] = c[255]
+        self.gamma = gamma
+        self.scale = scale
+
     def setup(self):
+        self.invalidate()
         try:
             self.i2c.writeto_mem(self.address, 0x00, b'\x00')
             self.freq(200)
@@ -97,11 +139,31 @@ class PCA9685:
     def _prepare_reg_buf(self):
         p_buf = ptr16(self._buf)
         p_reg = ptr8(self.reg_buf)
+        curve = ptr16(self._curve)
+        err = ptr16(self._err)
         n = int(self.n)
         is_inv = int(self.invert)
+        mode = int(self.mode)
+        dith = int(self.dither)
         
         for i in range(n):
-            val = p_buf[i]
+            val = int(p_buf[i])
+
+            # --- 感知曲線擴展 (12.4 定點) + 時間抖動 ---
+            if mode != 0:
+                if mode == 1:
+                    q = int(curve[val & 0xFF])
+                else:
+                    pos = val - (val >> 8)          # 0-65535 -> 8.8 定點索引 (0 ~ 255.0)
+                    k = pos >> 8
+                    a = int(curve[k])
+                    q = a + (((int(curve[k + 1]) - a) * (pos & 0xFF)) >> 8)
+                if dith:
+                    q += int(err[i])
+                    err[i] = q & 0xF
+                    val = q >> 4
+                else:
+                    val = (q + 8) >> 4
             
             # --- 邏輯反轉處理 ---
             if is_inv:
@@ -125,9 +187,136 @@ class PCA9685:
                 p_reg[idx+2] = val & 0xFF
                 p_reg[idx+3] = val >> 8
 
+    # ========================================
+    # 差量寫入與批次排程
+    # ========================================
+    def invalidate(self):
+        """鏡像失效 (重置 / I2C 錯誤後)：下一幀強制全量寫入"""
+        for i in range(len(self._sent)):
+            self._sent[i] = 0xFF  # 0xFF 永遠不是合法寄存器值
+
+    def reset_stats(self):
+        self.bytes_written = 0
+        self.bytes_skipped = 0
+        self.writes = 0
+        self.deferred = 0
+
+    def stats(self):
+        return {"addr": self.address, "written": self.bytes_written, "skipped": self.bytes_skipped,
+                "writes": self.writes, "deferred": self.deferred}
+
+    def tx_us(self, nbytes):
+        """估算單次 writeto_mem 線上時間：(地址 + 寄存器 + 數據) x 9 bit + START/STOP"""
+        return ((nbytes + 2) * 9 + 2) * 1_000_000 // self.bus_hz
+
+    @micropython.viper
+    def _diff_runs(self) -> int:
+        """比對寄存器鏡像，把變更通道的連續區段寫入 _runs，返回區段數"""
+        cur = ptr8(self.reg_buf)
+        old = ptr8(self._sent)
+        r = ptr16(self._runs)
+        n = int(self.n)
+        cnt = 0
+        start = -1
+        last = -1
+        for ch in range(n):
+            b = ch << 2
+            if cur[b] != old[b] or cur[b+1] != old[b+1] or cur[b+2] != old[b+2] or cur[b+3] != old[b+3]:
+                if start < 0:
+                    start = ch
+                elif ch != last + 1:
+                    r[cnt << 1] = start
+                    r[(cnt << 1) + 1] = last + 1
+                    cnt += 1
+                    start = ch
+                last = ch
+        if start >= 0:
+            r[cnt << 1] = start
+            r[(cnt << 1) + 1] = last + 1
+            cnt += 1
+        return cnt
+
+    def flush(self, budget_us=-1):
+        """
+        只寫出變更的連續通道 (自動遞增寄存器)，返回估算耗用的 I2C 時間 (us)
+        budget_us >= 0 時超出預算的區段延後；鏡像未更新，下一幀自然重送
+        """
+        cnt = self._diff_runs()
+        runs = self._runs
+        mv = self._mv
+        used = 0
+        sent = 0
+        for k in range(cnt):
+            a = runs[k << 1] << 2
+            b = runs[(k << 1) + 1] << 2
+            t = self.tx_us(b - a)
+            if budget_us >= 0 and used + t > budget_us:
+                self.deferred += cnt - k
+                break
+            try:
+                self.i2c.writeto_mem(self.address, 0x06 + a, mv[a:b])
+            except OSError:
+                self.invalidate()
+                raise
+            self._sent[a:b] = mv[a:b]
+            used += t
+            sent += b - a
+            self.writes += 1
+        self.bytes_written += sent
+        self.bytes_skipped += len(self._sent) - sent
+        return used
+
     def show(self):
         self._prepare_reg_buf()
-        self.i2c.writeto_mem(self.address, 0x06, self.reg_buf)
+        if self.batch is not None:
+            self.batch.mark(self)
+        else:
+            self.flush()
+
+class PCA9685Batch:
+    """
+    同一條 I2C 總線上的多塊 PCA9685 以一批次寫出
+    每塊板的 show() 只填寄存器；全部到齊後依輪轉順序在每幀 I2C 時間預算內差量寫出
+    """
+    def __init__(self, boards, budget_us=0):
+        self.boards = boards
+        self.budget_us = budget_us  # 0 = 不限
+        self._pending = 0
+        self._rr = 0
+        self.frames = 0
+        self.over_budget = 0
+        self.last_us = 0
+        for b in boards:
+            b.batch = self
+
+    def mark(self, board):
+        self._pending += 1
+        if self._pending >= len(self.boards):
+            self.flush()
+
+    def flush(self):
+        self._pending = 0
+        boards = self.boards
+        n = len(boards)
+        budget = self.budget_us
+        used = 0
+        deferred = 0
+        for k in range(n):
+            b = boards[(self._rr + k) % n]
+            d0 = b.deferred
+            used += b.flush(budget - used if budget else -1)
+            deferred += b.deferred - d0
+        # 輪轉起點，避免預算不足時總是同一塊板被延後
+        self._rr = (self._rr + 1) % n if n else 0
+        self.frames += 1
+        self.last_us = used
+        if deferred:
+            self.over_budget += 1
+        return used
+
+    def stats(self):
+        return {"frames": self.frames, "over_budget": self.over_budget, "last_us": self.last_us,
+                "budget_us": self.budget_us, "boards": [b.stats() for b in self.boards]}
 
 # ==================== 用法範例 ====================
 # i2c = machine.I2C(0, scl=machine.Pin(9), sda=machine.Pin(8))
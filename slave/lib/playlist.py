@@ -0,0 +1,236 @@
+# lib/playlist.py
+import time
+import micropython
+
+class Playlist:
+    """
+    Slave 端播放清單：依序播放多個秀檔，換檔落在精確的幀邊界
+    設計目標：
+    1. 當前項播放時，Core 0 空檔 preload() 先開好下一項並讀入首塊；
+       Hub 補貨遇到檔尾即在同一塊內接上下一項，不留黑場、不需往返 Server。
+    2. 每項可重複 loops 次 (0 = 無限，直到 Seek / SET 打斷)；清單 repeat 時末項接回首項。
+    3. 轉場 fade > 0：本項最後 fade 幀與下一項前 fade 幀逐幀交叉淡化，總長度不變
+       (下一項從第 fade 幀接續)；靜止段 (HOLD) 在淡化區內按幀展開。
+    items: [{"file": 路徑, "loops": 次數, "fade": 淡入本項前一項的幀數}, ...]
+    open_reader(path, spare): 開好並定位在第 0 幀的讀取器 (spare 為可回收的舊讀取器)
+    """
+    def __init__(self, items, repeat, open_reader, frame_size):
+        self.items = items
+        self.repeat = repeat
+        self._open = open_reader
+        self.fs = frame_size
+        self.index = 0
+        self.loop = 0              # 當前項已播完的次數
+        self.cur = None
+        self.nxt = None            # 已預載的下一項讀取器
+        self._nxt_idx = -1
+        self.hold = 0
+        self.cuts = 0              # 最近一次 fill 的硬切位圖 (同 ShowReader.cuts)
+        self._cut_next = False     # 下一個輸出幀為無淡化換檔 (硬切)
+        self.switches = 0
+        self.preload_us = 0        # 最近一次預載 (開檔 + 首塊) 耗時
+        self.late = 0              # 換檔時下一項尚未預載好 (同步開檔)
+        # 淡化暫存：本項 / 下一項的當前幀與混合結果，及各自剩餘的重複次數 (HOLD)
+        self._a = bytearray(frame_size)
+        self._b = bytearray(frame_size)
+        self._mix = bytearray(frame_size)
+        self._a_rep = -1           # -1 = 淡化未開始，-2 = 本輪不淡化
+        self._b_rep = 0
+        self._k = 0                # 已輸出的淡化幀數
+
+    # --- 清單位置 ---
+    def start(self, spare=None):
+        """開啟第 0 項 (spare 為 Core 0 既有的讀取器)，返回當前讀取器"""
+        self.index = 0
+        self.loop = 0
+        self.cur = self._open(self.items[0]["file"], spare)
+        self._reset_fade()
+        return self.cur
+
+    def _next_index(self):
+        i = self.index + 1
+        if i >= len(self.items):
+            return 0 if self.repeat else -1
+        return i
+
+    def _last_loop(self):
+        loops = self.items[self.index].get("loops", 1)
+        return loops > 0 and self.loop + 1 >= loops
+
+    def _fade_len(self):
+        """本項結尾要與下一項交叉淡化的幀數 (不在最後一輪 / 無下一項則 0)"""
+        i = self._next_index()
+        if i < 0 or self._a_rep == -2 or not self._last_loop():
+            return 0
+        f = self.items[i].get("fade", 0)
+        return min(f, self.cur.total, self._peek_total(i))
+
+    def _peek_total(self, i):
+        r = self.nxt if self._nxt_idx == i else None
+        return r.total if r else 0     # 下一項未預載時不淡化 (硬切)
+
+    def _reset_fade(self):
+        self._cut_next = False
+        self._a_rep = -1
+        self._b_rep = 0
+        self._k = 0
+
+    def seek(self, frame):
+        """Seek 只在當前項內跳轉；淡化狀態作廢，已預載的下一項退回第 0 幀"""
+        self._reset_fade()
+        if self.cur.total and frame >= self.cur.total:
+            frame = self.cur.total - 1
+        self.cur.seek_frame(frame)
+        if self.nxt:
+            self.nxt.seek_frame(0)
+
+    def preload(self):
+        """
+        Core 0 空檔調用：下一項未預載則開檔並讀入首塊 (一次只做一件 I/O)；
+        否則替當前項預讀下一塊 (還要重播時預讀第 0 塊)
+        """
+        i = self._next_index()
+        if i >= 0 and self._nxt_idx != i:
+            t0 = time.ticks_us()
+            self.nxt = self._open(self.items[i]["file"], self.nxt)
+            self.nxt.preload()
+            self._nxt_idx = i
+            self.preload_us = time.ticks_diff(time.ticks_us(), t0)
+            return True
+        return self.cur.prefetch(not self._last_loop())
+
+    def _advance(self):
+        """本項播完一輪：重播或換到下一項；清單結束返回 False"""
+        self._reset_fade()
+        if not self._last_loop():
+            self.loop += 1
+            self.cur.seek_frame(0)
+            self.cur.wraps += 1
+            return True
+        i = self._next_index()
+        if i < 0:
+            return False
+        if self._nxt_idx != i:
+            # 下一項沒來得及預載：同步開檔 (會在關鍵路徑上，記一次 late)
+            self.late += 1
+            self.nxt = self._open(self.items[i]["file"], self.nxt)
+        self.cur, self.nxt = self.nxt, self.cur
+        self._nxt_idx = -1
+        self.index = i
+        self.loop = 0
+        self.switches += 1
+        return True
+
+    # --- 補貨 ---
+    def fill(self, view, _loop=False):
+        """
+        介面同 ShowReader.fill：把整幀寫入 view，跨檔尾時在同一塊內接上重播 / 下一項
+        返回寫入字節數 (0 = 清單播完)，self.hold = 末幀需再重複的 tick 數，
+        self.cuts = 硬切位圖 (讀取器標記的 cut 與無淡化換檔處)
+        """
+        fs = self.fs
+        size = len(view) - len(view) % fs
+        pos = 0
+        self.hold = 0
+        self.cuts = 0
+        while pos < size:
+            r = self.cur
+            fade = self._fade_len()
+            region = r.total - fade            # 淡化區起點 (幀)
+            if fade and self._a_rep < 0 and r.tell_frame() > region:
+                # 下一項在淡化區開始後才預載好：本輪改為硬切
+                self._a_rep = -2
+                fade = 0
+            if fade and (self._a_rep >= 0 or r.tell_frame() >= region):
+                self._mark_cut(pos)
+                if not self._blend(view, pos, fade):
+                    b_rep = self._b_rep
+                    if not self._advance():
+                        break
+                    if b_rep > 0:
+                        # 下一項首段正處於靜止：整段交給 Core 1 保持
+                        view[pos : pos + fs] = self._b
+                        pos += fs
+                        self.hold = b_rep - 1
+                        break
+                    continue
+                pos += fs
+                continue
+            lim = size - pos
+            if fade:
+                lim = min(lim, (region - r.tell_frame()) * fs)
+            n = r.fill(view[pos : pos + lim], False)
+            if n:
+                self.cuts |= r.cuts << (pos // fs)
+                self._mark_cut(pos)
+            pos += n
+            if r.hold:
+                over = r.tell_frame() - region
+                if fade and over > 0:
+                    # 靜止段伸入淡化區：區外部分照常保持，區內改由淡化逐幀重複
+                    self._a[:] = view[pos - fs : pos]
+                    self._a_rep = over
+                    self.hold = r.hold - over
+                else:
+                    self.hold = r.hold
+                break
+            if fade and r.tell_frame() >= region:
+                continue
+            if r.tell_frame() < r.total:
+                break                          # 塊已滿或檔案被截短
+            sw = self.switches
+            if not self._advance():
+                break
+            self._cut_next = self.switches != sw
+        return pos
+
+    def _mark_cut(self, pos):
+        if self._cut_next:
+            self.cuts |= 1 << (pos // self.fs)
+            self._cut_next = False
+
+    def _step(self, r, buf, rep):
+        """取讀取器下一幀到 buf；rep > 0 時沿用 buf (靜止段)。返回新的剩餘重複次數，-1 = 無幀"""
+        if rep > 0:
+            return rep - 1
+        if r.fill(buf, False) == 0:
+            return -1
+        return r.hold
+
+    def _blend(self, view, pos, fade):
+        """輸出一個淡化幀到 view[pos:]；本項已無幀 (淡化完成) 返回 False"""
+        if self._a_rep < 0:
+            self._a_rep = 0
+        a = self._step(self.cur, self._a, self._a_rep)
+        if a < 0:
+            return False
+        self._a_rep = a
+        b = self._step(self.nxt, self._b, self._b_rep)
+        if b < 0:
+            # 下一項比淡化區還短：直接延用本項
+            view[pos : pos + self.fs] = self._a
+            return True
+        self._b_rep = b
+        self._k += 1
+        _mix(self._mix, self._a, self._b, self.fs, self._k * 256 // (fade + 1))
+        view[pos : pos + self.fs] = self._mix
+        return True
+
+    def stats(self):
+        it = self.items[self.index]
+        return {"index": self.index, "count": len(self.items), "file": it["file"],
+                "loop": self.loop, "loops": it.get("loops", 1),
+                "frame": self.cur.tell_frame() if self.cur else 0,
+                "total": self.cur.total if self.cur else 0,
+                "next_ready": 1 if self._nxt_idx >= 0 else 0, "switches": self.switches,
+                "preload_us": self.preload_us, "late": self.late}
+
+@micropython.viper
+def _mix(dst, a, b, n: int, w: int):
+    """dst = a * (256 - w) / 256 + b * w / 256 (逐字節)"""
+    d = ptr8(dst)
+    pa = ptr8(a)
+    pb = ptr8(b)
+    iw = 256 - w
+    for i in range(n):
+        d[i] = (pa[i] * iw + pb[i] * w) >> 8
@@ -0,0 +1,175 @@
+# lib/show_clock.py
+import time
+
+MASK32 = 0xFFFFFFFF
+
+def s32(v):
+    """u32 差值轉有號 (show clock 以 2**32 us 回繞)"""
+    v &= MASK32
+    return v - 0x100000000 if v & 0x80000000 else v
+
+class ShowClock:
+    """
+    主機 show clock (u32 us) 在本地 ticks_us 上的紀律化估計
+    設計目標：
+    1. NTP 式四時戳交換 (HEARTBEAT t1 → ACK t2/t3 → 收到 t4)，取往返中點估計偏移。
+    2. 開機先做一輪 burst，取 RTT 最小的樣本一次定相；之後只接受 RTT 接近底值的樣本
+       (網路排隊造成的不對稱延遲會直接變成偏移誤差)。
+    3. 對最近的有效樣本做加權直線擬合 (偏移 vs 本地時間)：斜率即晶振頻率誤差，
+       兩次校時之間按頻率外推，長秀不再漂移。每 BIN_US 只保留權重最高的一點，
+       密集校時時擬合基線不會被壓短；擬合窗口填滿前 (settled 為 False) 呼叫者應維持密集校時。
+    4. 參考點 (本地, show, 頻率) 以單一 tuple 整體替換：Core 1 讀取時不會看到半更新的狀態。
+    本地時刻一律由呼叫者傳入或取 time.ticks_us()，以便主機端以模擬晶振測試。
+    """
+    WINDOW = 16            # 擬合用的有效樣本數
+    BIN_US = 1000000       # 擬合點最小間距 (同一區間內只留最佳樣本)
+    MIN_SPAN_US = 8000000  # 樣本橫跨至少 8 s 才估計頻率
+    MAX_RATE = 500e-6      # 晶振誤差上限 (±500 ppm)
+    REBASE_US = 1 << 27    # 錨點距今超過約 134 s 即前移 (遠小於 ticks 回繞半週期)
+
+    def __init__(self, burst=8, step_us=20000):
+        self.burst = burst
+        self.step_us = step_us     # 誤差超過此值視為跳變 (連續出現則重新定相)
+        self.synced = False
+        self._ref = (0, 0, 0.0)    # (本地 ticks, 對應 show 時間, 頻率誤差)
+        self._anchor = (0, 0)      # 擬合座標原點 (本地 ticks, show)
+        self._pts = []             # [x 本地 us, y 偏移 us, 權重]，相對錨點
+        self._cand = []            # burst 候選 (rtt, 本地中點, show 中點)
+        self._rtts = []            # 最近 RTT (底值估計)
+        self._jumps = 0
+        self.samples = 0
+        self.used = 0
+        self.steps = 0
+        self.err_us = 0
+        self.rtt_us = 0
+
+    @property
+    def settled(self):
+        """已定相且擬合窗口已滿、頻率已估計"""
+        pts = self._pts
+        return (self.synced and len(pts) >= self.WINDOW
+                and pts[-1][0] - pts[0][0] >= self.MIN_SPAN_US)
+
+    # --- 讀取 (Core 0 / Core 1 皆可) ---
+    def show_at(self, local):
+        """本地 ticks → show 時間 (u32 us)"""
+        ref_l, ref_s, rate = self._ref
+        d = time.ticks_diff(local, ref_l)
+        return (ref_s + d + int(d * rate)) & MASK32
+
+    def now(self):
+        return self.show_at(time.ticks_us())
+
+    def to_local(self, show_t, local=None):
+        """show 時間 → 本地 ticks (以目前時刻為錨，目標須在 ±35 分鐘內)"""
+        if local is None:
+            local = time.ticks_us()
+        ds = s32(show_t - self.show_at(local))
+        return time.ticks_add(local, int(ds / (1.0 + self._ref[2])))
+
+    # --- 校時 (Core 0) ---
+    def sample(self, t1, t2, t3, t4):
+        """
+        t1/t4: 本地送出 / 收到 (ticks_us)；t2/t3: 主機收到 / 回覆 (show us)
+        返回 True 代表樣本被採用
+        """
+        self.samples += 1
+        span = time.ticks_diff(t4, t1)
+        hold = s32(t3 - t2)
+        rtt = span - hold
+        if span < 0 or rtt < 0:
+            return False
+        mid_l = time.ticks_add(t1, span // 2)
+        mid_s = (t2 + hold // 2) & MASK32
+        self.rtt_us = rtt
+
+        if not self.synced:
+            self._cand.append((rtt, mid_l, mid_s))
+            if len(self._cand) < self.burst:
+                return False
+            rtt, mid_l, mid_s = min(self._cand)
+            self._cand = []
+            self._rtts = [rtt]
+            self._anchor = (mid_l, mid_s)
+            self._pts = [[0, 0, 1.0]]
+            self._ref = (mid_l, mid_s, self._ref[2])
+            self.synced = True
+            self.steps += 1
+            self.err_us = 0
+            self.used += 1
+            return True
+
+        # 爆米花濾波：RTT 明顯高於近期底值的樣本 (排隊 / 重傳) 不用
+        self._rtts.append(rtt)
+        if len(self._rtts) > self.WINDOW:
+            self._rtts.pop(0)
+        floor = min(self._rtts)
+        slack = max(floor // 4, 100)
+        if rtt > floor + 2 * slack:
+            return False
+
+        err = s32(mid_s - self.show_at(mid_l))
+        self.err_us = err
+        if abs(err) > self.step_us:
+            self._jumps += 1
+            if self._jumps >= 3:
+                # 主機時鐘重啟 / 長時間失聯：重新 burst 定相
+                self.synced = False
+                self._jumps = 0
+            return False
+        self._jumps = 0
+
+        a_l, a_s = self._anchor
+        x = time.ticks_diff(mid_l, a_l)
+        if x > self.REBASE_US:
+            # 錨點前移到本樣本，舊樣本座標一併平移
+            dy = s32(mid_s - a_s) - x
+            for p in self._pts:
+                p[0] -= x
+                p[1] -= dy
+            self._anchor = (mid_l, mid_s)
+            x = 0
+            a_s = mid_s
+        # 權重：RTT 越接近底值，不對稱誤差上限越小
+        w = slack / (slack + rtt - floor)
+        w *= w
+        pt = [x, s32(mid_s - a_s) - x, w]
+        pts = self._pts
+        if pts and x - pts[-1][0] < self.BIN_US:
+            if w <= pts[-1][2]:
+                return False
+            pts[-1] = pt
+        else:
+            pts.append(pt)
+            if len(pts) > self.WINDOW:
+                pts.pop(0)
+        self._fit(mid_l, x)
+        self.used += 1
+        return True
+
+    def _fit(self, mid_l, x_now):
+        """加權最小平方：y = b + rate * x；參考點放在最新樣本"""
+        pts = self._pts
+        sw = sx = sy = 0.0
+        for x, y, w in pts:
+            sw += w; sx += w * x; sy += w * y
+        mx = sx / sw
+        my = sy / sw
+        rate = self._ref[2]
+        if pts[-1][0] - pts[0][0] >= self.MIN_SPAN_US:
+            sxx = sxy = 0.0
+            for x, y, w in pts:
+                dx = x - mx
+                sxx += w * dx * dx
+                sxy += w * dx * (y - my)
+            if sxx > 0:
+                rate = sxy / sxx
+                if rate > self.MAX_RATE: rate = self.MAX_RATE
+                elif rate < -self.MAX_RATE: rate = -self.MAX_RATE
+        y_now = my + rate * (x_now - mx)
+        self._ref = (mid_l, (self._anchor[1] + x_now + int(y_now)) & MASK32, rate)
+
+    def stats(self):
+        return {"synced": (1 if self.synced else 0) + (1 if self.settled else 0), "err_us": self.err_us, "rtt_us": self.rtt_us,
+                "ppm": int(self._ref[2] * 1e6), "samples": self.samples, "used": self.used,
+                "steps": self.steps}
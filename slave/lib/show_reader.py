@@ -0,0 +1,445 @@
+# lib/show_reader.py
+import time
+import struct
+import array
+import micropython
+
+# 壓縮秀檔 (NLPK) 格式
+# ──────────────────────────────────────────────
+# 檔頭 32 B: magic "NLPK", ver u8, flags u8, hdr_len u16,
+#            frame_size u32, frame_count u32, fps u16, keyint u16,
+#            index_off u32, data_end u32, max_rec u32
+# 記錄: type u8 + len u24 (LE) + 指令流
+#   type 0 = KEY   (以全 0 幀為底)
+#   type 1 = DELTA (以上一幀為底)
+#   type 2 = HOLD  (payload u32 n：上一幀再重複 n 幀，不佔 I/O 與拷貝)
+#   KEY / DELTA 的 type 最高位 (REC_CUT) = 編碼器判定的硬切幀 (檔頭 flags 帶 FLAG_CUTS)，插值時不與前一幀混合
+# 指令: t < 0x80 → 後隨 t+1 個字面字節；t >= 0x80 → 跳過 t-0x7F 個不變字節
+# 索引 (index_off != 0): count u32 + 關鍵幀號 u32[count] (遞增) + 記錄偏移 u32[count]
+PACK_MAGIC = b"NLPK"
+PACK_HDR = "<4sBBHIIHHIII"
+PACK_HDR_SIZE = 32
+REC_KEY = 0
+REC_DELTA = 1
+REC_HOLD = 2
+REC_CUT = 0x80
+FLAG_CUTS = 0x01
+
+def is_packed(path):
+    """嗅探檔頭：是否為 NLPK 壓縮秀檔"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == PACK_MAGIC
+    except OSError:
+        return False
+
+class RawShowReader:
+    """
+    整檔原始幀 (data.bin) 的大塊對齊預讀器
+    設計目標：
+    1. 檔案只以「扇區對齊、整塊」方式讀取 (預設 32 KB)，避免 SD / Flash 的小塊非對齊讀。
+    2. 雙塊輪替：播放當前塊時，由 Core 0 空檔 prefetch() 先讀好下一塊；
+       Hub 補貨只剩內存拷貝，讀取停頓不再直接變成掉幀。
+    3. 只交付整幀；loop 模式在檔尾無縫接回第 0 幀 (檔尾不足一幀的殘餘字節忽略)。
+    """
+    def __init__(self, frame_size, chunk=32768, align=512, stall_us=0):
+        self.fs = frame_size
+        # 塊大小向上取整到對齊單位
+        align = max(1, align)
+        self.chunk = ((max(chunk, align) + align - 1) // align) * align
+        self.align = align
+        # 超過此時長的同步讀取記為一次 stall (0 = 所有未命中的同步讀都算)
+        self.stall_us = stall_us
+
+        self._bufs = [bytearray(self.chunk), bytearray(self.chunk)]
+        self._mvs = [memoryview(b) for b in self._bufs]
+        self._ids = [-1, -1]   # 各槽目前持有的塊序號
+        self._lens = [0, 0]    # 各槽有效字節數 (檔尾塊可能不足)
+        self._cur = 0          # 正在消費的槽
+        self._prime = True     # 開檔 / Seek 後的第一次讀取屬預填，不算 stall
+
+        self._f = None
+        self.path = None
+        self.total = 0         # 檔內完整幀數
+        self._end = 0          # 有效數據結尾 (字節)
+        self._frame = 0        # 下一個要交付的幀
+        self.hold = 0          # 最近一次 fill 結尾幀需再重複的 tick 數 (原始檔恆為 0)
+        self.cuts = 0          # 最近一次 fill 的硬切位圖 (bit j = 第 j 幀；原始檔恆為 0)
+        self.reset_stats()
+
+    # --- 檔案 ---
+    def open(self, path):
+        self.close()
+        self._f = open(path, "rb")
+        self.path = path
+        self.total = self._f.seek(0, 2) // self.fs
+        self._end = self.total * self.fs
+        self._ids[0] = self._ids[1] = -1
+        self._frame = 0
+        self._prime = True
+
+    def close(self):
+        if self._f:
+            self._f.close()
+        self._f = None
+        self.path = None
+
+    def seek_frame(self, n):
+        """O(1) 定址：下一次 fill 從第 n 幀開始 (塊已在槽內則不重讀)"""
+        self._frame = n
+        self._prime = True
+
+    def tell_frame(self):
+        return self._frame
+
+    # --- 統計 ---
+    def reset_stats(self):
+        self.reads = 0
+        self.bytes = 0
+        self.read_us = 0
+        self.max_read_us = 0
+        self.stalls = 0       # 補貨時發現下一塊還沒讀好 (同步讀在關鍵路徑上)
+        self.wraps = 0
+        self.held = 0         # 以 HOLD 交付、未拷貝的幀數
+
+    def stats(self):
+        kbps = (self.bytes * 1000 // self.read_us) if self.read_us else 0
+        return {"reads": self.reads, "bytes": self.bytes, "read_us": self.read_us,
+                "max_read_us": self.max_read_us, "stalls": self.stalls,
+                "wraps": self.wraps, "held": self.held, "kBps": kbps, "chunk": self.chunk}
+
+    # --- 讀取 ---
+    def _load(self, slot, ci):
+        t0 = time.ticks_us()
+        self._f.seek(ci * self.chunk)
+        n = self._f.readinto(self._bufs[slot]) or 0
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        self._ids[slot] = ci
+        self._lens[slot] = n
+        self.reads += 1
+        self.bytes += n
+        self.read_us += dt
+        if dt > self.max_read_us:
+            self.max_read_us = dt
+        return dt
+
+    def _slot(self, ci):
+        """返回持有第 ci 塊的槽；未命中則同步讀入另一槽"""
+        cur = self._cur
+        if self._ids[cur] == ci:
+            return cur
+        o = 1 - cur
+        if self._ids[o] != ci:
+            dt = self._load(o, ci)
+            if not self._prime and dt >= self.stall_us:
+                self.stalls += 1
+        self._cur = o
+        return o
+
+    def _next_chunk(self, loop):
+        """當前塊之後應預讀的塊序號 (None = 無)"""
+        ci = self._ids[self._cur]
+        if ci < 0:
+            return None
+        nxt = ci + 1
+        if nxt * self.chunk >= self._end:
+            # 最後一塊：loop 時預讀第 0 塊，讓回繞無縫
+            nxt = 0 if loop else None
+        return nxt
+
+    def preload(self):
+        """讀入當前位置所在的塊 (播放清單換檔前先備好，首次 fill 不再同步讀)"""
+        if self._f:
+            self._slot(self._pos() // self.chunk)
+
+    def _pos(self):
+        """下一次 fill 要讀取的檔案偏移"""
+        return self._frame * self.fs
+
+    def prefetch(self, loop=False):
+        """Core 0 空檔調用：把下一塊讀進空閒槽；已就緒則立即返回"""
+        if not self._f:
+            return False
+        nxt = self._next_chunk(loop)
+        if nxt is None or nxt == self._ids[self._cur] or nxt == self._ids[1 - self._cur]:
+            return False
+        self._load(1 - self._cur, nxt)
+        return True
+
+    def fill(self, view, loop=False):
+        """
+        把整幀拷入 view (Hub 寫入區)，返回寫入字節數 (幀大小的整數倍)
+        非 loop 到檔尾時可能少於 len(view)；返回 0 代表播完
+        """
+        fs = self.fs
+        n = len(view) // fs
+        pos = 0
+        for _ in range(n):
+            if self._frame >= self.total:
+                if not loop or self.total == 0:
+                    break
+                self._frame = 0
+                self.wraps += 1
+            if not self._copy(view, pos, self._frame * fs, fs):
+                break  # 檔案在播放中被截短：丟棄半幀
+            pos += fs
+            self._frame += 1
+        self._prime = False
+        return pos
+
+    def _copy(self, dst, pos, off, ln):
+        """從檔案偏移 off 經預讀塊拷貝 ln 字節到 dst[pos:]；檔案不足時返回 False"""
+        while ln:
+            ci = off // self.chunk
+            slot = self._slot(ci)
+            b = off - ci * self.chunk
+            k = self._lens[slot] - b
+            if k <= 0:
+                return False
+            if k > ln:
+                k = ln
+            dst[pos : pos + k] = self._mvs[slot][b : b + k]
+            pos += k
+            off += k
+            ln -= k
+        return True
+
+
+class PackedShowReader(RawShowReader):
+    """
+    NLPK 壓縮秀檔的流式解碼器 (接口與 RawShowReader 相同)
+    - 記錄仍經同一套對齊大塊預讀取得，檔案讀取行為不變
+    - 解碼在常駐的「上一幀」緩衝上原地套用差分，再整幀拷入 Hub 寫入區
+    - Seek / 回繞先按關鍵幀索引跳到目標之前最近的關鍵幀，再逐幀解碼前進 (只解碼、不出幀)；
+      索引在第一次需要跳轉時才載入，舊檔無索引則由檔首解碼
+    - HOLD 段不展開：fill 在靜止幀處截止並以 self.hold 回報重複次數，由 Hub 帶給 Core 1
+    """
+    def __init__(self, frame_size, chunk=32768, align=512, stall_us=0):
+        super().__init__(frame_size, chunk, align, stall_us)
+        self._prev = bytearray(frame_size)
+        self._hdr = bytearray(4)
+        self._cnt = bytearray(4)
+        self._hold_left = 0         # _prev 還要再重複的幀數
+        self._cut = False           # _prev 是否為硬切幀
+        self._rec = bytearray(0)
+        self._start = PACK_HDR_SIZE # 第一條記錄的檔案偏移
+        self._off = PACK_HDR_SIZE   # 下一條記錄的檔案偏移
+        self._dec = 0               # _prev 目前持有的幀 + 1 (0 = 無)
+        self.keyint = 0
+        self.fps = 0
+        self._ix_off = 0            # 索引塊偏移 (0 = 無)
+        self._ix_frames = None      # 延遲載入的 array('I')
+        self._ix_offs = None
+
+    def open(self, path):
+        self.close()
+        self._f = open(path, "rb")
+        h = self._f.read(PACK_HDR_SIZE)
+        if len(h) < PACK_HDR_SIZE:
+            self.close()
+            raise ValueError("packed header truncated")
+        (magic, ver, _flags, hlen, fs, count, fps, keyint,
+         index_off, data_end, max_rec) = struct.unpack(PACK_HDR, h)
+        if magic != PACK_MAGIC or ver != 1:
+            self.close()
+            raise ValueError("not a NLPK v1 file")
+        if fs != self.fs:
+            self.close()
+            raise ValueError(f"frame size {fs} != {self.fs}")
+        self.path = path
+        self.total = count
+        self.fps = fps
+        self.keyint = keyint
+        self._start = hlen
+        self._end = data_end
+        self._ix_off = index_off
+        self._ix_frames = self._ix_offs = None
+        if len(self._rec) < max_rec:
+            self._rec = bytearray(max_rec)
+        self._ids[0] = self._ids[1] = -1
+        self._frame = 0
+        self._rewind()
+        self._prime = True
+
+    def _pos(self):
+        return self._off
+
+    def _rewind(self):
+        self._off = self._start
+        self._dec = 0
+        self._hold_left = 0
+
+    def _load_index(self):
+        """讀入關鍵幀索引；失敗或無索引時記為空表，之後不再嘗試"""
+        frames = offs = array.array('I')
+        if self._ix_off:
+            try:
+                f = self._f
+                f.seek(self._ix_off)
+                n = struct.unpack("<I", f.read(4))[0]
+                raw = f.read(8 * n)
+                if len(raw) == 8 * n:
+                    frames = array.array('I', raw[:4 * n])
+                    offs = array.array('I', raw[4 * n:])
+            except (OSError, struct.error):
+                pass
+        self._ix_frames = frames
+        self._ix_offs = offs
+
+    def _key_at(self, n):
+        """二分搜尋 frame <= n 的最後一個關鍵幀，返回索引位置 (-1 = 無)"""
+        if self._ix_frames is None:
+            self._load_index()
+        a = self._ix_frames
+        lo, hi = 0, len(a)
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if a[mid] <= n:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def _goto(self, n):
+        """讓下一條要解碼的記錄成為第 n 幀 (能跳則跳到最近關鍵幀，再逐幀前進)"""
+        if n == self._dec:
+            return True
+        i = self._key_at(n)
+        if i >= 0:
+            k = self._ix_frames[i]
+            # 關鍵幀在目前位置之後 (或需要倒退) 才跳；否則直接往前解更近
+            if k > self._dec or n < self._dec:
+                self._off = self._ix_offs[i]
+                self._dec = k
+                self._hold_left = 0
+        if n < self._dec:
+            self._rewind()
+        while self._dec < n:
+            if self._hold_left:
+                # 靜止段整段跳過
+                k = min(self._hold_left, n - self._dec)
+                self._hold_left -= k
+                self._dec += k
+            elif not self._decode_next():
+                return False
+        return True
+
+    def seek_frame(self, n):
+        """跳到第 n 幀：經索引定位最近關鍵幀，再解碼前進到 n 之前"""
+        self._goto(n)
+        self._frame = n
+        self._prime = True
+
+    def reset_stats(self):
+        super().reset_stats()
+        self.decoded = 0
+        self.decode_us = 0
+        self.max_decode_us = 0
+
+    def stats(self):
+        d = super().stats()
+        d["decoded"] = self.decoded
+        d["decode_us"] = self.decode_us
+        d["max_decode_us"] = self.max_decode_us
+        return d
+
+    def _decode_next(self):
+        """
+        前進一幀：靜止段內只遞減計數；否則讀入並套用下一條幀記錄到 _prev，
+        並吸收緊隨其後的 HOLD 記錄。失敗 (截短 / 損壞) 返回 False
+        """
+        if self._hold_left:
+            self._hold_left -= 1
+            self._dec += 1
+            self._cut = False
+            return True
+        if self._dec >= self.total or not self._copy(self._hdr, 0, self._off, 4):
+            return False
+        h = self._hdr
+        ln = h[1] | (h[2] << 8) | (h[3] << 16)
+        kind = h[0] & ~REC_CUT
+        if kind > REC_DELTA or ln > len(self._rec) or not self._copy(self._rec, 0, self._off + 4, ln):
+            return False
+        t0 = time.ticks_us()
+        if self._apply(self._prev, self._rec, ln, self.fs, 1 if kind == REC_KEY else 0) < 0:
+            return False
+        self._cut = h[0] & REC_CUT != 0
+        dt = time.ticks_diff(time.ticks_us(), t0)
+        self.decoded += 1
+        self.decode_us += dt
+        if dt > self.max_decode_us:
+            self.max_decode_us = dt
+        self._off += 4 + ln
+        self._dec += 1
+        h = self._hdr
+        if (self._dec < self.total and self._copy(h, 0, self._off, 4) and h[0] == REC_HOLD
+                and self._copy(self._cnt, 0, self._off + 4, 4)):
+            c = self._cnt
+            self._hold_left = c[0] | (c[1] << 8) | (c[2] << 16) | (c[3] << 24)
+            self._off += 4 + (h[1] | (h[2] << 8) | (h[3] << 16))
+        return True
+
+    @micropython.viper
+    def _apply(self, prev, ops, n: int, fs: int, key: int) -> int:
+        """在 prev 上原地套用指令流；返回寫到的位置，越界返回 -1"""
+        d = ptr8(prev)
+        s = ptr8(ops)
+        if key:
+            for i in range(fs):
+                d[i] = 0
+        i = 0
+        p = 0
+        while i < n:
+            t = s[i]
+            i += 1
+            if t < 0x80:
+                k = t + 1
+                if p + k > fs or i + k > n:
+                    return -1
+                for j in range(k):
+                    d[p + j] = s[i + j]
+                i += k
+                p += k
+            else:
+                p += t - 0x7F
+                if p > fs:
+                    return -1
+        return p
+
+    def fill(self, view, loop=False):
+        """
+        同 RawShowReader.fill；遇到靜止段時在該幀後截止，self.hold = 需再重複的幀數
+        self.cuts = 本次寫入的硬切位圖
+        """
+        fs = self.fs
+        n = len(view) // fs
+        pos = 0
+        self.hold = 0
+        self.cuts = 0
+        for _ in range(n):
+            if self._frame >= self.total:
+                if not loop or self.total == 0:
+                    break
+                self._frame = 0
+                self.wraps += 1
+            if self._dec != self._frame:
+                # 回繞或未對齊 (Seek 半途失敗)：經索引重新定位
+                self._goto(self._frame)
+            if not self._decode_next():
+                break  # 記錄截短 / 損壞：停在最後一個完整幀
+            view[pos : pos + fs] = self._prev
+            if self._cut:
+                self.cuts |= 1 << (pos // fs)
+            pos += fs
+            self._frame += 1
+            if self._hold_left:
+                # 靜止段：不拷貝不解碼，整段交給 Core 1 重複上一幀
+                h = self._hold_left
+                self._hold_left = 0
+                self._dec += h
+                self._frame += h
+                self.hold = h
+                self.held += h
+                break
+        self._prime = False
+        return pos
@@ -3,6 +3,8 @@ import machine, network, time, _thread, ubinascii
 from app import App
 from lib.sys_bus import bus
 from lib.buffer_hub import AtomicStreamHub
+from lib.show_clock import ShowClock
+from lib.overlay import OverlayLayer
 import Core0_worker
 import Core1_engine
 from apa102 import APA102
@@ -18,6 +20,14 @@ def launcher():
     # 3. 🚀 註冊核心交換服務 (不修改 lib，在此處申請)
     hub = AtomicStreamHub(st_LED.total_bytes * bus_sys["buffer_frames"]) 
     bus.register_service("pixel_stream", hub)
+    # 主機 show clock 的本地估計：Core 0 以心跳校時，Core 1 按它排定起播
+    clock = ShowClock()
+    bus.register_service("show_clock", clock)
+    bus.register_provider("clock", clock.stats)
+    # 即時覆蓋層：Core 0 收 0x3015 寫入，Core 1 轉換時合成
+    overlay = OverlayLayer(st_LED.layout())
+    bus.register_service("overlay", overlay)
+    bus.register_provider("overlay", overlay.stats)
 
     
     
@@ -10,6 +10,8 @@ from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from collections import defaultdict, deque
+from fleet_clock import FleetClock
+from file_sender import WindowedSender, MulticastSender, RemoteHashes, pick_block_size, plan_patch
 
 # ==================== 音頻模式自動檢測 (修復導入) ====================
 AUDIO_MODE = 'miniaudio'
@@ -51,7 +53,7 @@ try:
     from slave.lib.proto import Proto, StreamParser
     from slave.lib.schema_loader import SchemaStore
     from slave.lib.schema_codec import SchemaCodec
-    from tools.PXLDv3Splitter import PXLDv3Decoder
+    from tools.PXLDv3Splitter import PXLDv3Decoder, parse_layout, repack_pixels
 except ImportError as e:
     print(f"❌ 導入錯誤: {e}")
     sys.exit(1)
@@ -75,6 +77,7 @@ class DeviceMonitor:
         self.uploaded_bytes = 0
         self.total_bytes = 0
         self.upload_start_time = 0
+        self.saved_bytes = 0          # 差量部署：與遠端相同、免傳的字節
         
         # ========== 播放階段數據 ==========
         self.total_frames = 0
@@ -87,6 +90,10 @@ class DeviceMonitor:
         self.block_count = 0
         self.avg_fps = 0.0
         
+        # ========== 播放漂移 (0x3012：實際出幀 show 時刻 - 理想時刻) ==========
+        self.drift_us = None
+        self.drift_history = deque(maxlen=40)
+        
         # ========== 歷史數據 (用於計算) ==========
         self.frame_history = deque(maxlen=10)
         self.last_update = time.time()
@@ -121,6 +128,11 @@ class DeviceMonitor:
             self.current_frame = frame_num
             self.last_frame_update = now
     
+    def add_drift(self, drift_us):
+        with self.lock:
+            self.drift_us = drift_us
+            self.drift_history.append(drift_us)
+    
     def get_play_progress(self):
         """返回播放進度百分比"""
         with self.lock:
@@ -137,6 +149,8 @@ class DeviceMonitor:
             self.block_count = 0
             self.avg_fps = 0.0
             self.frame_history.clear()
+            self.drift_us = None
+            self.drift_history.clear()
 
 
 # ==================== 終端 UI 渲染引擎 ====================
@@ -172,6 +186,16 @@ class ConsoleUI:
     def reset_color():
         return "\033[0m"
     
+    @staticmethod
+    def draw_sparkline(values, scale):
+        """有號數值走勢 (±scale 對應最低 / 最高格，中格為 0)"""
+        blocks = "▁▂▃▄▅▆▇█"
+        out = []
+        for v in values:
+            v = max(-scale, min(scale, v))
+            out.append(blocks[min(7, int((v + scale) * 8 / (2 * scale)))])
+        return "".join(out)
+    
     @staticmethod
     def draw_progress_bar(percent, width=30):
         filled = int(width * percent / 100)
@@ -295,6 +319,8 @@ class MonitorPanel:
             speed_str = f"{monitor.upload_speed:>6.1f} KB/s"
             size_str = f"{monitor.uploaded_bytes//1024}/{monitor.total_bytes//1024} KB"
             info = f"{progress_bar} │ {speed_str} │ {size_str}"
+            if monitor.saved_bytes:
+                info += f" │ 省 {monitor.saved_bytes//1024} KB"
         
         elif monitor.status in ["播放中", "暂停"]:
             play_progress = monitor.get_play_progress()
@@ -314,6 +340,13 @@ class MonitorPanel:
             
             # 🔧 简化显示: 只显示 Real_FPS (真实渲染帧率)
             info = f"Progress: {progress_percent} │ Frame: {frame_str:<12} │ FPS: {calc_fps_str} │ Mem: {mem_str}"
+            
+            # 殘餘漂移：最新值 + 走勢 (±2 ms 滿格)
+            if monitor.drift_us is not None:
+                d_ms = monitor.drift_us / 1000
+                d_color = ConsoleUI.get_color(-abs(d_ms), threshold_good=-1, threshold_warn=-5)
+                spark = ConsoleUI.draw_sparkline(list(monitor.drift_history)[-16:], 2000)
+                info += f" │ Drift: {d_color}{d_ms:+6.2f}ms{ConsoleUI.reset_color()} {spark}"
         
         elif monitor.status == "錯誤":
             info = f"\033[91m{monitor.error_msg[:70]}\033[0m"
@@ -339,6 +372,8 @@ class NetBusMaster:
         self.play_lock = threading.Lock()
         
         self.panel = MonitorPanel()
+        # show clock 時間源：回覆 HEARTBEAT 校時，PLAY 帶起播時刻
+        self.clock = FleetClock()
         
         self.config_file = config_file
         self.config = self.load_config()
@@ -477,7 +512,11 @@ class NetBusMaster:
                 "addr": addr,
                 "parser": StreamParser(),
                 "ack_event": threading.Event(),
+                "sender": None,
+                "mcast": None,
+                "hashes": RemoteHashes(),
                 "query_event": threading.Event(),
+                "remote_exists": False,
                 "remote_sha": None
             }
             
@@ -511,11 +550,16 @@ class NetBusMaster:
             conn.close()
     
     def dispatch_logic(self, cid, cmd, payload):
+        t2 = self.clock.now_us()  # 校時 t2：盡早蓋章
         c_def = self.store.get(cmd)
         args = SchemaCodec.decode(c_def, payload)
         
+        # ========== 0x1201: 心跳 / show clock 校時 ==========
+        if cmd == 0x1201:
+            self.send_pkt([cid], 0x1202, self.clock.ack(args, t2))
+        
         # ========== 0x1102: 状态心跳 ==========
-        if cmd == 0x1102:
+        elif cmd == 0x1102:
             try:
                 status_data = json.loads(args["status_json"])
                 
@@ -531,6 +575,10 @@ class NetBusMaster:
                     mem_free=mem_free
                 )
                 
+                # 來源格式佈局 (slave 只需要的字節)：Step 2 切分時按此打包
+                if status_data.get('led_layout') and cid in self.slaves:
+                    self.slaves[cid]["layout"] = status_data['led_layout']
+                
                 # 设备 ID 转移
                 if real_id and real_id != cid:
                     self.migrate_mapping_key(cid, real_id)
@@ -547,6 +595,13 @@ class NetBusMaster:
             block_id = args.get("block_id", 0)
             current_frame = args.get("end_frame", 0)
             actual_fps = args.get("actual_fps", 0) / 100.0
+            tick_fps = args.get("tick_fps", 0)
+            src_fps = args.get("src_fps", 0)
+            # 新韌體另帶 tick_n，end_frame 即秀檔幀號 (暫停 / Seek 不歸零)；
+            # 舊韌體的 end_frame 是 tick 序號，插值出幀中 (src_fps 非 0) 須換算回來源幀號
+            tick_n = args.get("tick_n", current_frame)
+            if "tick_n" not in args and tick_fps and src_fps and src_fps != tick_fps:
+                current_frame = current_frame * src_fps // tick_fps
             
             self.panel.update_device(
                 cid,
@@ -558,16 +613,39 @@ class NetBusMaster:
                 with monitor.lock:
                     monitor.block_count += 1
                     monitor.avg_fps = (monitor.avg_fps * (monitor.block_count - 1) + actual_fps) / monitor.block_count
+                
+                # 殘餘漂移：slave 回報第 tick_n 個 tick 的 show clock 出幀時刻，理想時刻 = anchor + n / fps
+                # (tick_fps 為 slave 出幀率；插值時與 PXLD 幀率不同，舊韌體無此欄位)
+                anchor = args.get("anchor_us", 0)
+                fps = tick_fps or self.pxld_metadata.get(monitor.play_id, {}).get("fps", 0)
+                if anchor and fps:
+                    ideal = (anchor + round(tick_n * 1e6 / fps)) & 0xFFFFFFFF
+                    drift = ((args.get("show_us", 0) - ideal + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+                    monitor.add_drift(drift)
         
         elif cmd == 0x2004:
             if cid in self.slaves:
+                sender = self.slaves[cid].get("sender")
+                if sender:
+                    sender.on_ack(args)
                 self.slaves[cid]["ack_event"].set()
         
         elif cmd == 0x2006:
             if cid in self.slaves:
                 self.slaves[cid]["remote_sha"] = args["sha256"]
+                self.slaves[cid]["remote_exists"] = bool(args.get("exists"))
                 self.slaves[cid]["query_event"].set()
         
+        elif cmd == 0x2008:
+            if cid in self.slaves:
+                self.slaves[cid]["hashes"].on_rsp(args)
+        
+        elif cmd == 0x200B:
+            if cid in self.slaves:
+                mcast = self.slaves[cid].get("mcast")
+                if mcast:
+                    mcast.on_nak(cid, args)
+        
         return cid
     
     def send_pkt(self, targets, cmd_id, args):
@@ -791,7 +869,16 @@ class NetBusMaster:
                     if pid is None:
                         continue
                     
-                    print(f"  📦 提取 PlayID {pid}...", end="", flush=True)
+                    # 依 slave 回報的 led_layout 打包 (未回報則保持 RGBW8888)
+                    layouts = [self.slaves.get(tid, {}).get("layout") for tid in self.selected_targets
+                               if self.config["mapping"][tid].get("play_id") == pid]
+                    layouts = [l for l in layouts if l]
+                    layout = parse_layout(layouts[0]) if layouts else None
+                    if any(l != layouts[0] for l in layouts):
+                        print(f"\n  ⚠️ PlayID {pid} 的設備回報了不同的 led_layout，使用第一個")
+                    
+                    fmt_str = ",".join(f"{n}:{c}" for n, c in layout) if layout else "RGBW8888"
+                    print(f"  📦 提取 PlayID {pid} [{fmt_str}]...", end="", flush=True)
                     
                     data = bytearray()
                     frame_count = 0
@@ -799,11 +886,12 @@ class NetBusMaster:
                     for frame in decoder.iterate_frames():
                         slave_data = decoder.get_slave_data(frame, pid)
                         if slave_data:
-                            data.extend(slave_data)
+                            data.extend(repack_pixels(slave_data, layout))
                         frame_count += 1
                     
                     self.prepared_data[pid] = data
-                    self.pxld_metadata[pid] = {"total_frames": total_frames}
+                    self.pxld_metadata[pid] = {"total_frames": total_frames,
+                                               "fps": getattr(decoder, "fps", 0)}
                     
                     # 更新監控面板的 total_frames
                     for tid in self.selected_targets:
@@ -829,7 +917,7 @@ class NetBusMaster:
         self.panel.start()
     
     # ==================== Step 3: 部署數據 ====================
-    def step_3_deploy(self):
+    def step_3_deploy(self, audit=False):
         if not self.prepared_data:
             print("⚠️ 無預備數據,請先執行 Step 2")
             time.sleep(1)
@@ -858,7 +946,8 @@ class NetBusMaster:
                 node["query_event"].clear()
                 node["remote_sha"] = None
                 valid_tids.append(tid)
-                self.send_pkt([tid], 0x2005, {"path": "/data.bin"})
+                # slave 以摘要快取即答；audit 時強制整檔重算 (flags bit0)
+                self.send_pkt([tid], 0x2005, {"path": "/data.bin", "flags": 1 if audit else 0})
         tout = 120
         print(f"⏳ 等待設備回報 (Timeout: {tout}s)...")
         start_wait = time.time()
@@ -924,8 +1013,16 @@ class NetBusMaster:
             else:
                 self.panel.update_device(tid, status="傳輸中", upload_progress=0)
         
+        # 同內容的設備 (同 play_id / 切出的數據相同) 合併成一組廣播一次；單台與廣播失敗者走單播 (含差量)
+        groups = {}
+        for tid in final_targets:
+            groups.setdefault(local_sha_cache[tid], []).append(tid)
+        unicast_targets = []
+        for tids in groups.values():
+            unicast_targets += self._multicast_deploy(tids) if len(tids) > 1 else tids
+        
         with ThreadPoolExecutor(max_workers=50) as executor:
-            futures = {executor.submit(self._deploy_to_single_slave, tid): tid for tid in final_targets}
+            futures = {executor.submit(self._deploy_to_single_slave, tid): tid for tid in unicast_targets}
             
             for future in futures:
                 tid = futures[future]
@@ -936,7 +1033,69 @@ class NetBusMaster:
                     self.panel.update_device(tid, status="錯誤", error_msg=str(e))
         
         time.sleep(2)
-        print("\n✅ 部署完成")
+        saved = sum(self.panel.monitors[tid].saved_bytes for tid in final_targets if tid in self.panel.monitors)
+        print(f"\n✅ 部署完成" + (f" (差量部署省下 {saved / 1024 / 1024:.1f} MB)" if saved else ""))
+    
+    def _multicast_deploy(self, tids):
+        """
+        同一份數據一次廣播給多台 (NAK 式補洞，見 file_sender.MulticastSender)
+        FILE_END 後以 FILE_QUERY 確認摘要 (slave 校驗成功即寫入摘要快取，立即命中)；返回需改走單播的設備
+        """
+        pid = self.config["mapping"][tids[0]].get("play_id")
+        data = self.prepared_data.get(pid)
+        local_sha = hashlib.sha256(data).digest()
+        total_len = len(data)
+        start_time = time.time()
+        
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        
+        def bcast(cmd, args):
+            sock.sendto(Proto.pack(cmd, SchemaCodec.encode(self.store.get(cmd), args)), ('255.255.255.255', 9000))
+        
+        def progress(targets, done, total):
+            elapsed = time.time() - start_time
+            for tid in targets:
+                self.panel.update_device(
+                    tid,
+                    upload_progress=(done / total) * 100 if total else 100,
+                    upload_speed=(done / 1024) / elapsed if elapsed > 0 else 0,
+                    uploaded_bytes=done,
+                    total_bytes=total
+                )
+        
+        sender = MulticastSender(bcast, lambda tid, cmd, args: self.send_pkt([tid], cmd, args))
+        for tid in tids:
+            self.slaves[tid]["mcast"] = sender
+            self.panel.update_device(tid, uploaded_bytes=0, total_bytes=total_len, saved_bytes=0,
+                                     upload_start_time=start_time)
+        try:
+            st = sender.send_file(data, "/data.bin", tids, progress=progress)
+        finally:
+            for tid in tids:
+                if tid in self.slaves:
+                    self.slaves[tid]["mcast"] = None
+            sock.close()
+        
+        for tid in st["done"]:
+            node = self.slaves.get(tid)
+            if node:
+                node["query_event"].clear()
+                node["remote_sha"] = None
+                self.send_pkt([tid], 0x2005, {"path": "/data.bin", "flags": 0})
+        retry = [tid for tid in tids if tid not in st["done"]]
+        for tid in st["done"]:
+            node = self.slaves.get(tid)
+            if node and node["query_event"].wait(10) and node.get("remote_sha") == local_sha:
+                self.config["mapping"][tid]["last_sha"] = local_sha.hex()
+                self.panel.update_device(tid, status="待機", upload_progress=100)
+            else:
+                retry.append(tid)
+        self.save_config()
+        
+        print(f"📡 [Multicast] {len(tids)} 台 {total_len / 1024:.0f} KB：{st['seconds']} s, "
+              f"{st['rounds']} 輪, 補洞 {st['repairs']} 片" + (f", {len(retry)} 台改走單播" if retry else ""))
+        return retry
     
     def _deploy_to_single_slave(self, tid):
         node = self.slaves.get(tid)
@@ -949,7 +1108,14 @@ class NetBusMaster:
         local_sha = hashlib.sha256(data).digest()
         target_path = "/data.bin"
         total_len = len(data)
-        chunk_size = 1024
+        
+        # 差量部署：遠端已有舊版時先取逐區塊摘要，只送變動的分片 (舊韌體不回應則整檔上傳)
+        skip = None
+        sender = WindowedSender(lambda cmd, args: self.send_pkt([tid], cmd, args))
+        if node.get("remote_exists"):
+            node["hashes"].request(lambda cmd, args: self.send_pkt([tid], cmd, args),
+                                   target_path, pick_block_size(total_len, sender.chunk_size))
+            skip = plan_patch(data, node["hashes"].wait(), sender.chunk_size)
         
         start_time = time.time()
         
@@ -957,44 +1123,28 @@ class NetBusMaster:
             tid,
             uploaded_bytes=0,
             total_bytes=total_len,
+            saved_bytes=0,
             upload_start_time=start_time
         )
         
-        self.send_pkt([tid], 0x2001, {
-            "file_id": 1,
-            "total_size": total_len,
-            "chunk_size": chunk_size,
-            "sha256": local_sha,
-            "path": target_path
-        })
-        time.sleep(0.1)
-        
-        for off in range(0, total_len, chunk_size):
-            chunk = data[off : off + chunk_size]
-            
-            node["ack_event"].clear()
-            self.send_pkt([tid], 0x2002, {
-                "file_id": 1,
-                "offset": off,
-                "data": chunk
-            })
-            
-            if not node["ack_event"].wait(timeout=5.0):
-                raise Exception(f"Offset {off} 超時")
-            
-            done = off + len(chunk)
+        def progress(done, total):
             elapsed = time.time() - start_time
             speed = (done / 1024) / elapsed if elapsed > 0 else 0
-            progress = (done / total_len) * 100
-            
             self.panel.update_device(
                 tid,
-                upload_progress=progress,
+                upload_progress=(done / total) * 100 if total else 100,
                 upload_speed=speed,
-                uploaded_bytes=done
+                uploaded_bytes=done,
+                total_bytes=total,
+                saved_bytes=total_len - total
             )
         
-        self.send_pkt([tid], 0x2003, {"file_id": 1})
+        # 視窗化管線上傳：同時在途多個分片，ACK 由收包執行緒轉給 sender
+        node["sender"] = sender
+        try:
+            sender.send_file(data, target_path, file_id=1, progress=progress, skip=skip)
+        finally:
+            node["sender"] = None
         
         self.config["mapping"][tid]["last_sha"] = local_sha.hex()
         self.save_config()
@@ -1048,16 +1198,21 @@ class NetBusMaster:
             if tid in self.panel.monitors:
                 self.panel.monitors[tid].reset_play_stats()
         
+        # 插值：slave 以本地幀率出幀，來源 (data.bin) 維持 PXLD 幀率；config "interp" 1 = 線性混合
+        interp = self.config.get("interp", 0)
+        src_fps = next((m.get("fps", 0) for m in self.pxld_metadata.values()), 0) if interp else 0
         self.send_pkt(self.selected_targets, 0x3009, {
             "file_name": "data.bin",
             "block_id": 0,
-            "play_mode": 0
+            "play_mode": 0,
+            "src_fps": src_fps,
+            "interp": 1 if interp else 0
         })
         time.sleep(0.5)
         
         print("\n" + "!" * 50)
         print("     系統就緒,等待擊發")
-        print(f"     延遲設定: {self.config.get('sync_delay_ms', 0)} ms")
+        print(f"     延遲設定: {self.config.get('sync_delay_ms', 0)} ms | 起播提前量: {self.config.get('sync_lead_ms', 300)} ms")
         print("     輸入 'go' 開始 | 'q' 取消")
         print("!" * 50)
         
@@ -1073,18 +1228,14 @@ class NetBusMaster:
         
         self.panel.start(interactive=True)
         
+        # 所有 slave 在同一個 show clock 時刻出第一幀 (逐台發送的先後不再影響對齊)；
+        # sync_delay_ms 只補償音訊輸出延遲：> 0 音訊提前啟動，< 0 音訊延後啟動
         delay_ms = self.config.get("sync_delay_ms", 150)
-        delay_sec = abs(delay_ms) / 1000.0
-        
-        if delay_ms >= 0:
-            self._start_audio_stream(selected_mp3)
-            if delay_ms > 0:
-                time.sleep(delay_sec)
-            self.send_pkt(self.selected_targets, 0x300A, {})
-        else:
-            self.send_pkt(self.selected_targets, 0x300A, {})
-            time.sleep(delay_sec)
-            self._start_audio_stream(selected_mp3)
+        lead_ms = max(self.config.get("sync_lead_ms", 300), delay_ms + 50)
+        start_us = self.clock.at(lead_ms)
+        self.send_pkt(self.selected_targets, 0x300A, {"start_us": start_us})
+        self.clock.wait_until((start_us - delay_ms * 1000) & 0xFFFFFFFF)
+        self._start_audio_stream(selected_mp3)
         
         print("\n[控制提示] SPACE=暫停/繼續 | S=停止 | Q=退出")
         
@@ -1099,11 +1250,11 @@ class NetBusMaster:
                     with self.play_lock:
                         self.is_paused = not self.is_paused
                         if self.is_paused:
-                            self.send_pkt(self.selected_targets, 0x3003, {})
+                            self.send_pkt(self.selected_targets, 0x3005, {"pause": 1})
                             for tid in self.selected_targets:
                                 self.panel.update_device(tid, status="暫停")
                         else:
-                            self.send_pkt(self.selected_targets, 0x3004, {})
+                            self.send_pkt(self.selected_targets, 0x3005, {"pause": 0})
                             for tid in self.selected_targets:
                                 self.panel.update_device(tid, status="播放中")
                 
@@ -1202,6 +1353,7 @@ class NetBusMaster:
             print(" 1. Select Devices     | 掃描並選擇設備")
             print(" 2. Slice Animation    | 切分動畫數據")
             print(" 3. Deploy Data        | 部署到設備 (帶監控)")
+            print(" 3a. Deploy + Audit    | 部署前強制設備重算 SHA (不用快取)")
             print(" 4. Sync Play          | 同步播放 (支持暫停)")
             print(" s. STOP ALL           | 緊急停止")
             print(" q. Exit               | 退出程序")
@@ -1215,6 +1367,8 @@ class NetBusMaster:
                 self.step_2_prepare_data()
             elif ch == '3':
                 self.step_3_deploy()
+            elif ch == '3a':
+                self.step_3_deploy(audit=True)
             elif ch == '4':
                 self.step_4_sync_play()
             elif ch == 's':
@@ -18,6 +18,68 @@ V3_FRAME_HEADER_SIZE = 32
 V3_SLAVE_ENTRY_SIZE = 24
 V3_BYTES_PER_LED = 4  # 固定 RGBW 4 bytes
 
+# 輸出來源格式 (與 slave/lib/LEDController.SOURCE_FORMATS 對應)：保留的 RGBW 通道索引
+# P8 需要調色盤，由特效 / 即時端產生，不在此離線轉換
+OUTPUT_FORMATS = {
+    'RGBW8888': (0, 1, 2, 3),
+    'RGB888': (0, 1, 2),
+    'W8': (3,),
+}
+
+
+def parse_layout(spec) -> Optional[List[Tuple[str, Optional[int]]]]:
+    """
+    解析輸出格式佈局
+    "RGB888"               -> 整段同一格式
+    "RGB888:290,W8:16"     -> 依控制器分段 (與 slave 回報的 led_layout 相同)
+    也接受 slave 回報的 [["RGB888", 290], ["W8", 16]]
+    """
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        items = []
+        for part in spec.split(','):
+            name, _, count = part.strip().partition(':')
+            items.append((name.upper(), int(count) if count else None))
+    else:
+        items = [(str(name).upper(), int(count)) for name, count in spec]
+    for name, _ in items:
+        if name not in OUTPUT_FORMATS:
+            raise ValueError(f"不支援的輸出格式: {name} (可用: {', '.join(OUTPUT_FORMATS)})")
+    if any(c is None for _, c in items[:-1]):
+        raise ValueError("只有最後一段可以省略燈數")
+    return items
+
+
+def layout_is_identity(layout) -> bool:
+    return not layout or all(name == 'RGBW8888' for name, _ in layout)
+
+
+def repack_pixels(data: bytes, layout) -> bytes:
+    """把一幀 RGBW8888 數據按佈局裁剪為硬體實際需要的字節"""
+    if layout_is_identity(layout):
+        return bytes(data)
+    total = len(data) // V3_BYTES_PER_LED
+    out = bytearray()
+    led = 0
+    for name, count in layout:
+        n = total - led if count is None else count
+        seg = data[led * V3_BYTES_PER_LED:(led + n) * V3_BYTES_PER_LED]
+        if len(seg) < n * V3_BYTES_PER_LED:
+            seg = bytes(seg) + bytes(n * V3_BYTES_PER_LED - len(seg))
+        chans = OUTPUT_FORMATS[name]
+        if len(chans) == 4:
+            out += seg
+        else:
+            # 按通道交錯取樣：W8 取 seg[3::4]，RGB888 交錯組回 R,G,B
+            planes = [seg[c::V3_BYTES_PER_LED] for c in chans]
+            packed = bytearray(n * len(chans))
+            for j, plane in enumerate(planes):
+                packed[j::len(chans)] = plane
+            out += packed
+        led += n
+    return bytes(out)
+
 # ==================== 資料結構 ====================
 @dataclass
 class SlaveInfo:
@@ -274,18 +336,23 @@ class PXLDv3Decoder:
 class PXLDv3Splitter:
     """PXLD v3 分離器 - 支持幀範圍控制"""
     
-    def __init__(self, decoder: PXLDv3Decoder):
+    def __init__(self, decoder: PXLDv3Decoder, layout=None):
         """
         初始化分離器
         
         參數:
             decoder: PXLDv3Decoder 實例
+            layout: 輸出格式佈局 (見 parse_layout)，None 為原始 RGBW8888
         """
         self.decoder = decoder
+        self.layout = parse_layout(layout)
         self.output_files: Dict[int, BinaryIO] = {}
         
         print(f"🔧 PXLD v3 分離器初始化成功")
     
+    def _layout_str(self) -> str:
+        return ','.join(name if count is None else f"{name}:{count}" for name, count in self.layout)
+
     def split_single_slave(self, slave_id: int, 
                           output_path: Optional[str] = None,
                           start_frame: int = 0,
@@ -341,7 +408,7 @@ class PXLDv3Splitter:
         for frame_data in self.decoder.iterate_frames(start_frame, end_frame):
             try:
                 # 提取 Slave 數據
-                slave_data = self.decoder.get_slave_data(frame_data, slave_id)
+                slave_data = repack_pixels(self.decoder.get_slave_data(frame_data, slave_id), self.layout)
                 
                 # 寫入文件
                 output_file.write(slave_data)
@@ -368,10 +435,12 @@ class PXLDv3Splitter:
         
         if processed_frames > 0:
             bytes_per_frame = total_bytes // processed_frames
-            leds_per_frame = bytes_per_frame // V3_BYTES_PER_LED
             duration_seconds = processed_frames / self.decoder.fps
             
-            print(f"   每個影格: {bytes_per_frame:,} bytes ({leds_per_frame:,} LEDs)")
+            if layout_is_identity(self.layout):
+                print(f"   每個影格: {bytes_per_frame:,} bytes ({bytes_per_frame // V3_BYTES_PER_LED:,} LEDs)")
+            else:
+                print(f"   每個影格: {bytes_per_frame:,} bytes (格式 {self._layout_str()})")
             print(f"   總時長: {duration_seconds:.2f} 秒")
         
         return str(output_path)
@@ -434,7 +503,7 @@ class PXLDv3Splitter:
                 
                 try:
                     # 提取 Slave 數據
-                    slave_data = self.decoder.get_slave_data(frame_data, slave_id)
+                    slave_data = repack_pixels(self.decoder.get_slave_data(frame_data, slave_id), self.layout)
                     
                     # 寫入對應文件
                     if slave_id in self.output_files:
@@ -460,8 +529,10 @@ class PXLDv3Splitter:
             
             if processed_frames > 0:
                 bytes_per_frame = file_size // processed_frames
-                leds_per_frame = bytes_per_frame // V3_BYTES_PER_LED
-                print(f"   Slave {slave_id}: {file_size:,} bytes (每個影格 {bytes_per_frame:,} bytes, {leds_per_frame:,} LEDs)")
+                if layout_is_identity(self.layout):
+                    print(f"   Slave {slave_id}: {file_size:,} bytes (每個影格 {bytes_per_frame:,} bytes, {bytes_per_frame // V3_BYTES_PER_LED:,} LEDs)")
+                else:
+                    print(f"   Slave {slave_id}: {file_size:,} bytes (每個影格 {bytes_per_frame:,} bytes, 格式 {self._layout_str()})")
         
         # 總體統計
         total_duration = processed_frames / self.decoder.fps if self.decoder.fps > 0 else 0
@@ -603,6 +674,8 @@ def main():
   分離指定幀範圍: python pxld_splitter.py demo.pxld --start-frame 100 --end-frame 200
   分離指定Slave和幀範圍: python pxld_splitter.py demo.pxld -s 0 --start-frame 100 --end-frame 200
   分段提取: python pxld_splitter.py demo.pxld --segment 0-100,200-300
+  RGB 燈條輸出: python pxld_splitter.py demo.pxld --format RGB888
+  混合控制器: python pxld_splitter.py demo.pxld -s 0 --format RGB888:290,W8:16
         """
     )
     
@@ -620,6 +693,8 @@ def main():
                        help='結束影格索引 (不包含，默認: 總影格數)')
     parser.add_argument('--segment', type=str,
                        help='分段提取，格式: "起始1-結束1,起始2-結束2" (例如: "0-100,200-300")')
+    parser.add_argument('--format', type=str, default=None,
+                       help='輸出格式: RGBW8888 (默認) / RGB888 / W8，或按控制器分段 "RGB888:290,W8:16"')
     
     args = parser.parse_args()
     
@@ -659,7 +734,7 @@ def main():
                 return
             
             # 4. 初始化分離器
-            splitter = PXLDv3Splitter(decoder)
+            splitter = PXLDv3Splitter(decoder, layout=args.format)
             
             # 5. 執行分離
             if args.segment:
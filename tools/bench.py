@@ -0,0 +1,1284 @@
+#!/usr/bin/env python3
+"""
+主機端基準測試 - 在 PC 上以 emu 替身硬體運行 slave/ 的真實代碼
+═══════════════════════════════════════════════════════
+用法:
+  python bench.py apa102 --leds 300 --frames 200
+  python bench.py lut --leds 300 --frames 200 --gamma 2.2
+  python bench.py pca --frames 2000
+  python bench.py i2c --boards 8 --frames 300 --budget 4000
+  python bench.py formats --leds 300 --frames 200
+  python bench.py remap --leds 300 --frames 200
+  python bench.py reader --leds 1000 --chunk 32 --lat-us 1500 --mbps 10
+  python bench.py pack --leds 336 --frames 2400 [--pxld show.pxld --slave 1]
+  python bench.py effects --leds 336 --frames 120
+  python bench.py interp --leds 336 --frames 600 --src-fps 20 --fps 100
+  python bench.py overlay --leds 300 --spot 24
+  python bench.py filerx --kb 2048 --loss 0.03 --edit 0.03
+"""
+import argparse
+import array
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import emu
+emu.install()
+
+
+def _pattern(size, seed=1):
+    """可重現的偽隨機 RGBW 來源"""
+    out = bytearray(size)
+    x = seed
+    for i in range(size):
+        x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+        out[i] = (x >> 16) & 0xFF
+    return out
+
+
+def _report(title, rows):
+    print("\n" + "=" * 60)
+    print(f"🏁 {title}")
+    print("-" * 60)
+    for k, v in rows:
+        print(f"  {k:<28} {v}")
+    print("=" * 60)
+
+
+# ==================== APA102 ====================
+def apa102_reference(src, n, order, header):
+    """純 Python 參考：APA102 單幀 SPI 字節流 (頭部恆在每顆像素第 0 字節，order 中的 W 不影響位置)"""
+    colors = [c for c in order.upper() if c in "RGB"]
+    px = bytearray(n * 4)
+    for i in range(n):
+        s = i * 4
+        px[i * 4] = header
+        for k, c in enumerate(colors):
+            px[i * 4 + 1 + k] = src[s + "RGB".index(c)]
+    end_len = max(4, (n + 15) // 16)
+    return bytes(4) + bytes(px) + b"\xff" * end_len
+
+
+def bench_apa102(args):
+    from machine import SPI
+    from lib.apa102 import APA102
+    from lib.LEDController import LEDController, LEDStreamer
+
+    rc = 0
+    for order in args.order.split(","):
+        spi = SPI(1, baudrate=args.baudrate)
+        apa = APA102(spi, num_leds=args.leds, order=order, brightness=args.brightness)
+        ctrl = LEDController('APA102', {'led_IO': apa, 'Q': args.leds, 'order': order})
+        st = LEDStreamer([ctrl])
+
+        src = st.get_write_view()
+        src[:] = _pattern(len(src))
+
+        # 1. 正確性：與參考字節流逐字節比較 (參考由設定的 order 推導，不取驅動正規化的結果)
+        st.show_all()
+        expect = apa102_reference(src, args.leds, order, apa.header)
+        ok = spi.last == expect
+        hdr_ok = all(spi.last[4 + i * 4] & 0xE0 == 0xE0 for i in range(args.leds))
+
+        # 2. 吞吐量
+        spi.reset_stats()
+        t0 = time.perf_counter()
+        for _ in range(args.frames):
+            st.show_all()
+        dt = time.perf_counter() - t0
+
+        per_frame_us = dt * 1e6 / args.frames
+        _report(f"APA102 fused path ({args.leds} LEDs, order={order} -> wire {apa.order})", [
+            ("byte output", "✅ match" if ok else "❌ MISMATCH"),
+            ("0xE0 header at byte 0", "✅" if hdr_ok else "❌"),
+            ("spi.write / frame", f"{spi.writes / args.frames:.2f}"),
+            ("bytes / frame", f"{spi.bytes_out // args.frames}"),
+            ("wire time / frame", f"{spi.wire_us / args.frames:.0f} us @ {args.baudrate // 1_000_000} MHz"),
+            ("host convert+show / frame", f"{per_frame_us:.0f} us"),
+            ("host pixels / s", f"{args.leds * args.frames / dt:,.0f}"),
+        ])
+        if not (ok and hdr_ok):
+            rc = 1
+    return rc
+
+
+# ==================== LUT ====================
+def bench_lut(args):
+    from neopixel import NeoPixel
+    from machine import Pin
+    from lib.LEDController import LEDController, LEDStreamer, _lut_plane, _lut_plane_loop
+
+    np = NeoPixel(Pin(0), args.leds)
+    ctrl = LEDController('WS2812', {'led_IO': np, 'Q': args.leds, 'order': 'GRB'})
+    st = LEDStreamer([ctrl])
+    src = st.get_write_view()
+    src[:] = _pattern(len(src))
+
+    def run():
+        t0 = time.perf_counter()
+        for _ in range(args.frames):
+            ctrl.st_load_and_convert(src, 0)
+        return (time.perf_counter() - t0) * 1e6 / args.frames
+
+    # 1. LUT 重建成本與同參數免重建
+    wb = (1.0, 0.9, 0.8, 1.0)
+    t0 = time.perf_counter()
+    st.set_levels(brightness=args.brightness, gamma=args.gamma, wb=wb)
+    build_ms = (time.perf_counter() - t0) * 1e3
+    rebuilt = st.controllers[0].set_levels(brightness=args.brightness, gamma=args.gamma, wb=wb)
+
+    # 2. 原始直拷 (預設參數 -> 不啟用 LUT) 與 LUT 路徑交替計時，兩者各取最佳 (排除主機雜訊的時段偏差)
+    run()  # 暖機
+    raw, lut = [], []
+    for _ in range(args.repeat):
+        ctrl.set_levels()
+        raw.append(run())
+        ctrl.set_levels(brightness=args.brightness, gamma=args.gamma, wb=wb)
+        lut.append(run())
+    raw_us, lut_us = min(raw), min(lut)
+
+    # 3. 正確性：逐像素對照浮點公式
+    ok = True
+    for i in range(args.leds):
+        for c, off in ((0, ctrl._r), (1, ctrl._g), (2, ctrl._b)):
+            v = src[i * 4 + c]
+            expect = int(((v / 255) ** args.gamma) * args.brightness * wb[c] * 255 + 0.5)
+            if np.buf[i * 3 + off] != expect:
+                ok = False
+
+    # 4. 板上的 viper 平面查表與主機 translate 版逐字節一致
+    a = bytearray(_pattern(args.leds * 3))
+    b = bytearray(a)
+    for c in range(3):
+        _lut_plane(a, c, 3, args.leds, ctrl._lutp[c])
+        _lut_plane_loop(b, c, 3, args.leds, ctrl._lutp[c])
+    same = a == b
+
+    # 預算以轉換本身計 (LUT 路徑 vs 原始直拷)；線上時間只作參考，不計入判定
+    # LUT 以直拷後逐平面原地查表套用：板上為 viper 迴圈，CPython 為 bytes.translate
+    overhead = (lut_us - raw_us) / raw_us * 100
+    within = overhead < 10
+    wire_us = args.leds * 24 * 1.25  # WS2812 800 kHz 線上時間
+    _report(f"LUT vs raw copy ({args.leds} LEDs, gamma={args.gamma}, bri={args.brightness})", [
+        ("byte output", "✅ match" if ok else "❌ MISMATCH"),
+        ("plane pass", "✅ viper loop == translate" if same else "❌ viper loop differs"),
+        ("LUT rebuild", f"{build_ms:.2f} ms (same params -> {'rebuilt' if rebuilt else 'skipped'})"),
+        ("raw convert / frame", f"{raw_us:.0f} us"),
+        ("LUT convert / frame", f"{lut_us:.0f} us"),
+        ("convert overhead", f"{overhead:+.1f} % {'✅' if within else '❌'} (budget < 10 %)"),
+        ("WS2812 wire / frame", f"{wire_us:.0f} us (reference only)"),
+    ])
+    return 0 if ok and same and not rebuilt and within else 1
+
+
+# ==================== PCA9685 ====================
+def _duty(reg, i):
+    """從寄存器鏡像還原第 i 通道的 12-bit duty"""
+    idx = i * 4
+    if reg[idx + 3] & 0x10: return 0
+    if reg[idx + 1] & 0x10: return 4095
+    return reg[idx + 2] | (reg[idx + 3] << 8)
+
+
+def bench_pca(args):
+    from machine import I2C
+    from lib.pca9685 import PCA9685, MODE_RAW12, MODE_CURVE8, MODE_CURVE16
+
+    i2c = I2C(0)
+    raw = PCA9685(i2c, mode=MODE_RAW12)
+    cur = PCA9685(i2c, mode=MODE_CURVE8, dither=True)
+    c16 = PCA9685(i2c, mode=MODE_CURVE16, dither=True)
+
+    # 1. 可用階數：舊路徑 8-bit 直灌 12-bit 寄存器 vs 曲線擴展
+    steps_raw = set()
+    steps_cur = set()
+    ramp = list(range(256))
+    for base in range(0, 256, 16):
+        raw.buf = array.array('H', ramp[base:base + 16])
+        cur.buf = array.array('H', ramp[base:base + 16])
+        cur.dither = False
+        raw._prepare_reg_buf(); cur._prepare_reg_buf()
+        for i in range(16):
+            steps_raw.add(_duty(raw.reg_buf, i))
+            steps_cur.add(_duty(cur.reg_buf, i))
+    cur.dither = True
+
+    # 16-bit 來源 (無抖動) 可達的 12-bit 階數
+    steps_16 = set()
+    c16.dither = False
+    for base in range(0, 65536, 16 * 64):
+        c16.buf = array.array('H', range(base, base + 16 * 64, 64))
+        c16._prepare_reg_buf()
+        for i in range(16):
+            steps_16.add(_duty(c16.reg_buf, i))
+    c16.dither = True
+
+    # 2. 抖動精度：16-bit 低亮度目標，多幀平均應逼近 12.4 定點理論值
+    targets = [257 * k + 128 for k in range(1, 17)]  # 介於兩個 8-bit 階之間
+    c16.buf = array.array('H', targets)
+    acc = [0] * 16
+    for _ in range(args.frames):
+        c16._prepare_reg_buf()
+        for i in range(16):
+            acc[i] += _duty(c16.reg_buf, i)
+    worst = 0.0
+    for i, v in enumerate(targets):
+        pos = v - (v >> 8)
+        k = pos >> 8
+        a = c16._curve[k]
+        ideal = (a + (((c16._curve[k + 1] - a) * (pos & 0xFF)) >> 8)) / 16
+        worst = max(worst, abs(acc[i] / args.frames - ideal))
+
+    # 3. 每幀寄存器填充成本
+    def run(pca):
+        pca.buf = array.array('H', list(_pattern(16)))
+        t0 = time.perf_counter()
+        for _ in range(args.frames):
+            pca._prepare_reg_buf()
+        return (time.perf_counter() - t0) * 1e6 / args.frames
+
+    raw_us = run(raw)
+    cur_us = run(cur)
+    ok = worst < 0.05 and max(steps_cur) == 4095 and len(steps_16) > len(steps_cur)
+    _report(f"PCA9685 8->12 bit + temporal dither ({args.frames} frames)", [
+        ("8-bit raw copy", f"{len(steps_raw)} duties, full scale {max(steps_raw)} / 4095"),
+        ("8-bit curve", f"{len(steps_cur)} duties, full scale {max(steps_cur)} / 4095"),
+        ("16-bit curve", f"{len(steps_16)} duties"),
+        ("dither mean error (16-bit)", f"{worst:.4f} LSB {'✅' if worst < 0.05 else '❌'}"),
+        ("reg fill raw / frame", f"{raw_us:.1f} us"),
+        ("reg fill curve+dither / frame", f"{cur_us:.1f} us"),
+        ("i2c bytes / frame", f"{len(raw.reg_buf)} (unchanged)"),
+    ])
+    return 0 if ok else 1
+
+
+def bench_i2c(args):
+    from machine import I2C
+    from lib.pca9685 import PCA9685, PCA9685Batch, MODE_CURVE8
+
+    i2c = I2C(0, freq=args.freq)
+    boards = [PCA9685(i2c, address=0x40 + k, mode=MODE_CURVE8, bus_hz=args.freq) for k in range(args.boards)]
+    batch = PCA9685Batch(boards, budget_us=args.budget)
+
+    # 來源：每幀只有 --change 比例的通道改變 (典型緩慢漸變場景)
+    levels = [list(_pattern(16, seed=k + 1)) for k in range(args.boards)]
+    full_bytes = args.boards * 64
+    i2c.writes = i2c.bytes_out = 0
+    for b in boards: b.reset_stats()
+
+    x = 7
+    for f in range(args.frames):
+        for k, b in enumerate(boards):
+            lv = levels[k]
+            for ch in range(16):
+                x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+                if (x >> 8) % 1000 < args.change * 1000:
+                    lv[ch] = (lv[ch] + 1) & 0xFF
+            b.buf = array.array('H', lv)
+            b.show()
+
+    # 正確性：預算不限時最後一幀後 I2C 端寄存器 == 驅動寄存器；有預算時再補一輪不限預算的 flush
+    batch.budget_us = 0
+    batch.flush()
+    ok = all(i2c.mem[b.address][0x06:0x06 + 64] == b.reg_buf for b in boards)
+
+    per = args.frames
+    rows = [
+        ("register image", "✅ match" if ok else "❌ MISMATCH"),
+        ("full rewrite bytes / frame", f"{full_bytes}  (~{boards[0].tx_us(64) * args.boards} us)"),
+        ("delta bytes / frame", f"{i2c.bytes_out / per:.1f}  ({100 * i2c.bytes_out / per / full_bytes:.1f} %)"),
+        ("writeto_mem / frame", f"{i2c.writes / per:.2f}"),
+        ("frames over budget", f"{batch.over_budget}" + (f" (budget {args.budget} us)" if args.budget else " (no budget)")),
+    ]
+    for b in boards[:4]:
+        st = b.stats()
+        rows.append((f"board 0x{st['addr']:02X}", f"written {st['written']} / skipped {st['skipped']} / deferred {st['deferred']}"))
+    _report(f"PCA9685 delta writes ({args.boards} boards @ {args.freq // 1000} kHz)", rows)
+    return 0 if ok else 1
+
+
+# ==================== 來源格式 ====================
+def bench_formats(args):
+    from neopixel import NeoPixel
+    from machine import Pin, SPI
+    from lib.apa102 import APA102
+    from lib.pca9685 import PCA9685
+    from machine import I2C
+    from lib.LEDController import LEDController
+    from PXLDv3Splitter import repack_pixels
+
+    n = args.leds
+    rgbw = _pattern(n * 4, seed=3)
+    pal = _pattern(1024, seed=5)
+    idx = _pattern(n, seed=7)
+    # P8 參考：索引展開為 RGBW8888
+    p8_rgbw = bytearray(n * 4)
+    for i in range(n):
+        p8_rgbw[i * 4:i * 4 + 4] = pal[idx[i] * 4:idx[i] * 4 + 4]
+
+    def make(kind):
+        if kind == 'WS2812':
+            return NeoPixel(Pin(0), n), {'order': 'GRB'}
+        if kind == 'APA102':
+            return APA102(SPI(1), num_leds=n, order='BGR'), {'order': 'BGR'}
+        return PCA9685(I2C(0), n=n), {'order': 'W'}
+
+    def output(kind, fmt, src, levels=None):
+        io, cfg = make(kind)
+        ctrl = LEDController(kind, dict(cfg, led_IO=io, Q=n, fmt=fmt))
+        if fmt == 'P8':
+            ctrl.set_palette(pal)
+        if levels:
+            ctrl.set_levels(**levels)
+        ctrl.st_load_and_convert(src, 0)
+        t0 = time.perf_counter()
+        for _ in range(args.frames):
+            ctrl.st_load_and_convert(src, 0)
+        us = (time.perf_counter() - t0) * 1e6 / args.frames
+        return bytes(io.buf), ctrl.frame_size, us
+
+    rows = []
+    ok = True
+    for kind in ('WS2812', 'APA102', 'i2c_LED'):
+        for levels in (None, {'brightness': 0.7, 'gamma': 2.2}):
+            ref, ref_size, _ = output(kind, 'RGBW8888', rgbw, levels)
+            ref_p8, _, _ = output(kind, 'RGBW8888', p8_rgbw, levels)
+            fmts = ('RGB888', 'W8', 'P8') if kind != 'i2c_LED' else ('W8', 'P8')
+            for fmt in fmts:
+                if fmt == 'P8':
+                    src, expect = idx, ref_p8
+                elif fmt == 'W8' and kind != 'i2c_LED':
+                    # 單色燈條：W 灰階複製到 R/G/B，參考為 W 展開的 RGBW
+                    w = rgbw[3::4]
+                    mono = bytearray(n * 4)
+                    for c in range(3):
+                        mono[c::4] = w
+                    src = repack_pixels(rgbw, [('W8', None)])
+                    expect, _, _ = output(kind, 'RGBW8888', mono, levels)
+                else:
+                    src, expect = repack_pixels(rgbw, [(fmt, None)]), ref
+                got, size, us = output(kind, fmt, src, levels)
+                good = got == expect
+                ok &= good
+                if levels is None:
+                    rows.append((f"{kind} {fmt}", f"{'✅' if good else '❌'} {size} B/frame ({100 * size / ref_size:.0f} % of RGBW), {us:.0f} us"))
+                elif not good:
+                    rows.append((f"{kind} {fmt} +LUT", "❌ MISMATCH"))
+    _report(f"Source formats vs RGBW8888 ({n} LEDs)", rows)
+    return 0 if ok else 1
+
+
+# ==================== 重映射 ====================
+def bench_remap(args):
+    import random
+    import struct
+    import tempfile
+    from neopixel import NeoPixel
+    from machine import Pin, SPI
+    from lib.apa102 import APA102
+    from lib.LEDController import LEDController, LEDStreamer
+
+    n = args.leds
+    rnd = random.Random(11)
+
+    def build(fmt):
+        ws = LEDController('WS2812', {'led_IO': NeoPixel(Pin(0), n), 'Q': n, 'order': 'GRB', 'fmt': fmt})
+        apa = LEDController('APA102', {'led_IO': APA102(SPI(1), num_leds=n), 'Q': n, 'fmt': fmt})
+        return LEDStreamer([ws, apa])
+
+    # 整機表：每個控制器內隨機打亂 (蛇形接線等)，值為整幀邏輯索引
+    perm = []
+    for base in (0, n):
+        local = list(range(n))
+        rnd.shuffle(local)
+        perm += [base + v for v in local]
+
+    rows = []
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "remap.bin")
+        with open(path, "wb") as f:
+            f.write(struct.pack(f"<{len(perm)}H", *perm))
+
+        for fmt in ("RGBW8888", "RGB888"):
+            st = build(fmt)
+            ref = build(fmt)
+            bpp = st.controllers[0]._stride
+            src = st.get_write_view()
+            src[:] = _pattern(len(src), seed=9)
+            # 參考：伺服器端預先按接線順序重排
+            pre = ref.get_write_view()
+            for phys, logical in enumerate(perm):
+                pre[phys * bpp:(phys + 1) * bpp] = src[logical * bpp:(logical + 1) * bpp]
+
+            def run(s):
+                t0 = time.perf_counter()
+                for _ in range(args.frames):
+                    s.show_all()
+                return (time.perf_counter() - t0) * 1e6 / args.frames
+
+            base_us = run(st)
+            loaded = st.load_remap(path)
+            map_us = run(st)
+            ref.show_all()
+            good = loaded and all(bytes(a.led.buf) == bytes(b.led.buf) for a, b in zip(st.controllers, ref.controllers))
+            ok &= good
+            rows.append((f"{fmt} gather output", "✅ match" if good else "❌ MISMATCH"))
+            rows.append((f"{fmt} frame (plain / remap)", f"{base_us:.0f} us / {map_us:.0f} us"))
+
+        # 跨控制器條目必須被拒絕
+        with open(path, "wb") as f:
+            f.write(struct.pack(f"<{2 * n}H", *([n] + list(range(1, 2 * n)))))
+        rejected = not build("RGB888").load_remap(path)
+        ok &= rejected
+        rows.append(("cross-controller entry", "✅ rejected" if rejected else "❌ accepted"))
+        rows.append(("table size", f"{len(perm) * 2} bytes for {len(perm)} LEDs"))
+
+    _report(f"On-slave remap gather (2 x {n} LEDs)", rows)
+    return 0 if ok else 1
+
+
+# ==================== Show Reader ====================
+class _SDFile:
+    """
+    以 SD 卡成本模型包裝真實檔案 (不真的 sleep)：
+    每次 readinto = 命令延遲 + 覆蓋扇區的傳輸時間；首尾非對齊時整扇區讀入
+    每 spike_every 次命令出現一次 spike_us 的長停頓 (卡內 GC / 磨損均衡)
+    """
+    def __init__(self, path, lat_us, mbps, sector=512, spike_us=0, spike_every=0):
+        self.f = open(path, "rb")
+        self.lat_us = lat_us
+        self.bps = mbps * 1_000_000
+        self.sector = sector
+        self.pos = 0
+        self.cost_us = 0.0
+        self.reads = 0
+        self.bytes = 0
+        self.unaligned = 0
+        self.spike_us = spike_us
+        self.spike_every = spike_every
+
+    def seek(self, off, whence=0):
+        self.pos = self.f.seek(off, whence)
+        return self.pos
+
+    def readinto(self, buf):
+        n = self.f.readinto(buf)
+        start, end = self.pos, self.pos + n
+        sec = self.sector
+        if n and (start % sec or end % sec):
+            self.unaligned += 1
+        covered = (-(-end // sec) - start // sec) * sec
+        self.cost_us += self.lat_us + covered * 1e6 / self.bps
+        if self.spike_every and self.reads % self.spike_every == self.spike_every - 1:
+            self.cost_us += self.spike_us
+        self.reads += 1
+        self.bytes += n
+        self.pos = end
+        return n
+
+    def close(self):
+        self.f.close()
+
+
+def bench_reader(args):
+    import struct
+    import tempfile
+    import lib.show_reader as show_reader
+    from lib.show_reader import RawShowReader
+
+    fs = args.leds * 3
+    bf = args.buffer_frames
+    hub = bytearray(fs * bf)
+    view = memoryview(hub)
+    interval_us = 1e6 / args.fps
+    slack_us = interval_us * bf          # Core 1 播完手上這塊之前，補貨必須完成
+    refills = (args.frames * args.loops) // bf + 1
+
+    def check(data, n, expect):
+        """逐幀核對標籤 (幀號)；返回 (下一個期望幀號, 錯幀數)"""
+        bad = 0
+        for k in range(n // fs):
+            tag = struct.unpack_from("<I", data, k * fs)[0]
+            if tag != expect:
+                bad += 1
+            expect = (tag + 1) % args.frames
+        return expect, bad
+
+    rows = []
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "data.bin")
+        data = bytearray(_pattern(fs * args.frames, seed=5))
+        for k in range(args.frames):
+            struct.pack_into("<I", data, k * fs, k)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        # 1. 原做法：每次補貨 readinto 一整塊 Hub，檔尾 seek(0)
+        sd = dict(lat_us=args.lat_us, mbps=args.mbps, spike_us=args.spike_us, spike_every=args.spike_every)
+        f = _SDFile(path, **sd)
+        expect, bad, stalls, gaps = 0, 0, 0, 0
+        for _ in range(refills):
+            c0 = f.cost_us
+            n = f.readinto(view)
+            if n == 0:
+                f.seek(0)
+                gaps += 1
+                continue
+            if f.cost_us - c0 > slack_us:
+                stalls += 1
+            expect, b = check(hub, len(hub), expect)  # 原做法提交整塊 (含殘留)
+            bad += b
+        legacy = (f, stalls, bad, gaps)
+        f.close()
+
+        # 2. RawShowReader：大塊對齊預讀 + 整幀切片 + 無縫回繞
+        show_reader.open = lambda p, mode="rb": _SDFile(p, **sd)
+        try:
+            r = RawShowReader(fs, chunk=args.chunk * 1024, align=512)
+            r.open(path)
+            f = r._f
+            chunk_slack = interval_us * (r.chunk // fs)
+            expect, bad, stalls, gaps = 0, 0, 0, 0
+            for _ in range(refills):
+                c0 = f.cost_us
+                n = r.fill(view, loop=True)
+                if n == 0:
+                    gaps += 1
+                    continue
+                if f.cost_us - c0 > slack_us:
+                    stalls += 1
+                expect, b = check(hub, n, expect)
+                bad += b
+                c1 = f.cost_us
+                r.prefetch(True)
+                if f.cost_us - c1 > chunk_slack:
+                    stalls += 1
+            reader = (f, stalls, bad, gaps)
+            r.close()
+        finally:
+            del show_reader.open
+
+    for name, (f, stalls, bad, gaps) in (("readinto/slot", legacy), ("RawShowReader", reader)):
+        mbps = f.bytes / f.cost_us if f.cost_us else 0
+        rows.append((f"{name} reads", f"{f.reads}  (avg {f.bytes / max(1, f.reads) / 1024:.1f} KB, "
+                                      f"unaligned {f.unaligned})"))
+        rows.append((f"{name} read time", f"{f.cost_us / 1000:.1f} ms  ({mbps:.2f} MB/s effective)"))
+        rows.append((f"{name} stalls / bad / gaps", f"{stalls} / {bad} / {gaps}"))
+    ok = reader[1] == 0 and reader[2] == 0 and reader[3] == 0
+    rows.append(("reader output", "✅ whole frames, seamless loop" if reader[2] == 0 and reader[3] == 0
+                 else "❌ frame sequence broken"))
+    rows.append(("slack per refill", f"{slack_us / 1000:.1f} ms ({bf} frame @ {args.fps} FPS)"))
+
+    _report(f"Show reader: {args.frames} frames x {fs} B, {args.loops} loops, "
+            f"SD {args.lat_us} us + {args.mbps} MB/s, +{args.spike_us // 1000} ms / {args.spike_every} cmds", rows)
+    print("  stalls: 關鍵路徑讀取超過 slack；bad: 提交了錯誤/殘留幀；gaps: 檔尾空轉一次補貨")
+    return 0 if ok else 1
+
+
+# ==================== 壓縮秀檔 ====================
+def _show_frames(leds, frames, seed=7, order=None, dur=(40, 200)):
+    """
+    合成秀內容 (RGBW8888)：輪流出現的典型段落
+    hold 靜態畫面 / fade 全體漸變 / chase 跑點 / sparkle 稀疏閃爍 / blackout 黑場 / rainbow 全體流動
+    order 給定時依序循環這些段落 (否則隨機抽)；每段長 dur[0] + 0..dur[1]-1 幀
+    """
+    x = seed
+    def rnd():
+        nonlocal x
+        x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+        return x >> 16
+    scenes = ("hold", "fade", "chase", "sparkle", "blackout", "rainbow")
+    fs = leds * 4
+    base = bytes(_pattern(fs, seed=seed))
+    frame = bytearray(fs)
+    k = n = 0
+    while k < frames:
+        kind = order[n % len(order)] if order else scenes[rnd() % len(scenes)]
+        n += 1
+        span = dur[0] + rnd() % dur[1]
+        color = bytes((rnd() & 0xFF, rnd() & 0xFF, rnd() & 0xFF, rnd() & 0xFF))
+        for t in range(min(span, frames - k)):
+            if kind == "hold":
+                if t == 0:
+                    frame[:] = base
+            elif kind == "fade":
+                lv = (t * 255) // span
+                frame[:] = bytes(c * lv >> 8 for c in color) * leds
+            elif kind == "chase":
+                frame[:] = bytes(fs)
+                for j in range(0, leds, 24):
+                    i = ((j + t) % leds) * 4
+                    frame[i:i + 4] = color
+            elif kind == "sparkle":
+                if t == 0:
+                    frame[:] = bytes(fs)
+                for _ in range(max(1, leds // 50)):
+                    i = (rnd() % leds) * 4
+                    frame[i:i + 4] = color if rnd() & 1 else bytes(4)
+            elif kind == "blackout":
+                frame[:] = bytes(fs)
+            else:
+                frame[:] = bytes(((i * 7 + t * 3) & 0xFF) if (i & 3) != 3 else 0 for i in range(fs))
+            yield bytes(frame)
+            k += 1
+
+
+def bench_pack(args):
+    import tempfile
+    import show_pack
+    from lib.show_reader import RawShowReader, PackedShowReader
+
+    if args.pxld:
+        from PXLDv3Splitter import PXLDv3Decoder, repack_pixels, parse_layout
+        layout = parse_layout(args.format)
+        src = []
+        with PXLDv3Decoder(args.pxld) as dec:
+            end = min(dec.total_frames, args.frames) if args.frames else dec.total_frames
+            for fd in dec.iterate_frames(0, end):
+                src.append(repack_pixels(dec.get_slave_data(fd, args.slave), layout))
+        label = f"{os.path.basename(args.pxld)} slave {args.slave}"
+    else:
+        src = list(_show_frames(args.leds, args.frames))
+        label = "synthetic show (hold/fade/chase/sparkle/blackout/rainbow)"
+    fs = len(src[0])
+    raw = b"".join(src)
+
+    t0 = time.perf_counter()
+    packed = show_pack.pack_frames(src, fs, fps=args.fps, keyint=args.keyint, index_max=args.index_max)
+    enc_s = time.perf_counter() - t0
+    hdr = show_pack.read_header(packed)
+    index = show_pack.read_index(packed)
+    noix = show_pack.pack_frames(src, fs, fps=args.fps, keyint=args.keyint, index_max=0)
+    nohold = len(show_pack.pack_frames(src, fs, fps=args.fps, keyint=args.keyint, hold=False))
+
+    rows = []
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        p_raw = os.path.join(d, "data_raw.bin")
+        p_pk = os.path.join(d, "data.bin")
+        with open(p_raw, "wb") as f:
+            f.write(raw)
+        with open(p_pk, "wb") as f:
+            f.write(packed)
+        p_noix = os.path.join(d, "data_noix.bin")
+        with open(p_noix, "wb") as f:
+            f.write(noix)
+
+        # 以板上讀取器逐幀解出 (含 loop 回繞)，與原始幀比對
+        bf = args.buffer_frames
+        hub = memoryview(bytearray(fs * bf))
+        total = len(src) * 2
+        out = {}
+        for name, cls, path in (("raw", RawShowReader, p_raw), ("packed", PackedShowReader, p_pk),
+                                ("noindex", PackedShowReader, p_noix)):
+            r = cls(fs, chunk=args.chunk * 1024)
+            r.open(path)
+            bad = got = copied = 0
+            t0 = time.perf_counter()
+            while got < total:
+                n = r.fill(hub, loop=True)
+                if n == 0:
+                    break
+                k = n // fs
+                for j in range(k):
+                    if hub[j * fs:(j + 1) * fs] != src[(got + j) % len(src)]:
+                        bad += 1
+                got += k
+                copied += k
+                # 靜止段：Core 1 重複末幀，逐幀核對原始內容確實相同
+                last = hub[(k - 1) * fs:k * fs]
+                for j in range(r.hold):
+                    if last != src[(got + j) % len(src)]:
+                        bad += 1
+                got += r.hold
+                r.prefetch(True)
+            dt = time.perf_counter() - t0
+            st = r.stats()
+            # Seek：隨機跳轉後第一幀必須正確
+            seek_bad = 0
+            seek_us = []
+            d0 = st.get("decoded", 0)
+            for j in range(args.seeks):
+                tgt = (j * 7919 + 13) % len(src)
+                t1 = time.perf_counter()
+                r.seek_frame(tgt)
+                r.fill(hub[:fs])
+                seek_us.append((time.perf_counter() - t1) * 1e6)
+                if hub[:fs] != src[tgt]:
+                    seek_bad += 1
+            seek_dec = (r.stats().get("decoded", 0) - d0) / max(1, args.seeks)
+            r.close()
+            out[name] = (dt * 1e6 / max(1, got), bad, got, st, seek_us, seek_bad, seek_dec, copied)
+            ok = ok and bad == 0 and seek_bad == 0 and got >= total
+
+    ratio = len(raw) / len(packed)
+    per_frame = (len(packed) - hdr["hdr_len"]) / len(src)
+    rows.append(("content", label))
+    rows.append(("frames x frame size", f"{len(src)} x {fs} B ({len(raw) / 1e6:.2f} MB raw)"))
+    rows.append(("packed size", f"{len(packed) / 1e6:.3f} MB  (x{ratio:.1f}, {per_frame:.0f} B/frame avg)"))
+    rows.append(("without HOLD records", f"{nohold / 1e6:.3f} MB  (HOLD saves {nohold - len(packed):,} B)"))
+    rows.append(("largest record / keyint", f"{hdr['max_rec']} B / {hdr['keyint']} frames"))
+    ix_bytes = 4 + 8 * len(index)
+    hour_keys = min(args.index_max, -(-3600 * args.fps // args.keyint))
+    rows.append(("keyframe index", f"{len(index)} entries, {ix_bytes} B "
+                                   f"(1 h @ {args.fps} FPS: {4 + 8 * hour_keys} B)"))
+    rows.append(("host encode", f"{enc_s * 1000:.0f} ms ({enc_s * 1e6 / len(src):.0f} us/frame)"))
+    for name, (us, bad, got, st, seek_us, seek_bad, seek_dec, copied) in out.items():
+        rows.append((f"{name} fill per frame", f"{us:.0f} us  ({got} frames, bad {bad})"))
+        rows.append((f"{name} hub copies", f"{copied} of {got} frames ({got - copied} held)"))
+        rows.append((f"{name} file bytes read", f"{st['bytes']:,} B in {st['reads']} reads"))
+        if seek_us:
+            seek_us.sort()
+            rows.append((f"{name} seek p50 / max", f"{seek_us[len(seek_us) // 2] / 1000:.1f} / "
+                                                   f"{seek_us[-1] / 1000:.1f} ms (bad {seek_bad}, "
+                                                   f"{seek_dec:.0f} records decoded)"))
+    st = out["packed"][3]
+    if st.get("decoded"):
+        rows.append(("packed decode per frame", f"{st['decode_us'] / st['decoded']:.0f} us avg, "
+                                                f"{st['max_decode_us']} us max"))
+    rows.append(("result", "✅ decoded frames identical to raw" if ok else "❌ mismatch"))
+    _report(f"Packed show (NLPK delta + RLE), keyint {args.keyint}", rows)
+    print("  decode us: viper 路徑在主機以純 Python 執行，只作相對比較；板上實測見 STATUS 的 show_reader.decode_us")
+    return 0 if ok else 1
+
+
+# ==================== 程序化效果 ====================
+def bench_effects(args):
+    try:
+        import effects_ref
+    except ImportError as e:
+        print(f"❌ 需要 numpy 參考實作: {e}")
+        return 1
+    from lib.effects import EffectEngine, EFFECT_IDS
+
+    n = args.leds
+    # 混合佈局：四種來源格式各佔一段，同時核對打包
+    q = n // 4
+    layout = [["RGBW8888", q], ["RGB888", q], ["W8", q], ["P8", n - 3 * q]]
+    eng = EffectEngine(layout)
+    view = memoryview(bytearray(eng.frame_size * 2))
+    cases = [
+        ("solid", dict(speed=0, scale=0, param=0, c1=(12, 200, 99))),
+        ("rainbow", dict(speed=64, scale=256, param=255)),
+        ("rainbow", dict(speed=4000, scale=65535, param=180)),
+        ("chase", dict(speed=128, scale=30, param=8, c1=(255, 120, 0), c2=(0, 0, 30))),
+        ("chase", dict(speed=65535, scale=65535, param=0, c1=(1, 2, 3), c2=(250, 251, 252))),
+        ("breathe", dict(speed=64, scale=0, param=16, c1=(0, 80, 255), c2=(7, 0, 0))),
+        ("noise", dict(speed=96, scale=24, param=0, c1=(255, 60, 0), c2=(0, 0, 40))),
+        ("noise", dict(speed=65535, scale=65535, param=0, c1=(255, 255, 255))),
+    ]
+    rows = []
+    ok = True
+    for name, kw in cases:
+        for fps in (40, 17):
+            eng.set(EFFECT_IDS[name], fps=fps, **kw)
+            bad = 0
+            t0 = time.perf_counter()
+            for k in range(args.frames):
+                fs = eng.render(view)
+                if bytes(view[:fs]) != effects_ref.render_frame(EFFECT_IDS[name], k, layout, fps=fps, **kw):
+                    bad += 1
+            ok &= bad == 0
+            if fps == 40:
+                # 計時另跑一輪 (不含比對)
+                eng.set(EFFECT_IDS[name], fps=fps, **kw)
+                t0 = time.perf_counter()
+                for k in range(args.frames):
+                    eng.render(view)
+                us = (time.perf_counter() - t0) * 1e6 / args.frames
+                label = f"{name} speed={kw['speed']} scale={kw['scale']}"
+                rows.append((label, f"{'✅' if bad == 0 else f'❌ {bad} bad'}  {us:.0f} us/frame (emu)"))
+            elif bad:
+                rows.append((f"{name} @ {fps} FPS", f"❌ {bad} bad"))
+    st = eng.stats()
+    rows.append(("avg cost per effect (emu)", ", ".join(f"{k} {v} us" for k, v in st["cost_us"].items())))
+    rows.append(("result", "✅ byte-identical to numpy reference" if ok else "❌ mismatch"))
+    _report(f"Procedural effects ({n} LEDs, {eng.frame_size} B/frame, {args.frames} frames)", rows)
+    print("  us/frame: viper 核心在主機以純 Python 執行，只作相對比較；板上實測見 STATUS 的 effect.cost_us")
+    return 0 if ok else 1
+
+
+# ==================== 插值 ====================
+def bench_interp(args):
+    import tempfile
+    import show_pack
+    from lib.show_reader import PackedShowReader
+    from lib.buffer_hub import AtomicStreamHub
+    from lib.interp import Interpolator
+
+    # 短段落、固定次序：任何長度都以漸變 / 流動開場，保證有可混合的相鄰幀，也有硬切與靜止段
+    src = list(_show_frames(args.leds, args.frames, order=("fade", "rainbow", "hold", "chase", "blackout", "sparkle"),
+                            dur=(12, 24)))
+    fs = len(src[0])
+    S, R = args.src_fps, args.fps
+    packed = show_pack.pack_frames(src, fs, fps=S)
+    cuts = []
+    for _ in show_pack.iter_unpack(packed, cuts):
+        pass
+    cutset = set(cuts)
+
+    def expect(t):
+        """第 t 個 tick 的參考輸出與是否混合：a = floor(t*S/R)，w = 餘數相位；b 為硬切或與 a 相同則保持 a"""
+        i, rem = divmod(t * S, R)
+        a = src[i]
+        w = rem * 256 // R
+        if not w or i + 1 in cutset or src[i + 1] == a:
+            return a, False
+        b = src[i + 1]
+        return bytes((x * (256 - w) + y * w) >> 8 for x, y in zip(a, b)), True
+
+    rows = []
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "data.bin")
+        with open(path, "wb") as f:
+            f.write(packed)
+        r = PackedShowReader(fs, chunk=32 * 1024)
+        r.open(path)
+        hub = AtomicStreamHub(fs * args.buffer_frames)
+        ip = Interpolator(fs, R)
+        ip.reset(S, True)
+        out = bytearray(fs)
+        outputs = []
+        bad = rendered = unchanged = want = 0
+        t_us = 0.0
+        t = 0
+        last = (len(src) - 1) * R // S     # 最後一個 a, b 俱全的 tick
+        while t <= last:
+            # Core 0：Hub 空出即補貨
+            if not hub.dirty:
+                n = r.fill(hub.get_write_view())
+                if n:
+                    hub.commit(n, r.hold, r.cuts)
+            t0 = time.perf_counter()
+            st = ip.tick(hub, out)
+            t_us += time.perf_counter() - t0
+            if st == ip.STALLED or st == ip.NONE:
+                continue
+            rendered += st == ip.RENDERED
+            unchanged += st == ip.UNCHANGED
+            ref, mixed = expect(t)
+            want += mixed
+            if bytes(out) != ref:
+                bad += 1
+            outputs.append(bytes(out))
+            t += 1
+        r.close()
+
+    hi = show_pack.pack_frames(outputs, fs, fps=R)
+    ticks = len(outputs)
+    st = ip.stats()
+    rows.append(("source", f"{len(src)} frames @ {S} FPS, {fs} B/frame, {len(cuts)} cuts flagged"))
+    rows.append(("render", f"{ticks} ticks @ {R} FPS: {st['blended']} blended, {unchanged} unchanged, "
+                           f"{rendered - st['blended']} plain"))
+    rows.append(("blended vs reference", f"{st['blended']} / {want}"))
+    rows.append(("mismatch vs reference", f"{bad}"))
+    rows.append(("tick cost (emu)", f"{t_us * 1e6 / max(1, ticks):.0f} us avg"))
+    rows.append(("stream bandwidth", f"{fs * S / 1e3:.1f} kB/s vs {fs * R / 1e3:.1f} kB/s native {R} FPS"))
+    rows.append(("packed storage", f"{len(packed) / 1e3:.1f} kB vs {len(hi) / 1e3:.1f} kB encoded at {R} FPS"))
+    ok = (bad == 0 and st["cuts"] == len([c for c in cuts if c * R // S <= last])
+          and st["blended"] == want and (want > 0 or S == R))
+    rows.append(("result", "✅ output matches reference, blends and cuts checked" if ok
+                 else "❌ mismatch" if bad else "❌ blended ticks off reference (or none produced)"))
+    _report(f"Frame interpolation {S} → {R} FPS ({args.leds} LEDs)", rows)
+    return 0 if ok else 1
+
+
+# ==================== 覆蓋層 ====================
+def _ov_blend(v, o, a, mode):
+    """覆蓋層合成參考 (單通道)，與 LEDController._convert_ov 同一份整數規格"""
+    a += a >> 7
+    if not a:
+        return v
+    if mode == 1:
+        return min(255, v + (o * a >> 8))
+    if mode == 2:
+        o = (v * o + 255) >> 8
+    return (v * (256 - a) + o * a) >> 8
+
+
+def bench_overlay(args):
+    import array
+    from neopixel import NeoPixel
+    from machine import Pin, SPI, I2C
+    from lib.apa102 import APA102
+    from lib.pca9685 import PCA9685
+    from lib.LEDController import LEDController, LEDStreamer
+    from lib.overlay import OverlayLayer, OV_CLEAR, OV_COMMIT, OV_ALPHA_ONLY, OV_COLOR_ONLY, MODES
+
+    n = args.leds
+    q = n // 3
+    counts = (q, q, n - 2 * q)
+    perm = list(range(q))
+    perm[::2] = perm[::2][::-1]        # 蛇形接線式打亂 (WS2812 段)
+
+    def build(fmts, levels=None, remap=False):
+        ws = LEDController('WS2812', {'led_IO': NeoPixel(Pin(0), counts[0]), 'Q': counts[0], 'order': 'GRB', 'fmt': fmts[0]})
+        apa = LEDController('APA102', {'led_IO': APA102(SPI(1), num_leds=counts[1]), 'Q': counts[1], 'fmt': fmts[1]})
+        pca = LEDController('i2c_LED', {'led_IO': PCA9685(I2C(0), n=counts[2]), 'Q': counts[2], 'order': 'W', 'fmt': fmts[2]})
+        st = LEDStreamer([ws, apa, pca])
+        if levels:
+            st.set_levels(**levels)
+        if remap:
+            ws.set_remap(array.array('H', perm))
+        return st
+
+    def outputs(st):
+        return [bytes(c.led.buf) for c in st.controllers]
+
+    def spot(ovl, center, radius, seed):
+        """追光：中心 alpha 255 向外線性衰減，顏色為偽隨機；返回 (start, count, alpha, 像素)"""
+        start = max(0, center - radius)
+        end = min(ovl.n, center + radius)
+        alpha = bytes(max(0, 255 - abs(i - center) * 255 // radius) for i in range(start, end))
+        color = bytes(_pattern(ovl.byte_at(end) - ovl.byte_at(start), seed=seed))
+        return start, end - start, alpha, color
+
+    def composite(ovl, base, o):
+        """參考：先在來源域逐字節合成 (每像素各字節同一 alpha)，再走一般轉換"""
+        buf, alpha, mode = o
+        out = bytearray(base)
+        for i in range(ovl.n):
+            b0, b1 = ovl.byte_at(i), ovl.byte_at(i + 1)
+            for k in range(b0, b1):
+                out[k] = _ov_blend(base[k], buf[k], alpha[i], mode)
+        return out
+
+    rows = []
+    ok = True
+    fmts = ("RGB888", "RGBW8888", "W8")
+    base = _pattern(build(fmts).total_bytes, seed=21)
+    for levels, remap, tag in ((None, False, ""), ({"brightness": 0.6, "gamma": 2.2}, True, " +LUT +remap")):
+        for mode in MODES:
+            st = build(fmts, levels, remap)
+            ref = build(fmts, levels, remap)
+            ovl = OverlayLayer(st.layout())
+            start, count, alpha, color = spot(ovl, q, args.spot, seed=mode + 3)
+            ovl.apply(OV_CLEAR | OV_COMMIT, mode, start, count, alpha + color)
+            st.big_buffer[:] = base
+            o = ovl.begin()
+            st.show_all(o)
+            ovl.end()
+            ref.big_buffer[:] = composite(ovl, base, o)
+            ref.show_all()
+            good = outputs(st) == outputs(ref)
+            ok &= good
+            if tag:
+                if not good:
+                    rows.append((f"{MODES[mode]}{tag}", "❌ MISMATCH"))
+                continue
+            t0 = time.perf_counter()
+            for _ in range(args.frames):
+                st.show_all(ovl.begin())
+                ovl.end()
+            ov_us = (time.perf_counter() - t0) * 1e6 / args.frames
+            t0 = time.perf_counter()
+            for _ in range(args.frames):
+                st.show_all()
+            plain_us = (time.perf_counter() - t0) * 1e6 / args.frames
+            rows.append((f"{MODES[mode]} composite", f"{'✅' if good else '❌'} {ov_us:.0f} us vs {plain_us:.0f} us plain (emu)"))
+
+    # P8：兩層索引先經調色盤解析再混合；參考為調色盤展開的 RGBW8888
+    pal = _pattern(1024, seed=5)
+    ws_p8 = LEDController('WS2812', {'led_IO': NeoPixel(Pin(0), q), 'Q': q, 'order': 'GRB', 'fmt': 'P8'})
+    ws_p8.set_palette(pal)
+    ws_ref = LEDController('WS2812', {'led_IO': NeoPixel(Pin(0), q), 'Q': q, 'order': 'GRB', 'fmt': 'RGBW8888'})
+    idx, oidx = _pattern(q, seed=8), _pattern(q, seed=9)
+    alpha = _pattern(q, seed=10)
+    exp = bytearray(q * 4)
+    for i in range(q):
+        for c in range(4):
+            exp[i * 4 + c] = _ov_blend(pal[idx[i] * 4 + c], pal[oidx[i] * 4 + c], alpha[i], 0)
+    ws_p8.st_load_and_convert(idx, 0, oidx, alpha, 0, 0)
+    ws_ref.st_load_and_convert(exp, 0)
+    good = bytes(ws_p8.led.buf) == bytes(ws_ref.led.buf)
+    ok &= good
+    rows.append(("P8 palette composite", "✅ match" if good else "❌ MISMATCH"))
+
+    # 雙槽語意：未發佈的區段不可見；發佈後的稀疏更新疊在最新狀態上
+    ovl = OverlayLayer(build(fmts).layout())
+    model_a = bytearray(ovl.n)
+    model_c = bytearray(ovl.frame_size)
+    s1 = spot(ovl, q // 2, args.spot, seed=31)
+    s2 = spot(ovl, q + q // 2, args.spot, seed=32)
+    ovl.apply(OV_COMMIT, 0, s1[0], s1[1], s1[2] + s1[3])
+    ovl.apply(OV_ALPHA_ONLY, 0, s2[0], s2[1], s2[2])
+    model_a[s1[0]:s1[0] + s1[1]] = s1[2]
+    model_c[ovl.byte_at(s1[0]):ovl.byte_at(s1[0] + s1[1])] = s1[3]
+    o = ovl.begin()
+    ovl.end()
+    hidden = bytes(o[1]) == bytes(model_a) and bytes(o[0]) == bytes(model_c)
+    ovl.apply(OV_COLOR_ONLY | OV_COMMIT, 0, s2[0], s2[1], s2[3])
+    model_a[s2[0]:s2[0] + s2[1]] = s2[2]
+    model_c[ovl.byte_at(s2[0]):ovl.byte_at(s2[0] + s2[1])] = s2[3]
+    o = ovl.begin()
+    ovl.end()
+    merged = bytes(o[1]) == bytes(model_a) and bytes(o[0]) == bytes(model_c)
+    ovl.apply(OV_CLEAR | OV_COMMIT, 0, 0, 0, b"")
+    cleared = ovl.begin() is None
+    ovl.end()
+    bad_len = not ovl.apply(OV_COMMIT, 0, 0, 4, b"\x00")
+    good = hidden and merged and cleared and bad_len
+    ok &= good
+    rows.append(("double-buffer semantics", "✅ staged / merged / cleared / rejected" if good else
+                 f"❌ staged={hidden} merged={merged} cleared={cleared} rejected={bad_len}"))
+
+    start, count, alpha, color = spot(ovl, q, args.spot, seed=1)
+    upd = 16 + 8 + count + len(color)         # NL3 包頭 / CRC + 0x3015 欄位 + data
+    full = 16 + 4 + ovl.frame_size            # 0x3003 單幀直推
+    rows.append(("spot update on the wire", f"{upd} B vs {full} B full frame ({100 * upd / full:.0f} %)"))
+    rows.append(("result", "✅ fused composite matches reference" if ok else "❌ mismatch"))
+    _report(f"Live overlay layer ({n} LEDs, spot ±{args.spot})", rows)
+    print("  us: viper 轉換在主機以純 Python 執行，只作相對比較")
+    return 0 if ok else 1
+
+
+# ==================== 檔案接收寫回 ====================
+class _BlockFile:
+    """
+    以塊設備成本模型包裝真實檔案 (不真的 sleep)：
+    每次 write = 命令延遲 + 覆蓋塊的編程時間；首尾不對齊的塊需先讀出再整塊重寫 (讀改寫，多一次磨損)
+    """
+    def __init__(self, path, mode, block, lat_us, mbps):
+        self.f = open(path, mode)
+        self.block = block
+        self.lat_us = lat_us
+        self.bps = mbps * 1_000_000
+        self.pos = 0
+        self.cost_us = 0.0
+        self.read_us = 0.0
+        self.cmds = 0
+        self.programs = 0
+        self.rmw = 0
+
+    def seek(self, off, whence=0):
+        self.pos = self.f.seek(off, whence)
+        return self.pos
+
+    def write(self, data):
+        n = self.f.write(data)
+        b = self.block
+        start, end = self.pos, self.pos + n
+        blocks = -(-end // b) - start // b
+        partial = len({k for k, cut in ((start // b, start % b), ((end - 1) // b, end % b)) if cut})
+        self.cost_us += self.lat_us + blocks * b * 1e6 / self.bps + partial * b * 1e6 / self.bps
+        self.cmds += 1
+        self.programs += blocks
+        self.rmw += partial
+        self.pos = end
+        return n
+
+    def readinto(self, buf):
+        n = self.f.readinto(buf)
+        self.read_us += self.lat_us + n * 1e6 / self.bps
+        self.pos += n
+        return n
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+def bench_filerx(args):
+    import hashlib
+    import random
+    import tempfile
+    import lib.file_rx as file_rx
+    from lib.file_rx import FileRx
+
+    cs = 1024
+    rnd = random.Random(3)
+    old = bytes(_pattern(args.kb * 1024, seed=11))
+    new = bytearray(old)
+    span = int(len(new) * args.edit)
+    for k in range(0, len(new) // cs, max(1, len(new) // cs // 8)):     # 8 段分散改動
+        o = k * cs + 100
+        new[o:o + span // 8] = _pattern(span // 8, seed=k + 20)
+    new = bytes(new)
+    n = -(-len(new) // cs)
+
+    # 發送順序：in-order；丟包 (缺口分片在之後第 3 片才補上，同 SACK 快速重傳)；修補 (不變分片以 FILE_SKIP 帶過)
+    order_loss, pend = [], []
+    for i in range(n):
+        if rnd.random() < args.loss:
+            pend.append([i, 3])
+            continue
+        order_loss.append(i)
+        for p_ in pend:
+            p_[1] -= 1
+        while pend and pend[0][1] <= 0:
+            order_loss.append(pend.pop(0)[0])
+    order_loss += [p_[0] for p_ in pend]
+    changed = {i for i in range(n) if new[i * cs:(i + 1) * cs] != old[i * cs:(i + 1) * cs]}
+
+    scenarios = (("in-order", new, list(range(n)), None),
+                 (f"loss {args.loss * 100:.0f}%", new, order_loss, None),
+                 (f"patch {len(changed)}/{n}", new, list(range(n)), changed))
+    profiles = (("SD", 512, args.sd_lat_us, args.sd_mbps), ("flash", 4096, args.flash_lat_us, args.flash_mbps))
+
+    rows = []
+    ok = True
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "data.bin")
+        for prof, block, lat, mbps in profiles:
+            for name, data, order, changed_set in scenarios:
+                for wb in (0, args.wb * 1024):
+                    with open(path, "wb") as f:
+                        f.write(old if changed_set is not None else b"")
+                    files = []
+
+                    def _open(p, mode="rb"):
+                        f = _BlockFile(p, mode, block, lat, mbps)
+                        files.append(f)
+                        return f
+                    file_rx.open = _open
+                    try:
+                        rx = FileRx(wb_size=wb)
+                        t0 = time.perf_counter()
+                        rx.begin({"file_id": 1, "total_size": len(data), "chunk_size": cs, "path": path,
+                                  "sha256": hashlib.sha256(data).digest(),
+                                  "flags": file_rx.F_PATCH if changed_set is not None else 0})
+                        run = None                     # 修補：連續不變分片合併為一個 FILE_SKIP (同 file_sender)
+                        for i in order + [None]:
+                            if i is not None and changed_set is not None and i not in changed_set:
+                                run = run or [i * cs, 0]
+                                run[1] = min(len(data), (i + 1) * cs) - run[0]
+                                continue
+                            if run:
+                                rx.skip({"file_id": 1, "offset": run[0], "length": run[1]})
+                                run = None
+                            if i is not None:
+                                o = i * cs
+                                rx.chunk({"file_id": 1, "offset": o, "data": data[o:o + cs]})
+                        good = rx.end({})
+                        wall = (time.perf_counter() - t0) * 1000
+                    finally:
+                        del file_rx.open
+                    with open(path, "rb") as f:
+                        good = good and f.read() == data
+                    ok &= good
+                    f = files[0]
+                    label = f"{prof:<5} {name:<14} {'wb %dK' % (wb // 1024) if wb else 'direct':<7}"
+                    rows.append((label, f"{f.cmds:>5} cmds {f.programs:>6} blk {f.rmw:>5} rmw "
+                                        f"{f.cost_us / 1000:>8.1f} ms  rd {f.read_us / 1000:>7.1f} ms  "
+                                        f"host {wall:>6.1f} ms  {'✅' if good else '❌'}"))
+
+    _report(f"FileRx write-back: {args.kb} KB, {cs} B chunks "
+            f"(SD {args.sd_lat_us} us + {args.sd_mbps} MB/s / 512 B; flash {args.flash_lat_us} us + {args.flash_mbps} MB/s / 4 KB)", rows)
+    print("  cmds: 寫命令數；blk: 編程塊數 (磨損)；rmw: 首尾不對齊的讀改寫塊；ms: 成本模型累計寫時間")
+    print("  rd: 流式摘要讀回 (修補的不變區段)；host: emu 假檔案系統 (本機檔案) 實際耗時")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mp_Net-Light 主機端基準測試")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("apa102", help="APA102 單趟轉換 + 單次 SPI 輸出")
+    p.add_argument("--leds", type=int, default=300)
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--order", default="WBGR,BGRW", help="逗號分隔；BGRW 為 slave/config.json 出廠設定")
+    p.add_argument("--brightness", type=int, default=31)
+    p.add_argument("--baudrate", type=int, default=8_000_000)
+    p.set_defaults(func=bench_apa102)
+
+    p = sub.add_parser("lut", help="gamma / 亮度 / 白平衡 LUT 相對原始直拷的成本")
+    p.add_argument("--leds", type=int, default=300)
+    p.add_argument("--frames", type=int, default=200)
+    p.add_argument("--repeat", type=int, default=9)
+    p.add_argument("--gamma", type=float, default=2.2)
+    p.add_argument("--brightness", type=float, default=0.8)
+    p.set_defaults(func=bench_lut)
+
+    p = sub.add_parser("pca", help="PCA9685 8→12 bit 感知曲線與時間抖動")
+    p.add_argument("--frames", type=int, default=2000)
+    p.set_defaults(func=bench_pca)
+
+    p = sub.add_parser("i2c", help="PCA9685 差量寄存器寫入與多板批次預算")
+    p.add_argument("--boards", type=int, default=8)
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--change", type=float, default=0.1, help="每幀改變的通道比例")
+    p.add_argument("--budget", type=int, default=0, help="每幀 I2C 時間預算 us (0 = 不限)")
+    p.add_argument("--freq", type=int, default=400_000)
+    p.set_defaults(func=bench_i2c)
+
+    p = sub.add_parser("formats", help="RGB888 / W8 / P8 來源格式與 RGBW8888 輸出一致性")
+    p.add_argument("--leds", type=int, default=300)
+    p.add_argument("--frames", type=int, default=100)
+    p.set_defaults(func=bench_formats)
+
+    p = sub.add_parser("remap", help="remap.bin 重映射 gather 與預排序輸出一致性")
+    p.add_argument("--leds", type=int, default=300)
+    p.add_argument("--frames", type=int, default=100)
+    p.set_defaults(func=bench_remap)
+
+    p = sub.add_parser("reader", help="data.bin 大塊對齊預讀 vs 每次補貨直讀 (SD 成本模型)")
+    p.add_argument("--leds", type=int, default=1000)
+    p.add_argument("--frames", type=int, default=997, help="檔內幀數 (刻意不整除塊大小)")
+    p.add_argument("--loops", type=int, default=3)
+    p.add_argument("--fps", type=int, default=40)
+    p.add_argument("--buffer-frames", type=int, default=1)
+    p.add_argument("--chunk", type=int, default=32, help="預讀塊 KB")
+    p.add_argument("--lat-us", type=int, default=1500, help="每次讀命令延遲 us")
+    p.add_argument("--mbps", type=float, default=10.0, help="持續傳輸 MB/s")
+    p.add_argument("--spike-us", type=int, default=60000, help="偶發長停頓 us")
+    p.add_argument("--spike-every", type=int, default=50, help="每 N 次讀命令出現一次長停頓 (0 = 關)")
+    p.set_defaults(func=bench_reader)
+
+    p = sub.add_parser("pack", help="NLPK 壓縮秀檔：壓縮率、解碼成本與 Seek 正確性")
+    p.add_argument("--leds", type=int, default=336)
+    p.add_argument("--frames", type=int, default=2400, help="幀數 (PXLD 輸入時為上限，0 = 全部)")
+    p.add_argument("--fps", type=int, default=40)
+    p.add_argument("--keyint", type=int, default=200)
+    p.add_argument("--index-max", type=int, default=512, help="關鍵幀索引條目上限")
+    p.add_argument("--buffer-frames", type=int, default=2)
+    p.add_argument("--chunk", type=int, default=32, help="預讀塊 KB")
+    p.add_argument("--seeks", type=int, default=10)
+    p.add_argument("--pxld", help="改用真實 PXLD v3 內容")
+    p.add_argument("--slave", type=int, default=1, help="PXLD Slave ID")
+    p.add_argument("--format", default=None, help="PXLD 輸出格式佈局 (同 PXLDv3Splitter --format)")
+    p.set_defaults(func=bench_pack)
+
+    p = sub.add_parser("effects", help="程序化效果：與 numpy 參考逐字節比對及每效果成本")
+    p.add_argument("--leds", type=int, default=336)
+    p.add_argument("--frames", type=int, default=120)
+    p.set_defaults(func=bench_effects)
+
+    p = sub.add_parser("interp", help="Core 1 插值：低幀率來源以高幀率出幀，與參考逐字節比對")
+    p.add_argument("--leds", type=int, default=336)
+    p.add_argument("--frames", type=int, default=600, help="來源幀數")
+    p.add_argument("--src-fps", type=int, default=20)
+    p.add_argument("--fps", type=int, default=100, help="本地出幀率")
+    p.add_argument("--buffer-frames", type=int, default=2)
+    p.set_defaults(func=bench_interp)
+
+    p = sub.add_parser("overlay", help="即時覆蓋層：轉換中同趟合成與參考比對、雙槽語意、線上用量")
+    p.add_argument("--leds", type=int, default=300)
+    p.add_argument("--spot", type=int, default=24, help="追光半徑 (像素)")
+    p.add_argument("--frames", type=int, default=20)
+    p.set_defaults(func=bench_overlay)
+
+    p = sub.add_parser("filerx", help="FileRx 寫回暫存 vs 每片直寫 (SD / flash 塊設備成本模型)")
+    p.add_argument("--kb", type=int, default=2048, help="檔案大小 KB")
+    p.add_argument("--wb", type=int, default=16, help="寫回暫存 KB")
+    p.add_argument("--loss", type=float, default=0.03, help="丟包率 (缺口分片延後 3 片到達)")
+    p.add_argument("--edit", type=float, default=0.03, help="修補情境的改動比例")
+    p.add_argument("--sd-lat-us", type=int, default=800, help="SD 每次寫命令延遲 us")
+    p.add_argument("--sd-mbps", type=float, default=8.0, help="SD 持續寫入 MB/s")
+    p.add_argument("--flash-lat-us", type=int, default=100, help="flash 每次寫命令延遲 us")
+    p.add_argument("--flash-mbps", type=float, default=1.0, help="flash 編程 MB/s")
+    p.set_defaults(func=bench_filerx)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+show clock 校時精度基準 - 多台虛擬 slave 在 loopback 上對同一台 Server 校時
+═══════════════════════════════════════════════════════
+* Server 端使用 tools/fleet_clock.FleetClock (與 NetBusMaster 相同)，
+  以真實 NL3 封包 (0x1201 HEARTBEAT / 0x1202 HEARTBEAT_ACK) 經 TCP loopback 往返
+* 每台 slave 跑未修改的 slave/lib/show_clock.ShowClock，本地 ticks 由模擬晶振產生
+  (隨機起點偏移 + ±ppm 頻率誤差，30-bit 回繞與 ESP32 一致)
+* 注入抖動：slave 蓋 t1 後、Server 蓋 t3 後各延遲一段指數分佈的隨機時間
+  (模擬 Wi-Fi 排隊；兩個方向各自獨立，往返不對稱)
+* 量測 (以 CLOCK_MONOTONIC 為真值)：
+    - 時鐘誤差：各 slave 的 show 時間估計 - Server 真實 show 時間
+    - 同刻偏差 (skew)：同一瞬間所有 slave 估計值的 最大 - 最小
+    - 排程起播：PLAY start_us 換算回各 slave 本地出幀時刻的真實時間差
+    - 對照：舊式逐台發送 0x300A，各 slave 收包時刻的分佈
+
+為避免 50 個完整韌體進程在單核主機上互相搶佔，本工具只模擬 Core 0 的校時路徑；
+完整韌體的起播對齊見 bench_e2e.py --sync。
+
+用法:
+  python bench_clock.py
+  python bench_clock.py --slaves 50 --duration 60 --jitter-ms 2 --ppm 100
+"""
+import argparse
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+import emu
+emu.install()
+
+from emu import PROJECT_ROOT
+from fleet_clock import FleetClock, MASK32
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from slave.lib.proto import Proto, StreamParser
+from slave.lib.schema_loader import SchemaStore
+from slave.lib.schema_codec import SchemaCodec
+from slave.lib.show_clock import ShowClock, s32
+
+TICKS_MAX = (1 << 30) - 1
+
+
+def _pct(sorted_vals, q):
+    if not sorted_vals:
+        return 0
+    return sorted_vals[min(len(sorted_vals) - 1, int(len(sorted_vals) * q))]
+
+
+class Crystal:
+    """模擬晶振：真實時間 (monotonic ns) → 本地 ticks_us"""
+
+    def __init__(self, t0_ns, offset_us, ppm):
+        self.t0 = t0_ns
+        self.off = offset_us
+        self.rate = ppm * 1e-6
+
+    def ticks(self, t_ns=None):
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+        return (int((t_ns - self.t0) * (1.0 + self.rate)) // 1000 + self.off) & TICKS_MAX
+
+    def true_after(self, d_local_us):
+        """本地經過 d_local_us 對應的真實微秒數"""
+        return d_local_us / (1.0 + self.rate)
+
+
+class Agent(threading.Thread):
+    """一台虛擬 slave 的校時路徑 (HEARTBEAT → ACK → ShowClock.sample)"""
+
+    def __init__(self, idx, port, store, args, t0_ns):
+        super().__init__(daemon=True)
+        rnd = random.Random(args.seed * 1000 + idx)
+        self.idx = idx
+        self.store = store
+        self.args = args
+        self.rnd = rnd
+        self.xtal = Crystal(t0_ns, rnd.randrange(1 << 30), rnd.uniform(-args.ppm, args.ppm))
+        self.clock = ShowClock()
+        self.sock = socket.create_connection(("127.0.0.1", port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.play_ns = None
+        self.stop = False
+
+    def _heartbeat(self):
+        args = {"slave_id": "emu%02d" % self.idx, "uptime_ms": 0, "mem_free": 0,
+                "ws_connected": 1, "t1_us": self.xtal.ticks()}
+        pkt = Proto.pack(0x1201, SchemaCodec.encode(self.store.get(0x1201), args))
+        # 出站抖動：t1 之後才進「網路」
+        time.sleep(self.rnd.expovariate(1.0 / self.args.jitter_ms) / 1000)
+        self.sock.sendall(pkt)
+
+    def run(self):
+        parser = StreamParser()
+        next_ns = time.monotonic_ns() + self.rnd.randrange(self.args.burst_ms) * 1000000
+        while not self.stop:
+            now = time.monotonic_ns()
+            if now >= next_ns:
+                self._heartbeat()
+                period = self.args.sync_ms if self.clock.settled else self.args.burst_ms
+                next_ns = now + period * 1000000
+                continue
+            self.sock.settimeout(max(0.001, (next_ns - now) / 1e9))
+            try:
+                raw = self.sock.recv(4096)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            t4 = self.xtal.ticks()
+            # 舊式 PLAY 的收包時刻同樣經過出站抖動
+            arrived = time.monotonic_ns() + int(self.rnd.expovariate(1.0 / self.args.jitter_ms) * 1e6)
+            if not raw:
+                return
+            parser.feed(raw)
+            for _, _, cmd, payload in parser.pop():
+                if cmd == 0x1202:
+                    a = SchemaCodec.decode(self.store.get(cmd), payload)
+                    self.clock.sample(a["t1_us"], a["t2_us"], a["t3_us"], t4)
+                elif cmd == 0x300A:
+                    self.play_ns = arrived
+
+
+class Server(threading.Thread):
+    """FleetClock 校時服務；每條連線一個執行緒，回覆前注入回程抖動"""
+
+    def __init__(self, store, args):
+        super().__init__(daemon=True)
+        self.store = store
+        self.args = args
+        self.clock = FleetClock()
+        self.srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.srv.bind(("127.0.0.1", 0))
+        self.srv.listen(128)
+        self.port = self.srv.getsockname()[1]
+        self.conns = []
+        self.acks = 0
+
+    def run(self):
+        while True:
+            try:
+                conn, _ = self.srv.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.conns.append(conn)
+            threading.Thread(target=self._serve, args=(conn, len(self.conns)), daemon=True).start()
+
+    def _serve(self, conn, seed):
+        rnd = random.Random(self.args.seed * 7919 + seed)
+        parser = StreamParser()
+        while True:
+            try:
+                raw = conn.recv(4096)
+            except OSError:
+                return
+            t2 = self.clock.now_us()
+            if not raw:
+                return
+            parser.feed(raw)
+            for _, _, cmd, payload in parser.pop():
+                if cmd != 0x1201:
+                    continue
+                args = SchemaCodec.decode(self.store.get(cmd), payload)
+                ack = self.clock.ack(args, t2)
+                pkt = Proto.pack(0x1202, SchemaCodec.encode(self.store.get(0x1202), ack))
+                time.sleep(rnd.expovariate(1.0 / self.args.jitter_ms) / 1000)
+                try:
+                    conn.sendall(pkt)
+                except OSError:
+                    return
+                self.acks += 1
+
+    def truth(self, t_ns):
+        return ((t_ns - self.clock._t0) // 1000) & MASK32
+
+    def send_play_sequential(self, start_us=0):
+        pkt = Proto.pack(0x300A, SchemaCodec.encode(self.store.get(0x300A), {"start_us": start_us}))
+        for conn in list(self.conns):
+            conn.sendall(pkt)
+
+
+def sample_errors(server, agents):
+    """同一瞬間讀取所有已同步 slave 的 show 時間估計誤差 (us)"""
+    t = time.monotonic_ns()
+    truth = server.truth(t)
+    return [s32(a.clock.show_at(a.xtal.ticks(t)) - truth) for a in agents if a.clock.synced]
+
+
+def scheduled_start(server, agents, lead_ms):
+    """PLAY start_us 換算回各 slave 出幀時刻；回傳相對真實起播時刻的誤差 (us)"""
+    t = time.monotonic_ns()
+    start = (server.truth(t) + lead_ms * 1000) & MASK32
+    errs = []
+    for a in agents:
+        now_l = a.xtal.ticks(t)
+        fire_l = a.clock.to_local(start, now_l)
+        d_true = a.xtal.true_after(time.ticks_diff(fire_l, now_l))
+        errs.append(d_true - lead_ms * 1000)
+    return errs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="show clock 校時精度 (loopback 多 slave + 注入抖動)")
+    parser.add_argument("--slaves", type=int, default=50, help="虛擬 slave 數")
+    parser.add_argument("--duration", type=float, default=60.0, help="總時長 (秒)")
+    parser.add_argument("--warmup", type=float, default=30.0, help="暖機秒數 (show clock 收斂，不計入統計)")
+    parser.add_argument("--jitter-ms", type=float, default=2.0, help="單向注入抖動均值 (指數分佈)")
+    parser.add_argument("--ppm", type=float, default=100.0, help="晶振頻率誤差範圍 ±ppm")
+    parser.add_argument("--sync-ms", type=int, default=1000, help="同步後校時間隔 (System.clock_sync_ms)")
+    parser.add_argument("--burst-ms", type=int, default=100, help="定相 burst 間隔 (System.clock_burst_ms)")
+    parser.add_argument("--lead-ms", type=int, default=300, help="排程起播提前量 (sync_lead_ms)")
+    parser.add_argument("--target-ms", type=float, default=2.0, help="同刻偏差合格線")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    # 上百個執行緒共用 GIL：縮短切換間隔，避免蓋章被 GIL 排隊延遲 (那是測試架構的誤差，不是網路)
+    sys.setswitchinterval(0.0002)
+
+    store = SchemaStore(dir_path=os.path.join(PROJECT_ROOT, "slave", "schema"))
+    server = Server(store, args)
+    server.start()
+    t0 = time.monotonic_ns()
+    agents = [Agent(i, server.port, store, args, t0) for i in range(args.slaves)]
+    for a in agents:
+        a.start()
+
+    print(f"🕒 {args.slaves} 台 slave | 抖動 {args.jitter_ms} ms/方向 | 晶振 ±{args.ppm} ppm | "
+          f"校時 {args.sync_ms} ms | {args.duration:.0f} s")
+    errs, skews, starts = [], [], []
+    t_end = time.monotonic() + args.duration
+    t_warm = time.monotonic() + args.warmup
+    while time.monotonic() < t_end:
+        time.sleep(0.2)
+        if time.monotonic() < t_warm:
+            continue
+        e = sample_errors(server, agents)
+        if len(e) < len(agents):
+            continue
+        errs.extend(abs(v) for v in e)
+        skews.append(max(e) - min(e))
+        s = scheduled_start(server, agents, args.lead_ms)
+        starts.append(max(s) - min(s))
+
+    # 對照：舊式逐台發送 PLAY，收包時刻的分佈
+    for a in agents:
+        a.play_ns = None
+    server.send_play_sequential()
+    time.sleep(0.5)
+    arrivals = [a.play_ns for a in agents if a.play_ns is not None]
+    legacy_us = (max(arrivals) - min(arrivals)) / 1000 if arrivals else 0
+
+    for a in agents:
+        a.stop = True
+    unsynced = sum(1 for a in agents if not a.clock.synced)
+    used = sum(a.clock.used for a in agents)
+    total = sum(a.clock.samples for a in agents)
+    rtts = sorted(a.clock.rtt_us for a in agents)
+
+    errs.sort()
+    skews.sort()
+    starts.sort()
+    print(f"   樣本 {used}/{total} 採用 | ACK {server.acks} | RTT 中位 {_pct(rtts, 0.5) / 1000:.2f} ms | "
+          f"未同步 {unsynced}")
+    print(f"{'指標':<22}{'p50':>10}{'p99':>10}{'max':>10}  (ms)")
+    for name, vals in (("時鐘誤差 |err|", errs), ("同刻偏差 skew", skews), ("排程起播偏差", starts)):
+        print(f"{name:<20}{_pct(vals, 0.5) / 1000:>10.3f}{_pct(vals, 0.99) / 1000:>10.3f}"
+              f"{(vals[-1] if vals else 0) / 1000:>10.3f}")
+    print(f"{'舊式逐台 PLAY 收包':<18}{'':>20}{legacy_us / 1000:>10.3f}")
+    worst = max(skews[-1] if skews else 0, starts[-1] if starts else 0) / 1000
+    ok = bool(skews) and worst < args.target_ms and unsynced == 0
+    print(f"{'✅' if ok else '❌'} 最大偏差 {worst:.3f} ms (合格線 {args.target_ms} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
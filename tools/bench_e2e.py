@@ -0,0 +1,969 @@
+#!/usr/bin/env python3
+"""
+端到端基準測試 - 從 Server 發包到 LED 總線寫出 (show_all 完成)
+═══════════════════════════════════════════════════════
+在單台 Linux 主機上：本程式充當 Server (WS 控制 + WS/UDP 數據)，
+以 emu 啟動一台未修改的虛擬 slave (假總線按理論線上時間阻塞)，
+用 0x3003 直推幀掃描 燈數 × 目標 FPS × 傳輸方式 × buffer_frames。
+
+量測方式:
+  * 每幀前 4 字節寫入序號標籤；Core 1 每出一幀由 emu 探針回報 (標籤, 完成時刻)
+    兩端皆取 CLOCK_MONOTONIC，延遲 = 完成時刻 - 發送時刻 (含 buffer_frames 攢包等待)
+  * Core 0 / Core 1 佔用率、斷供 (underrun)、落後 tick 來自 0x1102 的
+    core0_load / core1_load 累計值差分
+
+用法:
+  python bench_e2e.py
+  python bench_e2e.py --leds 300,1000,2000,4000 --fps 30,60 --transport ws,udp --buffer-frames 1,2
+  python bench_e2e.py --strip ws2812 --leds 300,600 --duration 6 --json e2e.json
+  python bench_e2e.py --seek 30 --leds 1000 --fps 40 --buffer-frames 2
+  python bench_e2e.py --sync 4 --leds 300 --fps 40
+  python bench_e2e.py --playlist 4 --leds 1000 --fps 40 --pack
+  python bench_e2e.py --upload 512 --rtt-ms 0,5,20 --loss 0.02 --edit 0.03
+  python bench_e2e.py --mcast 4 --upload 1024 --link-mbps 16 --loss 0.02
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+from emu import PROJECT_ROOT
+from emu import slave as emu_slave
+from emu_slaves import send_discover
+from fleet_clock import FleetClock
+from file_sender import WindowedSender, MulticastSender, RemoteHashes, pick_block_size, plan_patch
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from slave.lib.proto import Proto, StreamParser
+from slave.lib.schema_loader import SchemaStore
+from slave.lib.schema_codec import SchemaCodec
+
+STRIDE = {"RGBW8888": 4, "RGB888": 3, "W8": 1, "P8": 1}
+NL3_OVERHEAD = 9 + 2 + 4          # 包頭 + CRC + frame_id
+MAX_NL3_PAYLOAD = 0xFFFF          # NL3 長度欄位為 u16
+MAX_UDP_PAYLOAD = 65507
+TAIL_FRAMES = 30                  # 起播對齊測試：末段取樣幀數 (台間偏差取中位)
+SYNC_GATE_MS = 2.0                # 起播對齊測試：台間偏差合格線 (與 bench_clock 相同)
+
+
+def _free_port(kind=socket.SOCK_STREAM):
+    s = socket.socket(socket.AF_INET, kind)
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def _pct(sorted_vals, q):
+    if not sorted_vals:
+        return None
+    k = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def _ws_frame(data):
+    l = len(data)
+    hdr = bytearray([0x82])
+    if l <= 125:
+        hdr.append(l)
+    elif l <= 65535:
+        hdr.append(126)
+        hdr.extend(struct.pack(">H", l))
+    else:
+        hdr.append(127)
+        hdr.extend(struct.pack(">Q", l))
+    return bytes(hdr) + data
+
+
+class SlaveLink:
+    """單台虛擬 slave 的 WS 控制通道 (本程式為 Server 端)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.srv.bind(("127.0.0.1", 0))
+        self.srv.listen(1)
+        self.port = self.srv.getsockname()[1]
+        self.conn = None
+        self.clock = None          # FleetClock：設定後回覆 0x1201 校時
+        self.reports = []          # 0x3012 STREAM_BLOCK_REPORT (播放漂移)
+        self.status = None
+        self.status_event = threading.Event()
+        self.ready_event = threading.Event()
+        self.sender = None         # WindowedSender：收到 0x2004 轉給它
+        self.mcast = None          # MulticastSender：收到 0x200B 轉給它 (設備代號 = 本 SlaveLink)
+        self.uplink = None         # Uplink：多台共用的主機上行頻寬
+        self.hashes = RemoteHashes()
+        self.delay = 0.0           # 上行注入延遲 (秒)，模擬 RTT
+        self.loss = 0.0            # FILE_CHUNK 丟包率 (發送端直接丟棄)
+        self.dropped = 0
+        self._delayq = None
+
+    def accept(self, timeout):
+        self.srv.settimeout(timeout)
+        conn, _ = self.srv.accept()
+        conn.settimeout(None)
+        conn.recv(1024)
+        conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=\r\n\r\n")
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.conn = conn
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self):
+        parser = StreamParser(max_len=MAX_NL3_PAYLOAD)
+        buf = bytearray()
+        while True:
+            try:
+                raw = self.conn.recv(65536)
+            except OSError:
+                return
+            t2 = self.clock.now_us() if self.clock else 0
+            if not raw:
+                return
+            buf.extend(raw)
+            while len(buf) >= 2:
+                ln, off = buf[1] & 0x7F, 2
+                if ln == 126:
+                    if len(buf) < 4:
+                        break
+                    ln, off = struct.unpack_from(">H", buf, 2)[0], 4
+                elif ln == 127:
+                    if len(buf) < 10:
+                        break
+                    ln, off = struct.unpack_from(">Q", buf, 2)[0], 10
+                if len(buf) < off + ln:
+                    break
+                parser.feed(bytes(buf[off:off + ln]))
+                buf = buf[off + ln:]
+            for _, _, cmd, payload in parser.pop():
+                if cmd == 0x1102:
+                    args = SchemaCodec.decode(self.store.get(cmd), payload)
+                    self.status = json.loads(args["status_json"])
+                    self.status_event.set()
+                elif cmd == 0x3008:
+                    self.ready_event.set()
+                elif cmd == 0x3012:
+                    self.reports.append(SchemaCodec.decode(self.store.get(cmd), payload))
+                elif cmd == 0x2008:
+                    self.hashes.on_rsp(SchemaCodec.decode(self.store.get(cmd), payload))
+                elif cmd == 0x2004 and self.sender:
+                    self.sender.on_ack(SchemaCodec.decode(self.store.get(cmd), payload))
+                elif cmd == 0x200B and self.mcast:
+                    self.mcast.on_nak(self, SchemaCodec.decode(self.store.get(cmd), payload))
+                elif cmd == 0x1201 and self.clock:
+                    args = SchemaCodec.decode(self.store.get(cmd), payload)
+                    self.send(0x1202, self.clock.ack(args, t2))
+
+    def pkt(self, cmd, args):
+        return Proto.pack(cmd, SchemaCodec.encode(self.store.get(cmd), args))
+
+    def send(self, cmd, args=None):
+        if cmd == 0x2002 and self.loss and random.random() < self.loss:
+            self.dropped += 1
+            return
+        frame = _ws_frame(self.pkt(cmd, args or {}))
+        if self.uplink:
+            self.uplink.take(len(frame))
+        if not self.delay:
+            self.conn.sendall(frame)
+            return
+        if self._delayq is None:
+            self._delayq = queue.Queue()
+            threading.Thread(target=self._delay_loop, daemon=True).start()
+        self._delayq.put((time.monotonic() + self.delay, frame))
+
+    def _delay_loop(self):
+        """按序延遲送出 (固定延遲不改變順序，等同一條長鏈路)"""
+        while True:
+            t, frame = self._delayq.get()
+            dt = t - time.monotonic()
+            if dt > 0:
+                time.sleep(dt)
+            try:
+                self.conn.sendall(frame)
+            except OSError:
+                return
+            finally:
+                self._delayq.task_done()
+
+    def drain(self):
+        """等延遲佇列送完 (之後的指令才不會插隊)"""
+        if self._delayq is not None:
+            self._delayq.join()
+
+    def query_status(self, timeout=3.0):
+        self.status_event.clear()
+        self.send(0x1101, {"query_type": 1})
+        if not self.status_event.wait(timeout):
+            raise TimeoutError("0x1102 STATUS timeout")
+        return self.status
+
+    def wait_ready(self, timeout=5.0):
+        if not self.ready_event.wait(timeout):
+            raise TimeoutError("0x3008 READY timeout")
+        self.ready_event.clear()
+
+    def close(self):
+        for s in (self.conn, self.srv):
+            try:
+                if s:
+                    s.close()
+            except OSError:
+                pass
+
+
+class Uplink:
+    """共用上行鏈路 (令牌桶)：各連線的發送排隊佔用同一頻寬；一次廣播只佔一次 (同一段無線電 / 交換機上行)"""
+
+    def __init__(self, mbps):
+        self.rate = mbps * 1e6 / 8
+        self.t = 0.0
+        self.lock = threading.Lock()
+
+    def take(self, nbytes):
+        with self.lock:
+            self.t = max(self.t, time.monotonic()) + nbytes / self.rate
+            t = self.t
+        dt = t - time.monotonic()
+        if dt > 0:
+            time.sleep(dt)
+
+
+class ProbeSink:
+    """收集 Core 1 出幀探針：tag -> 首次 (完成時刻 ns, 線上時間 us)，另保留全部事件序列"""
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.settimeout(0.2)
+        self.port = self.sock.getsockname()[1]
+        self.shown = {}
+        self.events = []
+        self.cond = threading.Condition()
+        self.running = True
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while self.running:
+            try:
+                data, _ = self.sock.recvfrom(64)
+            except OSError:
+                continue
+            tag, t_ns, wire = struct.unpack("<IQI", data)
+            with self.cond:
+                self.shown.setdefault(tag, (t_ns, wire))
+                self.events.append((tag, t_ns))
+                self.cond.notify_all()
+
+    def wait_tag(self, tag, after_ns, timeout):
+        """等待 after_ns 之後第一次出現 tag 的出幀，返回其完成時刻 (逾時為 None)"""
+        deadline = time.monotonic() + timeout
+        i = 0
+        with self.cond:
+            while True:
+                while i < len(self.events):
+                    t, t_ns = self.events[i]
+                    i += 1
+                    if t == tag and t_ns > after_ns:
+                        return t_ns
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self.cond.wait(left)
+
+    def close(self):
+        self.running = False
+        self.sock.close()
+
+
+class EmuSession:
+    """啟動一台虛擬 slave 並接上本程式的 WS 控制通道；with 區塊結束即停機"""
+
+    def __init__(self, args, store, leds, fps, bf, idx=0, crystal=None):
+        self.link = SlaveLink(store)
+        self.sink = ProbeSink()
+        self.disc_port = _free_port(socket.SOCK_DGRAM)
+        self.root = emu_slave.prepare_root(
+            os.path.join(args.root, "e2e%s" % (idx or "")), idx, discovery_port=self.disc_port,
+            apa102=leds if args.strip == "apa102" else 0,
+            ws2812=leds if args.strip == "ws2812" else 0,
+            pca=0, strips=1,
+            system={"local_fps": fps, "buffer_frames": bf})
+        env = dict(os.environ, NETLIGHT_PROBE=f"127.0.0.1:{self.sink.port}",
+                   NETLIGHT_WIRE="0" if args.no_wire else "1")
+        if crystal:
+            env["NETLIGHT_CLOCK"] = crystal
+        self.log = open(os.path.join(args.root, "e2e_slave.log"), "ab")
+        self.proc = subprocess.Popen([sys.executable, "-u", "-m", "emu.slave", self.root, str(idx)],
+                                     cwd=SCRIPT_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+
+    def connect(self, timeout=15):
+        """DISCOVER 需等 Core 0 綁定端口，重試直到連上"""
+        ws_url = f"ws://127.0.0.1:{self.link.port}/ws"
+        deadline = time.time() + timeout
+        while self.link.conn is None:
+            if time.time() > deadline or self.proc.poll() is not None:
+                return False
+            send_discover(ws_url, [self.disc_port])
+            try:
+                self.link.accept(timeout=0.5)
+            except socket.timeout:
+                pass
+        return True
+
+    def frame_size(self):
+        st = self.link.query_status()
+        return sum(STRIDE.get(f, 4) * n for f, n in st.get("led_layout", []))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.proc.send_signal(signal.SIGINT)
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+        self.sink.close()
+        self.link.close()
+
+
+def run_case(case, args, store):
+    """跑一組參數，返回結果字典 (或帶 skip 原因)"""
+    leds, fps, transport, bf = case["leds"], case["fps"], case["transport"], case["buffer_frames"]
+    res = dict(case)
+
+    with EmuSession(args, store, leds, fps, bf) as emu:
+        if not emu.connect():
+            res["skip"] = "slave did not connect"
+            return res
+        link, sink = emu.link, emu.sink
+
+        # 1. 佈局 -> 單幀 / 整塊 Hub 字節數
+        frame_size = emu.frame_size()
+        hub_size = frame_size * bf
+        res["frame_bytes"] = frame_size
+        limit = MAX_UDP_PAYLOAD if transport == "udp" else MAX_NL3_PAYLOAD
+        if hub_size + NL3_OVERHEAD > limit:
+            res["skip"] = f"packet {hub_size + NL3_OVERHEAD} B > {transport} limit"
+            return res
+
+        data_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if transport == "udp":
+            send = lambda pkt: data_sock.sendto(pkt, ("127.0.0.1", emu.disc_port))
+        else:
+            send = lambda pkt: link.conn.sendall(_ws_frame(pkt))
+
+        # 2. 開播並按目標 FPS 直推 (每包 buffer_frames 幀)
+        body = bytearray(os.urandom(hub_size))
+        link.send(0x300A)
+        time.sleep(0.2)
+        before = link.query_status()
+        t_before = time.monotonic_ns()
+
+        sent = {}
+        seq = 1
+        period_ns = int(1e9 * bf / fps)
+        n_pkts = max(1, int(args.duration * fps / bf))
+        t_next = time.monotonic_ns()
+        for _ in range(n_pkts):
+            for k in range(bf):
+                struct.pack_into("<I", body, k * frame_size, seq + k)
+            pkt = link.pkt(0x3003, {"frame_id": seq, "pixel_data": body})
+            _sleep_until(t_next)
+            t_send = time.monotonic_ns()
+            send(pkt)
+            for k in range(bf):
+                sent[seq + k] = t_send
+            seq += bf
+            t_next += period_ns
+        t_end = time.monotonic_ns()
+
+        # 3. 收尾：最後一包出完 (約 bf+1 個 tick) 即取負載計數，避免把停流後的空轉算進來
+        time.sleep((bf + 1.0) / fps)
+        after = link.query_status()
+        t_after = time.monotonic_ns()
+        link.send(0x3002)
+        time.sleep(0.2)  # 讓探針回報落地
+        data_sock.close()
+
+    # 4. 統計
+    lat = sorted((sink.shown[t][0] - s) / 1e6 for t, s in sent.items() if t in sink.shown)
+    wire = sorted(sink.shown[t][1] / 1e3 for t in sent if t in sink.shown)
+    shown_t = sorted(sink.shown[t][0] for t in sent if t in sink.shown)
+    span = (shown_t[-1] - shown_t[0]) / 1e9 if len(shown_t) > 1 else 0
+    wall_us = (t_after - t_before) / 1e3
+
+    def delta(core, key):
+        return after.get(core, {}).get(key, 0) - before.get(core, {}).get(key, 0)
+
+    res.update({
+        "sent": len(sent),
+        "shown": len(lat),
+        "drop_pct": 100.0 * (len(sent) - len(lat)) / max(1, len(sent)),
+        "send_fps": len(sent) / ((t_end - t_before) / 1e9),
+        "achieved_fps": (len(shown_t) - 1) / span if span else 0.0,
+        "p50_ms": _pct(lat, 0.50),
+        "p99_ms": _pct(lat, 0.99),
+        "wire_ms": _pct(wire, 0.50),
+        "underruns": delta("core1_load", "underruns"),
+        "late": delta("core1_load", "late"),
+        "core0_pct": 100.0 * delta("core0_load", "busy_us") / wall_us,
+        "core1_pct": 100.0 * delta("core1_load", "busy_us") / wall_us,
+    })
+    return res
+
+
+def run_seek(args, store):
+    """
+    Seek 延遲：data.bin 每幀首 4 字節即幀號，播放中 / 暫停中各隨機跳轉若干次，
+    量 0x3004 發出 -> 目標幀 show_all 完成 (主機時鐘) 與 slave 自報的 seek_us
+    """
+    import random
+    leds, fps, bf = _ints(args.leds)[0], _ints(args.fps)[0], _ints(args.buffer_frames)[0]
+    rnd = random.Random(1)
+    with EmuSession(args, store, leds, fps, bf) as emu:
+        if not emu.connect():
+            print("❌ slave did not connect")
+            return None
+        link, sink = emu.link, emu.sink
+        frame_size = emu.frame_size()
+        data = bytearray(os.urandom(frame_size * args.show_frames))
+        for n in range(args.show_frames):
+            struct.pack_into("<I", data, n * frame_size, n)
+        if args.pack:
+            import show_pack
+            fr = [bytes(data[k:k + frame_size]) for k in range(0, len(data), frame_size)]
+            data = show_pack.pack_frames(fr, frame_size, fps=fps)
+        with open(os.path.join(emu.root, "data.bin"), "wb") as f:
+            f.write(data)
+
+        link.send(0x3009, {"file_name": "data.bin", "block_id": 0, "play_mode": 1})
+        link.wait_ready()
+        link.send(0x300A)
+        time.sleep(0.5)
+
+        rows = {"play": [], "pause": []}
+        fw = {"play": [], "pause": []}
+        for mode in ("play", "pause"):
+            link.send(0x3005, {"pause": 1 if mode == "pause" else 0})
+            time.sleep(0.2)
+            for _ in range(args.seek):
+                target = rnd.randrange(args.show_frames)
+                t_send = time.monotonic_ns()
+                link.send(0x3004, {"target_block": 0, "target_frame": target})
+                t_shown = sink.wait_tag(target, after_ns=t_send, timeout=2.0)
+                if t_shown is None:
+                    continue
+                rows[mode].append((t_shown - t_send) / 1e6)
+                fw[mode].append(link.query_status().get("seek_us", -1) / 1e3)
+                time.sleep(0.1 + rnd.random() * 0.2)  # 打散與 Core 1 tick 的相位
+        link.send(0x3002)
+
+    out = {"leds": leds, "fps": fps, "buffer_frames": bf, "frame_bytes": frame_size}
+    print("\n" + "=" * 72)
+    print(f"🏁 STREAM_SEEK -> 目標幀寫出總線 ({args.strip} {leds} LEDs, {fps} FPS, bf={bf}"
+          f"{', NLPK' if args.pack else ''})")
+    print("-" * 72)
+    print(f"  {'mode':<6} {'n':>4} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} | {'fw p50':>8} {'fw max':>8}")
+    for mode in ("play", "pause"):
+        lat, f = sorted(rows[mode]), sorted(fw[mode])
+        out[mode] = {"n": len(lat), "p50_ms": _pct(lat, 0.5), "p99_ms": _pct(lat, 0.99),
+                     "max_ms": lat[-1] if lat else None, "fw_p50_ms": _pct(f, 0.5),
+                     "fw_max_ms": f[-1] if f else None}
+        r = out[mode]
+        print(f"  {mode:<6} {r['n']:>4} {_fmt(r['p50_ms'], '>8.2f')} {_fmt(r['p99_ms'], '>8.2f')} "
+              f"{_fmt(r['max_ms'], '>8.2f')} | {_fmt(r['fw_p50_ms'], '>8.2f')} {_fmt(r['fw_max_ms'], '>8.2f')}")
+    print("=" * 72)
+    print(f"  上限參考: 一個 tick = {1000 / fps:.1f} ms；單幀線上時間見 sweep 報告的 wire 欄")
+    print("  fw: slave 自報 seek_us (收到 0x3004 -> 目標幀 show_all 完成)")
+    return out
+
+
+def run_sync(args, store):
+    """
+    多台起播對齊：各 slave 以 NETLIGHT_CLOCK 模擬不同晶振，經 0x1201/0x1202 對本程式校時；
+    比較舊式逐台 0x300A (收到即播) 與帶 start_us 的排程起播，第 0 幀與末幀寫出總線時刻的分佈
+    (末幀偏差 = 起播偏差 + 播放中累積的節拍漂移)，並彙整 0x3012 回報的殘餘漂移
+    """
+    import random
+    from contextlib import ExitStack
+    leds, fps, bf = _ints(args.leds)[0], _ints(args.fps)[0], _ints(args.buffer_frames)[0]
+    rnd = random.Random(1)
+    clock = FleetClock()
+    with ExitStack() as stack:
+        sessions = []
+        for i in range(args.sync):
+            crystal = f"{rnd.randrange(1 << 30)}:{rnd.uniform(-args.sync_ppm, args.sync_ppm):.1f}"
+            sessions.append(stack.enter_context(EmuSession(args, store, leds, fps, bf, i, crystal)))
+        for emu in sessions:
+            emu.link.clock = clock
+            if not emu.connect():
+                print("❌ slave did not connect")
+                return None
+        frame_size = sessions[0].frame_size()
+        data = bytearray(frame_size * args.show_frames)
+        for n in range(args.show_frames):
+            struct.pack_into("<I", data, n * frame_size, n)
+        for emu in sessions:
+            with open(os.path.join(emu.root, "data.bin"), "wb") as f:
+                f.write(data)
+
+        # 等所有 slave 的 show clock 擬合窗口填滿 (status.clock.synced == 2)
+        deadline = time.time() + args.sync_wait
+        while True:
+            states = [emu.link.query_status().get("clock", {}) for emu in sessions]
+            if all(st.get("synced") == 2 for st in states):
+                break
+            if time.time() > deadline:
+                print(f"⚠️ show clock 未全部收斂: {[st.get('synced') for st in states]}")
+                break
+            time.sleep(1.0)
+
+        def first_frames(start_us):
+            for emu in sessions:
+                emu.link.send(0x3009, {"file_name": "data.bin", "block_id": 0, "play_mode": 1})
+            for emu in sessions:
+                emu.link.wait_ready()
+            t_send = time.monotonic_ns()
+            # 同一輪各台共用一個 start_us (與 NetBusMaster 相同)：逐台取值會把逐台發送耗時變成台間起播偏移
+            start = start_us() if start_us else 0
+            for emu in sessions:
+                emu.link.reports.clear()
+                emu.link.send(0x300A, {"start_us": start})
+            first = [emu.sink.wait_tag(0, after_ns=t_send, timeout=3.0) for emu in sessions]
+            last = [emu.sink.wait_tag(args.show_frames - 1, after_ns=t_send, timeout=play_s + 3.0)
+                    for emu in sessions]
+            for emu in sessions:
+                emu.link.send(0x3002)
+            time.sleep(0.3)
+            # 末段各幀的台間偏差取中位：持續錯 tick 會整段偏移，單次主機卡頓只影響一兩幀
+            tail = []
+            for k in range(max(0, args.show_frames - TAIL_FRAMES), args.show_frames):
+                ts = [emu.sink.wait_tag(k, after_ns=t_send, timeout=0) for emu in sessions]
+                if None not in ts:
+                    tail.append(spread(ts))
+            drift = []
+            for emu in sessions:
+                for r in emu.link.reports[1:]:
+                    ideal = (r["anchor_us"] + round(r["tick_n"] * 1e6 / fps)) & 0xFFFFFFFF
+                    drift.append(abs(((r["show_us"] - ideal + 0x80000000) & 0xFFFFFFFF) - 0x80000000))
+            return ([t for t in first if t is not None], [t for t in last if t is not None], drift,
+                    _pct(sorted(tail), 0.5) if tail else None)
+
+        def spread(ts):
+            return (max(ts) - min(ts)) / 1e6 if ts else None
+
+        play_s = args.show_frames / fps
+        rows = []
+        for _ in range(args.sync_rounds):
+            leg0, leg1, _, _ = first_frames(None)
+            sch0, sch1, drift, tail = first_frames(lambda: clock.at(args.sync_lead))
+            rows.append((spread(leg0), spread(sch0), spread(leg1), spread(sch1), max(drift, default=None), tail))
+        clk = [emu.link.query_status().get("clock", {}) for emu in sessions]
+
+    print("\n" + "=" * 72)
+    print(f"🏁 多台起播對齊：{args.sync} 台 slave 出幀時刻的 最大 - 最小 ({leds} LEDs, {fps} FPS, "
+          f"{args.show_frames} 幀 = {play_s:.1f} s, 晶振 ±{args.sync_ppm} ppm)")
+    print("-" * 72)
+    print(f"  {'mode':<12} {'frame':>6} {'n':>4} {'p50 ms':>8} {'max ms':>8}")
+    out = {"slaves": args.sync, "fps": fps, "frames": args.show_frames, "clock": clk}
+    for col, mode, frame in ((0, "sequential", 0), (1, "start_us", 0),
+                             (2, "sequential", args.show_frames - 1), (3, "start_us", args.show_frames - 1)):
+        v = sorted(r[col] for r in rows if r[col] is not None)
+        out[f"{mode}_{frame}"] = v
+        print(f"  {mode:<12} {frame:>6} {len(v):>4} {_pct(v, 0.5):>8.2f} {v[-1] if v else 0:>8.2f}")
+    tail = sorted(r[5] for r in rows if r[5] is not None)
+    out["start_us_tail"] = tail
+    print(f"  {'start_us':<12} {'末' + str(TAIL_FRAMES) + '幀':>5} {len(tail):>4} {_pct(tail, 0.5) or 0:>8.2f} "
+          f"{tail[-1] if tail else 0:>8.2f}   (每輪取各幀台間偏差的中位)")
+    drift = sorted(r[4] for r in rows if r[4] is not None)
+    print(f"  0x3012 殘餘漂移 |show_us - 理想| 最大: {drift[-1] / 1000 if drift else 0:.2f} ms")
+    print(f"  show clock: " + ", ".join(f"rtt {c.get('rtt_us', 0)}us/{c.get('ppm', 0)}ppm" for c in clk))
+    # 排程起播的台間偏差：第 0 幀或末段 (中位) 達 SYNC_GATE_MS 即失敗，缺樣本亦然
+    worst = [out["start_us_0"][-1] if out["start_us_0"] else None, tail[-1] if len(tail) == len(rows) else None]
+    out["ok"] = all(w is not None and w < SYNC_GATE_MS for w in worst)
+    print(f"  {'✅' if out['ok'] else '❌'} start_us 第 0 幀 / 末段最大偏差 "
+          + " / ".join("-" if w is None else f"{w:.2f}" for w in worst) + f" ms (合格線 {SYNC_GATE_MS:.1f} ms)")
+    print("=" * 72)
+    return out
+
+
+def run_playlist(args, store):
+    """
+    播放清單換檔：N 個短片 (幀首 4 字節 = 片號 << 24 | 幀號)，比較
+    舊式逐片 STOP → SET → READY → PLAY 與 0x3014 播放清單在換檔處的出幀間隔 / 缺幀
+    """
+    leds, fps, bf = _ints(args.leds)[0], _ints(args.fps)[0], _ints(args.buffer_frames)[0]
+    clip_frames = max(2, args.show_frames // args.playlist)
+    with EmuSession(args, store, leds, fps, bf) as emu:
+        if not emu.connect():
+            print("❌ slave did not connect")
+            return None
+        link, sink = emu.link, emu.sink
+        frame_size = emu.frame_size()
+        names = []
+        for c in range(args.playlist):
+            data = bytearray(os.urandom(frame_size * clip_frames))
+            for n in range(clip_frames):
+                struct.pack_into("<I", data, n * frame_size, (c << 24) | n)
+            if args.pack:
+                import show_pack
+                fr = [bytes(data[k:k + frame_size]) for k in range(0, len(data), frame_size)]
+                data = show_pack.pack_frames(fr, frame_size, fps=fps)
+            names.append(f"clip{c}.bin")
+            with open(os.path.join(emu.root, names[-1]), "wb") as f:
+                f.write(data)
+
+        def boundaries(t_from):
+            """各片首幀與前一片末幀的出幀間隔 (ms)，以及缺幀數"""
+            last = (args.playlist - 1) << 24 | (clip_frames - 1)
+            sink.wait_tag(last, after_ns=t_from, timeout=args.playlist * clip_frames / fps + 5)
+            with sink.cond:
+                ev = [(t, ns) for t, ns in sink.events if ns > t_from]
+            gaps, missing = [], 0
+            for c in range(1, args.playlist):
+                a = [ns for t, ns in ev if t == ((c - 1) << 24 | (clip_frames - 1))]
+                b = [ns for t, ns in ev if t == (c << 24)]
+                if not a or not b:
+                    missing += 1
+                    continue
+                gaps.append((b[0] - a[-1]) / 1e6)
+            return gaps, missing
+
+        # 舊式：每片一次 STOP → SET → READY → PLAY
+        t0 = time.monotonic_ns()
+        for name in names:
+            link.send(0x3009, {"file_name": name, "block_id": 0, "play_mode": 0})
+            link.wait_ready()
+            link.send(0x300A)
+            tag = (names.index(name) << 24) | (clip_frames - 1)
+            sink.wait_tag(tag, after_ns=t0, timeout=clip_frames / fps + 5)
+        legacy, miss_l = boundaries(t0)
+        link.send(0x3002)
+        time.sleep(0.3)
+
+        t0 = time.monotonic_ns()
+        items = [{"file": n, "loops": 1} for n in names]
+        link.send(0x3014, {"repeat": 0, "playlist_json": json.dumps(items)})
+        link.wait_ready()
+        link.send(0x300A)
+        gapless, miss_p = boundaries(t0)
+        pl = link.query_status().get("playlist") or {}
+        link.send(0x3002)
+
+    tick = 1000 / fps
+    print("\n" + "=" * 72)
+    print(f"🏁 換檔間隔：{args.playlist} 片 × {clip_frames} 幀 ({leds} LEDs, {fps} FPS, 一個 tick = {tick:.1f} ms"
+          f"{', NLPK' if args.pack else ''})")
+    print("-" * 72)
+    print(f"  {'mode':<10} {'n':>3} {'miss':>5} {'p50 ms':>8} {'max ms':>8}")
+    out = {"clips": args.playlist, "clip_frames": clip_frames, "fps": fps, "playlist_stats": pl}
+    for mode, g, miss in (("SET+PLAY", legacy, miss_l), ("0x3014", gapless, miss_p)):
+        g = sorted(g)
+        out[mode] = g
+        print(f"  {mode:<10} {len(g):>3} {miss:>5} {_pct(g, 0.5):>8.2f} {g[-1] if g else 0:>8.2f}")
+    print(f"  playlist: switches {pl.get('switches')} late {pl.get('late')} preload {pl.get('preload_us')} us")
+    print("=" * 72)
+    return out
+
+
+def run_upload(args, store):
+    """
+    檔案上傳：同一檔案在注入的 RTT / 丟包下，比較停等 (視窗 1) 與視窗化管線上傳的吞吐，
+    再改動 --edit 比例的連續區段做一次差量重新部署 (FILE_HASH + 修補)，並核對 slave 落盤內容
+    """
+    leds, fps, bf = _ints(args.leds)[0], _ints(args.fps)[0], _ints(args.buffer_frames)[0]
+    data = os.urandom(args.upload * 1024)
+    stop_wait = {"max_window": 1, "init_window": 1}
+    modes = (("stop-wait", stop_wait), ("window", {}), ("patch", {}), ("patch-head", stop_wait))
+    edited = bytearray(data)
+    n = int(len(data) * args.edit)
+    edited[len(data) // 3:len(data) // 3 + n] = os.urandom(n)
+    # patch-head 只改檔頭 (相對 patch 後的遠端則為檔頭 + 中段)，檔尾整段不變並以停等視窗送出：
+    # 最後一個改動分片必佔滿視窗，其 ACK 即確認全檔，檔尾的 FILE_SKIP 須在此之後補送
+    head = bytearray(data)
+    head[:n] = os.urandom(n)
+    rows = []
+    with EmuSession(args, store, leds, fps, bf) as emu:
+        if not emu.connect():
+            print("❌ slave did not connect")
+            return None
+        link = emu.link
+        for rtt in _ints(args.rtt_ms):
+            for mode, kw in modes:
+                link.delay, link.loss, link.dropped = rtt / 1000, args.loss, 0
+                name = f"up_{mode}_{rtt}.bin"
+                sender = WindowedSender(link.send, **kw)
+                link.sender = sender
+                body, skip, t0 = data, None, time.monotonic()
+                if mode.startswith("patch"):
+                    # 上一輪 window 已把原檔送上去：只送改動區段
+                    name, body = f"up_window_{rtt}.bin", bytes(edited if mode == "patch" else head)
+                    link.hashes.request(link.send, "/" + name, pick_block_size(len(body)))
+                    skip = plan_patch(body, link.hashes.wait(), sender.chunk_size)
+                try:
+                    st = sender.send_file(body, "/" + name, skip=skip)
+                    st["seconds"] = round(time.monotonic() - t0, 3)   # 含摘要交換
+                except TimeoutError as e:
+                    st = {"error": str(e)}
+                link.sender = None
+                link.drain()
+                link.delay, link.loss = 0.0, 0.0
+                rx = link.query_status(timeout=10).get("file_rx") or {}   # 排在 FILE_END 之後：回覆時已校驗落盤
+                st["rehashed"] = rx.get("rehashed")
+                try:
+                    with open(os.path.join(emu.root, name), "rb") as f:
+                        st["ok"] = f.read() == body
+                except OSError:
+                    st["ok"] = False
+                st.update(mode=mode, rtt_ms=rtt, dropped=link.dropped)
+                rows.append(st)
+                print(f"⏱️  {mode} rtt {rtt} ms: {st.get('seconds', '-')} s", flush=True)
+
+    print("\n" + "=" * 88)
+    print(f"🏁 檔案上傳：{args.upload} KB, 1024 B 分片, 丟包 {args.loss * 100:.1f}%, patch 改動 {args.edit * 100:.1f}%")
+    print("-" * 88)
+    print(f"  {'mode':<10} {'rtt':>4} {'KB/s':>8} {'sent KB':>8} {'sec':>7} {'win':>4} {'infl':>5} "
+          f"{'srtt':>7} {'drop':>5} {'retx':>5} {'fast':>5} {'rto':>4} {'ok':>3} {'rehash':>6}")
+    for r in rows:
+        if "error" in r:
+            print(f"  {r['mode']:<10} {r['rtt_ms']:>4} {r['error']}")
+            continue
+        print(f"  {r['mode']:<10} {r['rtt_ms']:>4} {r['kbps']:>8.1f} {r['bytes'] // 1024:>8} {r['seconds']:>7.2f} {r['window']:>4} "
+              f"{r['max_inflight']:>5} {_fmt(r['srtt_ms'], '>7.2f')} {r['dropped']:>5} {r['retransmits']:>5} "
+              f"{r['fast_retransmits']:>5} {r['timeouts']:>4} {'✔' if r['ok'] else '✘':>3} "
+              f"{'✘' if r['rehashed'] else '-':>6}")
+    print("=" * 88)
+    print("  patch: 先以 FILE_HASH 取回遠端區塊摘要，只送變動分片 (sec 含摘要交換)；patch-head 只改檔頭 (停等)，檔尾整段不變")
+    print("  rehash: slave 於 FILE_END 整檔重算摘要 (流式摘要未覆蓋全檔)；修補模式出現即失敗")
+    print("  rtt: 注入的上行延遲；win / infl: 結束時視窗 / 最大在途分片；retx: 重傳 (fast: SACK 快速重傳, rto: 逾時)")
+    # 落盤內容須一致；修補模式的不變區段 (含檔尾) 須經 FILE_SKIP 讀回補進流式摘要，不得整檔重算
+    ok = all(r.get("ok") and not (r["mode"].startswith("patch") and r["rehashed"]) for r in rows)
+    print(f"  {'✅' if ok else '❌'} 落盤一致且修補模式無整檔重算")
+    return {"kb": args.upload, "loss": args.loss, "edit": args.edit, "results": rows, "ok": ok}
+
+
+def run_mcast(args, store):
+    """
+    一對多分發：同一檔案送往 --mcast 台 slave，比較單台單播、逐台並行單播 (舊 Step 3) 與 NAK 式廣播的總耗時
+    --link-mbps 模擬共用的主機上行頻寬 (迴環網路本身不設限)；廣播以逐台 sendto 各 discovery 端口模擬，
+    --loss 為每台各自獨立的丟包率；完成後核對每台 slave 落盤內容
+    """
+    from contextlib import ExitStack
+    leds, fps, bf = _ints(args.leds)[0], _ints(args.fps)[0], _ints(args.buffer_frames)[0]
+    data = os.urandom((args.upload or 1024) * 1024)
+    uplink = Uplink(args.link_mbps) if args.link_mbps else None
+    rows = []
+    with ExitStack() as stack:
+        sessions = [stack.enter_context(EmuSession(args, store, leds, fps, bf, i)) for i in range(args.mcast)]
+        for emu in sessions:
+            if not emu.connect():
+                print("❌ slave did not connect")
+                return None
+            emu.link.uplink = uplink
+        links = [emu.link for emu in sessions]
+        udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        dropped = [0]
+
+        def bcast(cmd, a):
+            pkt = Proto.pack(cmd, SchemaCodec.encode(store.get(cmd), a))
+            if uplink:
+                uplink.take(len(pkt))
+            for emu in sessions:
+                if args.loss and random.random() < args.loss:
+                    dropped[0] += 1
+                    continue
+                udp.sendto(pkt, ("127.0.0.1", emu.disc_port))
+
+        def unicast_one(link, name):
+            sender = WindowedSender(link.send)
+            link.sender = sender
+            try:
+                return sender.send_file(data, "/" + name)
+            finally:
+                link.sender = None
+
+        for mode in ("unicast-1", f"unicast-{len(links)}", f"mcast-{len(links)}"):
+            name = mode.replace("-", "_") + ".bin"
+            targets = links[:1] if mode == "unicast-1" else links
+            for link in links:
+                link.loss, link.dropped = args.loss, 0
+            dropped[0] = 0
+            st = {}
+            t0 = time.monotonic()
+            try:
+                if mode.startswith("mcast"):
+                    mc = MulticastSender(bcast, lambda link, cmd, a: link.send(cmd, a), rate_kbps=args.mcast_rate)
+                    for link in targets:
+                        link.mcast = mc
+                    st = mc.send_file(data, "/" + name, targets)
+                    st["failed"] = len(st["failed"])
+                else:
+                    threads = [threading.Thread(target=unicast_one, args=(link, name)) for link in targets]
+                    for t in threads:
+                        t.start()
+                    for t in threads:
+                        t.join()
+            except TimeoutError as e:
+                st["error"] = str(e)
+            for link in links:
+                link.mcast = None
+            for link in targets:
+                link.query_status(timeout=10)   # 排在 FILE_END 之後：回覆時已校驗落盤
+            st["seconds"] = round(time.monotonic() - t0, 3)
+            ok = 0
+            for emu in sessions[:len(targets)]:
+                try:
+                    with open(os.path.join(emu.root, name), "rb") as f:
+                        ok += f.read() == data
+                except OSError:
+                    pass
+            st.update(mode=mode, slaves=len(targets), ok=ok,
+                      dropped=dropped[0] + sum(link.dropped for link in links))
+            rows.append(st)
+            print(f"⏱️  {mode}: {st['seconds']} s", flush=True)
+        udp.close()
+
+    one = rows[0]["seconds"]
+    print("\n" + "=" * 88)
+    print(f"🏁 一對多分發：{len(data) // 1024} KB × {args.mcast} 台, 上行 "
+          f"{args.link_mbps or '不限'} Mbps, 丟包 {args.loss * 100:.1f}%, 廣播限速 {args.mcast_rate} KB/s")
+    print("-" * 88)
+    print(f"  {'mode':<12} {'slaves':>6} {'sec':>7} {'× 1台':>6} {'rounds':>6} {'repair':>6} {'KB/s':>6} {'drop':>6} {'ok':>5}")
+    for r in rows:
+        if "error" in r:
+            print(f"  {r['mode']:<12} {r['slaves']:>6} {r['error']}")
+            continue
+        print(f"  {r['mode']:<12} {r['slaves']:>6} {r['seconds']:>7.2f} {r['seconds'] / one:>6.2f} "
+              f"{r.get('rounds', '-'):>6} {r.get('repairs', '-'):>6} {r.get('rate_kbps', '-'):>6} {r['dropped']:>6} "
+              f"{r['ok']:>3}/{r['slaves']}")
+    print("=" * 88)
+    print("  unicast-N: 每台一條 WindowedSender 並行 (舊 Step 3)；mcast: 分片廣播一次，FILE_NAK 輪詢補洞")
+    print("  rounds: NAK 輪詢次數；repair: 補洞重播的分片數 (4 KB)；KB/s: 結束時的廣播限速；× 1台: 相對單台單播的耗時")
+    return {"kb": len(data) // 1024, "slaves": args.mcast, "link_mbps": args.link_mbps,
+            "loss": args.loss, "results": rows}
+
+
+def _sleep_until(t_ns):
+    while True:
+        dt = t_ns - time.monotonic_ns()
+        if dt <= 0:
+            return
+        time.sleep(dt / 1e9)
+
+
+def _fmt(v, spec):
+    return "-" if v is None else format(v, spec)
+
+
+def print_report(rows, strip):
+    print("\n" + "=" * 118)
+    print(f"🏁 End-to-End: send_pkt -> show_all ({strip})")
+    print("-" * 118)
+    print(f"{'leds':>5} {'fps':>4} {'tx':>4} {'bf':>3} | {'sent':>5} {'shown':>5} {'drop%':>6} | "
+          f"{'send':>6} {'got':>6} | {'p50ms':>7} {'p99ms':>7} {'wire':>6} | "
+          f"{'under':>5} {'late':>5} | {'C0%':>5} {'C1%':>5}")
+    print("-" * 118)
+    for r in rows:
+        head = f"{r['leds']:>5} {r['fps']:>4} {r['transport']:>4} {r['buffer_frames']:>3} | "
+        if "skip" in r:
+            print(head + f"skipped: {r['skip']}")
+            continue
+        print(head +
+              f"{r['sent']:>5} {r['shown']:>5} {r['drop_pct']:>6.1f} | "
+              f"{r['send_fps']:>6.1f} {r['achieved_fps']:>6.1f} | "
+              f"{_fmt(r['p50_ms'], '>7.2f')} {_fmt(r['p99_ms'], '>7.2f')} {_fmt(r['wire_ms'], '>6.2f')} | "
+              f"{r['underruns']:>5} {r['late']:>5} | {r['core0_pct']:>5.1f} {r['core1_pct']:>5.1f}")
+    print("=" * 118)
+    print("  p50/p99: 發送 -> show_all 完成 (含攢包等待與線上時間)；wire: 單幀理論線上時間 (ms)")
+    print("  under: Core 1 到點無幀可出；late: tick 落後超過一個間隔；C0/C1: 累計工作時間 / 牆鐘")
+
+
+def _ints(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mp_Net-Light 端到端延遲 / 吞吐基準測試")
+    parser.add_argument("--leds", default="300,1000,2000,4000", help="燈數列表")
+    parser.add_argument("--fps", default="30,60", help="目標 FPS 列表 (同時設為 slave local_fps)")
+    parser.add_argument("--transport", default="ws,udp", help="數據通道: ws, udp")
+    parser.add_argument("--buffer-frames", default="1,2", help="buffer_frames 列表")
+    parser.add_argument("--strip", choices=("apa102", "ws2812"), default="apa102", help="單路燈條類型")
+    parser.add_argument("--duration", type=float, default=4.0, help="每組推流秒數")
+    parser.add_argument("--no-wire", action="store_true", help="假總線不模擬線上時間 (只量軟體路徑)")
+    parser.add_argument("--root", default=os.path.join("/tmp", "netlight_e2e"), help="虛擬根目錄")
+    parser.add_argument("--json", default=None, help="另存 JSON 報告，供不同版本比較")
+    parser.add_argument("--seek", type=int, default=0,
+                        help="改測 STREAM_SEEK：播放中 / 暫停中各跳轉 N 次 (取各列表第一個值)")
+    parser.add_argument("--show-frames", type=int, default=600, help="Seek 測試的 data.bin 幀數")
+    parser.add_argument("--pack", action="store_true", help="Seek 測試的 data.bin 改用 NLPK 壓縮格式")
+    parser.add_argument("--playlist", type=int, default=0,
+                        help="> 0 時改跑播放清單換檔測試 (片數，總幀數取 --show-frames)")
+    parser.add_argument("--sync", type=int, default=0,
+                        help="> 0 時改跑多台起播對齊測試 (slave 台數，各自模擬不同晶振)")
+    parser.add_argument("--sync-rounds", type=int, default=5, help="起播對齊測試輪數")
+    parser.add_argument("--sync-lead", type=int, default=300, help="排程起播提前量 ms (sync_lead_ms)")
+    parser.add_argument("--sync-wait", type=float, default=60.0, help="等待 show clock 收斂的上限秒數")
+    parser.add_argument("--upload", type=int, default=0,
+                        help="> 0 時改跑檔案上傳測試 (KB)，比較停等與視窗化上傳")
+    parser.add_argument("--rtt-ms", default="0,5,20", help="上傳測試注入的延遲列表 (ms)")
+    parser.add_argument("--loss", type=float, default=0.0, help="上傳測試的 FILE_CHUNK 丟包率 (0~1)")
+    parser.add_argument("--edit", type=float, default=0.03, help="差量部署測試改動的比例 (0~1)")
+    parser.add_argument("--mcast", type=int, default=0,
+                        help="一對多分發測試的 slave 台數 (>0 啟用；檔案大小取 --upload，預設 1024 KB)")
+    parser.add_argument("--mcast-rate", type=int, default=1024, help="廣播限速 KB/s")
+    parser.add_argument("--link-mbps", type=float, default=0.0, help="模擬共用主機上行頻寬 Mbps (0 = 不限)")
+    parser.add_argument("--sync-ppm", type=float, default=100.0, help="起播對齊測試的晶振誤差範圍 ±ppm")
+    args = parser.parse_args()
+
+    os.makedirs(args.root, exist_ok=True)
+    store = SchemaStore(dir_path=os.path.join(PROJECT_ROOT, "slave", "schema"))
+
+    if args.seek or args.sync or args.playlist or args.upload or args.mcast:
+        run = (run_seek if args.seek else run_sync if args.sync else
+               run_playlist if args.playlist else run_mcast if args.mcast else run_upload)
+        out = run(args, store)
+        if args.json and out:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(out, f, indent=2)
+        # 有通過判定的測試 (out["ok"]) 未通過時以非零碼結束
+        sys.exit(0 if out is None or out.get("ok", True) else 1)
+
+    cases = [{"leds": n, "fps": f, "transport": t, "buffer_frames": b}
+             for n in _ints(args.leds) for f in _ints(args.fps)
+             for t in args.transport.split(",") for b in _ints(args.buffer_frames)]
+    rows = []
+    for i, case in enumerate(cases, 1):
+        print(f"⏱️  [{i}/{len(cases)}] {case}", flush=True)
+        rows.append(run_case(case, args, store))
+
+    print_report(rows, args.strip)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"strip": args.strip, "wire": not args.no_wire,
+                       "duration": args.duration, "results": rows}, f, indent=2)
+        print(f"💾 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
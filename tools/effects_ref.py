@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Effect reference - slave/lib/effects.EffectEngine 的主機端 numpy 參考實作
+═══════════════════════════════════════════════════════
+- 與板上核心同一份整數規格 (無浮點)，輸出應逐字節一致
+- 第 k 幀的相位 = k * speed * 256 // fps (mod 65536)，與引擎餘數累進等價
+- 供 bench.py effects 比對，亦可在 Server 端預覽效果
+
+用法:
+  python effects_ref.py rainbow --leds 60 --frames 3
+"""
+import argparse
+
+import numpy as np
+
+EFFECTS = {1: "solid", 2: "rainbow", 3: "chase", 4: "breathe", 5: "noise"}
+EFFECT_IDS = {v: k for k, v in EFFECTS.items()}
+
+
+def phase_at(k, speed, fps):
+    return (k * (speed & 0xFFFF) * 256 // max(1, fps)) & 0xFFFF
+
+
+def _smooth8(x):
+    return (x * x * (768 - 2 * x)) >> 16
+
+
+def _blend(c1, c2, w):
+    """w: 0..256 (陣列或純量) -> 每像素 RGB (n, 3)"""
+    w = np.asarray(w, dtype=np.int64).reshape(-1, 1)
+    return (np.asarray(c1, dtype=np.int64) * w + np.asarray(c2, dtype=np.int64) * (256 - w)) >> 8
+
+
+def _hash(c, t):
+    h = (c * 0x9E37 + t * 0x7F4B + 0x3A5D) & 0xFFFF
+    h ^= h >> 7
+    h = (h * 0x2F9B) & 0xFFFF
+    return (h ^ (h >> 8)) & 255
+
+
+def render_rgb(effect, n, phase, scale=0, param=0, c1=(255, 255, 255), c2=(0, 0, 0)):
+    """邏輯 RGB888 (n, 3) int64"""
+    i = np.arange(n, dtype=np.int64)
+    name = EFFECTS[effect]
+    if name == "solid":
+        return np.tile(np.asarray(c1, dtype=np.int64), (n, 1))
+    if name == "rainbow":
+        h = ((i * scale >> 8) + (phase >> 8)) & 255
+        reg = (h * 6) >> 8
+        rem = (h * 6) & 255
+        v = np.full(n, param & 255, dtype=np.int64)
+        t = (v * rem) >> 8
+        q = (v * (255 - rem)) >> 8
+        z = np.zeros(n, dtype=np.int64)
+        conds = [reg == 0, reg == 1, reg == 2, reg == 3, reg == 4]
+        r = np.select(conds, [v, q, z, z, t], v)
+        g = np.select(conds, [t, v, v, q, z], z)
+        b = np.select(conds, [z, z, t, v, v], q)
+        return np.stack([r, g, b], axis=1)
+    if name == "chase":
+        per = max(1, min(scale, 32767))
+        width = max(1, min(param, per))
+        step = 65536 // width
+        head = (phase * per) >> 16
+        dist = head - i % per
+        dist = np.where(dist < 0, dist + per, dist)
+        lit = dist < width
+        w = np.where(lit, 256 - ((dist * step) >> 8), 0)
+        out = _blend(c1, c2, w)
+        out[~lit] = c2
+        return out
+    if name == "breathe":
+        x = phase >> 8
+        tri = x * 2 if x < 128 else (255 - x) * 2
+        fl = param & 255
+        lv = fl + ((_smooth8(tri) * (256 - fl)) >> 8)
+        lv += lv >> 7
+        return np.tile(_blend(c1, c2, lv), (n, 1))
+    if name == "noise":
+        x = i * scale
+        cell = (x >> 8) & 0xFFFF
+        sx = _smooth8(x & 255)
+        t0 = (phase >> 8) & 255
+        t1 = (t0 + 1) & 255
+        st = _smooth8(phase & 255)
+        c1n = (cell + 1) & 0xFFFF
+        a = (_hash(cell, t0) * (256 - sx) + _hash(c1n, t0) * sx) >> 8
+        b = (_hash(cell, t1) * (256 - sx) + _hash(c1n, t1) * sx) >> 8
+        v = (a * (256 - st) + b * st) >> 8
+        return _blend(c1, c2, v + (v >> 7))
+    raise ValueError(effect)
+
+
+def pack(rgb, layout):
+    """RGB (n, 3) -> 按佈局打包的來源幀 bytes (RGBW8888 的 W = 0；W8 / P8 取亮度)"""
+    out = []
+    base = 0
+    for fmt, count in layout:
+        seg = rgb[base:base + count]
+        base += count
+        if fmt == "RGB888":
+            out.append(seg.astype(np.uint8).tobytes())
+        elif fmt in ("W8", "P8"):
+            luma = (seg[:, 0] * 77 + seg[:, 1] * 150 + seg[:, 2] * 29) >> 8
+            out.append(luma.astype(np.uint8).tobytes())
+        else:
+            px = np.zeros((count, 4), dtype=np.uint8)
+            px[:, :3] = seg
+            out.append(px.tobytes())
+    return b"".join(out)
+
+
+def render_frame(effect, k, layout, speed=0, scale=0, param=0, c1=(255, 255, 255), c2=(0, 0, 0), fps=40):
+    """第 k 幀 (自 EFFECT_SET 起算) 的來源幀"""
+    n = sum(c for _, c in layout)
+    rgb = render_rgb(effect, n, phase_at(k, speed, fps), scale, param, c1, c2)
+    assert rgb.min() >= 0 and rgb.max() <= 255
+    return pack(rgb, layout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="程序化效果 numpy 參考")
+    parser.add_argument("effect", choices=list(EFFECT_IDS))
+    parser.add_argument("--leds", type=int, default=60)
+    parser.add_argument("--frames", type=int, default=3)
+    parser.add_argument("--fps", type=int, default=40)
+    parser.add_argument("--speed", type=int, default=64)
+    parser.add_argument("--scale", type=int, default=256)
+    parser.add_argument("--param", type=int, default=255)
+    args = parser.parse_args()
+    layout = [("RGB888", args.leds)]
+    for k in range(args.frames):
+        f = render_frame(EFFECT_IDS[args.effect], k, layout, args.speed, args.scale, args.param, fps=args.fps)
+        print(f"#{k}: {f[:24].hex()}...")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+emu - 在 PC (CPython) 上運行 slave/ 代碼的硬體替身
+═══════════════════════════════════════════════════════
+用法:
+    import emu
+    emu.install()               # 注入 micropython / machine / neopixel / network / utime ...
+    from lib.apa102 import APA102
+
+    emu.install(root="/tmp/s0") # 另外把 "/schema"、"/data.bin" 等板上路徑映射到 root 下
+                                # 並允許多個進程共用 discovery 端口 (見 emu.slave)
+"""
+import binascii
+import gc
+import json
+import os
+import sys
+
+EMU_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.abspath(os.path.join(EMU_DIR, "..", ".."))
+SLAVE_DIR = os.path.join(PROJECT_ROOT, "slave")
+
+# 虛擬機回報的 RAM (ESP32-P4 + PSRAM 量級)
+MEM_TOTAL = 8 * 1024 * 1024
+
+_installed = False
+
+
+def _gc_shim():
+    """CPython 的 gc 沒有 mem_free / mem_alloc；以固定總量減去 Python 物件數估算"""
+    if not hasattr(gc, "mem_free"):
+        gc.mem_free = lambda: max(0, MEM_TOTAL - len(gc.get_objects()) * 64)
+        gc.mem_alloc = lambda: MEM_TOTAL - gc.mem_free()
+        gc.threshold = lambda *args: -1
+
+
+def install(slave_dir=SLAVE_DIR, root=None):
+    """註冊替身模組並把 slave 根目錄 (與其 lib/) 加入 sys.path"""
+    global _installed
+    if _installed:
+        return
+    from . import micropython, machine, neopixel, clock, network, esp, esp32, btree, webrepl
+    micropython.install()
+    sys.modules["utime"] = clock.install()
+    for mod in (machine, neopixel, network, esp, esp32, btree, webrepl):
+        sys.modules[mod.__name__.rsplit(".", 1)[-1]] = mod
+    sys.modules["ubinascii"] = binascii
+    sys.modules["ujson"] = json
+    _gc_shim()
+
+    if root is not None:
+        from . import vfs, net
+        vfs.install(root)
+        sys.modules["usocket"] = net.install()
+    else:
+        import socket
+        sys.modules["usocket"] = socket
+
+    for p in (os.path.join(slave_dir, "lib"), slave_dir):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+    _installed = True
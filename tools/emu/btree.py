@@ -0,0 +1,33 @@
+"""
+MicroPython `btree` 模組的 PC 替身
+═══════════════════════════════════════════════════════
+以 JSON 存放在傳入的文件對象中，flush / close 時整體寫回。
+"""
+import json
+
+
+class _DB(dict):
+    def __init__(self, f):
+        super().__init__()
+        self._f = f
+        try:
+            f.seek(0)
+            raw = f.read()
+            if raw:
+                self.update({k.encode(): v.encode() for k, v in json.loads(raw).items()})
+        except ValueError:
+            pass
+
+    def flush(self):
+        data = json.dumps({k.decode(): v.decode() for k, v in self.items()}).encode()
+        self._f.seek(0)
+        self._f.write(data)
+        self._f.truncate()
+        self._f.flush()
+
+    def close(self):
+        self.flush()
+
+
+def open(stream, **kwargs):
+    return _DB(stream)
@@ -0,0 +1,91 @@
+"""
+MicroPython `time` 擴展的 PC 替身
+═══════════════════════════════════════════════════════
+把 ticks_ms / ticks_us / ticks_diff / sleep_ms ... 補到標準 time 模組上，
+ticks 週期與 ESP32 port 一致 (2**30)，可以暴露回繞 (wrap-around) 相關的錯誤。
+NETLIGHT_CLOCK="offset_us:ppm" 模擬本機晶振：ticks 起點偏移與頻率誤差 (sleep 一併按本地時間計)。
+cpu_now_ns() 為「本執行緒獨佔一顆 CPU」時的此刻：多台虛擬機共用主機核心的排隊不計入 (見 machine._wire)。
+"""
+import os
+import threading
+import time
+
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+_T0 = time.monotonic_ns()
+
+
+def _crystal(spec):
+    if not spec:
+        return 0, 0.0
+    off, _, ppm = spec.partition(":")
+    return int(off or 0), float(ppm or 0) * 1e-6
+
+
+_OFFSET_US, _RATE = _crystal(os.environ.get("NETLIGHT_CLOCK"))
+
+
+def _local_us():
+    return int((time.monotonic_ns() - _T0) * (1.0 + _RATE)) // 1000 + _OFFSET_US
+
+
+def ticks_us():
+    return _local_us() & TICKS_MAX
+
+
+def ticks_ms():
+    return (_local_us() // 1000) & TICKS_MAX
+
+
+def ticks_cpu():
+    return ticks_us()
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+# 各執行緒最近一次 sleep 的到期時刻 (CLOCK_MONOTONIC ns) 與返回時的執行緒 CPU 時間
+_wake = threading.local()
+
+
+def sleep_until_ns(due):
+    """睡到 due (CLOCK_MONOTONIC ns)，並記下到期時刻：真機的定時器準時喚醒，之後只差本執行緒的實際工作"""
+    d = due - time.monotonic_ns()
+    if d > 0:
+        time.sleep(d / 1e9)
+    _wake.due = due
+    _wake.cpu = time.thread_time_ns()
+
+
+def cpu_now_ns():
+    """上次 sleep 的到期時刻 + 其後本執行緒實際用掉的 CPU 時間 (不晚於真實此刻)；未 sleep 過即真實此刻"""
+    now = time.monotonic_ns()
+    due = getattr(_wake, "due", None)
+    if due is None:
+        return now
+    t = due + time.thread_time_ns() - _wake.cpu
+    return t if t < now else now
+
+
+def sleep_ms(ms):
+    if ms > 0:
+        sleep_until_ns(time.monotonic_ns() + int(ms * 1_000_000 / (1.0 + _RATE)))
+
+
+def sleep_us(us):
+    if us > 0:
+        sleep_until_ns(time.monotonic_ns() + int(us * 1000 / (1.0 + _RATE)))
+
+
+def install():
+    for name in ("ticks_us", "ticks_ms", "ticks_cpu", "ticks_add", "ticks_diff",
+                 "sleep_ms", "sleep_us"):
+        setattr(time, name, globals()[name])
+    return time
@@ -0,0 +1,5 @@
+"""MicroPython `esp` 模組的 PC 替身"""
+
+
+def osdebug(*args): pass
+def flash_size(): return 16 * 1024 * 1024
@@ -0,0 +1,16 @@
+"""MicroPython `esp32` 模組的 PC 替身"""
+
+
+class LDO:
+    def __init__(self, id, mv, adjustable=False):
+        self.id = id
+        self.mv = mv
+
+    def voltage(self, mv=None):
+        if mv is None:
+            return self.mv
+        self.mv = mv
+
+
+def mcu_temperature():
+    return 40
@@ -0,0 +1,217 @@
+"""
+MicroPython `machine` 模組的 PC 替身
+═══════════════════════════════════════════════════════
+假 SPI / I2C 總線會記錄每次 write 的字節與理論線上傳輸時間，
+供主機端驗證驅動輸出與基準測試使用。
+虛擬 slave 可透過 UID / I2C_DEVICES 設定每台機器的身份與總線上的設備。
+REALTIME = True 時每次 write 會阻塞其理論線上時間，與真機的阻塞式傳輸一致
+(端到端基準測試需要，否則 Core 1 的出幀時間只剩轉換成本)。
+"""
+import time
+
+from . import clock
+
+# 由 emu.slave 於啟動時設定
+UID = b"\x00\x00\x00\x00\x00\x01"
+I2C_DEVICES = []
+REALTIME = False
+
+# 所有假總線 (SPI / I2C / neopixel) 的累計線上時間
+wire_total_us = 0
+# 最近一次傳輸按理論線上時間結束的時刻 (CLOCK_MONOTONIC ns)：出幀探針以此為準
+# REALTIME 模式下起點取 clock.cpu_now_ns()：每塊真機獨佔 CPU、由定時器準時喚醒，
+# 多台虛擬機同一 tick 醒來在主機核心上排隊的時間不代表總線上晚出幀
+wire_end_ns = 0
+
+
+def _wire(us):
+    """記入一次總線傳輸；REALTIME 模式下按理論時間阻塞"""
+    global wire_total_us, wire_end_ns
+    wire_total_us += us
+    if not REALTIME:
+        wire_end_ns = time.monotonic_ns() + us * 1000
+        return
+    wire_end_ns = clock.cpu_now_ns() + us * 1000
+    if us > 0:
+        clock.sleep_until_ns(wire_end_ns)
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self._value = value or 0
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        self._value = 1 if v else 0
+
+    def on(self): self._value = 1
+    def off(self): self._value = 0
+
+
+class SPI:
+    """假 SPI：記錄 write 次數、字節數、最後一幀內容與線上時間 (us)"""
+    def __init__(self, id=1, baudrate=8_000_000, polarity=0, phase=0,
+                 sck=None, mosi=None, miso=None, record=True):
+        self.id = id
+        self.baudrate = baudrate
+        self.record = record
+        self.reset_stats()
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate:
+            self.baudrate = baudrate
+
+    def reset_stats(self):
+        self.writes = 0
+        self.bytes_out = 0
+        self.wire_us = 0
+        self.last = b""
+        self.last_ns = 0
+
+    def write(self, buf):
+        n = len(buf)
+        self.writes += 1
+        self.bytes_out += n
+        us = (n * 8 * 1_000_000) // self.baudrate
+        self.wire_us += us
+        if self.record:
+            self.last = bytes(buf)
+        _wire(us)
+        self.last_ns = time.monotonic_ns()
+
+    def deinit(self):
+        pass
+
+
+def unique_id():
+    return UID
+
+
+def freq(hz=None):
+    return 360_000_000
+
+
+def reset():
+    raise SystemExit("machine.reset()")
+
+
+def soft_reset():
+    raise SystemExit("machine.soft_reset()")
+
+
+class I2C:
+    """假 I2C：記錄 writeto_mem 次數、字節數與線上時間 (每字節 9 bit + 地址/寄存器)"""
+    def __init__(self, id=0, scl=None, sda=None, freq=400_000):
+        self.id = id
+        self.freq = freq or 400_000
+        self.mem = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.writes = 0
+        self.bytes_out = 0
+        self.wire_us = 0
+        self.last_ns = 0
+
+    def scan(self):
+        return list(I2C_DEVICES)
+
+    def writeto_mem(self, addr, memaddr, buf, addrsize=8):
+        self.writes += 1
+        self.bytes_out += len(buf)
+        us = ((len(buf) + 2) * 9 + 2) * 1_000_000 // self.freq
+        self.wire_us += us
+        regs = self.mem.setdefault(addr, bytearray(256))
+        regs[memaddr : memaddr + len(buf)] = buf
+        _wire(us)
+        self.last_ns = time.monotonic_ns()
+
+    def readfrom_mem(self, addr, memaddr, nbytes, addrsize=8):
+        regs = self.mem.setdefault(addr, bytearray(256))
+        return bytes(regs[memaddr : memaddr + nbytes])
+
+
+class Timer:
+    """假 Timer：以執行緒週期觸發回調"""
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self._t = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=1000, freq=None, callback=None):
+        import threading
+        self.deinit()
+        if freq:
+            period = 1000 // freq
+        self._stop = threading.Event()
+
+        def run():
+            while not self._stop.wait(period / 1000):
+                if callback:
+                    callback(self)
+                if mode == Timer.ONE_SHOT:
+                    break
+
+        self._t = threading.Thread(target=run, daemon=True)
+        self._t.start()
+
+    def deinit(self):
+        if self._t:
+            self._stop.set()
+            self._t = None
+
+
+class ADC:
+    ATTN_11DB = 3
+
+    def __init__(self, pin, atten=None):
+        self.pin = pin
+
+    def read(self): return 0
+    def read_u16(self): return 0
+    def atten(self, a): pass
+
+
+class PWM:
+    def __init__(self, pin, freq=1000, duty=0, duty_u16=None):
+        self.pin = pin
+        self._freq = freq
+        self._duty = duty_u16 or 0
+
+    def freq(self, f=None):
+        if f is None: return self._freq
+        self._freq = f
+
+    def duty_u16(self, d=None):
+        if d is None: return self._duty
+        self._duty = d
+
+    def deinit(self): pass
+
+
+class UART:
+    def __init__(self, id, baudrate=115200, **kwargs):
+        self.id = id
+        self.baudrate = baudrate
+
+    def any(self): return 0
+    def read(self, n=-1): return None
+    def write(self, buf): return len(buf)
+
+
+class SDCard:
+    """虛擬機沒有 SD 卡；構造即失敗，走 boot.py 的錯誤路徑"""
+    def __init__(self, *args, **kwargs):
+        raise OSError(19, "ENODEV (emu: no SD card)")
@@ -0,0 +1,55 @@
+"""
+MicroPython `micropython` 模組的 PC 替身
+═══════════════════════════════════════════════════════
+- viper / native 裝飾器直接返回原函數 (以純 Python 執行)
+- ptr8 / ptr16 / ptr32 以可索引的緩衝區視圖模擬指針
+"""
+import array
+import builtins
+import sys
+
+
+def viper(f): return f
+def native(f): return f
+def const(x): return x
+def opt_level(*args): return 0
+def mem_info(*args): pass
+def alloc_emergency_exception_buf(size): pass
+def schedule(func, arg): func(arg)
+
+
+def _cast(obj, code, size):
+    if isinstance(obj, array.array) and obj.itemsize == size:
+        return obj
+    mv = obj if isinstance(obj, memoryview) else memoryview(obj)
+    if mv.itemsize == size:
+        return mv
+    return mv.cast('B').cast(code)
+
+
+def ptr8(obj):
+    if isinstance(obj, (bytes, bytearray)):
+        return obj
+    return _cast(obj, 'B', 1)
+
+
+def ptr16(obj):
+    return _cast(obj, 'H', 2)
+
+
+def ptr32(obj):
+    return _cast(obj, 'I', 4)
+
+
+def uint(x):
+    return int(x) & 0xFFFFFFFF
+
+
+def install():
+    """把 viper 型別與 micropython 模組注入 builtins (MicroPython 中這些由編譯器提供)"""
+    me = sys.modules[__name__]
+    sys.modules["micropython"] = me
+    builtins.micropython = me
+    builtins.const = const
+    for name in ("ptr8", "ptr16", "ptr32", "uint"):
+        setattr(builtins, name, getattr(me, name))
@@ -0,0 +1,43 @@
+"""MicroPython `neopixel` 模組的 PC 替身 (記錄 write 次數、字節與線上時間)"""
+import time
+
+from . import machine
+
+
+class NeoPixel:
+    ORDER = (1, 0, 2, 3)
+
+    def __init__(self, pin, n, bpp=3, timing=1):
+        self.pin = pin
+        self.n = n
+        self.bpp = bpp
+        self.buf = bytearray(n * bpp)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.writes = 0
+        self.bytes_out = 0
+        self.wire_us = 0
+        self.last = b""
+        self.last_ns = 0
+
+    def __len__(self):
+        return self.n
+
+    def __setitem__(self, i, v):
+        off = i * self.bpp
+        for j in range(self.bpp):
+            self.buf[off + self.ORDER[j]] = v[j]
+
+    def fill(self, v):
+        for i in range(self.n):
+            self[i] = v
+
+    def write(self):
+        self.writes += 1
+        self.bytes_out += len(self.buf)
+        us = len(self.buf) * 10 + 50  # 800 kHz: 1.25 us/bit + reset
+        self.wire_us += us
+        self.last = bytes(self.buf)
+        machine._wire(us)
+        self.last_ns = time.monotonic_ns()
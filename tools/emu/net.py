@@ -0,0 +1,22 @@
+"""
+多台虛擬 slave 共用一台主機的網路調整
+═══════════════════════════════════════════════════════
+真機每台都綁定 0.0.0.0:discovery_port；同一主機上需要 SO_REUSEADDR
+才能讓多個進程綁定同一端口並各自收到廣播。
+"""
+import socket
+
+_RealSocket = socket.socket
+
+
+class EmuSocket(_RealSocket):
+    def bind(self, address):
+        if self.type == socket.SOCK_DGRAM:
+            self.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        return super().bind(address)
+
+
+def install():
+    socket.socket = EmuSocket
+    return socket
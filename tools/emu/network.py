@@ -0,0 +1,70 @@
+"""
+MicroPython `network` 模組的 PC 替身
+═══════════════════════════════════════════════════════
+虛擬 LAN / WLAN 永遠「已連線」，IP 為本機迴環；真正的收發由 CPython socket 完成。
+"""
+STA_IF = 0
+AP_IF = 1
+PHY_LAN8720 = 0
+PHY_IP101 = 1
+PHY_RTL8201 = 2
+PHY_DP83848 = 3
+PHY_KSZ8041 = 4
+
+IP = "127.0.0.1"
+
+
+class _Iface:
+    def __init__(self, *args, **kwargs):
+        self._active = False
+        self._cfg = {"mac": b"\x02\xee\x00\x00\x00\x01", "hostname": "emu"}
+
+    def active(self, v=None):
+        if v is None:
+            return self._active
+        self._active = bool(v)
+
+    def isconnected(self):
+        return self._active
+
+    def status(self, *args):
+        return 1010 if self._active else 0
+
+    def ifconfig(self, cfg=None):
+        return (IP, "255.0.0.0", IP, IP)
+
+    def ipconfig(self, key=None, **kwargs):
+        if key == "addr4":
+            return (IP, "255.0.0.0")
+        return None
+
+    def config(self, *args, **kwargs):
+        if args:
+            return self._cfg.get(args[0])
+        self._cfg.update(kwargs)
+
+
+class LAN(_Iface):
+    pass
+
+
+class WLAN(_Iface):
+    def __init__(self, interface_id=STA_IF):
+        super().__init__()
+        self._connected = False
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self._connected = self._active
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._active and self._connected
+
+    def scan(self):
+        return []
+
+
+def hostname(name=None):
+    return "emu"
@@ -0,0 +1,133 @@
+"""
+虛擬 slave：在獨立根目錄中原樣運行 slave/boot.py + main.py
+═══════════════════════════════════════════════════════
+根目錄結構 (每台一份):
+    boot.py main.py ... lib/ action/ schema/  -> 符號連結到 slave/ (代碼不複製、不修改)
+    config.json                              -> 由 slave/config.json 生成的合法 JSON + 覆寫
+    data.bin remap.bin secrets.db ...        -> 該機器自己的數據
+
+環境變數 (端到端基準測試用):
+    NETLIGHT_PROBE=host:port   Core 1 每出一幀，以 UDP 回報 (幀首 4 字節標籤, 完成時刻 ns, 線上時間 us)
+    NETLIGHT_WIRE=1            假總線按理論線上時間阻塞 (machine.REALTIME)
+    NETLIGHT_CLOCK=off_us:ppm  本機晶振模型 (ticks 起點偏移 + 頻率誤差)，測試 show clock 校時
+"""
+import json
+import os
+import re
+import runpy
+import socket
+import struct
+import sys
+import time
+
+from . import SLAVE_DIR
+
+# 不連結的 slave/ 項目 (每台機器獨立生成或無用)
+_SKIP = {"config.json", "secrets.db", "__pycache__"}
+
+
+def load_config(path=os.path.join(SLAVE_DIR, "config.json")):
+    """容錯讀取板上 config.json (允許尾隨逗號與 "key"value 缺冒號)"""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    text = re.sub(r",(\s*[}\]])", r"\1", text)
+    text = re.sub(r'"(\w+)"\s*(-?\d)', r'"\1": \2', text)
+    return json.loads(text)
+
+
+def make_config(index, discovery_port=9000, apa102=None, ws2812=None, pca=0,
+                strips=None, system=None):
+    """
+    以倉庫 config.json 為藍本，關閉虛擬機沒有的硬體
+    strips: 每種燈條只保留前 N 路；system: 覆寫 System 段 (local_fps, buffer_frames ...)
+    """
+    cfg = load_config()
+    if strips is not None:
+        for kind in ("APA102", "WS2812"):
+            cfg[kind]["list"] = cfg[kind]["list"][:strips]
+    cfg["System"].update(system or {})
+    cfg["System"]["discovery_port"] = discovery_port
+    cfg["System"]["hostname"] = f"emu-{index}"
+    cfg["WIFI_Network"]["enable"] = 0
+    cfg["ETH_Network"]["enable"] = 1
+    cfg["SDcard"]["enable"] = 0
+    if apa102 is not None:
+        for e in cfg["APA102"]["list"]:
+            e["Q"] = apa102
+        cfg["APA102"]["enable"] = 1 if apa102 else 0
+    if ws2812 is not None:
+        for e in cfg["WS2812"]["list"]:
+            e["Q"] = ws2812
+        cfg["WS2812"]["enable"] = 1 if ws2812 else 0
+    cfg["PCA9685"]["enable"] = 1 if pca else 0
+    return cfg
+
+
+def prepare_root(root, index, **cfg_opts):
+    """建立 (或更新) 一台虛擬 slave 的根目錄"""
+    os.makedirs(root, exist_ok=True)
+    for name in os.listdir(SLAVE_DIR):
+        if name in _SKIP:
+            continue
+        link = os.path.join(root, name)
+        if os.path.lexists(link):
+            os.remove(link)
+        os.symlink(os.path.join(SLAVE_DIR, name), link)
+    with open(os.path.join(root, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(make_config(index, **cfg_opts), f, indent=4, ensure_ascii=False)
+    return root
+
+
+def uid_for(index):
+    """每台虛擬機唯一的 6 字節 ID (本地管理 MAC 前綴 02:EE)"""
+    return b"\x02\xee" + index.to_bytes(4, "big")
+
+
+def frame_probe(target):
+    """
+    建立 Core 1 出幀探針：幀首 4 字節 (小端) 為發送端寫入的序號標籤，
+    時刻取 CLOCK_MONOTONIC (同一主機上各進程共用)，線上時間取本幀累計的假總線時間
+    假總線阻塞時 (REALTIME) 取本幀末次傳輸的理論結束時刻 (machine.wire_end_ns)：多台虛擬機同一 tick
+    醒來搶主機 CPU 的排隊不計入，轉換等實際工作仍計入
+    """
+    import machine
+    host, port = target.rsplit(":", 1)
+    addr = (host, int(port))
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    last = [machine.wire_total_us]
+
+    def probe(view):
+        wire = machine.wire_total_us - last[0]
+        last[0] = machine.wire_total_us
+        tag = view[0] | (view[1] << 8) | (view[2] << 16) | (view[3] << 24)
+        try:
+            t_ns = machine.wire_end_ns if machine.REALTIME and wire else time.monotonic_ns()
+            sock.sendto(struct.pack("<IQI", tag, t_ns, wire), addr)
+        except OSError:
+            pass
+    return probe
+
+
+def run(root, index, i2c_devices=()):
+    """在當前進程中啟動虛擬 slave (阻塞，直到 main.py 結束)"""
+    from . import install
+    root = os.path.abspath(root)
+    os.chdir(root)
+    install(slave_dir=root, root=root)
+
+    import machine
+    machine.UID = uid_for(index)
+    machine.I2C_DEVICES = list(i2c_devices)
+    machine.REALTIME = os.environ.get("NETLIGHT_WIRE", "0") == "1"
+    if os.environ.get("NETLIGHT_PROBE"):
+        from lib.sys_bus import bus
+        bus.register_service("frame_probe", frame_probe(os.environ["NETLIGHT_PROBE"]))
+
+    # 與 MicroPython 相同：先 boot.py 再 main.py，共用 __main__ 命名空間
+    g = runpy.run_path(os.path.join(root, "boot.py"), run_name="__main__")
+    runpy.run_path(os.path.join(root, "main.py"), init_globals=g, run_name="__main__")
+
+
+if __name__ == "__main__":
+    # python -m emu.slave <root> <index> [i2c_addr ...]
+    run(sys.argv[1], int(sys.argv[2]), [int(a, 0) for a in sys.argv[3:]])
@@ -0,0 +1,75 @@
+"""
+虛擬文件系統根目錄
+═══════════════════════════════════════════════════════
+slave 代碼使用 "/schema"、"/data.bin" 這類板上絕對路徑；
+每台虛擬 slave 有自己的根目錄，這裡把這些路徑映射進去。
+真實系統的頂層目錄 (/usr、/tmp ...) 不受影響。
+"""
+import builtins
+import os
+
+ROOT = None
+_REAL_TOP = set()
+_real = {}
+
+
+def vpath(p):
+    if ROOT is None or not isinstance(p, str) or not p.startswith("/"):
+        return p
+    if p == "/":
+        return ROOT
+    if p.startswith(ROOT + "/") or p == ROOT:
+        return p
+    top = p.split("/", 2)[1]
+    if top in _REAL_TOP:
+        return p
+    return ROOT + p
+
+
+def _wrap(fn):
+    def inner(p, *args, **kwargs):
+        return fn(vpath(p), *args, **kwargs)
+    inner.__name__ = getattr(fn, "__name__", "vfs")
+    return inner
+
+
+def _rename(a, b):
+    return _real["rename"](vpath(a), vpath(b))
+
+
+def _listdir(p="."):
+    return _real["listdir"](vpath(p))
+
+
+def _ilistdir(p="."):
+    for name in _real["listdir"](vpath(p)):
+        st = os.stat(os.path.join(vpath(p), name))
+        yield (name, 0x4000 if os.path.isdir(os.path.join(vpath(p), name)) else 0x8000, 0, st.st_size)
+
+
+def _mount(dev, point, **kwargs):
+    os.makedirs(vpath(point), exist_ok=True)
+
+
+def _umount(point):
+    pass
+
+
+def install(root):
+    """把 open / os.* 的板上絕對路徑映射到 root 下"""
+    global ROOT
+    ROOT = os.path.abspath(root)
+    _REAL_TOP.update(os.listdir("/"))
+
+    _real["open"] = builtins.open
+    _real["listdir"] = os.listdir
+    _real["rename"] = os.rename
+    builtins.open = _wrap(builtins.open)
+    for name in ("stat", "remove", "mkdir", "rmdir", "statvfs", "chdir"):
+        _real[name] = getattr(os, name)
+        setattr(os, name, _wrap(getattr(os, name)))
+    os.listdir = _listdir
+    os.rename = _rename
+    os.ilistdir = _ilistdir
+    os.mount = _mount
+    os.umount = _umount
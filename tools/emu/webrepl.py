@@ -0,0 +1,5 @@
+"""MicroPython `webrepl` 模組的 PC 替身 (不開放任何端口)"""
+
+
+def start(password=None, port=8266): pass
+def stop(): pass
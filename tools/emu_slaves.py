@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+虛擬 Slave 啟動器 - 在本機以 CPython 原樣運行一台或多台 slave/
+═══════════════════════════════════════════════════════
+每台 slave 是獨立進程 (真實 _thread 雙核、假 SPI/I2C/neopixel/LAN)，
+透過迴環網路以 NL3 協議與真實 Server 或 NetBusMaster 通訊。
+
+用法:
+  python emu_slaves.py                         # 1 台，監聽 discovery 9000
+  python emu_slaves.py -n 8                    # 8 台，端口 9000..9007
+  python emu_slaves.py -n 8 --shared-port      # 8 台共用 9000 (接收同一個廣播)
+  python emu_slaves.py -n 4 --connect ws://127.0.0.1:8000/ws   # 啟動後主動發 DISCOVER
+  python emu_slaves.py --apa102 300 --ws2812 0 --pca 2
+"""
+import argparse
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+if SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, SCRIPT_DIR)
+
+from emu import PROJECT_ROOT
+from emu import slave as emu_slave
+
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def _pump(proc, tag):
+    """把子進程輸出加上機器前綴轉印"""
+    for line in iter(proc.stdout.readline, b""):
+        sys.stdout.write(f"{tag} {line.decode(errors='replace')}")
+        sys.stdout.flush()
+
+
+def send_discover(ws_url, ports, host="127.0.0.1"):
+    """以單播 DISCOVER (0x1001) 通知每台虛擬 slave 連上指定的 WS 伺服器"""
+    from slave.lib.proto import Proto
+    from slave.lib.schema_loader import SchemaStore
+    from slave.lib.schema_codec import SchemaCodec
+
+    store = SchemaStore(dir_path=os.path.join(PROJECT_ROOT, "slave", "schema"))
+    server_ip = ws_url.split("://", 1)[-1].split(":", 1)[0].split("/", 1)[0]
+    pkt = Proto.pack(0x1001, SchemaCodec.encode(store.get(0x1001), {"server_ip": server_ip, "ws_url": ws_url}))
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    for port in sorted(set(ports)):
+        s.sendto(pkt, (host, port))
+    s.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mp_Net-Light 虛擬 Slave 啟動器")
+    parser.add_argument("-n", "--count", type=int, default=1, help="虛擬 slave 數量")
+    parser.add_argument("--root", default=os.path.join("/tmp", "netlight_emu"), help="虛擬根目錄存放位置")
+    parser.add_argument("--port", type=int, default=9000, help="discovery 起始端口")
+    parser.add_argument("--shared-port", action="store_true", help="所有 slave 共用同一 discovery 端口")
+    parser.add_argument("--apa102", type=int, default=None, help="覆寫 APA102 每條燈數 (0 = 關閉)")
+    parser.add_argument("--ws2812", type=int, default=None, help="覆寫 WS2812 每條燈數 (0 = 關閉)")
+    parser.add_argument("--pca", type=int, default=0, help="每台 I2C 總線上的 PCA9685 數量")
+    parser.add_argument("--connect", default=None, help="啟動後發送 DISCOVER 的 ws_url，例如 ws://127.0.0.1:8000/ws")
+    parser.add_argument("--fresh", action="store_true", help="清空虛擬根目錄 (data.bin 等) 後再啟動")
+    args = parser.parse_args()
+
+    if args.fresh and os.path.isdir(args.root):
+        shutil.rmtree(args.root)
+
+    procs = []
+    ports = []
+    i2c = [str(0x40 + k) for k in range(args.pca)]
+    for idx in range(args.count):
+        port = args.port if args.shared_port else args.port + idx
+        root = emu_slave.prepare_root(os.path.join(args.root, f"slave_{idx}"), idx,
+                                      discovery_port=port, apa102=args.apa102,
+                                      ws2812=args.ws2812, pca=args.pca)
+        cmd = [sys.executable, "-u", "-m", "emu.slave", root, str(idx)] + i2c
+        proc = subprocess.Popen(cmd, cwd=SCRIPT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        uid = emu_slave.uid_for(idx).hex().upper()
+        threading.Thread(target=_pump, args=(proc, f"[S{idx}:{uid[-4:]}]"), daemon=True).start()
+        procs.append(proc)
+        ports.append(port)
+        print(f"🤖 slave_{idx}  uid={uid}  discovery=:{port}  root={root}")
+
+    try:
+        if args.connect:
+            time.sleep(2.0)  # 等待 boot + Core0 綁定端口
+            send_discover(args.connect, ports)
+            print(f"📡 DISCOVER -> {args.connect} ({len(set(ports))} ports)")
+        while any(p.poll() is None for p in procs):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\n👋 Stopping virtual slaves...")
+    finally:
+        for p in procs:
+            if p.poll() is None:
+                p.send_signal(signal.SIGINT)
+        for p in procs:
+            try:
+                p.wait(timeout=3)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+if __name__ == "__main__":
+    main()
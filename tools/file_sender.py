@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+File sender - FILE_BEGIN / CHUNK / END 的視窗化管線上傳 (與 slave/lib/file_rx.FileRx 對應)
+═══════════════════════════════════════════════════════
+- 同時在途 N 個 FILE_CHUNK，不再每包停等 FILE_ACK (吞吐受 RTT 而非頻寬限制)
+- FILE_ACK (0x2004)：offset = 該包 (舊韌體只回這個)，cum = 已連續收齊字節數，sack = 缺口後已到分片位圖
+- 重傳：SACK 顯示缺口後已有 3 個分片到達即快速重傳；最舊未確認分片逾 RTO 則重傳並減半視窗
+- 視窗：RTT 依 RFC 6298 平滑 (Karn：重傳分片不取樣)，視窗 = 2 × 交付速率 × 最小 RTT (BDP)，
+  不把整個檔案塞進 socket 緩衝 (同一條 WS 上的控制指令不被排在幾 MB 資料後面)
+- 與傳輸無關：send(cmd, args) 由呼叫端提供，收到 0x2004 時呼叫 on_ack(args)
+- 差量重新部署：FILE_HASH (0x2007) 取回遠端逐區塊摘要 (RemoteHashes)，plan_patch() 比對出不變分片，
+  send_file(skip=...) 以修補模式 (FILE_BEGIN flags = 1) 只送變動分片，不變區段以 FILE_SKIP (0x2009) 帶過
+- 一對多分發 (MulticastSender)：同一檔案的分片經 UDP 廣播只送一次，各 slave 以位圖記帳不回 ACK；
+  每輪以 FILE_NAK_REQ (0x200A) 輪詢缺片位圖 (FILE_NAK 0x200B)，取聯集再廣播補洞，收齊後逐台 FILE_END 校驗
+
+用法 (NetBusMaster / pc_test_tool / server core.bus_hub 共用):
+    sender = WindowedSender(lambda cmd, args: send_pkt([tid], cmd, args))
+    node["sender"] = sender            # 收包執行緒：0x2004 -> sender.on_ack(args)
+    stats = sender.send_file(data, "/data.bin", progress=lambda done, total: ...)
+
+    rh = RemoteHashes()                # 收包執行緒：0x2008 -> rh.on_rsp(args)
+    rh.request(send, "/data.bin", pick_block_size(len(data)))
+    skip = plan_patch(data, rh.wait(), sender.chunk_size)      # None = 只能整檔上傳
+    stats = sender.send_file(data, "/data.bin", skip=skip)
+
+    mc = MulticastSender(bcast, lambda tid, cmd, args: send_pkt([tid], cmd, args))
+    node["mcast"] = mc                 # 收包執行緒：0x200B -> mc.on_nak(tid, args)
+    stats = mc.send_file(data, "/data.bin", tids)              # stats["failed"] 改走單播
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+
+F_PATCH = 1          # FILE_BEGIN flags：就地修補 (slave/lib/file_rx.F_PATCH)
+F_MCAST = 2          # FILE_BEGIN flags：廣播一對多 (slave/lib/file_rx.F_MCAST)
+MCAST_CHUNK = 4096   # 廣播分片上限 (slave/lib/file_rx.MCAST_CHUNK)
+NO_SESSION = 0xFFFFFFFF    # FILE_NAK missing：slave 沒有對應的接收任務
+HASH_LEN = 8         # 區塊摘要長度 (slave/lib/file_rx.HASH_LEN)
+MAX_BLOCKS = 16384   # 摘要表上限 (128 KB)；超過則加大區塊
+
+
+def pick_block_size(total, chunk_size=1024, block_size=16384):
+    """區塊須為分片大小的整數倍；檔案很大時加倍，控制摘要表大小"""
+    bs = max(chunk_size, block_size // chunk_size * chunk_size)
+    while -(-total // bs) > MAX_BLOCKS:
+        bs *= 2
+    return bs
+
+
+def block_hashes(data, block_size):
+    return b"".join(hashlib.sha256(data[o:o + block_size]).digest()[:HASH_LEN]
+                    for o in range(0, len(data), block_size))
+
+
+def plan_patch(data, remote, chunk_size):
+    """
+    remote = RemoteHashes.wait() 的結果；返回與遠端相同的分片序號集合 (可給 send_file(skip=...))
+    遠端無檔 / 韌體不支援 / 遠端較長 (MicroPython 無法截短) / 區塊未對齊分片時返回 None (整檔上傳)
+    """
+    if not remote or not remote["exists"]:
+        return None
+    size, bs, theirs = remote["total_size"], remote["block_size"], remote["hashes"]
+    if size > len(data) or not bs or bs % chunk_size:
+        return None
+    data = memoryview(data)
+    skip = set()
+    for i in range(-(-size // bs)):
+        o = i * bs
+        end = min(o + bs, size)
+        # 只比對兩邊長度相同的區塊 (舊檔末端的殘塊在新檔已變長時必然要重送)
+        if end - o != min(bs, len(data) - o):
+            continue
+        if hashlib.sha256(data[o:end]).digest()[:HASH_LEN] == theirs[i * HASH_LEN:(i + 1) * HASH_LEN]:
+            skip.update(range(o // chunk_size, -(-end // chunk_size)))
+    return skip
+
+
+class RemoteHashes:
+    """收集 FILE_HASH_RSP (0x2008)：首包為表頭 (確認韌體支援)，其後分批帶回區塊摘要"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._reset(None)
+
+    def _reset(self, path):
+        self.path = path
+        self.header = None
+        self.parts = {}
+        self.last_t = 0.0
+
+    def request(self, send, path, block_size):
+        with self._cond:
+            self._reset(path)
+        send(0x2007, {"path": path, "block_size": block_size})
+
+    def on_rsp(self, args):
+        with self._cond:
+            if args.get("path") != self.path:
+                return
+            if self.header is None:
+                self.header = args
+            if args.get("hashes"):
+                self.parts[args.get("first_block", 0)] = args["hashes"]
+            self.last_t = time.monotonic()
+            self._cond.notify_all()
+
+    def _blocks(self):
+        h = self.header
+        return -(-h["total_size"] // h["block_size"]) if h["exists"] and h["block_size"] else 0
+
+    def _have(self):
+        return sum(len(v) for v in self.parts.values()) // HASH_LEN
+
+    def wait(self, first_timeout=3.0, idle_timeout=60.0):
+        """
+        first_timeout 內沒有表頭視為舊韌體；之後只要摘要持續到達就等 (slave 大檔計算較久)
+        返回 {"exists", "total_size", "block_size", "hashes"}，失敗為 None
+        """
+        with self._cond:
+            deadline = time.monotonic() + first_timeout
+            while self.header is None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+            while self._have() < self._blocks():
+                left = self.last_t + idle_timeout - time.monotonic()
+                if left <= 0:
+                    return None
+                self._cond.wait(left)
+            h = self.header
+            return {"exists": h["exists"], "total_size": h["total_size"], "block_size": h["block_size"],
+                    "hashes": b"".join(self.parts[k] for k in sorted(self.parts))}
+
+
+class WindowedSender:
+    def __init__(self, send, chunk_size=1024, max_window=64, init_window=4,
+                 min_rto=0.2, max_rto=5.0, max_timeouts=6):
+        self.send = send
+        self.chunk_size = chunk_size
+        self.max_window = max_window
+        self.init_window = init_window
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.max_timeouts = max_timeouts
+        self._cond = threading.Condition()
+        self.file_id = None
+        self._reset(0)
+
+    def _reset(self, n, skip=()):
+        self.n = n
+        self._acked = bytearray(n)
+        for i in skip:                 # 修補模式下與遠端相同的分片：視為已確認，不計入交付速率
+            if i < n:
+                self._acked[i] = 1
+        self._sent_t = [0.0] * n       # 最近一次發送時刻
+        self._tx = bytearray(n)        # 發送次數 (飽和 255)
+        self._retx = []                # 待重傳 (由 ACK 觸發的快速重傳)
+        self.una = 0                   # 最低未確認分片
+        while self.una < n and self._acked[self.una]:
+            self.una += 1
+        self.nxt = 0                   # 下一個新分片
+        self.inflight = 0
+        self.acked_chunks = 0
+        self.window = self.init_window
+        self.srtt = None
+        self.rttvar = 0.0
+        self.min_rtt = None
+        self.rto = 1.0
+        self.rate = 0.0                # 近期最大交付速率 (分片/秒)
+        self._rate_mark = (time.monotonic(), 0)
+        self.retransmits = 0
+        self.fast_retransmits = 0
+        self.timeouts = 0
+        self.max_inflight = 0
+
+    # ---------- 收包執行緒 ----------
+    def on_ack(self, args):
+        """0x2004 FILE_ACK；舊韌體無 cum / sack 欄位時只確認 offset 那一包"""
+        with self._cond:
+            if args.get("file_id") != self.file_id or not self.n:
+                return
+            now = time.monotonic()
+            cs = self.chunk_size
+            i = args.get("offset", 0) // cs
+            if i < self.n and not self._acked[i] and self._tx[i] == 1:
+                self._rtt_sample(now - self._sent_t[i])
+            if i < self.n:
+                self._ack(i)
+            cum = args.get("cum")
+            if cum is not None:
+                top = min(self.n, -(-cum // cs))
+                for j in range(self.una, top):
+                    self._ack(j)
+                sack = args.get("sack", 0)
+                hole = top
+                d = 0
+                while sack >> d:
+                    if sack >> d & 1 and hole + 1 + d < self.n:
+                        self._ack(hole + 1 + d)
+                    d += 1
+                # 缺口之後已有 3 個分片到達：缺口分片視為遺失，快速重傳 (一個 RTT 內只重傳一次)
+                if hole < self.n and not self._acked[hole] and bin(sack).count("1") >= 3:
+                    if hole not in self._retx and now - self._sent_t[hole] > (self.srtt or self.min_rto):
+                        self._retx.append(hole)
+            while self.una < self.n and self._acked[self.una]:
+                self.una += 1
+            self._update_window(now)
+            self._cond.notify_all()
+
+    def _ack(self, i):
+        if not self._acked[i]:
+            self._acked[i] = 1
+            self.acked_chunks += 1
+            if i < self.nxt:
+                self.inflight -= 1
+
+    def _rtt_sample(self, r):
+        """RFC 6298：srtt / rttvar / rto"""
+        if self.srtt is None:
+            self.srtt, self.rttvar = r, r / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - r)
+            self.srtt = 0.875 * self.srtt + 0.125 * r
+        self.min_rtt = r if self.min_rtt is None else min(self.min_rtt, r)
+        self.rto = min(self.max_rto, max(self.min_rto, self.srtt + 4 * self.rttvar))
+
+    def _update_window(self, now):
+        """每個 srtt 量一次交付速率 (慢衰減的最大值)；視窗 = 2 × BDP，估出前每個 ACK +1 (慢啟動)"""
+        t0, a0 = self._rate_mark
+        span = now - t0
+        if self.srtt is not None and span >= max(self.srtt, 0.01):
+            r = (self.acked_chunks - a0) / span
+            self.rate = max(r, self.rate * 0.9)
+            self._rate_mark = (now, self.acked_chunks)
+        if self.rate and self.min_rtt:
+            w = math.ceil(2 * self.rate * self.min_rtt) + 1
+        else:
+            w = self.window + 1
+        self.window = max(min(2, self.max_window), min(self.max_window, w))
+
+    # ---------- 發送端 ----------
+    def _chunk(self, data, i):
+        off = i * self.chunk_size
+        return {"file_id": self.file_id, "offset": off, "data": data[off:off + self.chunk_size]}
+
+    def send_file(self, data, path, file_id=1, progress=None, skip=None):
+        """
+        上傳整個檔案並等到全部確認後送 FILE_END；返回統計 dict
+        skip：與遠端相同的分片序號 (plan_patch)，給定即以修補模式只送其餘分片
+        progress(done, total) 以實際要送的字節計；連續 max_timeouts 次逾時無進展則拋出 TimeoutError
+        """
+        data = memoryview(data)
+        cs = self.chunk_size
+        total = len(data)
+        n = -(-total // cs)
+        skip = sorted(i for i in skip if i < n) if skip is not None else None
+        saved = sum(min(cs, total - i * cs) for i in skip) if skip else 0
+        payload = total - saved
+        with self._cond:
+            self.file_id = file_id
+            self._reset(n, skip or ())
+        t_start = time.monotonic()
+        self.send(0x2001, {
+            "file_id": file_id,
+            "total_size": total,
+            "chunk_size": cs,
+            "sha256": hashlib.sha256(data).digest(),
+            "path": path,
+            "flags": F_PATCH if skip is not None else 0
+        })
+
+        stalls = 0
+        last_una = 0
+        while True:
+            out = []
+            with self._cond:
+                # 末尾不變區段已預先確認，una 會先到 n：等 nxt 也走完 (送出最後一個 FILE_SKIP) 才結束，
+                # 否則 slave 的流式摘要停在該區段前，FILE_END 時只能整檔重算
+                if self.una >= self.n and self.nxt >= self.n:
+                    break
+                # 1. 快速重傳
+                for i in self._retx:
+                    if not self._acked[i]:
+                        out.append(i)
+                        self.fast_retransmits += 1
+                self._retx = []
+                # 2. 視窗內的新分片 (不變區段合併成一個 FILE_SKIP)
+                while self.nxt < self.n and self.inflight < self.window:
+                    if self._acked[self.nxt]:
+                        s0 = self.nxt
+                        while self.nxt < self.n and self._acked[self.nxt]:
+                            self.nxt += 1
+                        out.append((s0, self.nxt))
+                        continue
+                    out.append(self.nxt)
+                    self.nxt += 1
+                    self.inflight += 1
+                self.max_inflight = max(self.max_inflight, self.inflight)
+                if not out:
+                    # 3. 等 ACK 或最舊未確認分片逾時
+                    oldest = self._oldest()
+                    wait = self._sent_t[oldest] + self.rto - time.monotonic() if oldest is not None else self.rto
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    if self.una == last_una:
+                        stalls += 1
+                        if stalls > self.max_timeouts:
+                            raise TimeoutError(f"Offset {self.una * cs} 超時")
+                    self.timeouts += 1
+                    self.rto = min(self.max_rto, self.rto * 2)
+                    self.window = max(1, self.window // 2)
+                    out.append(oldest)
+                if self.una != last_una:
+                    stalls = 0
+                    last_una = self.una
+                now = time.monotonic()
+                for i in out:
+                    if isinstance(i, tuple):
+                        continue
+                    if self._tx[i]:
+                        self.retransmits += 1
+                    self._tx[i] = min(255, self._tx[i] + 1)
+                    self._sent_t[i] = now
+            # socket 可能因對端流控阻塞：發送時不持鎖，收包執行緒照常處理 ACK
+            for i in out:
+                if isinstance(i, tuple):
+                    off = i[0] * cs
+                    self.send(0x2009, {"file_id": file_id, "offset": off,
+                                       "length": min(total, i[1] * cs) - off})
+                else:
+                    self.send(0x2002, self._chunk(data, i))
+            if progress:
+                progress(min(payload, self.acked_chunks * cs), payload)
+
+        self.send(0x2003, {"file_id": file_id})
+        if progress:
+            progress(payload, payload)
+        elapsed = time.monotonic() - t_start
+        st = self.stats()
+        st.update(bytes=payload, saved=saved, seconds=round(elapsed, 3),
+                  kbps=round(payload / 1024 / elapsed, 1) if elapsed > 0 else 0)
+        return st
+
+    def _oldest(self):
+        """最早發出且未確認的分片"""
+        best = None
+        for i in range(self.una, self.nxt):
+            if not self._acked[i] and (best is None or self._sent_t[i] < self._sent_t[best]):
+                best = i
+        return best
+
+    def stats(self):
+        return {"chunks": self.n, "window": self.window, "max_inflight": self.max_inflight,
+                "srtt_ms": round(self.srtt * 1000, 2) if self.srtt else None,
+                "min_rtt_ms": round(self.min_rtt * 1000, 2) if self.min_rtt else None,
+                "retransmits": self.retransmits, "fast_retransmits": self.fast_retransmits,
+                "timeouts": self.timeouts}
+
+
+class MulticastSender:
+    """
+    一對多分發 (NAK 式可靠廣播)
+    - FILE_BEGIN (flags = F_MCAST) 經可靠通道逐台送出，之後全部分片只廣播一次 (按 rate_kbps 限速：
+      slave 主迴圈每輪只讀一個數據報，超速即在 socket 緩衝丟包)
+    - 每輪逐台 FILE_NAK_REQ，FILE_NAK 帶回缺片位圖；缺片 0 即收齊，聯集後廣播補洞，進入下一輪
+    - 連續 max_silent 輪不回覆 / 回報無任務 / 輪數用盡的設備列入 failed (呼叫端改走單播)
+    - 收齊的設備逐台 FILE_END，照常由 slave 端 SHA256 把關
+    bcast(cmd, args)：廣播一包；unicast(tid, cmd, args)：可靠通道；收到 0x200B 時呼叫 on_nak(tid, args)
+    """
+
+    def __init__(self, bcast, unicast, chunk_size=MCAST_CHUNK, rate_kbps=1024, min_rate_kbps=64,
+                 max_rounds=30, nak_timeout=1.0, max_silent=3, settle=0.05):
+        self.bcast = bcast
+        self.unicast = unicast
+        self.chunk_size = chunk_size
+        self.rate_kbps = rate_kbps
+        self.min_rate_kbps = min_rate_kbps
+        self.max_rounds = max_rounds
+        self.nak_timeout = nak_timeout
+        self.max_silent = max_silent
+        self.settle = settle           # 輪詢前等 slave 消化 socket 緩衝裡的分片 (否則誤報缺片)
+        self._cond = threading.Condition()
+        self.file_id = None
+        self.n = 0
+        self.round = 0
+        self._waiting = set()
+        self._naks = {}
+
+    # ---------- 收包執行緒 ----------
+    def on_nak(self, tid, args):
+        """0x200B FILE_NAK；round 不符的是上一輪逾時後才到的回覆，丟棄"""
+        with self._cond:
+            if (args.get("file_id") != self.file_id or args.get("round") != self.round
+                    or tid not in self._waiting):
+                return
+            self._naks[tid] = args
+            self._waiting.discard(tid)
+            self._cond.notify_all()
+
+    # ---------- 發送端 ----------
+    def _chunk(self, data, i):
+        off = i * self.chunk_size
+        return {"file_id": self.file_id, "offset": off, "data": data[off:off + self.chunk_size]}
+
+    def _missing(self, args):
+        """FILE_NAK 位圖 (bit = 1 已收，自 first_chunk 起) -> 缺片序號"""
+        first = args.get("first_chunk", 0)
+        out = []
+        for b, v in enumerate(args.get("bitmap", b"")):
+            if v == 0xFF:
+                continue
+            for k in range(8):
+                i = first + b * 8 + k
+                if not v >> k & 1 and i < self.n:
+                    out.append(i)
+        return out
+
+    def _blast(self, data, idxs, tick=None):
+        """按 rate_kbps 廣播分片；落後排程太多時不追趕 (避免突發灌爆 slave 的接收緩衝)"""
+        gap = self.chunk_size / (self.rate_kbps * 1024)
+        t = time.monotonic()
+        for k, i in enumerate(idxs):
+            args = self._chunk(data, i)
+            self.bcast(0x2002, args)
+            self.chunks_sent += 1
+            self.wire_bytes += len(args["data"])
+            if tick and k % 64 == 63:
+                tick(k + 1)
+            t += gap
+            dt = t - time.monotonic()
+            if dt > 0:
+                time.sleep(dt)
+            elif dt < -4 * gap:
+                t = time.monotonic()
+
+    def _poll(self, tids):
+        """一輪 FILE_NAK_REQ；返回 {tid: FILE_NAK args} (逾時未回的不在其中)"""
+        with self._cond:
+            self.round = (self.round + 1) & 0xFFFF
+            self._naks = {}
+            self._waiting = set(tids)
+            rnd = self.round
+        for tid in tids:
+            self.unicast(tid, 0x200A, {"file_id": self.file_id, "round": rnd})
+        deadline = time.monotonic() + self.nak_timeout
+        with self._cond:
+            while self._waiting:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(left)
+            self._waiting = set()
+            return dict(self._naks)
+
+    def send_file(self, data, path, targets, file_id=None, progress=None):
+        """
+        分發到 targets 並對收齊者送 FILE_END；返回統計 dict (done / failed 為設備列表 / {設備: 原因})
+        progress(tids, done, total)：首輪按已廣播字節，其後按各設備 FILE_NAK 回報的已收字節
+        """
+        data = memoryview(data)
+        cs = self.chunk_size
+        total = len(data)
+        n = -(-total // cs)
+        with self._cond:
+            # 隨機 file_id：廣播也會到達非目標 slave，避免撞上它們手上的單播任務 (file_id = 1)
+            self.file_id = file_id or 0x8000 | random.getrandbits(15)
+            self.n = n
+        self.chunks_sent = 0
+        self.wire_bytes = 0
+        t_start = time.monotonic()
+        begin = {"file_id": self.file_id, "total_size": total, "chunk_size": cs,
+                 "sha256": hashlib.sha256(data).digest(), "path": path, "flags": F_MCAST}
+        for tid in targets:
+            self.unicast(tid, 0x2001, begin)
+
+        pending = list(targets)
+        done, failed = [], {}
+        silent = dict.fromkeys(targets, 0)
+        todo = list(range(n))
+        rounds = 0
+        while pending:
+            if todo:
+                tick = (lambda k: progress(pending, min(total, k * cs), total)) if progress and not rounds else None
+                self._blast(data, todo, tick)
+            rounds += 1
+            time.sleep(self.settle)
+            naks = self._poll(pending)
+            need = set()
+            worst = 0
+            for tid in list(pending):
+                a = naks.get(tid)
+                if a is None:
+                    silent[tid] += 1
+                    if silent[tid] >= self.max_silent:
+                        failed[tid] = "no FILE_NAK"
+                        pending.remove(tid)
+                    continue
+                silent[tid] = 0
+                missing = a.get("missing", NO_SESSION)
+                if missing == NO_SESSION:
+                    failed[tid] = "no session"
+                    pending.remove(tid)
+                    continue
+                if progress:
+                    progress([tid], max(0, total - missing * cs), total)
+                if not missing:
+                    done.append(tid)
+                    pending.remove(tid)
+                    continue
+                need.update(self._missing(a))
+                worst = max(worst, missing)
+            # 上一批 (夠大才有統計意義) 有一成以上沒到：限速減半 (接收端或鏈路跟不上)
+            if len(todo) >= 64 and worst > len(todo) / 10:
+                self.rate_kbps = max(self.min_rate_kbps, self.rate_kbps / 2)
+            if pending and rounds >= self.max_rounds:
+                for tid in pending:
+                    failed[tid] = "rounds exhausted"
+                break
+            todo = sorted(need)
+
+        for tid in done:
+            self.unicast(tid, 0x2003, {"file_id": self.file_id})
+        elapsed = time.monotonic() - t_start
+        return {"chunks": n, "rounds": rounds, "chunks_sent": self.chunks_sent,
+                "repairs": self.chunks_sent - n, "bytes": total, "wire_bytes": self.wire_bytes,
+                "rate_kbps": round(self.rate_kbps), "seconds": round(elapsed, 3),
+                "kbps": round(total / 1024 / elapsed, 1) if elapsed > 0 else 0,
+                "done": done, "failed": failed}
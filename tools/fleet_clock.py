@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Fleet show clock - Server 端時間源 (與 slave/lib/show_clock.ShowClock 對應)
+═══════════════════════════════════════════════════════
+- show clock 為 u32 微秒 (約 71 分鐘回繞)，自本進程啟動起算
+- 收到 HEARTBEAT (0x1201) 立刻蓋 t2，回覆 HEARTBEAT_ACK (0x1202) 前蓋 t3，並回顯 slave 的 t1
+- PLAY (0x300A) 帶 start_us：各 slave 在自己的紀律化時鐘上於同一 show 時刻出第一幀
+"""
+import time
+
+MASK32 = 0xFFFFFFFF
+
+
+class FleetClock:
+    def __init__(self):
+        self._t0 = time.monotonic_ns()
+
+    def now_us(self):
+        return ((time.monotonic_ns() - self._t0) // 1000) & MASK32
+
+    def at(self, delay_ms):
+        """現在起 delay_ms 之後的 show 時刻"""
+        return (self.now_us() + int(delay_ms * 1000)) & MASK32
+
+    def ack(self, hb_args, t2):
+        """由 HEARTBEAT 參數與收到時刻 t2 組出 HEARTBEAT_ACK 參數 (t3 於此蓋章)"""
+        return {
+            "server_time": int(time.time() * 1000) & MASK32,
+            "success": 1,
+            "t1_us": hb_args.get("t1_us", 0),
+            "t2_us": t2,
+            "t3_us": self.now_us(),
+        }
+
+    def wait_until(self, show_us):
+        """阻塞到 show 時刻 (主機端，用於音訊與燈光對齊)"""
+        while True:
+            d = ((show_us - self.now_us() + 0x80000000) & MASK32) - 0x80000000
+            if d <= 0:
+                return
+            time.sleep(min(d, 2000) / 1e6 if d < 5000 else (d - 3000) / 1e6)
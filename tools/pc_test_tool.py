@@ -24,6 +24,7 @@ print(PROJECT_ROOT)
 from slave.lib.proto import Proto, StreamParser
 from slave.lib.schema_loader import SchemaStore
 from slave.lib.schema_codec import SchemaCodec
+from file_sender import WindowedSender
 
 # ==================== 全局配置 ====================
 DEBUG_MODE = True  # 開啟以監控二進制封包交換
@@ -69,7 +70,7 @@ class PCTestTool:
             conn.send(resp.encode())
             
             self.slaves[curr_id] = {
-                "conn": conn, "addr": addr, "ack_event": threading.Event(),
+                "conn": conn, "addr": addr, "ack_event": threading.Event(), "sender": None,
                 "parser": StreamParser(), "last_seen": time.time(),
                 "mem_free": 0, "uptime_ms": 0, "is_identified": False
             }
@@ -135,6 +136,8 @@ class PCTestTool:
             elif cmd == 0x3008: # STREAM_READY_ACK
                 print(f"\n✅ [MCU Ready] Block {args['block_id']} loaded on {cid}")
             elif cmd == 0x2004: # FILE_ACK
+                sender = self.slaves[cid].get("sender")
+                if sender: sender.on_ack(args)
                 self.slaves[cid]["ack_event"].set()
             elif cmd == 0x1102:
                 print(f"\n📊 [Status] {cid}: {args['status_json']}")
@@ -173,6 +176,10 @@ class PCTestTool:
         print("4. PAUSE / RESUME")
         print("5. STOP / BLACK")
         print("6. SEEK (Target Frame)")
+        print("7. LEVEL (Brightness / Gamma)")
+        print("8. PLAYLIST (a.bin,b.bin...)")
+        print("9. EFFECT (1 solid / 2 rainbow / 3 chase / 4 breathe / 5 noise, 0 = stop)")
+        print("10. OVERLAY spot (live layer over the show, radius 0 = clear)")
         
         c = input("\n👉 Choice: ")
         
@@ -193,6 +200,54 @@ class PCTestTool:
         elif c == '6': # Seek
             f_idx = int(input("Frame index: "))
             self.send_to_targets(targets, 0x3004, {"target_block": 0, "target_frame": f_idx})
+        elif c == '7': # Level
+            bri = int(input("Brightness (0-255): ") or 255)
+            gam = float(input("Gamma (1.0 = linear, 2.2 typical): ") or 1.0)
+            self.send_to_targets(targets, 0x3006, {
+                "brightness": bri, "gamma_x100": int(gam * 100),
+                "wb_r": 255, "wb_g": 255, "wb_b": 255, "wb_w": 255
+            })
+            print(f"💡 Level Sent: bri={bri} gamma={gam}")
+        elif c == '8': # Playlist
+            files = [f.strip() for f in input("Files (comma separated): ").split(",") if f.strip()]
+            loops = int(input("Loops per item [1]: ") or 1)
+            fade = int(input("Crossfade frames [0]: ") or 0)
+            rep = int(input("Repeat list (1/0) [0]: ") or 0)
+            items = [{"file": f, "loops": loops, "fade": fade if i else 0} for i, f in enumerate(files)]
+            self.send_to_targets(targets, 0x3014, {"repeat": rep, "playlist_json": json.dumps(items)})
+            print(f"📜 Playlist Sent: {len(items)} items (wait READY, then START PLAY)")
+        elif c == '9': # Effect
+            eid = int(input("Effect id [2]: ") or 2)
+            if eid == 0:
+                self.send_to_targets(targets, 0x4002, {})
+                return
+            rgb = [int(v) for v in (input("Color r,g,b [255,80,0]: ") or "255,80,0").split(",")]
+            self.send_to_targets(targets, 0x4001, {
+                "effect_id": eid, "fps": int(input("FPS (0 = local) [0]: ") or 0),
+                "speed": int(input("Speed (256 = 1 cycle/s) [128]: ") or 128),
+                "scale": int(input("Scale [256]: ") or 256),
+                "param": int(input("Param [255]: ") or 255),
+                "r": rgb[0], "g": rgb[1], "b": rgb[2], "r2": 0, "g2": 0, "b2": 0
+            })
+            print(f"✨ Effect Sent: {eid}")
+        elif c == '10': # Overlay
+            radius = int(input("Radius (pixels, 0 = clear) [10]: ") or 10)
+            if radius == 0:
+                self.send_to_targets(targets, 0x3015, {"ctrl": 3, "mode": 0, "start": 0, "count": 0, "data": b""})
+                return
+            center = int(input("Center pixel [20]: ") or 20)
+            mode = int(input("Mode (0 normal / 1 add / 2 multiply) [0]: ") or 0)
+            bpp = int(input("Bytes per pixel (RGBW8888 4 / RGB888 3 / W8 1) [4]: ") or 4)
+            rgbw = [int(v) for v in (input("Color r,g,b,w [255,255,255,0]: ") or "255,255,255,0").split(",")]
+            px = bytes(rgbw[3:4] if bpp == 1 else rgbw[:bpp])
+            start = max(0, center - radius)
+            alpha = bytes(max(0, 255 - abs(i - center) * 255 // radius) for i in range(start, center + radius))
+            # ctrl 3 = 清空 + 發佈 (單包即整個追光)
+            self.send_to_targets(targets, 0x3015, {
+                "ctrl": 3, "mode": mode, "start": start, "count": len(alpha),
+                "data": alpha + px * len(alpha)
+            })
+            print(f"🔦 Overlay Sent: {len(alpha)} px @ {start}")
 
     # ==================== 選單 ====================
     def select_targets(self):
@@ -219,33 +274,32 @@ class PCTestTool:
         with open(local_name, "rb") as f:
             data = f.read()
         
-        sha = hashlib.sha256(data).digest()
         f_id = 100
-        chunk_size = 1024
         
         print(f"\n🚀 Uploading to {targets}...")
-        self.send_to_targets(targets, 0x2001, {
-            "file_id": f_id, "total_size": len(data), 
-            "chunk_size": chunk_size, "sha256": sha, "path": remote_path
-        })
+        # 每台一個視窗化發送器並行上傳 (ACK 由收包執行緒轉給各自的 sender)
+        done = {}
+        def upload(tid):
+            sender = WindowedSender(lambda cmd, args: self.send_to_targets([tid], cmd, args))
+            self.slaves[tid]["sender"] = sender
+            try:
+                done[tid] = sender.send_file(data, remote_path, file_id=f_id,
+                    progress=lambda n, total: print(f"  ﹂ 📤 [{tid}] Progress: {n}/{total} bytes", end='\r'))
+            except Exception as e:
+                done[tid] = {"error": str(e)}
+            finally:
+                self.slaves[tid]["sender"] = None
         
-        for off in range(0, len(data), chunk_size):
-            chunk = data[off : off + chunk_size]
-            for tid in targets:
-                if tid not in self.slaves: continue
-                # 停等機制
-                retry = 0
-                while retry < 5:
-                    self.slaves[tid]["ack_event"].clear()
-                    self.send_to_targets([tid], 0x2002, {"file_id": f_id, "offset": off, "data": chunk})
-                    if self.slaves[tid]["ack_event"].wait(timeout=1.0):
-                        break
-                    retry += 1
-                    print(f"⚠️ [{tid}] Retry {retry}/5 for offset {off}")
-            
-            print(f"  ﹂ 📤 Progress: {min(off+chunk_size, len(data))}/{len(data)} bytes", end='\r')
-            
-        self.send_to_targets(targets, 0x2003, {"file_id": f_id})
+        workers = [threading.Thread(target=upload, args=(tid,), daemon=True)
+                   for tid in targets if tid in self.slaves]
+        for t in workers: t.start()
+        for t in workers: t.join()
+        
+        for tid, st in done.items():
+            if "error" in st:
+                print(f"\n❌ [{tid}] {st['error']}")
+            else:
+                print(f"\n✅ [{tid}] {st['kbps']} KB/s, window {st['window']}, retx {st['retransmits']}")
         print("\n✅ Upload Complete.")
 
     def run(self):
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+NLPK 壓縮秀檔編碼器 (與 slave/lib/show_reader.PackedShowReader 對應)
+功能: 把單一 Slave 的原始幀序列 (data.bin 或 PXLD v3) 壓縮為「差分 + 行程」格式
+      - 每幀只記錄相對上一幀改變的字節段，不變段以 1 字節跳過指令表示
+      - 每 keyint 幀寫一個關鍵幀 (以全 0 幀為底)，黑場 / 稀疏幀同樣很小
+      - 連續相同的幀 (靜止畫面 / 黑場) 只寫一條 HOLD 記錄 + 重複次數
+格式:
+  檔頭 32 B  "<4sBBHIIHHIII": magic "NLPK", ver=1, flags, hdr_len,
+             frame_size, frame_count, fps, keyint, index_off, data_end, max_rec
+  記錄       type u8 (0=KEY, 1=DELTA, 2=HOLD) + len u24 LE + 指令流
+             HOLD 的內容為 u32 n：上一幀再重複 n 幀 (關鍵幀處截斷，保證索引可跳)
+             KEY / DELTA 的 type | 0x80 = 硬切 (檔頭 flags bit0)：slave 插值時不與前一幀混合
+  指令       t < 0x80  → 後隨 t+1 個字面字節
+             t >= 0x80 → 跳過 t-0x7F 個不變字節
+  索引       (檔尾, index_off 指向) count u32 + 關鍵幀號 u32[count] + 記錄偏移 u32[count]
+             關鍵幀過多時均勻抽稀到 index_max 條，一小時的秀也只佔數 KB
+"""
+
+import argparse
+import re
+import struct
+import sys
+from typing import Iterable, Iterator
+
+PACK_MAGIC = b"NLPK"
+PACK_VERSION = 1
+PACK_HDR = "<4sBBHIIHHIII"
+PACK_HDR_SIZE = 32
+REC_KEY = 0
+REC_DELTA = 1
+REC_HOLD = 2
+REC_CUT = 0x80
+FLAG_CUTS = 0x01
+
+MAX_LIT = 0x80   # 單條字面指令最多字節
+MAX_SKIP = 0x80  # 單條跳過指令最多字節
+# 兩段改變之間的不變間隙不超過此長度時併入字面段 (跳過 + 新字面頭 = 2 字節)
+MERGE_GAP = 2
+# 索引條目上限 (8 B / 條)：512 條 = 4 KB
+INDEX_MAX = 512
+# 硬切判定：相對上一幀變化超過 CUT_DELTA 級的字節佔比 >= cut_pct %
+CUT_DELTA = 64
+CUT_PCT = 40
+
+_CHANGED = re.compile(rb"[^\x00]+")
+
+
+def _xor(a: bytes, b: bytes) -> bytes:
+    n = len(a)
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(n, "little")
+
+
+def encode_ops(cur: bytes, ref: bytes) -> bytes:
+    """產生把 ref 變成 cur 的指令流"""
+    spans = []
+    for m in _CHANGED.finditer(_xor(cur, ref)):
+        s, e = m.span()
+        if spans and s - spans[-1][1] <= MERGE_GAP:
+            spans[-1][1] = e
+        else:
+            spans.append([s, e])
+
+    out = bytearray()
+    pos = 0
+    for s, e in spans:
+        gap = s - pos
+        while gap > 0:
+            k = min(gap, MAX_SKIP)
+            out.append(0x7F + k)
+            gap -= k
+        while s < e:
+            k = min(e - s, MAX_LIT)
+            out.append(k - 1)
+            out += cur[s:s + k]
+            s += k
+        pos = e
+    # 尾部不變段無需指令
+    return bytes(out)
+
+
+def apply_ops(frame: bytearray, ops: bytes) -> None:
+    """參考解碼 (與板上 viper 版本逐字節一致)"""
+    i = p = 0
+    n = len(ops)
+    while i < n:
+        t = ops[i]
+        i += 1
+        if t < 0x80:
+            k = t + 1
+            frame[p:p + k] = ops[i:i + k]
+            i += k
+            p += k
+        else:
+            p += t - 0x7F
+        if p > len(frame):
+            raise ValueError("ops overrun frame")
+
+
+class ShowPacker:
+    """逐幀寫入 NLPK 檔 (先寫佔位檔頭，close 時回填)"""
+
+    def __init__(self, fp, frame_size: int, fps: int = 40, keyint: int = 200,
+                 index_max: int = INDEX_MAX, hold: bool = True, cut_pct: int = CUT_PCT):
+        if frame_size <= 0:
+            raise ValueError("frame_size must be > 0")
+        self.fp = fp
+        self.fs = frame_size
+        self.fps = fps
+        self.keyint = max(1, keyint)
+        self.count = 0
+        self.keys = 0
+        self.max_rec = 0
+        self.raw_bytes = 0
+        self.index_max = index_max
+        self.index_bytes = 0
+        self.hold = hold
+        self.held = 0         # 以 HOLD 表示的幀數
+        self.cut_pct = cut_pct  # 0 = 不標記硬切
+        self.cuts = 0         # 標記為硬切的幀數
+        self._pending = 0     # 尚未寫出的重複次數
+        self._keys = []   # (幀號, 記錄偏移)
+        self._prev = bytes(frame_size)
+        self._zero = bytes(frame_size)
+        self._start = fp.tell()
+        fp.write(bytes(PACK_HDR_SIZE))
+        self._pos = PACK_HDR_SIZE
+
+    def add(self, frame: bytes) -> None:
+        if len(frame) != self.fs:
+            raise ValueError(f"frame {self.count}: {len(frame)} B != {self.fs}")
+        frame = bytes(frame)
+        key = self.count % self.keyint == 0
+        if self.hold and not key and self.count and frame == self._prev:
+            self._pending += 1
+            self.held += 1
+            self.raw_bytes += self.fs
+            self.count += 1
+            return
+        self._flush_hold()
+        if key:
+            kind, ops = REC_KEY, encode_ops(frame, self._zero)
+            self._keys.append((self.count, self._pos))
+            self.keys += 1
+        else:
+            kind, ops = REC_DELTA, encode_ops(frame, self._prev)
+        if self.count and self.is_cut(frame, self._prev):
+            kind |= REC_CUT
+            self.cuts += 1
+        self._record(kind, ops)
+        self.max_rec = max(self.max_rec, len(ops))
+        self.raw_bytes += self.fs
+        self._prev = frame
+        self.count += 1
+
+    def is_cut(self, cur: bytes, prev: bytes) -> bool:
+        """場景硬切：大量字節大幅跳變 (插值會產生兩場景疊影，應改為換幀保持)"""
+        if not self.cut_pct:
+            return False
+        big = sum(1 for a, b in zip(cur, prev) if a - b > CUT_DELTA or b - a > CUT_DELTA)
+        return big * 100 >= self.cut_pct * self.fs
+
+    def _record(self, kind: int, body: bytes) -> None:
+        if len(body) >= 1 << 24:
+            raise ValueError("record too large")
+        self.fp.write(bytes((kind, len(body) & 0xFF, (len(body) >> 8) & 0xFF, len(body) >> 16)))
+        self.fp.write(body)
+        self._pos += 4 + len(body)
+
+    def _flush_hold(self) -> None:
+        if self._pending:
+            self._record(REC_HOLD, struct.pack("<I", self._pending))
+            self._pending = 0
+
+    def _index(self):
+        """抽稀後的關鍵幀表 (保留第 0 幀)"""
+        keys = self._keys
+        if self.index_max <= 0:
+            return []
+        stride = -(-len(keys) // self.index_max)
+        return keys[::stride]
+
+    def close(self) -> int:
+        """寫入索引並回填檔頭，返回檔案總字節數"""
+        self._flush_hold()
+        index_off = 0
+        size = self._pos
+        keys = self._index()
+        if keys:
+            index_off = self._pos
+            blob = struct.pack(f"<I{len(keys)}I{len(keys)}I", len(keys),
+                               *(k for k, _ in keys), *(o for _, o in keys))
+            self.fp.write(blob)
+            self.index_bytes = len(blob)
+            size += len(blob)
+        end = self.fp.tell()
+        self.fp.seek(self._start)
+        self.fp.write(struct.pack(PACK_HDR, PACK_MAGIC, PACK_VERSION, FLAG_CUTS if self.cuts else 0, PACK_HDR_SIZE,
+                                  self.fs, self.count, self.fps, self.keyint,
+                                  index_off, self._pos, self.max_rec))
+        self.fp.seek(end)
+        return size
+
+
+def read_header(data: bytes) -> dict:
+    if len(data) < PACK_HDR_SIZE or data[:4] != PACK_MAGIC:
+        raise ValueError("not a NLPK file")
+    (magic, ver, flags, hlen, fs, count, fps, keyint,
+     index_off, data_end, max_rec) = struct.unpack_from(PACK_HDR, data)
+    return {"version": ver, "flags": flags, "hdr_len": hlen, "frame_size": fs,
+            "frame_count": count, "fps": fps, "keyint": keyint,
+            "index_off": index_off, "data_end": data_end, "max_rec": max_rec}
+
+
+def read_index(data: bytes) -> list:
+    """返回 [(關鍵幀號, 記錄偏移)]；無索引為空表"""
+    off = read_header(data)["index_off"]
+    if not off:
+        return []
+    n = struct.unpack_from("<I", data, off)[0]
+    v = struct.unpack_from(f"<{2 * n}I", data, off + 4)
+    return list(zip(v[:n], v[n:]))
+
+
+def iter_unpack(data: bytes, cuts: list = None) -> Iterator[bytes]:
+    """逐幀解碼整個 NLPK 檔 (主機端驗證用)；給定 cuts 時附加硬切幀號"""
+    h = read_header(data)
+    fs = h["frame_size"]
+    frame = bytearray(fs)
+    off = h["hdr_len"]
+    left = h["frame_count"]
+    while left > 0:
+        kind = data[off]
+        ln = int.from_bytes(data[off + 1:off + 4], "little")
+        body = data[off + 4:off + 4 + ln]
+        off += 4 + ln
+        if kind & REC_CUT and cuts is not None:
+            cuts.append(h["frame_count"] - left)
+        kind &= ~REC_CUT
+        if kind == REC_HOLD:
+            n = min(struct.unpack("<I", body)[0], left)
+            for _ in range(n):
+                yield bytes(frame)
+            left -= n
+            continue
+        if kind == REC_KEY:
+            frame[:] = bytes(fs)
+        elif kind != REC_DELTA:
+            raise ValueError(f"unknown record type {kind} @ {off}")
+        apply_ops(frame, body)
+        left -= 1
+        yield bytes(frame)
+
+
+def pack_frames(frames: Iterable[bytes], frame_size: int, fps: int = 40, keyint: int = 200,
+                index_max: int = INDEX_MAX, hold: bool = True, cut_pct: int = CUT_PCT) -> bytes:
+    """記憶體內壓縮 (基準測試 / 小檔用)"""
+    import io
+    buf = io.BytesIO()
+    pk = ShowPacker(buf, frame_size, fps, keyint, index_max, hold, cut_pct)
+    for f in frames:
+        pk.add(f)
+    pk.close()
+    return buf.getvalue()
+
+
+def _raw_frames(path: str, frame_size: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        while True:
+            b = f.read(frame_size)
+            if len(b) < frame_size:
+                return
+            yield b
+
+
+def _pxld_frames(path: str, slave_id: int, layout) -> Iterator[bytes]:
+    from PXLDv3Splitter import PXLDv3Decoder, repack_pixels
+    with PXLDv3Decoder(path) as dec:
+        for fd in dec.iterate_frames():
+            yield repack_pixels(dec.get_slave_data(fd, slave_id), layout)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="NLPK 壓縮秀檔編碼 / 驗證",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+範例:
+  python show_pack.py data.bin -o data.nlpk --frame-size 1344
+  python show_pack.py show.pxld -s 3 --format RGB888:290,W8:16 -o data.bin
+  python show_pack.py data.nlpk --verify data_raw.bin
+        """)
+    parser.add_argument('input_file', help='原始 data.bin、PXLD v3 或 NLPK 檔')
+    parser.add_argument('-o', '--output', help='輸出檔 (NLPK)')
+    parser.add_argument('--frame-size', type=int, help='原始 data.bin 的單幀字節數')
+    parser.add_argument('-s', '--slave-id', type=int, help='PXLD 輸入：要壓縮的 Slave ID')
+    parser.add_argument('--format', type=str, default=None, help='PXLD 輸入：輸出格式佈局')
+    parser.add_argument('--fps', type=int, default=40)
+    parser.add_argument('--keyint', type=int, default=200, help='關鍵幀間隔 (幀)')
+    parser.add_argument('--index-max', type=int, default=INDEX_MAX, help='關鍵幀索引條目上限 (0 = 不寫索引)')
+    parser.add_argument('--no-hold', action='store_true', help='不使用 HOLD 記錄 (相同幀也寫成空差分)')
+    parser.add_argument('--cut-pct', type=int, default=CUT_PCT,
+                        help=f'硬切判定：大幅跳變 (> {CUT_DELTA} 級) 字節佔比 %% (0 = 不標記)')
+    parser.add_argument('--verify', metavar='RAW', help='解碼 NLPK 並與原始檔逐幀比對')
+    args = parser.parse_args()
+
+    with open(args.input_file, "rb") as f:
+        magic = f.read(4)
+
+    if magic == PACK_MAGIC:
+        with open(args.input_file, "rb") as f:
+            data = f.read()
+        h = read_header(data)
+        print(f"📦 {args.input_file}: {h}")
+        ix = read_index(data)
+        if ix:
+            print(f"🔑 索引 {len(ix)} 條 (關鍵幀 {ix[0][0]} .. {ix[-1][0]})")
+        if args.verify:
+            fs = h["frame_size"]
+            n = 0
+            for n, (a, b) in enumerate(zip(iter_unpack(data), _raw_frames(args.verify, fs)), 1):
+                if a != b:
+                    print(f"❌ 第 {n - 1} 幀不一致")
+                    return 1
+            print(f"✅ {n} 幀一致")
+        return 0
+
+    if not args.output:
+        parser.error("需要 -o/--output")
+    if magic == b"PXLD":
+        if args.slave_id is None:
+            parser.error("PXLD 輸入需要 -s/--slave-id")
+        from PXLDv3Splitter import parse_layout
+        frames = _pxld_frames(args.input_file, args.slave_id, parse_layout(args.format))
+        first = next(frames, None)
+        if first is None:
+            print("❌ PXLD 無幀")
+            return 1
+        fs = len(first)
+        frames = _chain(first, frames)
+    else:
+        if not args.frame_size:
+            parser.error("原始 data.bin 需要 --frame-size")
+        fs = args.frame_size
+        frames = _raw_frames(args.input_file, fs)
+
+    with open(args.output, "wb") as out:
+        pk = ShowPacker(out, fs, args.fps, args.keyint, args.index_max, not args.no_hold, args.cut_pct)
+        for fr in frames:
+            pk.add(fr)
+        size = pk.close()
+    ratio = pk.raw_bytes / size if size else 0
+    print(f"✅ {pk.count} 幀 ({pk.keys} 關鍵幀) {pk.raw_bytes:,} B → {size:,} B "
+          f"(×{ratio:.1f}, 最大記錄 {pk.max_rec} B, 靜止幀 {pk.held}, 硬切 {pk.cuts}, 索引 {pk.index_bytes} B)")
+    return 0
+
+
+def _chain(first: bytes, rest: Iterator[bytes]) -> Iterator[bytes]:
+    yield first
+    yield from rest
+
+
+if __name__ == "__main__":
+    sys.exit(main())